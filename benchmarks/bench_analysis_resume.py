@@ -0,0 +1,126 @@
+"""
+Benchmark: reanudación del análisis por lotes tras una caída (analysis_runs).
+
+Lanza analyze_ideas_batch con --ideas ideas en un proceso aparte y lo mata con
+SIGKILL cuando hay --kill-at ideas guardadas en disco (simula la caída del
+proceso o de la petición de Gradio). Después repite el mismo lote, que reanuda
+la ejecución, y lo compara con un lote completo desde cero. Cuenta las llamadas
+al LLM de cada ejecución a partir de la telemetría.
+
+Las ejecuciones se guardan en un directorio temporal (ANALYSIS_RUNS_DIR) y los
+PDF generados se borran salvo con --keep.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_analysis_resume.py
+    python benchmarks/bench_analysis_resume.py --ideas 80 --kill-at 40
+    python benchmarks/bench_analysis_resume.py --ideas 10 --kill-at 5 --live
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import signal
+import argparse
+import tempfile
+import subprocess
+
+os.environ.setdefault("LLM_CACHE_ENABLED", "0")
+os.environ.setdefault("LLM_TELEMETRY_SUMMARY", "0")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from bench_ranking_modes import make_idea  # noqa: E402
+
+_TITLE = "Lote de prueba"
+_CONTEXT = "Priorizar ideas con retorno en menos de 3 años"
+
+
+def child(args):
+    """Un análisis del lote en un proceso nuevo; imprime el resultado en JSON."""
+    if not args.live:
+        from llm_fake_server import start_fake_server_in_thread
+        _, url = start_fake_server_in_thread(latency=args.latency)
+        os.environ["LLM_MODE"] = "fake"
+        os.environ["LLM_FAKE_SERVER_URL"] = url
+
+    import analysis_module2 as am
+    from llm_telemetry import get_telemetry
+
+    ideas = [make_idea(i)["idea"] for i in range(1, args.ideas + 1)]
+    start = time.perf_counter()
+    text, pdf_path = am.analyze_ideas_batch(ideas, _TITLE, _CONTEXT, resume=args.child_mode == "resume")
+    elapsed = time.perf_counter() - start
+    if pdf_path and os.path.exists(pdf_path) and not args.keep:
+        os.remove(pdf_path)
+    calls = sum(1 for r in get_telemetry().snapshot() if r.get("type") == "llm_call")
+    print("RESULT " + json.dumps({"seconds": elapsed, "calls": calls, "ok": bool(text)}))
+
+
+def _saved_ideas(runs_dir):
+    count = 0
+    for root, _, files in os.walk(runs_dir):
+        if os.path.basename(root) == "ideas":
+            count += sum(1 for name in files if name.endswith(".json"))
+    return count
+
+
+def _spawn(args, mode, runs_dir):
+    cmd = [sys.executable, os.path.abspath(__file__), "--child-mode", mode, "--ideas", str(args.ideas),
+           "--latency", args.latency]
+    cmd += ["--live"] if args.live else []
+    cmd += ["--keep"] if args.keep else []
+    env = dict(os.environ, ANALYSIS_RUNS_DIR=runs_dir)
+    return subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, env=env)
+
+
+def _result(proc):
+    output, _ = proc.communicate()
+    lines = [line for line in output.splitlines() if line.startswith("RESULT ")]
+    return json.loads(lines[-1][len("RESULT "):]) if lines else None
+
+
+def main(args):
+    runs_dir = tempfile.mkdtemp(prefix="analysis_runs_")
+    try:
+        # 1. Lote interrumpido: SIGKILL con --kill-at ideas guardadas
+        start = time.perf_counter()
+        proc = _spawn(args, "resume", runs_dir)
+        while proc.poll() is None and _saved_ideas(runs_dir) < args.kill_at:
+            time.sleep(0.05)
+        proc.send_signal(signal.SIGKILL)
+        proc.communicate()
+        killed_seconds = time.perf_counter() - start
+        saved = _saved_ideas(runs_dir)
+
+        # 2. El mismo lote otra vez: reanuda la ejecución interrumpida
+        resumed = _result(_spawn(args, "resume", runs_dir))
+
+        # 3. Referencia: el lote completo desde cero
+        fresh = _result(_spawn(args, "fresh", runs_dir))
+    finally:
+        shutil.rmtree(runs_dir, ignore_errors=True)
+
+    print(f"\n💾 REANUDACIÓN DEL ANÁLISIS POR LOTES ({args.ideas} ideas)")
+    print(f"Caída simulada a los {killed_seconds:.1f} s con {saved} ideas guardadas")
+    print(f"{'Ejecución':<22}{'Tiempo (s)':>12}{'Llamadas LLM':>14}")
+    for label, row in (("reanudada", resumed), ("desde cero", fresh)):
+        if not row or not row["ok"]:
+            print(f"{label:<22}  ❌ la ejecución falló")
+            continue
+        print(f"{label:<22}{row['seconds']:>12.1f}{row['calls']:>14}")
+    if resumed and fresh and resumed["ok"] and fresh["ok"]:
+        print(f"Llamadas ahorradas al reanudar: {fresh['calls'] - resumed['calls']} "
+              f"(faltaban {args.ideas - saved} ideas)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ideas", type=int, default=80)
+    parser.add_argument("--kill-at", type=int, default=40, help="Ideas guardadas al simular la caída")
+    parser.add_argument("--latency", default="lognormal:1.0,0.3", help="Latencia del servidor simulado")
+    parser.add_argument("--keep", action="store_true", help="Conservar los PDF generados en output/")
+    parser.add_argument("--live", action="store_true", help="Usar Azure OpenAI en lugar del servidor simulado")
+    parser.add_argument("--child-mode", choices=["resume", "fresh"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    child(args) if args.child_mode else main(args)
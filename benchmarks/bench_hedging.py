@@ -0,0 +1,129 @@
+"""
+Benchmark: latencia de cola de los lotes con y sin peticiones duplicadas (hedging),
+y tiempo hasta caer a la estructura por defecto con el circuit breaker.
+
+Cada lote lanza --batch-size llamadas en paralelo y espera a todas, como
+generate_ranking o analyze_ideas_batch_competitor. El servidor simulado responde
+casi siempre rápido, pero una fracción de las respuestas tarda --slow segundos,
+así que sin hedging cualquier lote que toque una respuesta lenta tarda eso.
+
+Se muestran p50/p95/p99 del tiempo de finalización de los lotes y las peticiones
+duplicadas desperdiciadas (las que lanzó el hedging pero ganó la original).
+
+Uso (desde la raíz del repositorio, sin credenciales):
+    python benchmarks/bench_hedging.py --batches 30 --batch-size 10
+    python benchmarks/bench_hedging.py --breaker --calls 40
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+
+def run_batches(label, hedge_enabled, args):
+    import llm_resilience
+    from llm_gateway import JobThreadPoolExecutor, llm_job
+    from openai_config import get_openai_client, get_deployment_name
+
+    llm_resilience._resilience = llm_resilience.LLMResilience(
+        hedge_enabled=hedge_enabled, min_delay=args.min_delay, min_samples=args.warmup
+    )
+    client = get_openai_client()
+    deployment = get_deployment_name()
+
+    def call(i):
+        client.chat.completions.create(
+            model=deployment,
+            messages=[{"role": "user", "content": f"Evalúa la idea {i} en una frase."}],
+            max_tokens=60,
+            use_cache=False,
+        )
+
+    # Calentamiento: latencias para estimar el p95 antes de empezar a duplicar
+    with JobThreadPoolExecutor(max_workers=args.batch_size) as executor:
+        list(executor.map(call, range(args.warmup)))
+
+    @llm_job(label)
+    def batch(b):
+        with JobThreadPoolExecutor(max_workers=args.batch_size) as executor:
+            list(executor.map(call, range(b * args.batch_size, (b + 1) * args.batch_size)))
+
+    for b in range(args.batches):
+        batch(b)
+
+    times = llm_resilience.get_batch_times(label)[label]
+    return {"label": label, **times, **llm_resilience.get_resilience().get_stats()}
+
+
+def run_breaker(use_breaker, args):
+    import llm_resilience
+    from openai_config import get_openai_client, get_deployment_name
+
+    llm_resilience._resilience = llm_resilience.LLMResilience(
+        hedge_enabled=False, breaker_failures=5 if use_breaker else 0, breaker_cooldown=60
+    )
+    client = get_openai_client()
+    fallbacks = 0
+    start = time.perf_counter()
+    for i in range(args.calls):
+        try:
+            client.chat.completions.create(
+                model=get_deployment_name(),
+                messages=[{"role": "user", "content": f"Resume la idea {i}."}],
+                max_tokens=60,
+                use_cache=False,
+            )
+        except Exception:
+            # Lo que hacen los módulos: devolver su estructura por defecto
+            fallbacks += 1
+    return time.perf_counter() - start, fallbacks, llm_resilience.get_resilience().get_stats()
+
+
+def main(args):
+    from llm_fake_server import start_fake_server_in_thread
+
+    if args.breaker:
+        # Servicio caído: todas las respuestas son 500
+        _, url = start_fake_server_in_thread(latency="fixed:0.2", rate_500=1.0)
+    else:
+        _, url = start_fake_server_in_thread(
+            latency=f"tail:{args.median},0.3,{args.slow_rate},{args.slow}"
+        )
+    os.environ["LLM_MODE"] = "fake"
+    os.environ["LLM_FAKE_SERVER_URL"] = url
+    os.environ.setdefault("LLM_TELEMETRY_SUMMARY", "0")
+    os.environ.setdefault("LLM_MAX_RETRIES", "2")
+
+    if args.breaker:
+        print(f"\n🔌 CIRCUIT BREAKER ({args.calls} llamadas con el servicio devolviendo 500)")
+        for use_breaker in (False, True):
+            seconds, fallbacks, stats = run_breaker(use_breaker, args)
+            label = "con breaker" if use_breaker else "sin breaker"
+            print(f"{label:<14}{seconds:>8.1f}s  {fallbacks} valores por defecto, "
+                  f"{stats['fast_failures']} rechazadas al instante")
+        return
+
+    rows = [run_batches("sin_hedging", False, args), run_batches("con_hedging", True, args)]
+    print(f"\n📊 LOTES ({args.batches} lotes de {args.batch_size} llamadas; "
+          f"{args.slow_rate*100:.0f}% de respuestas de {args.slow:.0f}s)")
+    print(f"{'Configuración':<14}{'p50 (s)':>9}{'p95 (s)':>9}{'p99 (s)':>9}{'Duplicadas':>12}{'Desperdic.':>12}")
+    for row in rows:
+        print(f"{row['label']:<14}{row['p50']:>9.2f}{row['p95']:>9.2f}{row['p99']:>9.2f}"
+              f"{row['hedges']:>12}{row['wasted_hedges']:>12}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batches", type=int, default=30)
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--median", type=float, default=0.5, help="Mediana de latencia normal (s)")
+    parser.add_argument("--slow", type=float, default=15.0, help="Latencia de las respuestas lentas (s)")
+    parser.add_argument("--slow-rate", type=float, default=0.03, help="Fracción de respuestas lentas")
+    parser.add_argument("--min-delay", type=float, default=0.5, help="Espera mínima antes de duplicar (s)")
+    parser.add_argument("--warmup", type=int, default=30, help="Llamadas previas para estimar el p95")
+    parser.add_argument("--breaker", action="store_true", help="Medir el circuit breaker con el servicio caído")
+    parser.add_argument("--calls", type=int, default=40)
+    main(parser.parse_args())
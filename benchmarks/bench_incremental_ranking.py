@@ -0,0 +1,77 @@
+"""
+Benchmark: ranking incremental con RankingModule.rank_ideas.
+
+Rankea --ideas ideas desde cero, añade --new ideas y vuelve a rankear el conjunto:
+en la segunda pasada solo las ideas nuevas llegan al LLM y el resto reutiliza las
+métricas guardadas por huella. Una tercera pasada sin cambios no hace ninguna llamada.
+
+El ranking se guarda en un directorio temporal, no toca el ranked_ideas.json del proyecto.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_incremental_ranking.py --ideas 60 --new 3
+    python benchmarks/bench_incremental_ranking.py --ideas 20 --new 3 --live
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+os.environ.setdefault("LLM_CACHE_ENABLED", "0")
+os.environ.setdefault("LLM_TELEMETRY_SUMMARY", "0")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from bench_ranking_modes import make_idea  # noqa: E402
+
+
+def run(label, module, ideas, args):
+    from llm_telemetry import get_telemetry
+
+    start = time.perf_counter()
+    ranked = module.rank_ideas(ideas, "Priorizar ideas con retorno en menos de 3 años",
+                               max_workers=args.workers, scoring_mode=args.mode)
+    elapsed = time.perf_counter() - start
+
+    records = get_telemetry().snapshot()
+    job = [r["job"] for r in records if r.get("type") == "job" and r.get("name") == "ranking"][-1]
+    calls = sum(1 for r in records if r.get("type") == "llm_call" and r.get("job") == job)
+    return label, len(ideas), len(ranked), elapsed, calls
+
+
+def main(args):
+    if not args.live:
+        from llm_fake_server import start_fake_server_in_thread
+        _, url = start_fake_server_in_thread(latency=args.latency)
+        os.environ["LLM_MODE"] = "fake"
+        os.environ["LLM_FAKE_SERVER_URL"] = url
+
+    from ranking_module import RankingModule
+
+    ideas = [make_idea(i) for i in range(1, args.ideas + 1)]
+    extra = [make_idea(i) for i in range(args.ideas + 1, args.ideas + args.new + 1)]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        module = RankingModule()
+        rows = [
+            run("completo", module, ideas, args),
+            run(f"+{args.new} ideas", module, ideas + extra, args),
+            run("sin cambios", module, ideas + extra, args),
+        ]
+
+    print(f"\n📊 RANKING INCREMENTAL (modo {args.mode}, {args.workers} hilos)")
+    print(f"{'Pasada':<14}{'Ideas':>7}{'Rankeadas':>11}{'Tiempo (s)':>12}{'Llamadas':>10}")
+    for label, n, ranked, seconds, calls in rows:
+        print(f"{label:<14}{n:>7}{ranked:>11}{seconds:>12.1f}{calls:>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ideas", type=int, default=60)
+    parser.add_argument("--new", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=10)
+    parser.add_argument("--mode", default="chain", choices=["chain", "structured"])
+    parser.add_argument("--latency", default="lognormal:1.5,0.4", help="Latencia del servidor simulado")
+    parser.add_argument("--live", action="store_true", help="Usar Azure OpenAI en lugar del servidor simulado")
+    main(parser.parse_args())
@@ -0,0 +1,143 @@
+"""
+Benchmark: extracción de métricas por reglas antes del LLM (metric_rules).
+
+Genera --analyses análisis sintéticos en los que cada métrica aparece explícita
+("TRL 4", "mercado de 2.000 M€", "payback en 18 meses"...) con probabilidad
+--explicit, o lee análisis reales de un JSON (lista de ideas con "analysis").
+Mide:
+  - reglas: tasa de acierto por métrica y tiempo de las expresiones regulares
+  - LLM:    extract_metrics_from_analysis con METRICS_FAST_PATH desactivado y
+            activado contra el servidor simulado (o Azure con --live): llamadas,
+            métricas pedidas por llamada y latencia total ahorrada
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_metric_rules.py --analyses 100
+    python benchmarks/bench_metric_rules.py --json ranked_ideas.json --rules-only
+    python benchmarks/bench_metric_rules.py --analyses 20 --live
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+os.environ.setdefault("LLM_CACHE_ENABLED", "0")
+os.environ.setdefault("LLM_TELEMETRY_SUMMARY", "0")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+# Frases con el valor explícito de cada métrica, en prosa o como "Etiqueta: valor"
+_EXPLICIT = {
+    "trl": lambda rng: f"La tecnología está en TRL {rng.randint(2, 5)} y el objetivo es alcanzar TRL {rng.randint(6, 9)}.",
+    "tamano_mercado": lambda rng: rng.choice([
+        "El tamaño del mercado se estima en {}.", "Tamaño de mercado: {}."
+    ]).format(rng.choice(['800 M€', '2.000 M€', '3,5 mil millones de euros', '12 B€'])),
+    "ingresos_previstos": lambda rng: rng.choice([
+        "Se prevén ingresos anuales de {} millones de euros.", "Ingresos previstos: {} M€."
+    ]).format(rng.choice(['1,2', '4', '8', '25'])),
+    "ratio_costes_ingresos": lambda rng: f"Los costes operativos suponen el {rng.randint(10, 80)}% de los ingresos.",
+    "payback_roi": lambda rng: rng.choice([
+        "La recuperación de la inversión se estima en {}.", "Payback: {}."
+    ]).format(rng.choice(['18 meses', '2-3 años', '4 años'])),
+    "tiempo_desarrollo": lambda rng: rng.choice([
+        "El tiempo de desarrollo es de {}.", "Tiempo de desarrollo: {}."
+    ]).format(rng.choice(['9 meses', '18 meses', '2 años'])),
+    "riesgo_tecnico": lambda rng: f"Riesgo técnico: {rng.choice(['alto', 'medio', 'bajo'])}.",
+    "riesgo_mercado": lambda rng: f"El riesgo de mercado es {rng.choice(['alto', 'moderado', 'bajo'])}.",
+    "alineacion_estrategica": lambda rng: f"Alineación estratégica: {rng.randint(2, 5)}/5.",
+}
+
+_FILLER = [
+    "La propuesta combina sensores IoT con modelos de aprendizaje automático para anticipar fallos.",
+    "El piloto con un cliente de infraestructuras permitiría validar la solución en condiciones reales.",
+    "La competencia incluye grandes integradores y varias startups especializadas.",
+    "El modelo de negocio por suscripción facilita ingresos recurrentes y escalables.",
+    "Será necesario reforzar el equipo con perfiles de ciencia de datos y ciberseguridad.",
+]
+
+
+def synthetic_analyses(count, explicit, seed=0):
+    rng = random.Random(seed)
+    analyses = []
+    for _ in range(count):
+        sentences = list(_FILLER)
+        sentences += [make(rng) for make in _EXPLICIT.values() if rng.random() < explicit]
+        rng.shuffle(sentences)
+        analyses.append(" ".join(sentences))
+    return analyses
+
+
+def load_analyses(path):
+    with open(path, "r", encoding="utf-8") as f:
+        ideas = json.load(f)
+    return [str(idea.get("analysis", "")) for idea in ideas if isinstance(idea, dict) and idea.get("analysis")]
+
+
+def rules(analyses):
+    from metric_rules import RULE_METRICS, extract_metrics_by_rules
+
+    hits = {key: 0 for key in RULE_METRICS}
+    start = time.perf_counter()
+    for text in analyses:
+        values, _ = extract_metrics_by_rules(text)
+        for key in values:
+            hits[key] += 1
+    elapsed = time.perf_counter() - start
+
+    print(f"\n⚡ REGLAS ({len(analyses)} análisis, {elapsed / len(analyses) * 1000:.2f} ms por análisis)")
+    print(f"{'Métrica':<26}{'Acierto':>9}")
+    for key in RULE_METRICS:
+        print(f"{key:<26}{hits[key] / len(analyses):>9.0%}")
+
+
+def llm(analyses, args):
+    if not args.live:
+        from llm_fake_server import start_fake_server_in_thread
+        _, url = start_fake_server_in_thread(latency=args.latency, per_token_ms=args.per_token_ms)
+        os.environ["LLM_MODE"] = "fake"
+        os.environ["LLM_FAKE_SERVER_URL"] = url
+
+    import ranking_module as rm
+    from metric_rules import get_fast_path_stats, reset_fast_path_stats
+
+    rows = []
+    for enabled in (False, True):
+        rm.METRICS_FAST_PATH = enabled
+        reset_fast_path_stats()
+        start = time.perf_counter()
+        for text in analyses:
+            rm.extract_metrics_from_analysis(text, "Plataforma de mantenimiento predictivo", "Retorno en menos de 3 años")
+        rows.append((enabled, time.perf_counter() - start, get_fast_path_stats()))
+
+    print(f"\n🤖 EXTRACCIÓN CON LLM ({len(analyses)} análisis)")
+    print(f"{'Reglas':<10}{'Tiempo (s)':>12}{'Llamadas':>10}{'Evitadas':>10}{'Métricas/llamada':>18}{'s/llamada':>11}")
+    for enabled, elapsed, stats in rows:
+        print(f"{'sí' if enabled else 'no':<10}{elapsed:>12.1f}{stats['llm_calls']:>10}{stats['llm_skipped']:>10}"
+              f"{stats['llm_mean_fields']:>18.1f}{stats['llm_mean_seconds']:>11.2f}")
+    saved = rows[0][1] - rows[1][1]
+    print(f"Latencia ahorrada: {saved:.1f} s ({saved / rows[0][1]:.0%}), {saved / len(analyses):.2f} s por análisis")
+
+
+def main(args):
+    analyses = load_analyses(args.json) if args.json else synthetic_analyses(args.analyses, args.explicit)
+    if not analyses:
+        print("❌ No hay análisis que medir")
+        return
+    rules(analyses)
+    if not args.rules_only:
+        llm(analyses, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--analyses", type=int, default=100)
+    parser.add_argument("--explicit", type=float, default=0.6,
+                        help="Probabilidad de que cada métrica aparezca explícita en un análisis sintético")
+    parser.add_argument("--json", help="JSON con ideas que traen 'analysis' (p. ej. un ranked_ideas.json)")
+    parser.add_argument("--rules-only", action="store_true", help="Medir solo las reglas, sin LLM")
+    parser.add_argument("--latency", default="lognormal:1.0,0.3", help="Latencia del servidor simulado")
+    parser.add_argument("--per-token-ms", type=float, default=15.0,
+                        help="Latencia por token de salida del servidor simulado")
+    parser.add_argument("--live", action="store_true", help="Usar Azure OpenAI en lugar del servidor simulado")
+    main(parser.parse_args())
@@ -0,0 +1,88 @@
+"""
+Benchmark: modo empaquetado del ranking (RANKING_PACKED_CALLS).
+
+Ejecuta generate_ranking en modo "chain" sobre --ideas ideas sin análisis previo,
+primero con una llamada por idea y después con el análisis simplificado y la
+evaluación cualitativa empaquetados (varias ideas por llamada). Cuenta las
+llamadas al LLM por función a partir de la telemetría.
+
+Con el servidor simulado, --packed-drop omite cada idea de las respuestas
+empaquetadas con esa probabilidad, para medir el coste de los reenvíos individuales.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_packed_ranking.py --ideas 100
+    python benchmarks/bench_packed_ranking.py --ideas 150 --packed-drop 0.1
+    python benchmarks/bench_packed_ranking.py --ideas 20 --live
+"""
+
+import os
+import sys
+import time
+import argparse
+from collections import Counter
+
+os.environ.setdefault("LLM_CACHE_ENABLED", "0")
+os.environ.setdefault("LLM_TELEMETRY_SUMMARY", "0")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from bench_ranking_modes import make_idea  # noqa: E402
+
+# Llamadas que cubre el modo empaquetado
+_PACKED_FUNCTIONS = ("generate_simplified_analysis", "generate_qualitative_evaluation", "process_ideas_batch_optimized")
+
+
+def run(packed, ideas, workers):
+    import ranking_module as rm
+    from llm_telemetry import get_telemetry
+
+    # Cada ejecución empieza con la caché en memoria vacía
+    if isinstance(rm._api_cache, dict):
+        rm._api_cache.clear()
+    start = time.perf_counter()
+    ranked = rm.generate_ranking(ideas, ranking_context="Priorizar ideas con retorno en menos de 3 años",
+                                 max_workers=workers, scoring_mode="chain", packed=packed)
+    elapsed = time.perf_counter() - start
+
+    records = get_telemetry().snapshot()
+    job = [r["job"] for r in records if r.get("type") == "job" and r.get("name") == "ranking"][-1]
+    calls = Counter(r.get("function") for r in records if r.get("type") == "llm_call" and r.get("job") == job)
+    return {"packed": packed, "seconds": elapsed, "ranked": len(ranked), "calls": calls}
+
+
+def main(args):
+    if not args.live:
+        from llm_fake_server import start_fake_server_in_thread
+        _, url = start_fake_server_in_thread(latency=args.latency, packed_drop=args.packed_drop)
+        os.environ["LLM_MODE"] = "fake"
+        os.environ["LLM_FAKE_SERVER_URL"] = url
+
+    ideas = [make_idea(i) for i in range(1, args.ideas + 1)]
+    rows = [run(False, ideas, args.workers), run(True, ideas, args.workers)]
+
+    print(f"\n📦 RANKING EMPAQUETADO ({args.ideas} ideas, {args.workers} hilos)")
+    print(f"{'Modo':<14}{'Tiempo (s)':>12}{'Llamadas':>10}{'Llam./idea':>12}{'Análisis+cualit.':>18}")
+    for row in rows:
+        total = sum(row["calls"].values())
+        cheap = sum(row["calls"][name] for name in _PACKED_FUNCTIONS)
+        label = "empaquetado" if row["packed"] else "una por idea"
+        print(f"{label:<14}{row['seconds']:>12.1f}{total:>10}{total / args.ideas:>12.2f}{cheap:>18}")
+
+    before = sum(rows[0]["calls"][name] for name in _PACKED_FUNCTIONS)
+    after = sum(rows[1]["calls"][name] for name in _PACKED_FUNCTIONS)
+    if after:
+        print(f"Reducción en análisis simplificado + evaluación cualitativa: {before / after:.1f}x "
+              f"({before} → {after} llamadas)")
+    for row in rows:
+        detail = ", ".join(f"{name} {count}" for name, count in row["calls"].most_common())
+        print(f"  {'empaquetado' if row['packed'] else 'una por idea'}: {detail}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ideas", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=10)
+    parser.add_argument("--latency", default="lognormal:1.0,0.3", help="Latencia del servidor simulado")
+    parser.add_argument("--packed-drop", type=float, default=0.05,
+                        help="Probabilidad de que el servidor simulado omita una idea de una respuesta empaquetada")
+    parser.add_argument("--live", action="store_true", help="Usar Azure OpenAI en lugar del servidor simulado")
+    main(parser.parse_args())
@@ -0,0 +1,113 @@
+"""
+Benchmark: mejora de ideas extraídas de un PDF con la ruta ThreadPool
+(batch_process_ideas) frente a la ruta asíncrona (batch_process_ideas_async).
+
+Ambas rutas se lanzan desde una corrutina, igual que hace Gradio con
+process_pdf_direct, mientras un latido mide cuánto tarda el event loop en
+responder (lo que percibe la UI).
+
+Uso (desde la raíz del repositorio, con las variables de Azure configuradas):
+    python benchmarks/bench_pdf_processing.py --ideas 100
+
+Sin credenciales, contra el servidor LLM simulado (src/llm_fake_server.py):
+    python benchmarks/bench_pdf_processing.py --ideas 100 --fake lognormal:1.5,0.5
+
+La caché en disco se desactiva para que ambas rutas hagan las mismas llamadas.
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+os.environ.setdefault("LLM_CACHE_ENABLED", "0")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+CONTEXT = "Aplicación en proyectos de ingeniería de Sener: aeroespacial, energía e infraestructuras."
+
+
+def make_ideas(n):
+    return [
+        {
+            "idea": (
+                f"Idea {i}: Sistema de monitorización {i}\n"
+                f"- Descripción general: plataforma de sensores distribuidos número {i} para seguimiento "
+                f"en tiempo real de activos críticos.\n"
+                f"- Mecanismo de acción: fusión de datos y modelos predictivos con alertas tempranas.\n"
+                f"- Ventajas: reducción del {10 + i % 30}% en paradas no planificadas."
+            ),
+            "analysis": "",
+            "metrics": {},
+        }
+        for i in range(1, n + 1)
+    ]
+
+
+async def heartbeat(stop, lags, interval=0.05):
+    """Registra el retraso del event loop respecto al intervalo esperado."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+async def run_path(name, coro_factory):
+    stop = asyncio.Event()
+    lags = []
+    hb = asyncio.create_task(heartbeat(stop, lags))
+    start = time.perf_counter()
+    results = await coro_factory()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await hb
+    return {
+        "path": name,
+        "ideas": len(results),
+        "seconds": elapsed,
+        "max_loop_lag": max(lags) if lags else elapsed,
+    }
+
+
+async def main(n, batch_size, max_concurrency):
+    from pdf_processor_module import batch_process_ideas, batch_process_ideas_async
+
+    ideas = make_ideas(n)
+
+    async def threadpool_path():
+        # Así se llamaba antes desde process_pdf_direct: código síncrono dentro de una corrutina
+        return batch_process_ideas(ideas, batch_size=batch_size, context=CONTEXT)
+
+    async def async_path():
+        return await batch_process_ideas_async(ideas, max_concurrency=max_concurrency, context=CONTEXT)
+
+    rows = [
+        await run_path(f"ThreadPool (batch_size={batch_size})", threadpool_path),
+        await run_path(f"asyncio.gather (max={max_concurrency})", async_path),
+    ]
+
+    print("\n📊 RESULTADOS")
+    print(f"{'Ruta':<32}{'Ideas':>7}{'Tiempo (s)':>12}{'Ideas/s':>10}{'Lag máx. loop (s)':>20}")
+    for row in rows:
+        print(
+            f"{row['path']:<32}{row['ideas']:>7}{row['seconds']:>12.2f}"
+            f"{row['ideas'] / row['seconds']:>10.2f}{row['max_loop_lag']:>20.3f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ideas", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=12)
+    parser.add_argument("--max-concurrency", type=int, default=32)
+    parser.add_argument("--fake", metavar="LATENCIA", default=None,
+                        help="Usar el servidor LLM simulado con esa distribución de latencia (p. ej. fixed:1.0)")
+    args = parser.parse_args()
+
+    if args.fake:
+        # El servidor debe estar levantado antes de importar openai_config
+        from llm_fake_server import start_fake_server_in_thread
+        _, url = start_fake_server_in_thread(latency=args.fake)
+        os.environ["LLM_MODE"] = "fake"
+        os.environ["LLM_FAKE_SERVER_URL"] = url
+    asyncio.run(main(args.ideas, args.batch_size, args.max_concurrency))
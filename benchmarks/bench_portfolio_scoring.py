@@ -0,0 +1,105 @@
+"""
+Benchmark: calculate_final_score idea a idea frente a portfolio_scoring.score_portfolio
+(vectorizado con NumPy) sobre carteras sintéticas de 10k y 100k ideas.
+
+Comprueba además que ambos dan exactamente los mismos valores en todas las columnas,
+y mide la simulación de pesos (reweight_ranking) sobre rankings de cientos de ideas.
+
+Uso (desde la raíz del repositorio; no hace llamadas al LLM):
+    python benchmarks/bench_portfolio_scoring.py
+    python benchmarks/bench_portfolio_scoring.py --sizes 10000 100000 1000000 --skip-scalar-above 100000
+"""
+
+import io
+import os
+import sys
+import time
+import random
+import argparse
+import contextlib
+
+# ranking_module crea el cliente LLM al importarse; en modo fake no necesita credenciales
+os.environ.setdefault("LLM_MODE", "fake")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+_METRICS_1_5 = [
+    "riesgo_tecnico", "tiempo_desarrollo", "ratio_costes_ingresos", "ingresos_previstos",
+    "payback_roi", "tamano_mercado", "riesgo_mercado", "alineacion_estrategica",
+]
+
+
+def make_portfolio(n, seed=0):
+    rng = random.Random(seed)
+    portfolio = []
+    for _ in range(n):
+        metrics = {key: round(rng.uniform(1, 5), 2) for key in _METRICS_1_5}
+        metrics["trl_inicial"] = rng.randint(1, 6)
+        metrics["trl_final"] = rng.randint(metrics["trl_inicial"], 9)
+        metrics["evaluacion_cualitativa"] = (rng.uniform(0, 100) / 100) * 4 + 1
+        portfolio.append(metrics)
+    return portfolio
+
+
+def main(sizes, skip_scalar_above):
+    from ranking_module import calculate_final_score
+    from portfolio_scoring import score_portfolio, SCORE_COLUMNS
+
+    print(f"\n📊 PUNTUACIÓN DE CARTERAS")
+    print(f"{'Ideas':>9}{'Escalar (s)':>13}{'Vector lista (s)':>18}{'Vector DataFrame (s)':>22}{'Aceleración':>13}{'Iguales':>9}")
+    for n in sizes:
+        portfolio = make_portfolio(n)
+        frame = pd.DataFrame(portfolio)
+
+        start = time.perf_counter()
+        from_records = score_portfolio(portfolio)
+        t_records = time.perf_counter() - start
+
+        start = time.perf_counter()
+        score_portfolio(frame)
+        t_frame = time.perf_counter() - start
+
+        t_scalar, equal = None, "-"
+        if n <= skip_scalar_above:
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                reference = [calculate_final_score(m) for m in portfolio]
+            t_scalar = time.perf_counter() - start
+            expected = pd.DataFrame(reference)[SCORE_COLUMNS].to_numpy(dtype=np.float64)
+            equal = "sí" if np.array_equal(expected, from_records[SCORE_COLUMNS].to_numpy(), equal_nan=True) else "NO"
+
+        scalar_text = f"{t_scalar:>13.3f}" if t_scalar is not None else f"{'-':>13}"
+        speedup = f"{t_scalar / t_frame:>12.0f}x" if t_scalar is not None else f"{'-':>13}"
+        print(f"{n:>9}{scalar_text}{t_records:>18.3f}{t_frame:>22.3f}{speedup}{equal:>9}")
+
+
+def main_what_if(sizes, repeats=20):
+    from portfolio_scoring import reweight_ranking
+
+    weights = {"tecnica": 2.0, "economica": 1.0, "mercado": 0.5, "cualitativo": 0.3}
+    print(f"\n🎚️ SIMULACIÓN DE PESOS (reweight_ranking, media de {repeats} repeticiones)")
+    print(f"{'Ideas':>9}{'Tiempo (ms)':>13}{'Cambian de posición':>21}")
+    for n in sizes:
+        ideas = [{"title": f"Idea {i}", "metrics": metrics, "score": 50.0}
+                 for i, metrics in enumerate(make_portfolio(n, seed=1))]
+        ideas = reweight_ranking(ideas)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            result = reweight_ranking(ideas, weights)
+        elapsed_ms = (time.perf_counter() - start) / repeats * 1000
+        moved = sum(1 for idea in result if idea["rank"] != idea["previous_rank"])
+        print(f"{n:>9}{elapsed_ms:>13.1f}{moved:>21}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--skip-scalar-above", type=int, default=100000,
+                        help="No medir el cálculo escalar por encima de este tamaño")
+    parser.add_argument("--what-if-sizes", type=int, nargs="+", default=[100, 500, 1000],
+                        help="Tamaños de ranking para medir la simulación de pesos")
+    args = parser.parse_args()
+    main(args.sizes, args.skip_scalar_above)
+    main_what_if(args.what_if_sizes)
@@ -0,0 +1,89 @@
+"""
+Benchmark: prompts del análisis exhaustivo con el contexto de Sener pegado en el
+mensaje de usuario (formato anterior) frente al prefijo compartido de
+prompt_builder.build_messages.
+
+Siempre cuenta los tokens de entrada de ambos formatos con el tokenizador local.
+Con --calls N además lanza N llamadas reales (o contra el servidor simulado con
+LLM_MODE=fake) con el formato nuevo y muestra los tokens servidos desde la caché
+de prefijos del proveedor y la latencia con y sin prefijo cacheado.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_prompt_prefix.py --ideas 50
+    python benchmarks/bench_prompt_prefix.py --ideas 20 --calls 20
+"""
+
+import os
+import sys
+import time
+import argparse
+
+os.environ.setdefault("LLM_CACHE_ENABLED", "0")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from prompt_builder import (  # noqa: E402
+    PREFIX_CACHE_MIN_TOKENS, SENER_CONTEXT, count_message_tokens, get_prefix_tokens, print_prompt_savings,
+)
+
+
+def make_idea(i):
+    return (
+        f"Idea {i}: Plataforma de mantenimiento predictivo {i} para infraestructuras ferroviarias, "
+        f"con sensores de vibración, gemelo digital y alertas tempranas (reducción estimada del {10 + i % 25}% "
+        f"en paradas no planificadas)."
+    )
+
+
+def legacy_messages(messages):
+    """Formato anterior: instrucción de sistema y el contexto dentro del prompt de usuario."""
+    task_system = messages[1]["content"]
+    user = messages[-1]["content"]
+    return [
+        {"role": "system", "content": task_system},
+        {"role": "user", "content": f"Contexto de Sener:\n{SENER_CONTEXT}\n\n{user}"},
+    ]
+
+
+def main(n_ideas, n_calls):
+    from analysis_module2 import _build_exhaustive_messages
+
+    new_prompts = [_build_exhaustive_messages(make_idea(i)) for i in range(1, n_ideas + 1)]
+    old_prompts = [legacy_messages(m) for m in new_prompts]
+
+    old_tokens = sum(count_message_tokens(m) for m in old_prompts)
+    new_tokens = sum(count_message_tokens(m) for m in new_prompts)
+    prefix = get_prefix_tokens()
+    # Parte fija de cada prompt (prefijo + instrucciones de la tarea): lo que el proveedor puede cachear
+    stable = count_message_tokens(new_prompts[0][:-1])
+    cacheable = stable * (n_ideas - 1) if stable >= PREFIX_CACHE_MIN_TOKENS else 0
+
+    print("\n📊 TOKENS DE ENTRADA")
+    print(f"{'Formato':<34}{'Tokens':>10}{'Tokens/prompt':>15}")
+    print(f"{'Contexto en el prompt (anterior)':<34}{old_tokens:>10}{old_tokens / n_ideas:>15.0f}")
+    print(f"{'Prefijo compartido (nuevo)':<34}{new_tokens:>10}{new_tokens / n_ideas:>15.0f}")
+    print(f"Prefijo compartido: {prefix} tokens ({stable} con las instrucciones de la tarea); "
+          f"cacheables por el proveedor: {cacheable} ({cacheable / max(1, new_tokens) * 100:.1f}% de la entrada)")
+    if not cacheable:
+        print(f"⚠️ La parte fija no llega a {PREFIX_CACHE_MIN_TOKENS} tokens: el proveedor no la cacheará")
+    print("Con el formato anterior el prefijo común es solo la instrucción de sistema; "
+          "el contexto va detrás y no se cachea.")
+
+    if n_calls:
+        from openai_config import get_openai_client, get_deployment_name
+        client = get_openai_client()
+        start = time.perf_counter()
+        for messages in new_prompts[:n_calls]:
+            client.chat.completions.create(
+                model=get_deployment_name(), messages=messages, max_tokens=200, use_cache=False
+            )
+        print(f"\n⏱️ {min(n_calls, n_ideas)} llamadas en {time.perf_counter() - start:.1f}s")
+
+    print_prompt_savings()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ideas", type=int, default=50)
+    parser.add_argument("--calls", type=int, default=0, help="Llamadas reales con el formato nuevo (0 = solo contar tokens)")
+    args = parser.parse_args()
+    main(args.ideas, args.calls)
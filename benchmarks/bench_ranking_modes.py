@@ -0,0 +1,119 @@
+"""
+Benchmark: generate_ranking en modo "chain" (cinco llamadas encadenadas por idea)
+frente al modo "structured" (una llamada por idea con salida JSON según esquema).
+
+Compara tiempo total, llamadas al LLM, tokens de entrada/salida y el acuerdo entre
+ambas puntuaciones (correlación de Spearman del orden, diferencia media de score y
+coincidencia del top 10). El acuerdo solo es significativo contra Azure: el
+servidor simulado devuelve valores aleatorios.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_ranking_modes.py --ideas 50
+    python benchmarks/bench_ranking_modes.py --ideas 20 --live
+"""
+
+import os
+import sys
+import time
+import argparse
+
+os.environ.setdefault("LLM_CACHE_ENABLED", "0")
+os.environ.setdefault("LLM_TELEMETRY_SUMMARY", "0")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+_TOPICS = [
+    "mantenimiento predictivo de catenaria con sensores de vibración",
+    "gemelo digital de plantas de hidrógeno verde",
+    "inspección de puentes con drones y visión artificial",
+    "optimización de rutas de satélites de observación con IA",
+    "almacenamiento térmico en sales fundidas para plantas solares",
+    "monitorización estructural de túneles con fibra óptica",
+    "planificación automática de mantenimiento en aeropuertos",
+    "detección temprana de fallos en turbinas eólicas marinas",
+]
+
+
+def make_idea(i):
+    topic = _TOPICS[i % len(_TOPICS)]
+    return {
+        "title": f"Idea {i}: {topic}",
+        "idea": f"Idea {i}: plataforma de {topic}, con piloto en un cliente de infraestructuras, "
+                f"modelo de negocio por suscripción y reducción estimada de costes del {10 + i % 30}%.",
+    }
+
+
+def _ranks(values):
+    order = sorted(range(len(values)), key=lambda i: values[i])
+    ranks = [0.0] * len(values)
+    for rank, i in enumerate(order):
+        ranks[i] = float(rank)
+    return ranks
+
+
+def spearman(a, b):
+    if len(a) < 2:
+        return 1.0
+    ra, rb = _ranks(a), _ranks(b)
+    n = len(a)
+    d2 = sum((x - y) ** 2 for x, y in zip(ra, rb))
+    return 1 - 6 * d2 / (n * (n * n - 1))
+
+
+def run(mode, ideas, workers):
+    from ranking_module import generate_ranking
+    from llm_telemetry import get_telemetry
+
+    start = time.perf_counter()
+    ranked = generate_ranking(ideas, ranking_context="Priorizar ideas con retorno en menos de 3 años",
+                              max_workers=workers, scoring_mode=mode)
+    elapsed = time.perf_counter() - start
+
+    records = get_telemetry().snapshot()
+    job = [r["job"] for r in records if r.get("type") == "job" and r.get("name") == "ranking"][-1]
+    calls = [r for r in records if r.get("type") == "llm_call" and r.get("job") == job]
+    return {
+        "mode": mode,
+        "seconds": elapsed,
+        "calls": len(calls),
+        "prompt_tokens": sum(r.get("prompt_tokens") or 0 for r in calls),
+        "completion_tokens": sum(r.get("completion_tokens") or 0 for r in calls),
+        "scores": {r["index"]: r["score"] for r in ranked},
+        "top": [r["index"] for r in ranked[:10]],
+    }
+
+
+def main(args):
+    if not args.live:
+        from llm_fake_server import start_fake_server_in_thread
+        _, url = start_fake_server_in_thread(latency=args.latency)
+        os.environ["LLM_MODE"] = "fake"
+        os.environ["LLM_FAKE_SERVER_URL"] = url
+
+    ideas = [make_idea(i) for i in range(1, args.ideas + 1)]
+    chain = run("chain", ideas, args.workers)
+    structured = run("structured", ideas, args.workers)
+
+    print(f"\n📊 RANKING DE {args.ideas} IDEAS ({args.workers} hilos)")
+    print(f"{'Modo':<12}{'Tiempo (s)':>12}{'Llamadas':>10}{'Llam./idea':>12}{'Tok in':>10}{'Tok out':>10}")
+    for row in (chain, structured):
+        print(f"{row['mode']:<12}{row['seconds']:>12.1f}{row['calls']:>10}{row['calls'] / args.ideas:>12.1f}"
+              f"{row['prompt_tokens']:>10}{row['completion_tokens']:>10}")
+
+    common = sorted(set(chain["scores"]) & set(structured["scores"]))
+    a = [chain["scores"][i] for i in common]
+    b = [structured["scores"][i] for i in common]
+    mad = sum(abs(x - y) for x, y in zip(a, b)) / len(common) if common else 0.0
+    overlap = len(set(chain["top"]) & set(structured["top"]))
+    print(f"\n🤝 Acuerdo: Spearman {spearman(a, b):.2f}, diferencia media de score {mad:.1f} puntos, "
+          f"top 10 en común {overlap}/{min(10, len(common))}")
+    if not args.live:
+        print("   (servidor simulado: las puntuaciones son aleatorias, el acuerdo no es representativo)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ideas", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=10)
+    parser.add_argument("--latency", default="lognormal:1.5,0.4", help="Latencia del servidor simulado")
+    parser.add_argument("--live", action="store_true", help="Usar Azure OpenAI en lugar del servidor simulado")
+    main(parser.parse_args())
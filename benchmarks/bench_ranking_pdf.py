@@ -0,0 +1,124 @@
+"""
+Benchmark: PDF del ranking con muchas ideas (ranking_pdf.RankingReportWriter).
+
+Genera --sizes ideas rankeadas sintéticas (texto largo, métricas y justificación)
+y mide, para cada tamaño y layout, el tiempo de generate_ranking_pdf_improved, el
+pico de memoria (RSS) y el tamaño del PDF. Cada medición corre en un proceso
+propio para que el pico de RSS de una no contamine a la siguiente; se muestra
+también el RSS tras importar los módulos, que es la base común.
+
+Layouts:
+  - full: detalle de todas las ideas (como el informe anterior)
+  - top:  tabla resumen de todas las ideas y detalle de las --top-n primeras
+
+Los resúmenes (ejecutivo y de cada idea larga) se piden al servidor LLM simulado,
+o a Azure OpenAI con --live.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_ranking_pdf.py
+    python benchmarks/bench_ranking_pdf.py --sizes 50 200 500 --layouts top --top-n 30
+    SCORE_WHEEL_RENDERER=vector python benchmarks/bench_ranking_pdf.py --sizes 500
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import resource
+import subprocess
+
+os.environ.setdefault("LLM_CACHE_ENABLED", "0")
+os.environ.setdefault("LLM_TELEMETRY_SUMMARY", "0")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from bench_ranking_modes import make_idea  # noqa: E402
+
+_METRICS = ("riesgo_tecnico", "tiempo_desarrollo", "ratio_costes_ingresos", "ingresos_previstos", "payback_roi",
+            "tamano_mercado", "riesgo_mercado", "alineacion_estrategica", "evaluacion_cualitativa")
+
+
+def make_ranked_ideas(count, seed=0):
+    rng = random.Random(seed)
+    ideas = []
+    for i in range(1, count + 1):
+        idea = make_idea(i)
+        # Texto por encima del límite del resumen: cada idea pide su resumen y va al anexo
+        idea["idea"] = " ".join([idea["idea"]] * 3)
+        metrics = {key: round(rng.uniform(1, 5), 2) for key in _METRICS}
+        metrics["trl_inicial"] = rng.randint(2, 5)
+        metrics["trl_final"] = rng.randint(6, 9)
+        idea.update({
+            "score": round(rng.uniform(20, 95), 1),
+            "score_quantitative": round(rng.uniform(20, 95), 1),
+            "score_qualitative": round(rng.uniform(20, 95), 1),
+            "metrics": metrics,
+            "effort": round(rng.uniform(5, 95)),
+            "benefit": round(rng.uniform(5, 95)),
+            "justification": "La idea destaca por su retorno y su encaje con la estrategia. " * 20,
+        })
+        ideas.append(idea)
+    ideas.sort(key=lambda x: -x["score"])
+    return ideas
+
+
+def _peak_rss_mb():
+    # ru_maxrss está en KB en Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def child(args):
+    """Una medición: se ejecuta en un proceso nuevo e imprime el resultado en JSON."""
+    if not args.live:
+        from llm_fake_server import start_fake_server_in_thread
+        _, url = start_fake_server_in_thread(latency=args.latency)
+        os.environ["LLM_MODE"] = "fake"
+        os.environ["LLM_FAKE_SERVER_URL"] = url
+
+    import ranking_module as rm
+
+    ideas = make_ranked_ideas(args.child_size)
+    base_rss = _peak_rss_mb()
+    start = time.perf_counter()
+    path = rm.generate_ranking_pdf_improved(ideas, "Priorizar ideas con retorno en menos de 3 años",
+                                            layout=args.child_layout, top_n=args.top_n)
+    elapsed = time.perf_counter() - start
+    size = os.path.getsize(path) if path and os.path.exists(path) else 0
+    if path and not args.keep:
+        os.remove(path)
+    print("RESULT " + json.dumps({"seconds": elapsed, "base_rss": base_rss, "peak_rss": _peak_rss_mb(),
+                                  "kb": size / 1024, "ok": bool(path)}))
+
+
+def main(args):
+    print(f"\n📄 PDF DE RANKING (rueda {os.getenv('SCORE_WHEEL_RENDERER', 'png')}, top-n {args.top_n})")
+    print(f"{'Ideas':>6}  {'Layout':<7}{'Tiempo (s)':>12}{'RSS base (MB)':>15}{'RSS pico (MB)':>15}{'PDF (KB)':>10}")
+    for size in args.sizes:
+        for layout in args.layouts:
+            cmd = [sys.executable, os.path.abspath(__file__), "--child-size", str(size), "--child-layout", layout,
+                   "--top-n", str(args.top_n), "--latency", args.latency]
+            cmd += ["--live"] if args.live else []
+            cmd += ["--keep"] if args.keep else []
+            output = subprocess.run(cmd, capture_output=True, text=True).stdout
+            lines = [line for line in output.splitlines() if line.startswith("RESULT ")]
+            if not lines:
+                print(f"{size:>6}  {layout:<7}  ❌ la medición falló")
+                continue
+            row = json.loads(lines[-1][len("RESULT "):])
+            print(f"{size:>6}  {layout:<7}{row['seconds']:>12.1f}{row['base_rss']:>15.0f}"
+                  f"{row['peak_rss']:>15.0f}{row['kb']:>10.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 200, 500])
+    parser.add_argument("--layouts", nargs="+", default=["full", "top"], choices=["full", "top"])
+    parser.add_argument("--top-n", type=int, default=20)
+    parser.add_argument("--latency", default="fixed:0.05", help="Latencia del servidor simulado")
+    parser.add_argument("--keep", action="store_true", help="Conservar los PDF generados en output/")
+    parser.add_argument("--live", action="store_true", help="Usar Azure OpenAI en lugar del servidor simulado")
+    parser.add_argument("--child-size", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--child-layout", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    child(args) if args.child_size else main(args)
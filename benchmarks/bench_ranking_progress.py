@@ -0,0 +1,62 @@
+"""
+Benchmark: ranking progresivo (iter_ranking).
+
+Mide cuándo aparece la primera fila del ranking parcial frente al tiempo total,
+en modo "chain" y "structured". En modo structured cada idea es una sola llamada,
+así que la primera fila llega tras un viaje de ida y vuelta al LLM; en modo chain,
+tras la cadena de llamadas de la primera idea que termina.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_ranking_progress.py --ideas 30
+    python benchmarks/bench_ranking_progress.py --ideas 10 --live
+"""
+
+import os
+import sys
+import time
+import argparse
+
+os.environ.setdefault("LLM_CACHE_ENABLED", "0")
+os.environ.setdefault("LLM_TELEMETRY_SUMMARY", "0")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from bench_ranking_modes import make_idea  # noqa: E402
+
+
+def run(mode, ideas, workers):
+    from ranking_module import iter_ranking
+
+    start = time.perf_counter()
+    first_row = None
+    updates = 0
+    for ranked, completed, total in iter_ranking(ideas, "Priorizar ideas con retorno en menos de 3 años",
+                                                 max_workers=workers, scoring_mode=mode):
+        updates += 1
+        if ranked and first_row is None:
+            first_row = time.perf_counter() - start
+    return mode, first_row or 0.0, time.perf_counter() - start, updates
+
+
+def main(args):
+    if not args.live:
+        from llm_fake_server import start_fake_server_in_thread
+        _, url = start_fake_server_in_thread(latency=args.latency)
+        os.environ["LLM_MODE"] = "fake"
+        os.environ["LLM_FAKE_SERVER_URL"] = url
+
+    ideas = [make_idea(i) for i in range(1, args.ideas + 1)]
+    rows = [run(mode, ideas, args.workers) for mode in ("chain", "structured")]
+
+    print(f"\n📊 RANKING PROGRESIVO ({args.ideas} ideas, {args.workers} hilos)")
+    print(f"{'Modo':<12}{'Primera fila (s)':>18}{'Total (s)':>11}{'Actualizaciones':>17}")
+    for mode, first_row, total, updates in rows:
+        print(f"{mode:<12}{first_row:>18.1f}{total:>11.1f}{updates:>17}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ideas", type=int, default=30)
+    parser.add_argument("--workers", type=int, default=10)
+    parser.add_argument("--latency", default="lognormal:1.5,0.4", help="Latencia del servidor simulado")
+    parser.add_argument("--live", action="store_true", help="Usar Azure OpenAI en lugar del servidor simulado")
+    main(parser.parse_args())
@@ -0,0 +1,80 @@
+"""
+Benchmark: resumen ejecutivo del ranking con muchas ideas (generate_ranking_summary).
+
+Compara, para cada tamaño de --sizes:
+  - un prompt:   todas las ideas en un solo prompt (RANKING_SUMMARY_CHUNK_SIZE >= N)
+  - map-reduce:  grupos por banda de puntuación y cuadrante de payoff resumidos en
+                 paralelo y fusionados por niveles (RANKING_SUMMARY_CHUNK_SIZE=--chunk)
+
+Mide tiempo, llamadas al LLM, tokens del mayor prompt (y si cabe en
+LLM_MAX_INPUT_TOKENS) y palabras del resumen. El
+servidor simulado cobra --per-prompt-token-ms por token de entrada, como el prefill
+de un modelo real, y --per-token-ms por token generado.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_ranking_summary.py
+    python benchmarks/bench_ranking_summary.py --sizes 100 1000 --chunk 40
+    python benchmarks/bench_ranking_summary.py --sizes 50 --live
+"""
+
+import os
+import sys
+import time
+import argparse
+
+os.environ.setdefault("LLM_CACHE_ENABLED", "0")
+os.environ.setdefault("LLM_TELEMETRY_SUMMARY", "0")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from bench_ranking_pdf import make_ranked_ideas  # noqa: E402
+
+
+def run(rm, ideas, chunk_size):
+    from llm_telemetry import get_telemetry
+
+    rm.RANKING_SUMMARY_CHUNK_SIZE = chunk_size
+    # Cada ejecución empieza con la caché en memoria vacía
+    if isinstance(rm._api_cache, dict):
+        rm._api_cache.clear()
+    before = len(get_telemetry().snapshot())
+    start = time.perf_counter()
+    summary = rm.generate_ranking_summary(ideas, "Priorizar ideas con retorno en menos de 3 años")
+    elapsed = time.perf_counter() - start
+    calls = [r for r in get_telemetry().snapshot()[before:] if r.get("type") == "llm_call"]
+    max_prompt = max((r.get("prompt_tokens") or 0 for r in calls), default=0)
+    return elapsed, len(calls), max_prompt, len(summary.split())
+
+
+def main(args):
+    if not args.live:
+        from llm_fake_server import start_fake_server_in_thread
+        _, url = start_fake_server_in_thread(latency=args.latency, per_token_ms=args.per_token_ms,
+                                             per_prompt_token_ms=args.per_prompt_token_ms)
+        os.environ["LLM_MODE"] = "fake"
+        os.environ["LLM_FAKE_SERVER_URL"] = url
+
+    import ranking_module as rm
+    from token_budget import LLM_MAX_INPUT_TOKENS
+
+    print(f"\n📝 RESUMEN DEL RANKING (grupos de {args.chunk}+ ideas, fusión de {rm.RANKING_SUMMARY_FAN_IN}, "
+          f"tope de entrada {LLM_MAX_INPUT_TOKENS} tokens)")
+    print(f"{'Ideas':>6}  {'Modo':<12}{'Tiempo (s)':>12}{'Llamadas':>10}{'Mayor prompt (tok)':>20}{'Cabe':>6}{'Palabras':>10}")
+    for size in args.sizes:
+        ideas = make_ranked_ideas(size)
+        for label, chunk_size in (("un prompt", size), ("map-reduce", args.chunk)):
+            elapsed, calls, max_prompt, words = run(rm, ideas, chunk_size)
+            fits = "sí" if max_prompt <= LLM_MAX_INPUT_TOKENS else "no"
+            print(f"{size:>6}  {label:<12}{elapsed:>12.1f}{calls:>10}{max_prompt:>20}{fits:>6}{words:>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[25, 100, 500, 2000])
+    parser.add_argument("--chunk", type=int, default=25, help="Mínimo de ideas por grupo del map")
+    parser.add_argument("--latency", default="lognormal:1.0,0.3", help="Latencia del servidor simulado")
+    parser.add_argument("--per-token-ms", type=float, default=15.0,
+                        help="Latencia por token de salida del servidor simulado")
+    parser.add_argument("--per-prompt-token-ms", type=float, default=0.1,
+                        help="Latencia por token de entrada del servidor simulado")
+    parser.add_argument("--live", action="store_true", help="Usar Azure OpenAI en lugar del servidor simulado")
+    main(parser.parse_args())
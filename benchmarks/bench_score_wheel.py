@@ -0,0 +1,100 @@
+"""
+Benchmark: ruedas de puntuación del PDF de ranking.
+
+Compara, para --ideas ruedas con scores aleatorios insertadas como en
+generate_ranking_pdf_improved (una por página, 40 mm a la derecha):
+  - actual:        una figura polar de matplotlib por idea, rasterizada a PNG
+  - caché fría:    generate_score_wheel con la caché en disco vacía
+  - caché caliente: generate_score_wheel con la caché ya llena (otra ejecución)
+  - vectorial:     draw_score_wheel_pdf con primitivas de fpdf2, sin imagen
+
+Con --full mide además generate_ranking_pdf_improved completo con PNG cacheado y
+con la rueda vectorial (el resumen ejecutivo se pide al servidor LLM simulado).
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_score_wheel.py --ideas 100
+    python benchmarks/bench_score_wheel.py --ideas 100 --full
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from io import BytesIO
+
+# ranking_module crea el cliente LLM al importarse; en modo fake no necesita credenciales
+os.environ.setdefault("LLM_MODE", "fake")
+os.environ.setdefault("LLM_TELEMETRY_SUMMARY", "0")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+
+def build_pdf(scores, draw):
+    from fpdf import FPDF
+
+    pdf = FPDF()
+    pdf.set_font("Arial", "", 11)
+    start = time.perf_counter()
+    for score in scores:
+        pdf.add_page()
+        draw(pdf, score, pdf.w - 50, pdf.get_y(), 40)
+    elapsed = time.perf_counter() - start
+    data = bytes(pdf.output())
+    return elapsed, len(data)
+
+
+def main(args):
+    import ranking_module as rm
+
+    rng = random.Random(0)
+    scores = [round(rng.uniform(20, 95), 1) for _ in range(args.ideas)]
+
+    def draw_uncached(pdf, score, x, y, w):
+        pdf.image(BytesIO(rm._render_score_wheel_png(score)), x=x, y=y, w=w)
+
+    def draw_cached(pdf, score, x, y, w):
+        pdf.image(rm.generate_score_wheel(score), x=x, y=y, w=w)
+
+    def draw_vector(pdf, score, x, y, w):
+        rm.draw_score_wheel_pdf(pdf, score, x, y, w)
+
+    rows = []
+    with tempfile.TemporaryDirectory() as cache_dir:
+        rm.SCORE_WHEEL_CACHE_DIR = cache_dir
+        rows.append(("actual", *build_pdf(scores, draw_uncached)))
+        rm._score_wheel_cache.clear()
+        rows.append(("caché fría", *build_pdf(scores, draw_cached)))
+        # Nueva ejecución: memoria vacía, disco lleno
+        rm._score_wheel_cache.clear()
+        rows.append(("caché caliente", *build_pdf(scores, draw_cached)))
+        rows.append(("vectorial", *build_pdf(scores, draw_vector)))
+
+        print(f"\n🎡 RUEDAS DE PUNTUACIÓN ({args.ideas} ideas, {len(set(scores))} scores distintos)")
+        print(f"{'Método':<16}{'Tiempo (s)':>12}{'ms/rueda':>10}{'PDF (KB)':>10}")
+        for label, seconds, size in rows:
+            print(f"{label:<16}{seconds:>12.2f}{seconds / args.ideas * 1000:>10.1f}{size / 1024:>10.0f}")
+
+        if args.full:
+            from llm_fake_server import start_fake_server_in_thread
+            _, url = start_fake_server_in_thread(latency="fixed:0.05")
+            os.environ["LLM_FAKE_SERVER_URL"] = url
+            ideas = [{"idea": f"Idea {i}: plataforma de mantenimiento predictivo número {i}.",
+                      "title": f"Idea {i}", "score": score, "metrics": {}}
+                     for i, score in enumerate(scores, 1)]
+            print(f"\n📄 generate_ranking_pdf_improved ({args.ideas} ideas)")
+            for renderer in ("png", "vector"):
+                rm.SCORE_WHEEL_RENDERER = renderer
+                start = time.perf_counter()
+                path = rm.generate_ranking_pdf_improved(ideas, "Priorizar retorno a corto plazo")
+                elapsed = time.perf_counter() - start
+                size = os.path.getsize(path) / 1024 if path and os.path.exists(path) else 0
+                print(f"{renderer:<16}{elapsed:>12.2f}s{size:>10.0f} KB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ideas", type=int, default=100)
+    parser.add_argument("--full", action="store_true",
+                        help="Medir también generate_ranking_pdf_improved completo")
+    main(parser.parse_args())
@@ -0,0 +1,109 @@
+"""
+Benchmark: análisis de una idea por secciones en paralelo (ANALYSIS_PARALLEL_SECTIONS).
+
+Mide el tiempo de reloj de analyze_idea_exhaustive_stream (el que usa la UI) y
+de analyze_ideas_batch con una sola llamada por idea y con una llamada por
+sección (o por grupo de --group-size secciones), y lo compara con la sección más
+lenta de cada análisis según la telemetría. En el streaming mide también cuándo
+llega el primer texto parcial. Con el servidor simulado la latencia crece con la salida
+(--per-token-ms) y cada llamada por secciones solo genera las secciones pedidas.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_section_analysis.py
+    python benchmarks/bench_section_analysis.py --ideas 5 --batch 10 --group-size 2
+    python benchmarks/bench_section_analysis.py --ideas 2 --batch 0 --live
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+
+os.environ.setdefault("LLM_CACHE_ENABLED", "0")
+os.environ.setdefault("LLM_TELEMETRY_SUMMARY", "0")
+os.environ.setdefault("ANALYSIS_RUNS_DIR", tempfile.mkdtemp(prefix="analysis_runs_"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from bench_ranking_modes import make_idea  # noqa: E402
+
+
+def _calls_since(telemetry, start):
+    return [r for r in telemetry.snapshot()[start:] if r.get("type") == "llm_call"]
+
+
+def _remove(path):
+    if path and os.path.exists(path):
+        os.remove(path)
+
+
+def exhaustive(am, telemetry, ideas, sections):
+    rows = []
+    for text in ideas:
+        start = len(telemetry.snapshot())
+        t0 = time.perf_counter()
+        first = None
+        for partial, _ in am.analyze_idea_exhaustive_stream(text, build_pdf=False, sections=sections):
+            if partial and first is None:
+                first = time.perf_counter() - t0
+        elapsed = time.perf_counter() - t0
+        calls = _calls_since(telemetry, start)
+        rows.append((elapsed, len(calls), max((c.get("latency", 0) for c in calls), default=0), first or elapsed))
+    return rows
+
+
+def batch(am, telemetry, ideas, sections):
+    start = len(telemetry.snapshot())
+    t0 = time.perf_counter()
+    _, pdf_path = am.analyze_ideas_batch(ideas, "Lote de prueba", sections=sections, resume=False)
+    elapsed = time.perf_counter() - t0
+    _remove(pdf_path)
+    return elapsed, len(_calls_since(telemetry, start))
+
+
+def main(args):
+    if not args.live:
+        from llm_fake_server import start_fake_server_in_thread
+        _, url = start_fake_server_in_thread(latency=args.latency, per_token_ms=args.per_token_ms)
+        os.environ["LLM_MODE"] = "fake"
+        os.environ["LLM_FAKE_SERVER_URL"] = url
+    os.environ["ANALYSIS_SECTION_GROUP_SIZE"] = str(args.group_size)
+
+    import analysis_module2 as am
+    from llm_telemetry import get_telemetry
+
+    telemetry = get_telemetry()
+    ideas = [make_idea(i)["idea"] for i in range(1, max(args.ideas, args.batch) + 1)]
+
+    # Se mide todo primero y se imprime al final (los módulos escriben mucho en consola)
+    single = {sections: exhaustive(am, telemetry, ideas[:args.ideas], sections) for sections in (False, True)} \
+        if args.ideas else {}
+    batched = {sections: batch(am, telemetry, ideas[:args.batch], sections) for sections in (False, True)} \
+        if args.batch else {}
+
+    if single:
+        print(f"\n🧩 ANÁLISIS EXHAUSTIVO ({args.ideas} ideas, grupos de {args.group_size} secciones)")
+        print(f"{'Modo':<16}{'Tiempo medio (s)':>18}{'Primer texto (s)':>18}{'Llamadas/idea':>15}"
+              f"{'Sección más lenta (s)':>23}")
+        for sections, rows in single.items():
+            print(f"{'por secciones' if sections else 'llamada única':<16}"
+                  f"{statistics.mean(r[0] for r in rows):>18.1f}{statistics.mean(r[3] for r in rows):>18.1f}"
+                  f"{statistics.mean(r[1] for r in rows):>15.1f}{statistics.mean(r[2] for r in rows):>23.1f}")
+    if batched:
+        print(f"\n📋 ANÁLISIS POR LOTES ({args.batch} ideas)")
+        print(f"{'Modo':<16}{'Tiempo (s)':>12}{'Llamadas':>10}")
+        for sections, (elapsed, calls) in batched.items():
+            print(f"{'por secciones' if sections else 'llamada única':<16}{elapsed:>12.1f}{calls:>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ideas", type=int, default=5, help="Ideas del análisis exhaustivo (una a una)")
+    parser.add_argument("--batch", type=int, default=10, help="Ideas del análisis por lotes (0 para omitirlo)")
+    parser.add_argument("--group-size", type=int, default=1, help="Secciones por llamada en el modo por secciones")
+    parser.add_argument("--latency", default="lognormal:1.0,0.3", help="Latencia del servidor simulado")
+    parser.add_argument("--per-token-ms", type=float, default=15.0,
+                        help="Latencia por token de salida del servidor simulado")
+    parser.add_argument("--live", action="store_true", help="Usar Azure OpenAI en lugar del servidor simulado")
+    main(parser.parse_args())
@@ -0,0 +1,110 @@
+"""
+Benchmark: efecto de max_tokens sobredimensionado frente al planificado por
+token_budget en la espera de cola y la latencia.
+
+El gateway reserva de la cuota TPM los tokens estimados del prompt + max_tokens
+(como hace Azure), así que max_tokens=16000 en integrator.merge_llm_and_data
+bloquea cuota que no se usa. Se lanzan las mismas peticiones JSON con ambos
+valores de max_tokens y se comparan tiempo total, latencia y espera en cola.
+
+Por defecto usa el servidor LLM simulado (no necesita credenciales):
+    python benchmarks/bench_token_budget.py --calls 40 --tpm 200000
+Contra Azure (cuidado con la cuota):
+    python benchmarks/bench_token_budget.py --live --calls 20
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+
+def make_borrador(i):
+    return {
+        "resumen": f"Informe preliminar {i} sobre mantenimiento predictivo en infraestructuras.",
+        "mercado": {"tamano_millones_eur": 1200 + i, "crecimiento_anual": 0.08},
+        "competidores": [{"nombre": "Siemens", "foco": "digitalización"}, {"nombre": "ABB", "foco": "automatización"}],
+        "recomendaciones": ["Piloto en una línea de metro", "Alianza con un integrador local"],
+    }
+
+
+def run(label, max_tokens_fn, n_calls, workers):
+    from openai_config import get_openai_client, get_deployment_name
+    from llm_gateway import JobThreadPoolExecutor
+    from llm_telemetry import llm_context, get_telemetry
+
+    client = get_openai_client()
+    deployment = get_deployment_name()
+
+    def call(i):
+        borrador = json.dumps(make_borrador(i), ensure_ascii=False)
+        with llm_context(section_id=label):
+            client.chat.completions.create(
+                model=deployment,
+                messages=[
+                    {"role": "system", "content": "Eres un analista que mejora un informe integrando datos externos."},
+                    {"role": "user", "content": f"Devuelve SOLO un objeto JSON.\n\nBORRADOR:\n{borrador}"},
+                ],
+                temperature=0.3,
+                max_tokens=max_tokens_fn(borrador),
+                response_format={"type": "json_object"},
+                use_cache=False,
+            )
+
+    start = time.perf_counter()
+    with JobThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(call, range(n_calls)))
+    elapsed = time.perf_counter() - start
+
+    records = [r for r in get_telemetry().snapshot() if r.get("section_id") == label]
+    latencies = sorted(r["latency"] for r in records)
+    waits = sorted(r["queue_wait"] for r in records)
+    return {
+        "label": label,
+        "seconds": elapsed,
+        "p50": latencies[len(latencies) // 2],
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+        "wait_p95": waits[int(len(waits) * 0.95) - 1],
+    }
+
+
+def main(args):
+    if not args.live:
+        from llm_fake_server import start_fake_server_in_thread
+        _, url = start_fake_server_in_thread(latency=args.latency)
+        os.environ["LLM_MODE"] = "fake"
+        os.environ["LLM_FAKE_SERVER_URL"] = url
+    os.environ["LLM_TPM"] = str(args.tpm)
+    os.environ.setdefault("LLM_TELEMETRY_SUMMARY", "0")
+
+    from openai_config import get_deployment_name
+    from token_budget import plan_call, print_budget_stats
+
+    def planned(borrador):
+        from prompt_builder import count_tokens
+        expected = int(count_tokens(borrador) * 1.3) + 300
+        return plan_call(get_deployment_name(), [], expected, previous_max_tokens=16000).max_tokens
+
+    rows = [
+        run("max_tokens=16000", lambda _: 16000, args.calls, args.workers),
+        run("max_tokens planificado", planned, args.calls, args.workers),
+    ]
+
+    print(f"\n📊 RESULTADOS ({args.calls} llamadas, {args.workers} hilos, TPM={args.tpm})")
+    print(f"{'Configuración':<26}{'Total (s)':>11}{'p50 (s)':>10}{'p95 (s)':>10}{'Cola p95 (s)':>14}")
+    for row in rows:
+        print(f"{row['label']:<26}{row['seconds']:>11.2f}{row['p50']:>10.2f}{row['p95']:>10.2f}{row['wait_p95']:>14.2f}")
+    print_budget_stats()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--tpm", type=int, default=200000, help="Cuota TPM que aplica el gateway")
+    parser.add_argument("--latency", default="lognormal:1.0,0.4", help="Latencia del servidor simulado")
+    parser.add_argument("--live", action="store_true", help="Usar Azure OpenAI en lugar del servidor simulado")
+    main(parser.parse_args())
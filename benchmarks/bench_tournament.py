@@ -0,0 +1,105 @@
+"""
+Benchmark: ranking por torneo (comparaciones por pares).
+
+Con un comparador sintético (calidad latente de cada idea más ruido en cada
+comparación) mide, para --ideas ideas, cuántas comparaciones gasta el torneo
+frente a todos contra todos y qué parte del top-k real recupera. El ruido imita
+al LLM cuando dos ideas están muy parejas y --position-bias la fracción de
+comparaciones en que elige la idea presentada como "A" sin mirarla.
+
+Con --llm ejecuta además generate_tournament_ranking contra el servidor simulado
+(o Azure OpenAI con --live) y mide tiempo, llamadas y aciertos de la caché al
+repetir el mismo torneo.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_tournament.py --ideas 200 --top-k 10
+    python benchmarks/bench_tournament.py --ideas 200 --position-bias 0.3
+    python benchmarks/bench_tournament.py --ideas 50 --llm
+    python benchmarks/bench_tournament.py --ideas 20 --llm --live
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+os.environ.setdefault("LLM_CACHE_ENABLED", "0")
+os.environ.setdefault("LLM_TELEMETRY_SUMMARY", "0")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from bench_ranking_modes import make_idea  # noqa: E402
+
+
+def synthetic(args):
+    from ranking_tournament import run_tournament
+
+    print(f"\n🏆 TORNEO SINTÉTICO ({args.ideas} ideas, top {args.top_k}, {args.seeds} semillas, "
+          f"sesgo hacia A {args.position_bias:.0%})")
+    print(f"{'Ruido':<8}{'Recall top-k':>14}{'Comparaciones':>15}{'% pares':>9}{'Rondas':>8}")
+    for noise in args.noise:
+        recalls, comparisons, rounds = [], [], []
+        for seed in range(args.seeds):
+            rng = random.Random(seed)
+            ideas = [{"idea": f"Idea {i}", "quality": rng.gauss(0, 1)} for i in range(args.ideas)]
+
+            def compare(a, b):
+                if rng.random() < args.position_bias:
+                    return True
+                return a["quality"] + rng.gauss(0, noise) > b["quality"] + rng.gauss(0, noise)
+
+            result = run_tournament(ideas, compare, top_k=args.top_k, max_comparisons=args.budget)
+            truth = {idea["idea"] for idea in sorted(ideas, key=lambda x: -x["quality"])[:args.top_k]}
+            recalls.append(len(truth & {idea["idea"] for idea in result["top_k"]}) / args.top_k)
+            comparisons.append(result["comparisons"])
+            rounds.append(result["rounds"])
+        full = args.ideas * (args.ideas - 1) // 2
+        mean_comparisons = sum(comparisons) / len(comparisons)
+        print(f"{noise:<8}{sum(recalls) / len(recalls):>14.0%}{mean_comparisons:>15.0f}"
+              f"{mean_comparisons / full:>9.1%}{sum(rounds) / len(rounds):>8.1f}")
+    print(f"Todos contra todos: {args.ideas * (args.ideas - 1) // 2} comparaciones")
+
+
+def llm(args):
+    if not args.live:
+        from llm_fake_server import start_fake_server_in_thread
+        _, url = start_fake_server_in_thread(latency=args.latency)
+        os.environ["LLM_MODE"] = "fake"
+        os.environ["LLM_FAKE_SERVER_URL"] = url
+
+    import ranking_tournament as rtm
+
+    ideas = [make_idea(i) for i in range(1, args.ideas + 1)]
+    context = "Priorizar ideas con retorno en menos de 3 años"
+    cache = rtm.ComparisonCache(context)
+    print(f"\n🤖 TORNEO CON LLM ({args.ideas} ideas, top {args.top_k})")
+    print(f"{'Ejecución':<12}{'Tiempo (s)':>12}{'Llamadas':>10}{'Caché':>8}{'Rondas':>8}")
+    for label in ("primera", "repetida"):
+        start = time.perf_counter()
+        result = rtm.run_tournament(ideas, lambda a, b: rtm.llm_compare(a, b, context), top_k=args.top_k,
+                                    max_comparisons=args.budget, max_workers=args.workers, cache=cache)
+        elapsed = time.perf_counter() - start
+        print(f"{label:<12}{elapsed:>12.1f}{result['comparisons']:>10}{result['cache_hits']:>8}{result['rounds']:>8}")
+
+
+def main(args):
+    synthetic(args)
+    if args.llm:
+        llm(args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ideas", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--budget", type=int, default=None, help="Máximo de comparaciones pagadas")
+    parser.add_argument("--noise", type=float, nargs="+", default=[0.0, 0.25, 0.5],
+                        help="Desviación del ruido de cada comparación (la calidad es N(0,1))")
+    parser.add_argument("--position-bias", type=float, default=0.0,
+                        help="Fracción de comparaciones en que gana la idea presentada como A")
+    parser.add_argument("--seeds", type=int, default=5)
+    parser.add_argument("--llm", action="store_true", help="Medir también el torneo con el LLM")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latency", default="lognormal:0.8,0.3", help="Latencia del servidor simulado")
+    parser.add_argument("--live", action="store_true", help="Usar Azure OpenAI en lugar del servidor simulado")
+    main(parser.parse_args())
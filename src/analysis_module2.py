@@ -16,6 +16,11 @@ import concurrent.futures
 import re
 import time
 from openai_config import get_openai_client, get_deployment_name
+from llm_gateway import JobThreadPoolExecutor, llm_job
+from llm_telemetry import llm_stage, with_llm_context
+from prompt_builder import build_messages
+from analysis_runs import (AnalysisRun, ANALYSIS_AUTO_RESUME, batch_fingerprint, find_resumable_run,
+                           load_latest_results, clear_latest)
 import shutil  # Agregar esta importación al principio del archivo junto con las demás importaciones
 import textwrap
 import logging
@@ -26,14 +31,16 @@ import unicodedata
 logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(message)s')
 
 @contextmanager
-def timed(label):
+def timed(label, **fields):
+    """Etapa medida: la duración y las llamadas LLM del bloque van a la telemetría (llm_telemetry)."""
     start = time.time()
-    # logging.info(f"⏱️ {label} - INICIO")  # SUPRIMIDO POR PETICIÓN DEL USUARIO
     try:
-        yield
+        with llm_stage(label, **fields):
+            yield
     finally:
         elapsed = time.time() - start
-        # logging.info(f"⏱️ {label} - FIN ({elapsed:.2f}s)")  # SUPRIMIDO POR PETICIÓN DEL USUARIO
+        # En consola solo a nivel DEBUG (los mensajes INFO se suprimieron por petición del usuario)
+        logging.debug(f"⏱️ {label} - FIN ({elapsed:.2f}s)")
 
 SEVERITY = {5:(255,80,80),4:(255,150,80),3:(255,220,80),2:(200,255,200),1:(230,230,230)}
 
@@ -271,11 +278,173 @@ def validate_analysis_structure(analysis, expected_points=None):
     
     return True
 
-def analyze_ideas_batch(ideas_list, title="", context="", template=None):
+# Análisis por secciones: cada punto (o grupo de puntos) de la plantilla va en una
+# llamada propia y en paralelo, así que la latencia es la de la sección más larga
+ANALYSIS_PARALLEL_SECTIONS = os.getenv("ANALYSIS_PARALLEL_SECTIONS", "0") == "1"
+ANALYSIS_SECTION_GROUP_SIZE = max(1, int(os.getenv("ANALYSIS_SECTION_GROUP_SIZE", "1")))
+ANALYSIS_SECTION_MAX_TOKENS = int(os.getenv("ANALYSIS_SECTION_MAX_TOKENS", "1200"))
+ANALYSIS_SECTION_WORKERS = int(os.getenv("ANALYSIS_SECTION_WORKERS", "6"))
+
+# Secciones del análisis por lotes (las mismas que pide su prompt de una sola llamada)
+BATCH_SECTIONS_TEMPLATE = """
+1. RESUMEN EJECUTIVO: visión general, valor diferencial y recomendación principal
+2. ANÁLISIS TÉCNICO: viabilidad, requisitos tecnológicos, complejidad y riesgos técnicos
+3. POTENCIAL DE INNOVACIÓN: grado de novedad, diferenciación y casos comparables
+4. ALINEACIÓN ESTRATÉGICA CON SENER: encaje con la estrategia, sinergias e impacto en la cartera
+5. VIABILIDAD COMERCIAL: mercado, modelo de negocio, ROI esperado y barreras de entrada
+6. VALORACIÓN GLOBAL: fortalezas, debilidades y recomendación decisiva sobre si seguir con la idea
+"""
+
+# Secciones del análisis exhaustivo (las mismas que pide _build_exhaustive_messages)
+EXHAUSTIVE_SECTIONS_TEMPLATE = """
+1. Resumen Ejecutivo: valor para Sener, impacto potencial y oportunidad de mercado
+2. Análisis Técnico: viabilidad técnica, recursos necesarios y nivel de madurez tecnológica
+3. Potencial de Innovación: grado de novedad, carácter disruptivo y ventajas competitivas
+4. Alineación Estratégica: conexión con áreas estratégicas, objetivos corporativos y sinergias potenciales
+5. Viabilidad Comercial: potencial comercial, modelo de negocio y retorno de inversión
+"""
+
+def _section_title(point):
+    """Título de un punto de la plantilla ("Análisis Técnico: ..." -> "ANÁLISIS TÉCNICO")."""
+    return point.split(':')[0].strip().strip('*#').strip().upper()
+
+def _build_section_messages(system_prompt, idea_text, group, titles, instructions, task):
+    """
+    Mensajes de un grupo de secciones. La idea va al principio del mensaje de usuario
+    para que todas las secciones de la misma idea compartan el prefijo del prompt.
+    """
+    requested = "\n".join(f"{i}. {point}" for i, point in enumerate(group, 1))
+    prompt = f"""
+    Idea a analizar:
+    {idea_text}
+
+    El análisis completo de esta idea tiene estas secciones: {", ".join(titles)}.
+    Otras llamadas redactan el resto; escribe SOLO las siguientes, en este orden, cada una
+    precedida de su título en MAYÚSCULAS en una línea propia (sin números ni viñetas):
+
+    {requested}
+
+    {instructions}
+    """
+    return build_messages(system_prompt, prompt, task=task)
+
+def _ensure_section_heading(text, title):
+    """Antepone el título si la primera línea no lo es (basta con que empiece igual: "ALINEACIÓN ESTRATÉGICA")."""
+    first_line = normalize_text(text.split('\n', 1)[0].strip('*#: '))
+    key_words = ' '.join(normalize_text(title).split()[:2])
+    if len(first_line) <= 80 and first_line.startswith(key_words):
+        return text
+    return f"{title}\n\n{text}"
+
+def iter_sections_parallel(idea_text, points, system_prompt, instructions="", task="analisis_seccion",
+                           temperature=0.7, group_size=None, timeout=None):
+    """
+    Generador del análisis por secciones: lanza una llamada por punto (o grupo de puntos)
+    de la plantilla en paralelo y produce el texto acumulado, en el orden de la plantilla,
+    cada vez que termina el siguiente grupo. Lanza ValueError si falla alguna llamada o si
+    el análisis completo no pasa validate_analysis_structure.
+    """
+    if not points:
+        raise ValueError("la plantilla no tiene secciones")
+    group_size = group_size or ANALYSIS_SECTION_GROUP_SIZE
+    groups = [points[i:i + group_size] for i in range(0, len(points), group_size)]
+    titles = [_section_title(point) for point in points]
+
+    def analyze_group(group):
+        extra = {"timeout": timeout} if timeout else {}
+        response = client.chat.completions.create(
+            model=DEPLOYMENT_NAME,
+            messages=_build_section_messages(system_prompt, idea_text, group, titles, instructions, task),
+            max_tokens=min(4000, ANALYSIS_SECTION_MAX_TOKENS * len(group)),
+            temperature=temperature,
+            **extra
+        )
+        if not (response and response.choices and response.choices[0].message):
+            raise ValueError("respuesta vacía del modelo")
+        text = (response.choices[0].message.content or "").strip()
+        if not text:
+            raise ValueError("respuesta vacía del modelo")
+        # Con un punto por llamada el título se garantiza; con grupos lo comprueba la validación
+        return _ensure_section_heading(text, _section_title(group[0])) if len(group) == 1 else text
+
+    parts = []
+    with JobThreadPoolExecutor(max_workers=max(1, min(ANALYSIS_SECTION_WORKERS, len(groups)))) as executor:
+        futures = [executor.submit(with_llm_context(analyze_group, section_id=_section_title(group[0])), group)
+                   for group in groups]
+        try:
+            # En orden de plantilla: cada sección se entrega en cuanto terminan ella y las anteriores
+            for future in futures:
+                parts.append(future.result())
+                yield "\n\n".join(parts)
+        finally:
+            for future in futures:
+                future.cancel()
+
+    # Sin acentos: los prompts piden ASCII y el modelo puede escribir "ANALISIS TECNICO"
+    if not validate_analysis_structure(normalize_text("\n\n".join(parts)), [normalize_text(title) for title in titles]):
+        raise ValueError("el análisis por secciones no contiene todas las secciones esperadas")
+
+def analyze_sections_parallel(idea_text, points, system_prompt, instructions="", task="analisis_seccion",
+                              temperature=0.7, group_size=None, timeout=None):
+    """
+    Analiza una idea con una llamada por punto (o grupo de puntos) de la plantilla, en
+    paralelo. Devuelve las secciones unidas en el orden de la plantilla, o None si falla
+    alguna llamada o el resultado no pasa validate_analysis_structure (el llamador
+    vuelve entonces a la llamada única).
+    """
+    analysis = None
+    try:
+        for analysis in iter_sections_parallel(idea_text, points, system_prompt, instructions, task,
+                                               temperature, group_size, timeout):
+            pass
+    except Exception as e:
+        print(f"⚠️ Falló el análisis por secciones: {str(e)}")
+        return None
+    return analysis
+
+def _open_analysis_run(validated_ideas, title, context, run_id=None, resume=None, sections=None):
+    """
+    Ejecución con checkpoint del lote, ya reservada para este proceso: la indicada en
+    run_id, una sin terminar del mismo lote (si resume) o una nueva. sections son los
+    puntos del análisis por secciones (None con la llamada única). None si no se puede
+    escribir en disco.
+    """
+    resume = ANALYSIS_AUTO_RESUME if resume is None else resume
+    try:
+        if run_id:
+            run = AnalysisRun.open(run_id)
+            if run.manifest.get("fingerprint") != batch_fingerprint(validated_ideas, title, context, sections):
+                print(f"⚠️ La ejecución {run_id} no corresponde a estas ideas o a este modo; se crea una nueva")
+            elif run.acquire():
+                return run
+            else:
+                print(f"⚠️ La ejecución {run_id} está en curso en otro proceso; se crea una nueva")
+        elif resume:
+            run = find_resumable_run(validated_ideas, title, context, sections=sections)
+            if run and run.acquire():
+                return run
+        run = AnalysisRun.create(validated_ideas, title, context, sections=sections)
+        run.acquire()
+        return run
+    except Exception as e:
+        print(f"⚠️ No se pudo preparar el checkpoint del lote: {str(e)}")
+        return None
+
+@llm_job("analisis")
+def analyze_ideas_batch(ideas_list, title="", context="", template=None, run_id=None, resume=None, sections=None):
     """
     Analiza un lote de ideas en paralelo y genera un PDF con formato profesional.
     Optimizado para máxima eficiencia y compatibilidad con fuentes estándar.
+
+    Cada análisis se guarda en disco al terminar (analysis_runs). Repetir un lote
+    interrumpido, o pasar su run_id, solo analiza las ideas que faltan; resume=False
+    fuerza una ejecución nueva.
+
+    Con sections=True (o ANALYSIS_PARALLEL_SECTIONS=1) cada idea se analiza por
+    secciones en paralelo, con las secciones de BATCH_SECTIONS_TEMPLATE. Como en la
+    llamada única, `template` no se usa: el PDF del lote espera esas secciones.
     """
+    run = None
     try:
         if not ideas_list or not isinstance(ideas_list, list):
             print("❌ Error: Se requiere una lista válida de ideas")
@@ -302,8 +471,21 @@ def analyze_ideas_batch(ideas_list, title="", context="", template=None):
         if not validated_ideas:
             print("❌ Error: No hay ideas válidas para analizar")
             return None, None
-            
-        print(f"\n🚀 Iniciando análisis paralelo de {len(validated_ideas)} ideas...")
+
+        use_sections = ANALYSIS_PARALLEL_SECTIONS if sections is None else sections
+        section_points = extract_analysis_points(BATCH_SECTIONS_TEMPLATE) if use_sections else []
+
+        # Checkpoint en disco: los resultados ya guardados no se vuelven a pedir
+        run = _open_analysis_run(validated_ideas, title, context, run_id, resume,
+                                 sections=section_points or None)
+        done_results = {}
+        if run:
+            validated_ideas = run.ideas()
+            done_results = run.completed_results()
+            print(f"💾 Ejecución {run.run_id}: {len(done_results)}/{len(validated_ideas)} ideas ya analizadas")
+        pending_ideas = [idea for idea in validated_ideas if idea['index'] not in done_results]
+
+        print(f"\n🚀 Iniciando análisis paralelo de {len(pending_ideas)} ideas...")
         
         # Definir la función de análisis para cada idea
         def analyze_idea(idea_obj):
@@ -315,13 +497,6 @@ def analyze_ideas_batch(ideas_list, title="", context="", template=None):
                 print(f"\n📝 Procesando idea {index + 1}/{len(validated_ideas)}")
                 print(f"⏱️ Inicio de análisis: {datetime.now().strftime('%H:%M:%S')}")
                 
-                # Contexto optimizado
-                sener_context = """
-                Sener es una empresa líder en ingeniería y tecnología con especialización en sectores
-                aeroespacial, infraestructuras, energía, naval y digitalización. Fundada en 1956, 
-                se centra en la excelencia técnica, innovación y desarrollo de soluciones avanzadas.
-                """
-                
                 # 🔧 PROMPT MEJORADO CON ORDEN Y FORMATO ESPECÍFICOS
                 prompt = f"""
                 Analiza exhaustivamente esta idea para Sener:
@@ -360,52 +535,54 @@ def analyze_ideas_batch(ideas_list, title="", context="", template=None):
                 - Usa párrafos bien estructurados
                 """
                 
-                print(f"🤖 Enviando solicitud a la API para idea {index + 1}...")
-                
-                # Realizar llamada a la API
-                response = client.chat.completions.create(
-                    model=DEPLOYMENT_NAME,
-                    messages=[
-                        {"role": "system", "content": "Eres un consultor estratégico senior especializado en innovación industrial con amplia experiencia en empresas de ingeniería como Sener. Ofreces análisis críticos e incisivos, no generalidades. Tus clientes pagan miles de euros por tu experiencia, opiniones claras y recomendaciones accionables basadas en datos. Usas solo caracteres ASCII básicos en tus informes."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    max_tokens=4000,
-                    temperature=0.6
-                )
+                analysis_content = None
+                if section_points:
+                    print(f"🧩 Analizando idea {index + 1} por secciones ({len(section_points)} puntos)...")
+                    analysis_content = analyze_sections_parallel(
+                        idea_text, section_points, BATCH_SYSTEM_PROMPT, BATCH_SECTION_INSTRUCTIONS,
+                        task="analisis_lote", temperature=0.6
+                    )
                 
-                # Procesar la respuesta
-                if response and response.choices and response.choices[0].message:
-                    # Obtener el título de la idea (primera línea o primeras palabras)
-                    idea_title = idea_text.split('\n')[0].strip()
-                    if len(idea_title) > 60:
-                        idea_title = idea_title[:57] + "..."
+                if analysis_content is None:
+                    print(f"🤖 Enviando solicitud a la API para idea {index + 1}...")
                     
-                    # Normalizar el texto para eliminar caracteres problemáticos
+                    # Realizar llamada a la API
+                    response = client.chat.completions.create(
+                        model=DEPLOYMENT_NAME,
+                        messages=build_messages(BATCH_SYSTEM_PROMPT, prompt, task="analisis_lote"),
+                        max_tokens=4000,
+                        temperature=0.6
+                    )
+                    if not (response and response.choices and response.choices[0].message):
+                        print(f"❌ Error: No se recibió respuesta válida para idea {index + 1}")
+                        return None
                     analysis_content = response.choices[0].message.content.strip()
-                    
-                    # DEBUG: Imprimir los primeros 100 caracteres del análisis
-                    if analysis_content:
-                        print(f"🔍 Análisis recibido. Primeros 100 caracteres: {analysis_content[:100]}...")
-                    else:
-                        print("⚠️ Análisis recibido está vacío")
-                    
-                    end_time = time.time()
-                    processing_time = end_time - start_time
-                    
-                    print(f"✅ Análisis completado para idea {index + 1}")
-                    print(f"⏱️ Tiempo de procesamiento: {processing_time:.2f} segundos")
-                    print(f"📊 Longitud del análisis: {len(analysis_content)} caracteres")
-                        
-                    return {
-                        'idea': idea_text,
-                        'idea_title': idea_title,
-                        'analysis': analysis_content,
-                        'original_index': index,
-                        'processing_time': processing_time
-                    }
+                
+                # Obtener el título de la idea (primera línea o primeras palabras)
+                idea_title = idea_text.split('\n')[0].strip()
+                if len(idea_title) > 60:
+                    idea_title = idea_title[:57] + "..."
+                
+                # DEBUG: Imprimir los primeros 100 caracteres del análisis
+                if analysis_content:
+                    print(f"🔍 Análisis recibido. Primeros 100 caracteres: {analysis_content[:100]}...")
                 else:
-                    print(f"❌ Error: No se recibió respuesta válida para idea {index + 1}")
-                    return None
+                    print("⚠️ Análisis recibido está vacío")
+                
+                end_time = time.time()
+                processing_time = end_time - start_time
+                
+                print(f"✅ Análisis completado para idea {index + 1}")
+                print(f"⏱️ Tiempo de procesamiento: {processing_time:.2f} segundos")
+                print(f"📊 Longitud del análisis: {len(analysis_content)} caracteres")
+                    
+                return {
+                    'idea': idea_text,
+                    'idea_title': idea_title,
+                    'analysis': analysis_content,
+                    'original_index': index,
+                    'processing_time': processing_time
+                }
                     
             except Exception as e:
                 print(f"❌ Error analizando idea #{idea_obj['index']}: {str(e)}")
@@ -413,25 +590,31 @@ def analyze_ideas_batch(ideas_list, title="", context="", template=None):
                 return None
         
         # Ejecutar análisis en paralelo
-        max_workers = min(10, len(validated_ideas))
+        max_workers = max(1, min(10, len(pending_ideas)))
         print(f"\n⚙️ Configurando procesamiento paralelo con {max_workers} workers...")
         start_time = time.time()
         
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        with JobThreadPoolExecutor(max_workers=max_workers) as executor:
             print("🔄 Iniciando workers...")
-            futures = [executor.submit(analyze_idea, idea) for idea in validated_ideas]
+            futures = [executor.submit(with_llm_context(analyze_idea, idea_index=idea['index']), idea)
+                       for idea in pending_ideas]
             
-            # Monitorear el progreso
-            completed = 0
+            # Monitorear el progreso y guardar cada análisis en cuanto termina
+            completed = len(done_results)
             for future in concurrent.futures.as_completed(futures):
                 completed += 1
                 print(f"\n📊 Progreso: {completed}/{len(validated_ideas)} ideas procesadas")
                 if future.exception():
                     print(f"❌ Error en worker: {future.exception()}")
+                elif run and future.result():
+                    try:
+                        run.save_result(future.result()['original_index'], future.result())
+                    except Exception as e:
+                        print(f"⚠️ No se pudo guardar el checkpoint de la idea: {str(e)}")
         
-        # Filtrar resultados válidos
-        results = [future.result() for future in futures if future.result() is not None]
-        valid_results = [result for result in results if result is not None]
+        # Filtrar resultados válidos (los reanudados más los nuevos)
+        results = [future.result() for future in futures if not future.exception()]
+        valid_results = list(done_results.values()) + [result for result in results if result is not None]
         
         if not valid_results:
             print("❌ Error: No se pudo analizar ninguna idea")
@@ -477,6 +660,18 @@ def analyze_ideas_batch(ideas_list, title="", context="", template=None):
             except Exception as e2:
                 print(f"❌ Error con método básico: {str(e2)}")
                 pdf_path = None
+
+        if run:
+            try:
+                # Un lote con ideas fallidas queda sin terminar para poder reanudarlo
+                status = "done" if len(valid_results) == len(validated_ideas) else "incomplete"
+                run.update(status=status, pdf_path=pdf_path)
+                run.mark_latest()
+                if status != "done":
+                    print(f"ℹ️ Faltan {len(validated_ideas) - len(valid_results)} ideas; "
+                          f"resume_ideas_batch('{run.run_id}') las reintenta")
+            except Exception as e:
+                print(f"⚠️ No se pudo cerrar la ejecución {run.run_id}: {str(e)}")
         
         # Texto combinado para mostrar en la interfaz
         combined_text = "\n\n".join([
@@ -490,6 +685,26 @@ def analyze_ideas_batch(ideas_list, title="", context="", template=None):
         print(f"❌ Error en proceso de análisis: {str(e)}")
         print(f"📋 Detalles del error: {traceback.format_exc()}")
         return None, None
+    finally:
+        if run:
+            run.release()
+
+def resume_ideas_batch(run_id=None):
+    """
+    Reanuda un análisis por lotes interrumpido: solo se analizan las ideas sin
+    resultado guardado. Sin run_id, la última ejecución sin terminar.
+    """
+    try:
+        run = AnalysisRun.open(run_id) if run_id else find_resumable_run()
+    except FileNotFoundError:
+        print(f"❌ No existe la ejecución {run_id}")
+        return None, None
+    if run is None:
+        print("ℹ️ No hay ningún análisis por lotes pendiente de reanudar")
+        return None, None
+    print(f"🔁 Reanudando la ejecución {run.run_id}")
+    return analyze_ideas_batch(run.ideas(), run.manifest.get("title", ""), run.manifest.get("context", ""),
+                               run_id=run.run_id, sections=bool(run.manifest.get("sections")))
 
 def generate_unified_pdf(results, output_dir="output", pdf_type="analysis"):
     """
@@ -1278,15 +1493,10 @@ def get_global_analyzed_ideas():
         global _last_analyzed_ideas
         if '_last_analyzed_ideas' in globals() and isinstance(_last_analyzed_ideas, list) and _last_analyzed_ideas and all(isinstance(idea, dict) and 'analysis' in idea and idea['analysis'] for idea in _last_analyzed_ideas):
             return _last_analyzed_ideas
-        # 3. Intentar cargar desde archivo temporal
-        import tempfile, os, json
-        temp_dir = tempfile.gettempdir()
-        results_path = os.path.join(temp_dir, "last_analysis_results.json")
-        if os.path.exists(results_path):
-            with open(results_path, 'r', encoding='utf-8') as f:
-                ideas_data = json.load(f)
-            if ideas_data and all(isinstance(idea, dict) and 'analysis' in idea and idea['analysis'] for idea in ideas_data):
-                return ideas_data
+        # 3. Intentar cargar la última ejecución guardada en disco
+        ideas_data = load_latest_results()
+        if ideas_data and all(isinstance(idea, dict) and 'analysis' in idea and idea['analysis'] for idea in ideas_data):
+            return ideas_data
         # 4. Si no hay nada válido, devolver lista vacía
         print("⚠️ No se encontraron ideas analizadas completas en memoria global ni en disco.")
         return []
@@ -1307,16 +1517,12 @@ def clear_all_global_memory():
     analyzed_ideas_global = []
     _last_analyzed_ideas = []
     
-    # Limpiar archivo temporal si existe
+    # Olvidar la última ejecución (los checkpoints siguen en disco)
     try:
-        import tempfile, os
-        temp_dir = tempfile.gettempdir()
-        results_path = os.path.join(temp_dir, "last_analysis_results.json")
-        if os.path.exists(results_path):
-            os.remove(results_path)
-            print("🗑️ Archivo temporal de resultados eliminado")
+        if clear_latest():
+            print("🗑️ Referencia a la última ejecución eliminada")
     except Exception as e:
-        print(f"⚠️ Error limpiando archivo temporal: {str(e)}")
+        print(f"⚠️ Error limpiando la última ejecución: {str(e)}")
     
     print("🧹 Memoria global completamente limpiada")
     return True
@@ -1342,293 +1548,349 @@ def get_analyzed_ideas():
     if _last_analyzed_ideas and len(_last_analyzed_ideas) > 0:
         return _last_analyzed_ideas
     
-    # Si no hay en memoria, intentar cargar desde archivo
+    # Si no hay en memoria, intentar cargar la última ejecución guardada
     try:
-        temp_dir = tempfile.gettempdir()
-        results_path = os.path.join(temp_dir, "last_analysis_results.json")
-        
-        if os.path.exists(results_path):
-            with open(results_path, 'r', encoding='utf-8') as f:
-                ideas_data = json.load(f)
-            
-            if ideas_data and len(ideas_data) > 0:
-                print(f"✅ Se cargaron {len(ideas_data)} ideas analizadas del archivo")
-                _last_analyzed_ideas = ideas_data
-                return ideas_data
+        ideas_data = load_latest_results()
+        if ideas_data:
+            print(f"✅ Se cargaron {len(ideas_data)} ideas analizadas de la última ejecución")
+            _last_analyzed_ideas = ideas_data
+            return ideas_data
     except Exception as e:
         print(f"❌ Error cargando resultados: {str(e)}")
     
     # Si no se pudieron cargar ideas, devolver lista vacía
     return []
 
-def analyze_idea_exhaustive(idea_text):
-    """
-    Realiza un análisis exhaustivo de una idea innovadora para el departamento de innovación de Sener.
+# Instrucción de sistema del análisis por lotes
+BATCH_SYSTEM_PROMPT = "Eres un consultor estratégico senior especializado en innovación industrial con amplia experiencia en empresas de ingeniería como Sener. Ofreces análisis críticos e incisivos, no generalidades. Tus clientes pagan miles de euros por tu experiencia, opiniones claras y recomendaciones accionables basadas en datos. Usas solo caracteres ASCII básicos en tus informes."
+
+# Instrucción de sistema del análisis exhaustivo
+EXHAUSTIVE_SYSTEM_PROMPT = "Eres un experto en análisis de innovación para Sener. Usa solo caracteres ASCII básicos en tus respuestas."
+
+# Instrucciones de formato de cada sección en el análisis por secciones (mismas pautas que la llamada única)
+BATCH_SECTION_INSTRUCTIONS = """INSTRUCCIONES:
+    - Cada sección debe tener mínimo 250-300 palabras, con introducción, 3-4 puntos clave y una conclusión con recomendación
+    - Proporciona ejemplos concretos, casos comparables y métricas relevantes (ROI esperado, tiempo de desarrollo, etc.)
+    - Ofrece opiniones claras y recomendaciones específicas y accionables, no generalidades
+    - NO uses comillas tipográficas, guiones largos ni caracteres especiales"""
+
+EXHAUSTIVE_SECTION_INSTRUCTIONS = """IMPORTANTE:
+    - Proporciona un análisis profesional y detallado
+    - Usa lenguaje técnico específico
+    - Incluye ejemplos y justificaciones
+    - Mantén un enfoque práctico y orientado a la acción
+    - Evita caracteres especiales que puedan causar problemas"""
+
+def _build_exhaustive_messages(idea_text):
+    """Construye los mensajes del análisis exhaustivo de una idea (contexto de Sener en el prefijo compartido)."""
+    # Crear un prompt único que analice todos los aspectos a la vez
+    prompt = f"""
+    Idea a analizar:
+    {idea_text}
+
+    Realiza un análisis exhaustivo de la idea considerando los siguientes aspectos:
+
+    1. Resumen Ejecutivo:
+    - Valor para Sener
+    - Impacto potencial
+    - Oportunidad de mercado
+
+    2. Análisis Técnico:
+    - Viabilidad técnica
+    - Recursos necesarios
+    - Nivel de madurez tecnológica
+
+    3. Potencial de Innovación:
+    - Grado de novedad
+    - Carácter disruptivo
+    - Ventajas competitivas
+
+    4. Alineación Estratégica:
+    - Conexión con áreas estratégicas
+    - Objetivos corporativos
+    - Sinergias potenciales
+
+    5. Viabilidad Comercial:
+    - Potencial comercial
+    - Modelo de negocio
+    - Retorno de inversión
+
+    IMPORTANTE:
+    - Proporciona un análisis profesional y detallado
+    - Usa lenguaje técnico específico
+    - Incluye ejemplos y justificaciones
+    - Mantén un enfoque práctico y orientado a la acción
+    - Evita caracteres especiales que puedan causar problemas
     """
-    try:
-        # Validar entrada
-        if not idea_text or not isinstance(idea_text, str):
-            print("❌ Error: La idea debe ser un texto no vacío")
-            return None
-            
-        # Limpiar y normalizar el texto
-        idea_text = idea_text.strip()
-        if len(idea_text) < 10:
-            print("❌ Error: La idea es demasiado corta")
-            return None
-            
-        # Contexto optimizado de Sener
-        sener_context = """
-        Sener: Ingeniería, tecnología e innovación con visión global
-
-        Sener es un grupo privado de ingeniería y tecnología fundado en 1956, con sede en España y una sólida proyección internacional. A lo largo de sus más de seis décadas de trayectoria, Sener se ha consolidado como un referente en la ejecución de proyectos de alta complejidad técnica, aportando soluciones innovadoras en sectores estratégicos clave para el desarrollo sostenible y el progreso tecnológico.
 
-        Áreas de especialización:
+    return build_messages(EXHAUSTIVE_SYSTEM_PROMPT, prompt, task="analisis_exhaustivo")
 
-        Sener combina ingeniería avanzada, desarrollo tecnológico y capacidad constructiva para ofrecer soluciones integrales que abarcan desde la consultoría y diseño hasta la implementación y operación de sistemas complejos. Sus principales áreas de enfoque incluyen:
-
-        Ingeniería y construcción en sectores críticos, aplicando altos estándares de calidad, seguridad y sostenibilidad.
-
-        Desarrollo de sistemas y software a medida para sectores de alto valor estratégico, como defensa, energía y transporte.
-
-        Innovación tecnológica, con una fuerte inversión en I+D para el desarrollo de soluciones avanzadas que aporten valor diferencial a sus clientes.
-
-        Sectores clave de actividad:
-
-        Aeroespacial: Sener participa en misiones espaciales internacionales con el diseño, integración y fabricación de componentes y sistemas para satélites, vehículos espaciales y estaciones orbitales.
-
-        Infraestructuras y Transporte: Especialista en proyectos de gran escala como ferrocarriles, metros, carreteras y obras hidráulicas, incluyendo diseño de trazados, estructuras, sistemas y gestión del transporte. Las líneas estratégicas que se estan abriendo y explorando en innovación son hospital adaptable, transformación de instalaciones deportivas y de entretenimiento en espacios multifuncionales, infraestructura para el vehículo autónomo, puertos flotantes, centrales hidroeléctricas reversibles usando agua de mar, hiper-aprovechamiento de la infraestructura del metro.
-
-        Energía: Impulsa la transición energética mediante proyectos en energías renovables (solar, eólica, hidrógeno verde), eficiencia energética, almacenamiento y soluciones inteligentes de red.
-
-        Digitalización: Lidera procesos de transformación digital con soluciones de automatización, gemelos digitales, inteligencia artificial y sistemas ciberfísicos aplicados a sectores industriales complejos.
-
-        Centros de datos: Infraestructura para los centros de datos
-        
-        """
-        
-        # Crear un prompt único que analice todos los aspectos a la vez
-        prompt = f"""
-        Contexto de Sener:
-        {sener_context}
-
-        Idea a analizar:
-        {idea_text}
+def _postprocess_exhaustive_analysis(analysis_text):
+    """Limpia el texto devuelto por el modelo (títulos duplicados, caracteres problemáticos)."""
+    analysis_text = analysis_text.strip()
+    
+    # Eliminar duplicaciones de títulos
+    standard_sections = ["RESUMEN EJECUTIVO", "ANÁLISIS TÉCNICO", "POTENCIAL DE INNOVACIÓN", 
+                        "ALINEACIÓN ESTRATÉGICA", "VIABILIDAD COMERCIAL", "VALORACIÓN GLOBAL"]
+    
+    for section in standard_sections:
+        # Eliminar duplicación de títulos
+        pattern = f"({section})[\\s\\n]*({section})"
+        analysis_text = re.sub(pattern, r"\1", analysis_text, flags=re.IGNORECASE)
+    
+    # Normalizar el texto del análisis para evitar caracteres problemáticos
+    normalized_analysis = normalize_text_for_pdf(analysis_text)
+    return normalized_analysis
 
-        Realiza un análisis exhaustivo de la idea considerando los siguientes aspectos:
-
-        1. Resumen Ejecutivo:
-        - Valor para Sener
-        - Impacto potencial
-        - Oportunidad de mercado
-
-        2. Análisis Técnico:
-        - Viabilidad técnica
-        - Recursos necesarios
-        - Nivel de madurez tecnológica
-
-        3. Potencial de Innovación:
-        - Grado de novedad
-        - Carácter disruptivo
-        - Ventajas competitivas
-
-        4. Alineación Estratégica:
-        - Conexión con áreas estratégicas
-        - Objetivos corporativos
-        - Sinergias potenciales
-
-        5. Viabilidad Comercial:
-        - Potencial comercial
-        - Modelo de negocio
-        - Retorno de inversión
-
-        IMPORTANTE:
-        - Proporciona un análisis profesional y detallado
-        - Usa lenguaje técnico específico
-        - Incluye ejemplos y justificaciones
-        - Mantén un enfoque práctico y orientado a la acción
-        - Evita caracteres especiales que puedan causar problemas
-        """
-        
-        # 🔧 AÑADIR TIMEOUT: Realizar llamada a la API con timeout de 60 segundos
-        import signal
-        
-        def timeout_handler(signum, frame):
-            raise TimeoutError("La llamada a OpenAI excedió el tiempo límite de 60 segundos")
-        
-        try:
-            # Configurar timeout
-            signal.signal(signal.SIGALRM, timeout_handler)
-            signal.alarm(60)  # 60 segundos de timeout
-            
-            response = client.chat.completions.create(
-                model=DEPLOYMENT_NAME,
-                messages=[
-                    {"role": "system", "content": "Eres un experto en análisis de innovación para Sener. Usa solo caracteres ASCII básicos en tus respuestas."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=4000,
-                temperature=0.7
-            )
-            
-            # Desactivar timeout
-            signal.alarm(0)
-            
-        except TimeoutError as e:
-            print(f"❌ Timeout en análisis: {str(e)}")
-            return None
-        except Exception as e:
-            signal.alarm(0)  # Asegurar que se desactiva el timeout
-            print(f"❌ Error en llamada OpenAI: {str(e)}")
-            return None
-        
-        if response and response.choices and response.choices[0].message:
-            analysis_text = response.choices[0].message.content.strip()
-            
-            # Eliminar duplicaciones de títulos
-            standard_sections = ["RESUMEN EJECUTIVO", "ANÁLISIS TÉCNICO", "POTENCIAL DE INNOVACIÓN", 
-                                "ALINEACIÓN ESTRATÉGICA", "VIABILIDAD COMERCIAL", "VALORACIÓN GLOBAL"]
-            
-            for section in standard_sections:
-                # Eliminar duplicación de títulos
-                pattern = f"({section})[\\s\\n]*({section})"
-                analysis_text = re.sub(pattern, r"\1", analysis_text, flags=re.IGNORECASE)
-            
-            # Normalizar el texto del análisis para evitar caracteres problemáticos
-            normalized_analysis = normalize_text_for_pdf(analysis_text)
-            
-            # Generar PDF usando solo fuentes estándar
-            pdf = FPDF()
-            pdf.set_auto_page_break(auto=True, margin=15)
-            
-            # Portada
-            pdf.add_page()
-            
-            # Cargar logo usando función unificada
-            load_logo_unified(pdf, y=40, logo_type="standard")
-            
-            pdf.set_font('Arial', 'B', 24)
-            pdf.ln(80)  # Espacio para dejar sitio al logo
-            pdf.cell(0, 40, "Informe de Analisis de Innovacion", ln=True, align='C')
-            pdf.ln(20)
-            
-            pdf.set_font('Arial', '', 16)
-            pdf.cell(0, 10, "Generado por: AI Agent Innovacion Sener", ln=True, align='C')
-            pdf.cell(0, 10, f"Fecha: {datetime.now().strftime('%d/%m/%Y')}", ln=True, align='C')
+def _build_exhaustive_pdf(normalized_analysis):
+    """Genera el PDF del análisis exhaustivo a partir del texto final. Devuelve la ruta o None."""
+    # Generar PDF usando solo fuentes estándar
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    
+    # Portada
+    pdf.add_page()
+    
+    # Cargar logo usando función unificada
+    load_logo_unified(pdf, y=40, logo_type="standard")
+    
+    pdf.set_font('Arial', 'B', 24)
+    pdf.ln(80)  # Espacio para dejar sitio al logo
+    pdf.cell(0, 40, "Informe de Analisis de Innovacion", ln=True, align='C')
+    pdf.ln(20)
+    
+    pdf.set_font('Arial', '', 16)
+    pdf.cell(0, 10, "Generado por: AI Agent Innovacion Sener", ln=True, align='C')
+    pdf.cell(0, 10, f"Fecha: {datetime.now().strftime('%d/%m/%Y')}", ln=True, align='C')
+    
+    # Índice
+    index_page = pdf.page_no()
+    pdf.add_page()
+    pdf.set_font('Arial', 'B', 16)
+    pdf.cell(0, 20, "Indice", ln=True)
+    pdf.ln(10)
+    
+    # Preparar el texto para el índice y almacenar posiciones
+    toc_entries = []
+    pdf.set_font('Arial', '', 12)
+    
+    # Dividir el análisis en secciones para el índice
+    sections = normalized_analysis.split('\n\n')
+    section_pages = {}
+    
+    for i, section in enumerate(sections, 1):
+        if section.strip():
+            title = section.split('\n')[0].strip()
+            if len(title) > 50:
+                title = title[:47] + "..."
+            y_pos = pdf.get_y()
+            pdf.cell(0, 10, f"{i}. {title}", ln=True)
+            toc_entries.append({'num': i, 'title': title, 'y_pos': y_pos})
+    
+    # Guardar la página final del índice
+    last_index_page = pdf.page_no()
+    
+    # Contenido - con registro de páginas
+    for i, section in enumerate(sections, 1):
+        if section.strip():
+            # Registrar la página de esta sección
+            section_pages[i] = pdf.page_no() + 1  # +1 porque vamos a añadir página
             
-            # Índice
-            index_page = pdf.page_no()
             pdf.add_page()
             pdf.set_font('Arial', 'B', 16)
-            pdf.cell(0, 20, "Indice", ln=True)
+            title = section.split('\n')[0].strip()
+            pdf.cell(0, 20, title, ln=True)
             pdf.ln(10)
             
-            # Preparar el texto para el índice y almacenar posiciones
-            toc_entries = []
             pdf.set_font('Arial', '', 12)
-            
-            # Dividir el análisis en secciones para el índice
-            sections = normalized_analysis.split('\n\n')
-            section_pages = {}
-            
-            for i, section in enumerate(sections, 1):
-                if section.strip():
-                    title = section.split('\n')[0].strip()
-                    if len(title) > 50:
-                        title = title[:47] + "..."
-                    y_pos = pdf.get_y()
-                    pdf.cell(0, 10, f"{i}. {title}", ln=True)
-                    toc_entries.append({'num': i, 'title': title, 'y_pos': y_pos})
-            
-            # Guardar la página final del índice
-            last_index_page = pdf.page_no()
-            
-            # Contenido - con registro de páginas
-            for i, section in enumerate(sections, 1):
-                if section.strip():
-                    # Registrar la página de esta sección
-                    section_pages[i] = pdf.page_no() + 1  # +1 porque vamos a añadir página
-                    
-                    pdf.add_page()
-                    pdf.set_font('Arial', 'B', 16)
-                    title = section.split('\n')[0].strip()
-                    pdf.cell(0, 20, title, ln=True)
-                    pdf.ln(10)
-                    
-                    pdf.set_font('Arial', '', 12)
-                    content = '\n'.join(section.split('\n')[1:]).strip()
-                    try:
-                        # Si es un título de sección principal, aplicar formato especial pero SIN duplicar
-                        if title.upper() in ["RESUMEN EJECUTIVO", "ANÁLISIS TÉCNICO", "ANALISIS TECNICO", 
-                                              "POTENCIAL DE INNOVACIÓN", "ALINEACIÓN ESTRATÉGICA", 
-                                              "VIABILIDAD COMERCIAL", "VALORACIÓN GLOBAL"]:
-                            # Evitar duplicar el título - solo usar formato normal
-                            pdf.set_font('Arial', '', 12)  # Normal, sin negrita
-                        
-                        # Dividir en párrafos para mejor presentación
-                        paragraphs = section.split('\n\n')
-                        for paragraph in paragraphs:
-                            if paragraph.strip():
-                                pdf.multi_cell(0, 6, normalize_text_for_pdf(paragraph.strip()))
-                                pdf.ln(4)
-                    except Exception as e:
-                        print(f"⚠️ Error al procesar contenido: {str(e)}")
-                        # Intento de recuperación con limpieza adicional
-                        pdf.multi_cell(0, 6, emergency_clean_text(content))
-            
-            # Pie de página
-            pdf.set_y(-15)
-            pdf.set_font('Arial', 'I', 8)
-            pdf.set_text_color(150, 150, 150)  # Gris claro
-            pdf.cell(0, 10, f"Página {pdf.page_no()}", align='R')
+            content = '\n'.join(section.split('\n')[1:]).strip()
+            try:
+                # Si es un título de sección principal, aplicar formato especial pero SIN duplicar
+                if title.upper() in ["RESUMEN EJECUTIVO", "ANÁLISIS TÉCNICO", "ANALISIS TECNICO", 
+                                      "POTENCIAL DE INNOVACIÓN", "ALINEACIÓN ESTRATÉGICA", 
+                                      "VIABILIDAD COMERCIAL", "VALORACIÓN GLOBAL"]:
+                    # Evitar duplicar el título - solo usar formato normal
+                    pdf.set_font('Arial', '', 12)  # Normal, sin negrita
+                
+                # Dividir en párrafos para mejor presentación
+                paragraphs = section.split('\n\n')
+                for paragraph in paragraphs:
+                    if paragraph.strip():
+                        pdf.multi_cell(0, 6, normalize_text_for_pdf(paragraph.strip()))
+                        pdf.ln(4)
+            except Exception as e:
+                print(f"⚠️ Error al procesar contenido: {str(e)}")
+                # Intento de recuperación con limpieza adicional
+                pdf.multi_cell(0, 6, emergency_clean_text(content))
+    
+    # Pie de página
+    pdf.set_y(-15)
+    pdf.set_font('Arial', 'I', 8)
+    pdf.set_text_color(150, 150, 150)  # Gris claro
+    pdf.cell(0, 10, f"Página {pdf.page_no()}", align='R')
+        
+    # Volver al índice para completar números de página
+    current_page = pdf.page_no()
+    
+    # Recorrer las páginas del índice
+    for page in range(index_page, last_index_page + 1):
+        # Cambiar a la página del índice
+        pdf.page = page
+        
+        # Para cada entrada del índice en esta página
+        for entry in toc_entries:
+            # Asegurarnos de que la entrada sea válida y tenga un número en idea_pages
+            if isinstance(entry, dict) and 'num' in entry and 'y_pos' in entry and entry['num'] in section_pages:
+                # Colocar el cursor en la posición Y de la entrada
+                pdf.set_y(entry['y_pos'])
+                
+                # Colocar el cursor en la posición X para el número de página (alineado a la derecha)
+                pdf.set_x(180)
+                
+                # Añadir el número de página con formato
+                pdf.cell(15, 10, str(section_pages[entry['num']]), align='R')
+    
+    # Guardar PDF
+    output_dir = "output"
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
         
-        # Volver al índice para completar números de página
-        current_page = pdf.page_no()
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    pdf_path = os.path.join(output_dir, f"analisis_detallado_{timestamp}.pdf")
         
-        # Recorrer las páginas del índice
-        for page in range(index_page, last_index_page + 1):
-            # Cambiar a la página del índice
-            pdf.page = page
-            
-            # Para cada entrada del índice en esta página
-            for entry in toc_entries:
-                # Asegurarnos de que la entrada sea válida y tenga un número en idea_pages
-                if isinstance(entry, dict) and 'num' in entry and 'y_pos' in entry and entry['num'] in section_pages:
-                    # Colocar el cursor en la posición Y de la entrada
-                    pdf.set_y(entry['y_pos'])
-                    
-                    # Colocar el cursor en la posición X para el número de página (alineado a la derecha)
-                    pdf.set_x(180)
-                    
-                    # Añadir el número de página con formato
-                    pdf.cell(15, 10, str(section_pages[entry['num']]), align='R')
+    try:
+        pdf.output(pdf_path)
         
-        # Guardar PDF
-        output_dir = "output"
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-            
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        pdf_path = os.path.join(output_dir, f"analisis_detallado_{timestamp}.pdf")
+        if os.path.exists(pdf_path) and os.path.getsize(pdf_path) > 0:
+            print(f"✅ PDF generado correctamente: {pdf_path}")
+            return pdf_path
+        else:
+            print("❌ Error: El archivo PDF no se generó correctamente")
+            return None
+    except Exception as e:
+        print(f"❌ Error guardando PDF: {str(e)}")
+        return None
+
+def _validate_exhaustive_input(idea_text):
+    """Valida y normaliza el texto de la idea. Devuelve None si no es válido."""
+    if not idea_text or not isinstance(idea_text, str):
+        print("❌ Error: La idea debe ser un texto no vacío")
+        return None
+    idea_text = idea_text.strip()
+    if len(idea_text) < 10:
+        print("❌ Error: La idea es demasiado corta")
+        return None
+    return idea_text
+
+def analyze_idea_exhaustive(idea_text, sections=None):
+    """
+    Realiza un análisis exhaustivo de una idea innovadora para el departamento de innovación de Sener.
+    Con sections=True (o ANALYSIS_PARALLEL_SECTIONS=1) pide cada sección de
+    EXHAUSTIVE_SECTIONS_TEMPLATE en paralelo y, si falla, vuelve a la llamada única.
+    """
+    try:
+        # Validar entrada
+        idea_text = _validate_exhaustive_input(idea_text)
+        if idea_text is None:
+            return None
         
-        try:
-            pdf.output(pdf_path)
+        analysis_text = None
+        if ANALYSIS_PARALLEL_SECTIONS if sections is None else sections:
+            analysis_text = analyze_sections_parallel(
+                idea_text, extract_analysis_points(EXHAUSTIVE_SECTIONS_TEMPLATE), EXHAUSTIVE_SYSTEM_PROMPT,
+                EXHAUSTIVE_SECTION_INSTRUCTIONS, task="analisis_exhaustivo", timeout=60
+            )
+        
+        if analysis_text is None:
+            # Timeout de 60 segundos en la propia petición (signal.alarm solo funciona en el hilo
+            # principal y fallaba siempre desde los workers de Gradio)
+            try:
+                response = client.chat.completions.create(
+                    model=DEPLOYMENT_NAME,
+                    messages=_build_exhaustive_messages(idea_text),
+                    max_tokens=4000,
+                    temperature=0.7,
+                    timeout=60
+                )
+            except Exception as e:
+                print(f"❌ Error en llamada OpenAI: {str(e)}")
+                return None
             
-            if os.path.exists(pdf_path) and os.path.getsize(pdf_path) > 0:
-                print(f"✅ PDF generado correctamente: {pdf_path}")
-                return normalized_analysis, pdf_path
-            else:
-                print("❌ Error: El archivo PDF no se generó correctamente")
-                return normalized_analysis, None
-        except Exception as e:
-            print(f"❌ Error guardando PDF: {str(e)}")
-            return normalized_analysis, None
+            if not (response and response.choices and response.choices[0].message):
+                print("❌ Error: respuesta vacía del modelo")
+                return None, None
+            analysis_text = response.choices[0].message.content
+        
+        normalized_analysis = _postprocess_exhaustive_analysis(analysis_text)
+        return normalized_analysis, _build_exhaustive_pdf(normalized_analysis)
                 
     except Exception as e:
         print(f"❌ Error en análisis exhaustivo: {str(e)}")
         traceback.print_exc()
         return None, None
 
+def analyze_idea_exhaustive_stream(idea_text, build_pdf=True, sections=None):
+    """
+    Versión en streaming de analyze_idea_exhaustive.
+    
+    Generador que produce tuplas (texto_parcial, None) a medida que llegan los tokens y,
+    al terminar, (análisis_normalizado, ruta_pdf) con el PDF generado a partir del texto final
+    (ruta_pdf es None si build_pdf=False). Si la idea no es válida o falla la llamada, produce (None, None).
+    Con sections=True (o ANALYSIS_PARALLEL_SECTIONS=1) el texto parcial crece sección a
+    sección, en el orden de la plantilla; si falla, vuelve a la llamada única en streaming.
+    """
+    try:
+        idea_text = _validate_exhaustive_input(idea_text)
+        if idea_text is None:
+            yield None, None
+            return
+        
+        if ANALYSIS_PARALLEL_SECTIONS if sections is None else sections:
+            analysis_text = None
+            try:
+                for analysis_text in iter_sections_parallel(
+                        idea_text, extract_analysis_points(EXHAUSTIVE_SECTIONS_TEMPLATE), EXHAUSTIVE_SYSTEM_PROMPT,
+                        EXHAUSTIVE_SECTION_INSTRUCTIONS, task="analisis_exhaustivo", timeout=60):
+                    yield analysis_text, None
+            except Exception as e:
+                print(f"⚠️ Falló el análisis por secciones, se repite con una sola llamada: {str(e)}")
+                analysis_text = None
+            if analysis_text:
+                normalized_analysis = _postprocess_exhaustive_analysis(analysis_text)
+                yield normalized_analysis, _build_exhaustive_pdf(normalized_analysis) if build_pdf else None
+                return
+        
+        stream = client.chat.completions.create(
+            model=DEPLOYMENT_NAME,
+            messages=_build_exhaustive_messages(idea_text),
+            max_tokens=4000,
+            temperature=0.7,
+            timeout=60,
+            stream=True
+        )
+        
+        parts = []
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                yield "".join(parts), None
+        
+        if not parts:
+            print("❌ Error: respuesta vacía del modelo")
+            yield None, None
+            return
+        
+        normalized_analysis = _postprocess_exhaustive_analysis("".join(parts))
+        yield normalized_analysis, _build_exhaustive_pdf(normalized_analysis) if build_pdf else None
+    
+    except Exception as e:
+        print(f"❌ Error en análisis exhaustivo (streaming): {str(e)}")
+        traceback.print_exc()
+        yield None, None
+
 def process_text_response(text):
     """
     Procesa una respuesta de texto en un formato estructurado.
@@ -2237,6 +2499,7 @@ def generate_professional_pdf(results, output_dir="output"):
         return None
 
 # --- NUEVO BLOQUE: GENERACIÓN DE PDF DE SOLUCIÓN A RETOS ---
+@llm_job("retos")
 def generate_challenges_and_solutions_pdf(analyzed_ideas, context="", output_dir="output"):
     import os
     from datetime import datetime
@@ -2434,8 +2697,9 @@ def generate_challenges_and_solutions_pdf(analyzed_ideas, context="", output_dir
             return f"[Error extrayendo soluciones: {e}]"
 
     # 1. Extraer retos en paralelo
-    with concurrent.futures.ThreadPoolExecutor(max_workers=min(10, len(analyzed_ideas))) as executor:
-        retos_futures = [executor.submit(retos_worker, idea, idx) for idx, idea in enumerate(analyzed_ideas)]
+    with JobThreadPoolExecutor(max_workers=min(10, len(analyzed_ideas))) as executor:
+        retos_futures = [executor.submit(with_llm_context(retos_worker, idea_index=idx), idea, idx)
+                         for idx, idea in enumerate(analyzed_ideas)]
         retos_blocks = [f.result() for f in concurrent.futures.as_completed(retos_futures)]
     retos_blocks_ordered = [None]*len(analyzed_ideas)
     for idx, f in enumerate(retos_futures):
@@ -2445,8 +2709,9 @@ def generate_challenges_and_solutions_pdf(analyzed_ideas, context="", output_dir
             retos_blocks_ordered[idx] = f"[Error extrayendo retos: {e}]"
 
     # 2. Extraer soluciones en paralelo
-    with concurrent.futures.ThreadPoolExecutor(max_workers=min(10, len(analyzed_ideas))) as executor:
-        soluciones_futures = [executor.submit(soluciones_worker, retos_blocks_ordered[idx], idx) for idx in range(len(analyzed_ideas))]
+    with JobThreadPoolExecutor(max_workers=min(10, len(analyzed_ideas))) as executor:
+        soluciones_futures = [executor.submit(with_llm_context(soluciones_worker, idea_index=idx), retos_blocks_ordered[idx], idx)
+                              for idx in range(len(analyzed_ideas))]
         soluciones_blocks = [f.result() for f in concurrent.futures.as_completed(soluciones_futures)]
     soluciones_blocks_ordered = [None]*len(analyzed_ideas)
     for idx, f in enumerate(soluciones_futures):
@@ -0,0 +1,280 @@
+"""
+Ejecuciones del análisis por lotes con checkpoint en disco, para poder reanudarlas.
+
+analyze_ideas_batch guardaba los resultados en memoria hasta el final: si el
+proceso moría o la petición de Gradio caducaba se perdían todos los análisis ya
+pagados. Cada ejecución tiene ahora un directorio propio:
+
+    ANALYSIS_RUNS_DIR/<run_id>/
+        manifest.json          título, contexto, modo (secciones), ideas (texto y clave), estado y PDF
+        ideas/0007_<clave>.json  resultado de la idea 7, escrito al terminarla
+        run.lock               bloqueo del proceso que está ejecutando el lote
+
+Cada fichero se escribe en un temporal y se renombra (os.replace), así que tras
+una caída solo hay resultados completos o ninguno. Al reanudar se cargan los
+resultados cuya clave coincide con el texto de la idea y se analizan las demás.
+Solo se reanuda un lote con la misma huella (ideas, título, contexto y modo: llamada
+única o los puntos del análisis por secciones) y que no esté en curso: el proceso que
+lo ejecuta mantiene un bloqueo (flock) sobre run.lock, que el sistema libera si el
+proceso muere. Sin fcntl (Windows) el manifest guarda quién lo ejecuta (locked_by) y
+el lote se considera en curso si además se actualizó hace menos de
+ANALYSIS_RUN_STALE_SECONDS.
+`latest.json` sustituye al antiguo last_analysis_results.json del directorio
+temporal: apunta a la última ejecución que generó informe.
+
+    from analysis_runs import AnalysisRun, find_resumable_run
+    run = find_resumable_run(ideas, title, context) or AnalysisRun.create(ideas, title, context)
+    if run.acquire():
+        done = run.completed_results()
+        run.save_result(index, result)
+        run.release()
+
+Variables de entorno:
+    ANALYSIS_RUNS_DIR       Directorio de las ejecuciones (./runs/analysis)
+    ANALYSIS_AUTO_RESUME    "1": repetir un lote sin terminar lo reanuda (1)
+    ANALYSIS_RUN_STALE_SECONDS  Sin fcntl, segundos sin actualizar tras los que un lote
+                            en curso se da por muerto (600)
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: se usa la fecha de actualización del manifest
+    fcntl = None
+
+ANALYSIS_RUNS_DIR = os.getenv("ANALYSIS_RUNS_DIR", os.path.join(os.getcwd(), "runs", "analysis"))
+ANALYSIS_AUTO_RESUME = os.getenv("ANALYSIS_AUTO_RESUME", "1") == "1"
+ANALYSIS_RUN_STALE_SECONDS = float(os.getenv("ANALYSIS_RUN_STALE_SECONDS", "600"))
+
+# Subir al cambiar el prompt del análisis por lotes: los resultados antiguos no se reanudan
+BATCH_PROMPT_VERSION = 1
+
+_LATEST_FILE = "latest.json"
+_LOCK_FILE = "run.lock"
+
+
+def _write_json_atomic(path, data):
+    # Temporal + fsync + renombrado: el fichero final siempre está completo
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _read_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def idea_key(idea_text):
+    """Clave del texto de una idea: un resultado solo se reutiliza para el mismo texto."""
+    return hashlib.sha256(f"{BATCH_PROMPT_VERSION}|{idea_text}".encode("utf-8")).hexdigest()[:16]
+
+
+def batch_fingerprint(ideas, title="", context="", sections=None):
+    """
+    Huella del lote (ideas en orden, título, contexto, versión del prompt y modo):
+    sections es la lista de puntos del análisis por secciones o None con la llamada única.
+    """
+    payload = json.dumps([BATCH_PROMPT_VERSION, title or "", context or "", [idea['idea'] for idea in ideas],
+                          list(sections) if sections else None],
+                         ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AnalysisRun:
+    """Directorio de una ejecución del análisis por lotes."""
+
+    def __init__(self, run_dir):
+        self.run_dir = run_dir
+        self.run_id = os.path.basename(os.path.normpath(run_dir))
+        self.manifest_path = os.path.join(run_dir, "manifest.json")
+        self.ideas_dir = os.path.join(run_dir, "ideas")
+        self._lock = threading.Lock()
+        self._lock_file = None
+        self.manifest = _read_json(self.manifest_path)
+        if not isinstance(self.manifest, dict):
+            raise FileNotFoundError(f"No hay manifest válido en {run_dir}")
+
+    @classmethod
+    def create(cls, ideas, title="", context="", runs_dir=None, sections=None):
+        """
+        Crea la ejecución para una lista de ideas validadas ({'idea': texto, 'index': n}).
+        sections son los puntos del análisis por secciones (ver batch_fingerprint) y se guardan para reanudarlo.
+        """
+        runs_dir = runs_dir or ANALYSIS_RUNS_DIR
+        fingerprint = batch_fingerprint(ideas, title, context, sections)
+        run_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{fingerprint[:8]}"
+        run_dir = os.path.join(runs_dir, run_id)
+        os.makedirs(os.path.join(run_dir, "ideas"), exist_ok=True)
+        _write_json_atomic(os.path.join(run_dir, "manifest.json"), {
+            "run_id": run_id,
+            "created_at": time.time(),
+            "updated_at": time.time(),
+            "prompt_version": BATCH_PROMPT_VERSION,
+            "fingerprint": fingerprint,
+            "title": title or "",
+            "context": context or "",
+            "sections": list(sections) if sections else None,
+            "status": "running",
+            "pdf_path": None,
+            "ideas": [{"index": idea['index'], "key": idea_key(idea['idea']), "idea": idea['idea']} for idea in ideas],
+        })
+        return cls(run_dir)
+
+    @classmethod
+    def open(cls, run_id, runs_dir=None):
+        return cls(os.path.join(runs_dir or ANALYSIS_RUNS_DIR, run_id))
+
+    @property
+    def status(self):
+        return self.manifest.get("status")
+
+    def acquire(self):
+        """
+        Reserva la ejecución para este proceso; False si otra la está ejecutando.
+        Se libera con release() o, si el proceso muere, al cerrarse el fichero.
+        """
+        if self._lock_file is not None:
+            return True
+        if fcntl is None:
+            if self.is_active():
+                return False
+            self.update(locked_by=f"{os.getpid()}:{id(self)}")
+            self._lock_file = True
+            return True
+        lock_file = open(os.path.join(self.run_dir, _LOCK_FILE), "a")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def release(self):
+        lock_file, self._lock_file = self._lock_file, None
+        if lock_file is True:
+            self.update(locked_by=None)
+        elif lock_file is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            lock_file.close()
+
+    def is_active(self):
+        """True si otro proceso (o petición) está ejecutando ahora esta ejecución."""
+        if self._lock_file is not None:
+            return False
+        if fcntl is None:
+            return (bool(self.manifest.get("locked_by"))
+                    and time.time() - float(self.manifest.get("updated_at") or 0) < ANALYSIS_RUN_STALE_SECONDS)
+        if not self.acquire():
+            return True
+        self.release()
+        return False
+
+    def ideas(self):
+        """Ideas del lote en el formato de entrada de analyze_ideas_batch."""
+        return [{"idea": item["idea"], "index": item["index"]} for item in self.manifest.get("ideas", [])]
+
+    def _result_path(self, index, key):
+        return os.path.join(self.ideas_dir, f"{index:04d}_{key}.json")
+
+    def completed_results(self):
+        """Resultados ya guardados, por índice de idea; los ficheros dañados se ignoran."""
+        results = {}
+        for item in self.manifest.get("ideas", []):
+            data = _read_json(self._result_path(item["index"], item["key"]))
+            if isinstance(data, dict) and data.get("key") == item["key"] and data.get("result"):
+                results[item["index"]] = data["result"]
+        return results
+
+    def save_result(self, index, result):
+        """Guarda el resultado de una idea en cuanto termina."""
+        item = next((item for item in self.manifest.get("ideas", []) if item["index"] == index), None)
+        if item is None:
+            raise KeyError(f"La idea {index} no pertenece a la ejecución {self.run_id}")
+        _write_json_atomic(self._result_path(index, item["key"]),
+                           {"key": item["key"], "saved_at": time.time(), "result": result})
+        # Latido: sin fcntl, updated_at reciente indica que el lote sigue en curso
+        if fcntl is None:
+            self.update()
+
+    def update(self, **fields):
+        with self._lock:
+            self.manifest.update(fields, updated_at=time.time())
+            _write_json_atomic(self.manifest_path, self.manifest)
+
+    def mark_latest(self):
+        """Apunta latest.json a esta ejecución (la que leen get_analyzed_ideas y compañía)."""
+        _write_json_atomic(os.path.join(os.path.dirname(self.run_dir), _LATEST_FILE),
+                           {"run_id": self.run_id, "updated_at": time.time()})
+
+
+def list_runs(runs_dir=None):
+    """Ejecuciones existentes, de la más reciente a la más antigua."""
+    runs_dir = runs_dir or ANALYSIS_RUNS_DIR
+    try:
+        names = sorted(os.listdir(runs_dir), reverse=True)
+    except OSError:
+        return []
+    runs = []
+    for name in names:
+        if os.path.isfile(os.path.join(runs_dir, name, "manifest.json")):
+            try:
+                runs.append(AnalysisRun(os.path.join(runs_dir, name)))
+            except FileNotFoundError:
+                continue
+    return runs
+
+
+def find_resumable_run(ideas=None, title="", context="", runs_dir=None, sections=None):
+    """
+    Ejecución sin terminar más reciente que no esté en curso; con `ideas`, solo una
+    del mismo lote (mismas ideas, título, contexto, modo y versión del prompt).
+    La ejecución devuelta no queda reservada: hay que llamar a acquire().
+    """
+    fingerprint = batch_fingerprint(ideas, title, context, sections) if ideas is not None else None
+    for run in list_runs(runs_dir):
+        if run.status == "done" or run.manifest.get("prompt_version") != BATCH_PROMPT_VERSION:
+            continue
+        if fingerprint is not None and run.manifest.get("fingerprint") != fingerprint:
+            continue
+        if run.is_active():
+            print(f"ℹ️ La ejecución {run.run_id} está en curso en otro proceso; no se reanuda")
+            continue
+        return run
+    return None
+
+
+def load_latest_results(runs_dir=None):
+    """Resultados de la última ejecución con informe (lista ordenada) o [] si no hay."""
+    runs_dir = runs_dir or ANALYSIS_RUNS_DIR
+    latest = _read_json(os.path.join(runs_dir, _LATEST_FILE))
+    if not isinstance(latest, dict) or not latest.get("run_id"):
+        return []
+    try:
+        run = AnalysisRun.open(latest["run_id"], runs_dir)
+    except FileNotFoundError:
+        return []
+    results = run.completed_results()
+    return [results[index] for index in sorted(results)]
+
+
+def clear_latest(runs_dir=None):
+    """Olvida la última ejecución (las ejecuciones siguen en disco)."""
+    path = os.path.join(runs_dir or ANALYSIS_RUNS_DIR, _LATEST_FILE)
+    if os.path.exists(path):
+        os.remove(path)
+        return True
+    return False
@@ -37,11 +37,17 @@ from langchain_community.utilities import DuckDuckGoSearchAPIWrapper
 # Importaciones para OpenAI directo
 from openai import OpenAI, AzureOpenAI
 from openai_config import get_openai_client, get_deployment_name
+from llm_gateway import JobThreadPoolExecutor, llm_job
+from llm_telemetry import llm_context, with_llm_context
+from prompt_builder import SENER_CONTEXT, COMPETITOR_CONTEXT, COMPETITOR_PREFIX, build_messages
+from token_budget import plan_call
 
 # Configuración global para forzar response_format en formato JSON
 JSON_RESPONSE_FORMAT = {"type": "json_object"}
 # Temperatura más baja para respuestas determinísticas en JSON
 SAFE_TEMPERATURE = 0.0
+# Tope de tokens de entrada del brief/keywords (idea + análisis completo)
+BRIEF_MAX_INPUT_TOKENS = 1500
 
 # Cliente de OpenAI para uso directo
 client = get_openai_client()
@@ -200,62 +206,8 @@ class CompetitorAnalysis:
     Análisis competitivo LLM-first: el LLM genera el informe completo, y solo si lo pide se hace scraping puntual.
     """
     _init_logged = False
-    SENER_CONTEXT = '''Sener: Ingeniería, tecnología e innovación con visión global
-
-Sener es un grupo privado de ingeniería y tecnología fundado en 1956, con sede en España y una sólida proyección internacional. A lo largo de sus más de seis décadas de trayectoria, Sener se ha consolidado como un referente en la ejecución de proyectos de alta complejidad técnica, aportando soluciones innovadoras en sectores estratégicos clave para el desarrollo sostenible y el progreso tecnológico.
-
-Áreas de especialización:
-
-Sener combina ingeniería avanzada, desarrollo tecnológico y capacidad constructiva para ofrecer soluciones integrales que abarcan desde la consultoría y diseño hasta la implementación y operación de sistemas complejos. Sus principales áreas de enfoque incluyen:
-
-Ingeniería y construcción en sectores críticos, aplicando altos estándares de calidad, seguridad y sostenibilidad.
-
-Desarrollo de sistemas y software a medida para sectores de alto valor estratégico, como defensa, energía y transporte.
-
-Innovación tecnológica, con una fuerte inversión en I+D para el desarrollo de soluciones avanzadas que aporten valor diferencial a sus clientes.
-
-Sectores clave de actividad:
-
-Aeroespacial: Sener participa en misiones espaciales internacionales con el diseño, integración y fabricación de componentes y sistemas para satélites, vehículos espaciales y estaciones orbitales.
-
-Infraestructuras y Transporte: Especialista en proyectos de gran escala como ferrocarriles, metros, carreteras y obras hidráulicas, incluyendo diseño de trazados, estructuras, sistemas y gestión del transporte. Las líneas estratégicas que se estan abriendo y explorando en innovación son hospital adaptable, transformación de instalaciones deportivas y de entretenimiento en espacios multifuncionales, infraestructura para el vehículo autónomo, puertos flotantes, centrales hidroeléctricas reversibles usando agua de mar, hiper-aprovechamiento de la infraestructura del metro.
-
-Energía: Impulsa la transición energética mediante proyectos en energías renovables (solar, eólica, hidrógeno verde), eficiencia energética, almacenamiento y soluciones inteligentes de red.
-
-Digitalización: Lidera procesos de transformación digital con soluciones de automatización, gemelos digitales, inteligencia artificial y sistemas ciberfísicos aplicados a sectores industriales complejos.
-
-Centros de datos: Infraestructura para los centros de datos
-
-# -----------------------------------------------------------------------------
-# COMPETIDORES BASE MONITORIZADOS (DEBEN VERIFICARSE PARA CADA IDEA)
-# -----------------------------------------------------------------------------
-# IMPORTANTE PARA EL LLM: La siguiente lista constituye una base de referencia
-# de compañías que históricamente compiten con Sener.  NO significa que deban
-# aparecer automáticamente como competidores en todos los análisis.  Para cada
-# nueva idea o sector analizado, SOLO deben incluirse aquellos que presenten
-# evidencia real (proyectos, patentes, soluciones, comunicación oficial)
-# alineada con la idea concreta.  Si la evidencia no existe o es débil, el LLM
-# deberá omitirlos y buscar otros actores más pertinentes.
-#  •  NUNCA incluyas a Sener como competidor.
-#  •  Justifica internamente (no en la respuesta) la inclusión de cada empresa.
-#  •  Prefiere siempre datos verificados sobre tamaño, país y foco tecnológico.
-#
-# 1) IDOM:  Movilidad sostenible; big-data/IA; soluciones energéticas; optimización de procesos; innovación y digitalización.
-# 2) Abengoa:  Infraestructura ferroviaria; redes inteligentes 5E reversibles; proyectos de hidrógeno.
-# 3) Typsa: Ingeniería multidisciplinar; participación ocasional en infraestructuras de transporte (baja relevancia tecnológica actual).
-# 4) AECOM: Servicios globales de ingeniería y consultoría; proyectos de transporte y energía (revisar caso a caso).
-# 5) Elecnor: Ingeniería y construcción de grandes infraestructuras; presencia internacional (datos públicos limitados en áreas deep-tech).
-# 6) Atkins: Desarrollo de software y servicios de ingeniería; experiencia en movilidad y planificación.
-# 7) ARUP: Diseño de infraestructuras; asset-management; mantenimiento; consultoría digital avanzada.
-# 8) Jacobs: Climate response; data solutions; consultoría y advisory en grandes proyectos de infraestructura.
-# 9) Indra: Automatización aérea; navegación; drones; comunicaciones críticas y sistemas de información.
-# 10) Ineco: Cambio climático; renovables; optimización de procesos; innovación y digitalización en transporte.
-#
-# El modelo debe evaluar críticamente esta base y complementar O SUSTITUIR los
-# nombres con otros competidores más adecuados si el ámbito tecnológico o de
-# mercado de la IDEA lo requiere. MUY IMPORTANTE ANALIZARLO CRITICAMENTE
-# -----------------------------------------------------------------------------
- '''
+    # Contexto corporativo y competidores de referencia (los mismos del prefijo de competencia)
+    SENER_CONTEXT = SENER_CONTEXT + COMPETITOR_CONTEXT
     def __init__(self, max_workers=4):
         print("🟢 [CompetitorAnalysis] Inicializando clase CompetitorAnalysis...")
         self.max_workers = max_workers
@@ -345,7 +297,8 @@ Centros de datos: Infraestructura para los centros de datos
                 ],
                 temperature=0.2,
                 max_tokens=120,
-                response_format={"type": "json_object"}
+                response_format={"type": "json_object"},
+                task="sector_terms"
             )
             import json
             data = json.loads(resp.choices[0].message.content)
@@ -2425,20 +2378,22 @@ RESPUESTA: JSON válido sin texto adicional. MÁXIMO detalle técnico específic
             logging.error(f"[Patents] ❌ Error en búsqueda real de patentes: {e}")
             return []
 
+    @llm_job("competencia")
     def analyze_ideas_batch_competitor(self, ideas_list, context="", extra_sources="", max_workers=4):
         """
         Analiza una lista de ideas en paralelo usando ThreadPoolExecutor.
         Devuelve un dict con 'ideas' (análisis individuales sin EXEC_SUMMARY) y 'executive_summary' (resumen global).
         """
-        from concurrent.futures import ThreadPoolExecutor, as_completed
+        from concurrent.futures import as_completed
         
         print(f"🟢 [CompetitorAnalysis] Iniciando análisis batch de {len(ideas_list)} ideas...")
         
         # 1. Analizar cada idea individualmente (SIN EXEC_SUMMARY)
         results = {}
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        with JobThreadPoolExecutor(max_workers=max_workers) as executor:
             future_to_idx = {
-                executor.submit(self._analyze_idea_without_exec_summary, idea, context, extra_sources): idx
+                executor.submit(with_llm_context(self._analyze_idea_without_exec_summary, idea_index=idx),
+                                idea, context, extra_sources): idx
                 for idx, idea in enumerate(ideas_list)
             }
             for future in as_completed(future_to_idx):
@@ -2454,7 +2409,8 @@ RESPUESTA: JSON válido sin texto adicional. MÁXIMO detalle técnico específic
         
         # 2. Generar resumen ejecutivo GLOBAL
         print("🟢 [CompetitorAnalysis] Generando resumen ejecutivo global...")
-        global_summary = self._generate_global_executive_summary(ideas_list, ideas_analyzed, context)
+        with llm_context(section_id="EXEC_SUMMARY"):
+            global_summary = self._generate_global_executive_summary(ideas_list, ideas_analyzed, context)
         
         return {
             'ideas': ideas_analyzed,
@@ -2564,17 +2520,14 @@ RESPUESTA: JSON válido sin texto adicional. MÁXIMO detalle técnico específic
                 for info in ideas_info
             ])
             
+            # El contexto de Sener y los competidores van en el prefijo; aquí solo el del usuario
             user_context = (context or "").strip()
-            if user_context:
-                contexto_usuario = self.SENER_CONTEXT + "\n\n" + user_context
-            else:
-                contexto_usuario = self.SENER_CONTEXT
             
             prompt = f"""
             Genera un resumen ejecutivo CORTO Y DIRECTO para el análisis competitivo de {len(ideas_list)} ideas innovadoras.
 
-            CONTEXTO DE SENER:
-            {contexto_usuario}
+            CONTEXTO ADICIONAL DEL USUARIO:
+            {user_context or "No hay contexto adicional."}
 
             IDEAS ANALIZADAS:
             {ideas_summary}
@@ -2598,10 +2551,12 @@ RESPUESTA: JSON válido sin texto adicional. MÁXIMO detalle técnico específic
             
             response = self.openai_client.chat.completions.create(
                 model=self.deployment_name,
-                messages=[
-                    {"role": "system", "content": "Eres un consultor estratégico senior especializado en análisis competitivo y estrategia corporativa. Siempre eres conciso y directo."},
-                    {"role": "user", "content": prompt}
-                ],
+                messages=build_messages(
+                    "Eres un consultor estratégico senior especializado en análisis competitivo y estrategia corporativa. Siempre eres conciso y directo.",
+                    prompt,
+                    task="competencia_resumen_global",
+                    prefix=COMPETITOR_PREFIX,
+                ),
                 temperature=0.7,
                 max_tokens=500
             )
@@ -2625,6 +2580,7 @@ RESPUESTA: JSON válido sin texto adicional. MÁXIMO detalle técnico específic
                 'error': str(e)
             }
 
+    @llm_job("competencia")
     def generate_ai_only_competition_report(self, idea, context, meta, extra_sources=""):
         print("🟢 [CompetitorAnalysis] Iniciando generación de informe AI-only para competencia...")
         idea_raw = idea.get('idea') if isinstance(idea, dict) and 'idea' in idea else str(idea)
@@ -2654,7 +2610,7 @@ RESPUESTA: JSON válido sin texto adicional. MÁXIMO detalle técnico específic
             'REGULATORY_ESG_RISK'
         ]
         report_dict = {}
-        from concurrent.futures import ThreadPoolExecutor, as_completed
+        from concurrent.futures import as_completed
         
         # 🔧 CRITICAL FIX: Process COMPETITOR_MAPPING first, then BENCHMARK_MATRIX with extracted competitors
         # ✅ BENCHMARK_MATRIX EXCLUDED from first phase to avoid double processing
@@ -2701,8 +2657,9 @@ RESPUESTA: JSON válido sin texto adicional. MÁXIMO detalle técnico específic
 
         # 1.1 Extract first phase sections in parallel
         print("🔄 [CompetitorAnalysis] FASE 1: Procesando secciones base...")
-        with ThreadPoolExecutor(max_workers=min(5, self.max_workers)) as executor:
-            futures = {executor.submit(extract_structured, section_id): section_id for section_id in section_map_first_phase}
+        with JobThreadPoolExecutor(max_workers=min(5, self.max_workers)) as executor:
+            futures = {executor.submit(with_llm_context(extract_structured, section_id=section_id), section_id): section_id
+                       for section_id in section_map_first_phase}
             datos_dict = {}
             for future in as_completed(futures):
                 section_id, datos = future.result()
@@ -2716,7 +2673,8 @@ RESPUESTA: JSON válido sin texto adicional. MÁXIMO detalle técnico específic
         
         try:
             print(f"🚨🚨🚨 [DEBUG-FASE2] Llamando _extract_section_data_llm('BENCHMARK_MATRIX', shared_inputs, report_dict)")
-            benchmark_datos = self._extract_section_data_llm('BENCHMARK_MATRIX', shared_inputs, report_dict)
+            with llm_context(section_id='BENCHMARK_MATRIX'):
+                benchmark_datos = self._extract_section_data_llm('BENCHMARK_MATRIX', shared_inputs, report_dict)
             print(f"🚨🚨🚨 [DEBUG-FASE2] Resultado: {type(benchmark_datos)}, keys: {list(benchmark_datos.keys()) if isinstance(benchmark_datos, dict) else 'No es dict'}")
             
             if not benchmark_datos:
@@ -2768,8 +2726,9 @@ RESPUESTA: JSON válido sin texto adicional. MÁXIMO detalle técnico específic
                 texto = "[Error al redactar sección]"
             return section_id, texto
             
-        with ThreadPoolExecutor(max_workers=min(6, self.max_workers)) as executor:
-            futures = {executor.submit(redactar_explicativo, section_id): section_id for section_id in section_map_complete}
+        with JobThreadPoolExecutor(max_workers=min(6, self.max_workers)) as executor:
+            futures = {executor.submit(with_llm_context(redactar_explicativo, section_id=section_id), section_id): section_id
+                       for section_id in section_map_complete}
             textos_dict = {}
             for future in as_completed(futures):
                 section_id, texto = future.result()
@@ -3272,20 +3231,32 @@ RESPUESTA: JSON válido sin texto adicional. MÁXIMO detalle técnico específic
         """
         Llama al LLM para obtener un brief y 5-8 palabras clave sectoriales, usando también el análisis completo si existe.
         """
-        prompt = (
-            "Devuelve SOLO un objeto JSON con dos campos: 'brief' (resumen de la idea en 2-3 frases) y 'keywords' (lista de 5-8 palabras clave sectoriales, en minúsculas, separadas por coma). Nada fuera del JSON.\n\nIDEA:\n" + idea_raw[:800]
+        system = "Eres un analista experto en síntesis de ideas y extracción de palabras clave."
+        instruction = "Devuelve SOLO un objeto JSON con dos campos: 'brief' (resumen de la idea en 2-3 frases) y 'keywords' (lista de 5-8 palabras clave sectoriales, en minúsculas, separadas por coma). Nada fuera del JSON.\n\nIDEA:\n"
+        # Presupuesto de entrada en tokens (antes 800 + 1200 caracteres); el análisis
+        # conserva principio y final, donde están el resumen y la valoración
+        plan = plan_call(
+            self.deployment_name,
+            [{"role": "system", "content": system},
+             {"role": "user", "content": instruction + "\n\nANALISIS_COMPLETO:\n"}],
+            expected_output_tokens=200,
+            variable_texts={"idea": idea_raw, "analysis": analysis_full or ""},
+            weights={"idea": 1, "analysis": 2},
+            max_input_tokens=BRIEF_MAX_INPUT_TOKENS,
+            previous_max_tokens=300,
         )
+        prompt = instruction + plan.fit("idea", idea_raw, strategy="head")
         if analysis_full:
-            prompt += f"\n\nANALISIS_COMPLETO:\n{analysis_full[:1200]}"
+            prompt += f"\n\nANALISIS_COMPLETO:\n{plan.fit('analysis', analysis_full, strategy='head_tail')}"
         try:
             resp = self.openai_client.chat.completions.create(
                 model=self.deployment_name,
                 messages=[
-                    {"role": "system", "content": "Eres un analista experto en síntesis de ideas y extracción de palabras clave."},
+                    {"role": "system", "content": system},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.2,
-                max_tokens=300,
+                max_tokens=plan.max_tokens,
                 response_format={"type": "json_object"}
             )
             data = json.loads(resp.choices[0].message.content)
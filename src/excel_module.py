@@ -3,22 +3,16 @@ import re
 from fpdf import FPDF
 import tempfile
 from concurrent.futures import ThreadPoolExecutor
-import openai
 from docx import Document
 import os
 from datetime import datetime
 import numpy as np
 
-# Configuración de OpenAI
-AZURE_OPENAI_ENDPOINT = "https://azureaiservices-ailab-dev-003.openai.azure.com/"
-AZURE_OPENAI_API_KEY = "67788dc5a5a6425c9551d774c938b162"
-DEPLOYMENT_NAME = "gpt-4o"
-API_VERSION = "2024-05-01-preview"
+from openai_config import get_openai_client, get_deployment_name
 
-openai.api_type = "azure"
-openai.api_base = AZURE_OPENAI_ENDPOINT
-openai.api_version = API_VERSION
-openai.api_key = AZURE_OPENAI_API_KEY
+# Configuración de OpenAI: cliente compartido (con caché persistente de respuestas)
+client = get_openai_client()
+DEPLOYMENT_NAME = get_deployment_name()
 
 def generar_descripcion_breve(texto, contexto, deployment_name, max_tokens=50, temperature=0.3):
     """
@@ -32,16 +26,17 @@ def generar_descripcion_breve(texto, contexto, deployment_name, max_tokens=50, t
         "La respuesta debe ser muy breve (menos de 20 palabras)."
     )
     try:
-        response = openai.ChatCompletion.create(
-            engine=deployment_name,
+        response = client.chat.completions.create(
+            model=deployment_name or DEPLOYMENT_NAME,
             messages=[
                 {"role": "system", "content": "Eres un experto en innovación y análisis estratégico."},
                 {"role": "user", "content": prompt}
             ],
             temperature=temperature,
-            max_tokens=max_tokens
+            max_tokens=max_tokens,
+            task="brief"
         )
-        resumen = response["choices"][0]["message"]["content"].strip()
+        resumen = response.choices[0].message.content.strip()
     except Exception as e:
         resumen = f"Error: {e}"
     return resumen
@@ -316,7 +311,7 @@ def enrich_idea_with_context(idea_text, cluster, context):
         openai_config = {
             'temperature': 0.4,  # Reducido para mayor consistencia
             'max_tokens': 150,   # Ajustado para respuestas más concisas
-            'engine': DEPLOYMENT_NAME
+            'model': DEPLOYMENT_NAME
         }
         
         prompt = f"""
@@ -337,8 +332,8 @@ def enrich_idea_with_context(idea_text, cluster, context):
         ANÁLISIS: [tu explicación aquí]
         """
         
-        response = openai.ChatCompletion.create(
-            engine=openai_config['engine'],
+        response = client.chat.completions.create(
+            model=openai_config['model'],
             messages=[
                 {"role": "system", "content": "Eres un experto en tecnología que explica conceptos de forma clara y precisa."},
                 {"role": "user", "content": prompt}
@@ -7,8 +7,9 @@ import pandas as pd
 import openai
 import asyncio
 import os
+import time
 from excel_module import process_excel_file, generate_ideas_pdf
-from pdf_processor_module import process_pdf_file, generate_pdf_from_ideas
+from pdf_processor_module import process_pdf_file, process_pdf_file_async, generate_pdf_from_ideas
 from analysis_module2 import (
     get_analysis_template, 
     update_analysis_template, 
@@ -17,11 +18,11 @@ from analysis_module2 import (
     perform_analysis_module,
     get_analyzed_ideas,
     global_save_analyzed_ideas,
-    analyze_idea_exhaustive,
+    analyze_idea_exhaustive_stream,
     generate_challenges_and_solutions_pdf,
     get_global_analyzed_ideas
 )
-from ranking_module import generate_ranking, generate_ranking_pdf
+from ranking_module import generate_ranking, generate_ranking_pdf, RANKING_ORDER_MODE, sort_ranked_ideas
 from competitor_analysis_module import CompetitorAnalysis
 import tempfile
 from datetime import datetime
@@ -32,7 +33,7 @@ import sys
 from fpdf import FPDF
 import traceback
 import re
-from openai_config import get_openai_client, get_deployment_name
+from openai_config import get_openai_client, get_async_openai_client, get_deployment_name
 import spacy
 from sklearn.metrics.pairwise import cosine_similarity
 from pdf_generator import generate_analysis_pdf
@@ -53,6 +54,12 @@ idea_counter = 0
 analyzed_ideas_global_ui = []  # Variable global para almacenar ideas analizadas
 analysis_points_validated = None
 
+# Segundos mínimos entre repintados de la matriz de payoff parcial durante el ranking
+RANKING_PAYOFF_REFRESH = float(os.getenv("RANKING_PAYOFF_REFRESH", "3"))
+
+# Opciones del orden final del ranking (order_mode de ranking_module.iter_ranking)
+RANKING_ORDER_CHOICES = {"Puntuación": "score", "Torneo por pares (LLM)": "tournament"}
+
 # Variables globales para registro
 terminal_log = []
 log_limit = 50  # Limitar el número de líneas para evitar problemas de memoria
@@ -247,7 +254,7 @@ async def process_pdf_direct(pdf_file, context):
             print(f"=========================================\n")
         else:
             print("\n⚠️ No se proporcionó contexto en process_pdf_direct\n")
-        ideas, status = process_pdf_file(pdf_file.name, context)
+        ideas, status = await process_pdf_file_async(pdf_file.name, context)
         if not ideas:
             return f"❌ {status}", "0"
         validated_ideas = []
@@ -479,6 +486,14 @@ def create_ranking_tab():
                     lines=3
                 )
                 
+                ranking_order = gr.Dropdown(
+                    label="Orden del ranking",
+                    choices=list(RANKING_ORDER_CHOICES.keys()),
+                    value=next((label for label, mode in RANKING_ORDER_CHOICES.items() if mode == RANKING_ORDER_MODE),
+                               "Puntuación"),
+                    info="El torneo compara las ideas por pares con el LLM tras puntuarlas (más llamadas)"
+                )
+                
                 generate_ranking_btn = gr.Button("🔄 Generar Ranking", variant="primary", elem_classes=["ranking-btn"])
                 ranking_status = gr.Textbox(label="Estado", interactive=False)
                 ranking_pdf = gr.File(label="PDF de Ranking", interactive=False)
@@ -521,6 +536,32 @@ def create_ranking_tab():
                         visible=False,
                         elem_id="payoff-matrix-download"
                     )
+                
+                # Simulación de pesos sobre el ranking guardado (sin llamadas al LLM)
+                with gr.Accordion("🎚️ Simulación de pesos (what-if)", open=False):
+                    from portfolio_scoring import DEFAULT_WEIGHTS, load_weight_profiles
+                    weight_profile = gr.Dropdown(
+                        label="Perfil de pesos",
+                        choices=list(load_weight_profiles().keys()),
+                        value="equilibrado"
+                    )
+                    with gr.Row():
+                        weight_tecnica = gr.Slider(0, 3, value=DEFAULT_WEIGHTS["tecnica"], step=0.1, label="Peso dimensión técnica")
+                        weight_economica = gr.Slider(0, 3, value=DEFAULT_WEIGHTS["economica"], step=0.1, label="Peso dimensión económica")
+                        weight_mercado = gr.Slider(0, 3, value=DEFAULT_WEIGHTS["mercado"], step=0.1, label="Peso dimensión de mercado")
+                    weight_cualitativo = gr.Slider(0, 1, value=DEFAULT_WEIGHTS["cualitativo"], step=0.05,
+                                                   label="Fracción cualitativa del score (0.5 = 50/50)")
+                    with gr.Row():
+                        weight_profile_name = gr.Textbox(label="Nombre del perfil", placeholder="p. ej. corto_plazo")
+                        save_weight_profile_btn = gr.Button("💾 Guardar perfil")
+                    what_if_status = gr.Textbox(label="Estado", interactive=False)
+                    what_if_table = gr.Dataframe(
+                        headers=["Posición", "Antes", "Idea", "Puntuación"],
+                        datatype=["number", "number", "str", "number"],
+                        col_count=(4, "fixed"),
+                        interactive=False
+                    )
+                    what_if_payoff = gr.Image(label="Matriz de Payoff con estos pesos", show_label=True)
         
         # Estilo personalizado para el botón y mensajes
         gr.HTML("""
@@ -538,14 +579,65 @@ def create_ranking_tab():
         
         generate_ranking_btn.click(
             fn=generate_ranking_ui,
-            inputs=[ranking_context],
+            inputs=[ranking_context, ranking_order],
             outputs=[ranking_status, ranking_pdf, ranking_table, payoff_matrix_img, payoff_matrix_download]
         )
+        
+        weight_sliders = [weight_tecnica, weight_economica, weight_mercado, weight_cualitativo]
+        what_if_outputs = [what_if_status, what_if_table, what_if_payoff]
+        # release: recalcular al soltar el slider, no en cada paso del arrastre
+        for slider in weight_sliders:
+            slider.release(fn=reweight_ranking_ui, inputs=weight_sliders, outputs=what_if_outputs)
+        weight_profile.change(
+            fn=load_weight_profile_ui,
+            inputs=[weight_profile],
+            outputs=weight_sliders
+        ).then(fn=reweight_ranking_ui, inputs=weight_sliders, outputs=what_if_outputs)
+        save_weight_profile_btn.click(
+            fn=save_weight_profile_ui,
+            inputs=[weight_profile_name] + weight_sliders,
+            outputs=[what_if_status, weight_profile]
+        )
+
+def _unique_output_png(prefix):
+    """Ruta PNG única en output/ para que las sesiones concurrentes de Gradio no compartan imagen."""
+    os.makedirs("output", exist_ok=True)
+    fd, path = tempfile.mkstemp(prefix=f"{prefix}_", suffix=".png", dir="output")
+    os.close(fd)
+    return path
 
-def generate_ranking_ui(ranking_context):
+def _ranking_table_rows(ranked_ideas):
     """
-    Genera un ranking de ideas utilizando el módulo de ranking y actualiza la UI con los resultados
+    Filas (posición, título, puntuación) de la tabla de ranking
     """
+    table_data = []
+    for i, idea in enumerate(ranked_ideas, 1):
+        if isinstance(idea, dict):
+            # Extraer el título de la idea
+            title = idea.get('title', '')
+            if not title and 'idea' in idea:
+                # Extraer título de la idea si no está definido explícitamente
+                idea_text = str(idea['idea'])
+                title = idea_text.split('\n')[0][:50] if '\n' in idea_text else idea_text[:50]
+                if len(title) >= 50:
+                    title += "..."
+            
+            # Si aún no hay título, usar un título genérico
+            if not title:
+                title = f"Idea {i}"
+                    
+            score = idea.get('score', 0)
+            table_data.append([i, title[:100] + "..." if len(title) > 100 else title, score])
+    return table_data
+
+def generate_ranking_ui(ranking_context, ranking_order=None):
+    """
+    Genera un ranking de ideas utilizando el módulo de ranking y actualiza la UI con los resultados.
+    
+    Generador: produce la tabla y la matriz de payoff parciales a medida que termina cada
+    idea, y el PDF al final. ranking_order es una etiqueta de RANKING_ORDER_CHOICES.
+    """
+    order_mode = RANKING_ORDER_CHOICES.get(ranking_order, RANKING_ORDER_MODE)
     try:
         # Obtener ideas analizadas desde las funciones existentes
         analyzed_ideas = get_analyzed_ideas_global()
@@ -577,13 +669,14 @@ def generate_ranking_ui(ranking_context):
             
         if not analyzed_ideas or not isinstance(analyzed_ideas, list) or len(analyzed_ideas) == 0:
             print("🚫 No se encontraron ideas para rankear")
-            return (
+            yield (
                 "⚠️ No se encontraron ideas para rankear. Primero debes cargar y procesar ideas desde la pestaña 'Carga de Documentos'.",
                 None,
                 [],
                 None,
                 None
             )
+            return
             
         print(f"📊 Generando ranking con {len(analyzed_ideas)} ideas")
         
@@ -618,67 +711,78 @@ def generate_ranking_ui(ranking_context):
                 print(f"⚠️ Idea en posición {i} tiene formato no válido, omitiendo")
                 
         if not ideas_with_analysis:
-            return (
+            yield (
                 "⚠️ No se encontraron ideas válidas para rankear.",
                 None,
                 [],
                 None,
                 None
             )
+            return
         
         # Generar el ranking usando el módulo
         try:
             from ranking_module import generate_ranking, RankingModule
             print(f"🔍 Llamando a generate_ranking con {len(ideas_with_analysis)} ideas")
             
-            # Pasar las ideas con su análisis (si existe) para que extract_metrics_from_analysis pueda utilizarlo
-            ranked_ideas = generate_ranking(ideas_with_analysis, ranking_context)
+            # Pasar las ideas con su análisis (si existe) para que extract_metrics_from_analysis pueda utilizarlo.
+            # RankingModule reutiliza las ideas ya rankeadas sin cambios y guarda el resultado.
+            # La tabla y la matriz de payoff se actualizan cada vez que termina una idea
+            from payoff_matrix_generator import generate_payoff_matrix, save_payoff_matrix_to_file
+            ranking_module = RankingModule()
+            ranked_ideas = []
+            last_payoff_render = 0.0
+            partial_path = None
+            for ranked_ideas, completed, total in ranking_module.iter_rank_ideas(ideas_with_analysis, ranking_context,
+                                                                                  order_mode=order_mode):
+                payoff_update = gr.update()
+                # Matriz parcial a resolución de pantalla y como mucho cada RANKING_PAYOFF_REFRESH segundos
+                if ranked_ideas and time.perf_counter() - last_payoff_render >= RANKING_PAYOFF_REFRESH:
+                    try:
+                        # Una ruta por llamada: las sesiones concurrentes no se pisan la imagen
+                        partial_path = partial_path or _unique_output_png("payoff_matrix_partial")
+                        partial_path = save_payoff_matrix_to_file(ranked_ideas, output_path=partial_path, dpi=80)
+                        payoff_update = gr.update(visible=True, value=partial_path)
+                        last_payoff_render = time.perf_counter()
+                    except Exception as e:
+                        print(f"⚠️ Error al generar matriz de payoff parcial: {str(e)}")
+                status = f"🔄 Rankeando ideas: {completed}/{total} completadas ({len(ranked_ideas)} en la tabla)"
+                if order_mode == "tournament" and completed == total:
+                    status = "🏆 Ideas puntuadas. Ordenando con el torneo de comparaciones por pares..."
+                yield (
+                    status,
+                    None,
+                    _ranking_table_rows(ranked_ideas),
+                    payoff_update,
+                    gr.update()
+                )
             
             # Verificar que tenemos ideas rankeadas
             if not ranked_ideas or not isinstance(ranked_ideas, list) or len(ranked_ideas) == 0:
                 print("⚠️ No se generaron ideas rankeadas")
-                return (
+                yield (
                     "⚠️ No se pudieron generar rankings para las ideas. Por favor, intenta de nuevo.",
                     None,
                     [],
                     None,
                     None
                 )
+                return
             
-            # Guardar las ideas rankeadas usando RankingModule
-            ranking_module = RankingModule()
-            ranking_module.update_rankings(ranked_ideas)
             print("✅ Ideas rankeadas guardadas correctamente")
                 
-            # Ordenar por puntuación (por si acaso no están ordenadas)
-            ranked_ideas = sorted(ranked_ideas, key=lambda x: x.get('score', 0) if isinstance(x, dict) else 0, reverse=True)
+            # Ordenar por puntuación (o por el torneo) por si acaso no están ordenadas
+            ranked_ideas = sort_ranked_ideas([idea for idea in ranked_ideas if isinstance(idea, dict)])
             
             # Crear tabla para mostrar
-            table_data = []
-            for i, idea in enumerate(ranked_ideas, 1):
-                if isinstance(idea, dict):
-                    # Extraer el título de la idea
-                    title = idea.get('title', '')
-                    if not title and 'idea' in idea:
-                        # Extraer título de la idea si no está definido explícitamente
-                        idea_text = str(idea['idea'])
-                        title = idea_text.split('\n')[0][:50] if '\n' in idea_text else idea_text[:50]
-                        if len(title) >= 50:
-                            title += "..."
-                    
-                    # Si aún no hay título, usar un título genérico
-                    if not title:
-                        title = f"Idea {i}"
-                            
-                    score = idea.get('score', 0)
-                    table_data.append([i, title[:100] + "..." if len(title) > 100 else title, score])
+            table_data = _ranking_table_rows(ranked_ideas)
             
             if not table_data:
                 print("⚠️ No se pudo crear la tabla de datos")
-                return ("⚠️ No se generaron rankings. Intenta de nuevo.", None, [], None, None)
+                yield ("⚠️ No se generaron rankings. Intenta de nuevo.", None, [], None, None)
+                return
             
             # Generar matriz de payoff
-            from payoff_matrix_generator import generate_payoff_matrix, save_payoff_matrix_to_file
             try:
                 print("🔄 Generando matriz de payoff para mostrar en UI...")
                 # Guardar matriz como archivo para mostrar en la UI
@@ -695,6 +799,13 @@ def generate_ranking_ui(ranking_context):
                 payoff_matrix_download_visible = gr.update(visible=False, value=None)
             
             # Generar PDF de ranking
+            yield (
+                f"📄 Ranking de {len(ranked_ideas)} ideas completado. Generando PDF...",
+                None,
+                table_data,
+                payoff_matrix_visible,
+                payoff_matrix_download_visible
+            )
             from ranking_module import generate_ranking_pdf_improved
             pdf_path = generate_ranking_pdf_improved(ranked_ideas, ranking_context)
             
@@ -733,19 +844,81 @@ def generate_ranking_ui(ranking_context):
             
             set_analyzed_ideas_global(ranked_ideas)
             
-            return (success_message, pdf_file, table_data, payoff_matrix_visible, payoff_matrix_download_visible)
+            yield (success_message, pdf_file, table_data, payoff_matrix_visible, payoff_matrix_download_visible)
                 
         except Exception as e:
             print(f"❌ Error al generar ranking: {str(e)}")
             import traceback
             traceback.print_exc()
-            return (f"⚠️ Error: No se pudo generar el ranking. {str(e)}", None, [], gr.update(visible=False), gr.update(visible=False))
+            yield (f"⚠️ Error: No se pudo generar el ranking. {str(e)}", None, [], gr.update(visible=False), gr.update(visible=False))
     
     except Exception as e:
         print(f"❌ Error general en UI de ranking: {str(e)}")
         import traceback
         traceback.print_exc()
-        return (f"⚠️ Error en la interfaz: {str(e)}", None, [], gr.update(visible=False), gr.update(visible=False))
+        yield (f"⚠️ Error en la interfaz: {str(e)}", None, [], gr.update(visible=False), gr.update(visible=False))
+
+def _weights_from_sliders(tecnica, economica, mercado, cualitativo):
+    return {"tecnica": tecnica, "economica": economica, "mercado": mercado, "cualitativo": cualitativo}
+
+def reweight_ranking_ui(tecnica, economica, mercado, cualitativo):
+    """
+    Recalcula el ranking guardado con los pesos de los sliders, sin llamadas al LLM
+    """
+    try:
+        from ranking_module import RankingModule
+        from payoff_matrix_generator import save_payoff_matrix_to_file
+        
+        start = time.perf_counter()
+        ideas = RankingModule().reweight(_weights_from_sliders(tecnica, economica, mercado, cualitativo))
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if not ideas:
+            return ("⚠️ No hay un ranking guardado. Genera primero el ranking.", [], None)
+        
+        table_data = [
+            [idea["rank"], idea["previous_rank"], str(idea.get("title") or idea.get("idea", ""))[:100], idea.get("score", 0)]
+            for idea in ideas
+        ]
+        moved = sum(1 for idea in ideas if idea["rank"] != idea["previous_rank"])
+        
+        # Resolución de pantalla: la matriz del PDF se sigue generando a 300 dpi
+        payoff_path = None
+        try:
+            payoff_path = save_payoff_matrix_to_file(ideas, output_path=_unique_output_png("payoff_matrix_what_if"), dpi=100)
+        except Exception as e:
+            print(f"⚠️ Error al generar la matriz de payoff simulada: {str(e)}")
+        
+        return (f"✅ {len(ideas)} ideas re-puntuadas en {elapsed_ms:.0f} ms; {moved} cambian de posición", table_data, payoff_path)
+    except ValueError as e:
+        return (f"⚠️ Pesos no válidos: {str(e)}", [], None)
+    except Exception as e:
+        print(f"❌ Error en la simulación de pesos: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return (f"⚠️ Error en la simulación de pesos: {str(e)}", [], None)
+
+def load_weight_profile_ui(profile_name):
+    """
+    Carga un perfil de pesos con nombre en los sliders
+    """
+    from portfolio_scoring import DEFAULT_WEIGHTS, load_weight_profiles
+    weights = load_weight_profiles().get(profile_name, DEFAULT_WEIGHTS)
+    return weights["tecnica"], weights["economica"], weights["mercado"], weights["cualitativo"]
+
+def save_weight_profile_ui(profile_name, tecnica, economica, mercado, cualitativo):
+    """
+    Guarda los pesos actuales como perfil con nombre
+    """
+    from portfolio_scoring import load_weight_profiles, save_weight_profile
+    try:
+        save_weight_profile(profile_name, _weights_from_sliders(tecnica, economica, mercado, cualitativo))
+        return (f"✅ Perfil '{profile_name.strip()}' guardado",
+                gr.update(choices=list(load_weight_profiles().keys()), value=profile_name.strip()))
+    except ValueError as e:
+        return (f"⚠️ {str(e)}", gr.update())
+    except Exception as e:
+        print(f"❌ Error guardando perfil de pesos: {str(e)}")
+        return (f"⚠️ No se pudo guardar el perfil: {str(e)}", gr.update())
 
 def create_competitor_tab():
     """
@@ -934,6 +1107,19 @@ def create_analysis_tab():
                     elem_id="analysis_status"
                 )
         
+        with gr.Row():
+            with gr.Column():
+                individual_stream_btn = gr.Button(
+                    "⚡ Análisis Individual (en directo)",
+                    variant="secondary",
+                    size="lg",
+                    elem_classes="analysis-btn"
+                )
+                individual_stream_output = gr.Markdown(
+                    "",
+                    elem_id="individual_stream_output"
+                )
+        
         with gr.Row():
             download_pdf = gr.File(
                 label="Descargar Informe",
@@ -965,6 +1151,12 @@ def create_analysis_tab():
             outputs=[analysis_status, download_pdf]
         )
         
+        # Análisis individual en streaming: el texto aparece a medida que se genera
+        individual_stream_btn.click(
+            fn=run_individual_analysis_stream,
+            outputs=[analysis_status, individual_stream_output, download_pdf]
+        )
+        
         # Al iniciar el análisis, limpiar el log aunque no mostremos el progreso
         def initialize_analysis():
             global terminal_log
@@ -984,13 +1176,22 @@ def create_analysis_tab():
             outputs=[download_challenges_pdf, status_challenges]
         )
 
-def individual_analyze(ideas_list):
-    """Analiza ideas individualmente utilizando analyze_idea_exhaustive"""
+# Intervalo mínimo entre actualizaciones de la UI durante el streaming (segundos)
+STREAM_UI_INTERVAL = 0.2
+
+def individual_analyze_stream(ideas_list):
+    """
+    Analiza ideas individualmente en streaming con analyze_idea_exhaustive_stream.
+    
+    Generador que produce tuplas (estado, analisis_parcial, ruta_pdf) para actualizar
+    los componentes de Gradio a medida que llegan los tokens. La ruta del PDF solo se
+    informa en la última tupla, cuando el informe se ha generado con los textos finales.
+    """
+    from analysis_module2 import generate_improved_pdf
+    import analysis_module2
+    import time
+    validated_ideas = []
     try:
-        from analysis_module2 import analyze_idea_exhaustive, generate_improved_pdf, global_save_analyzed_ideas
-        import analysis_module2
-        validated_ideas = []
-        
         log_message(f"🔄 Iniciando análisis individual de {len(ideas_list)} ideas...")
         
         for i, idea in enumerate(ideas_list, 1):
@@ -1009,13 +1210,29 @@ def individual_analyze(ideas_list):
                     continue
                 preview = idea_text[:50] + "..." if len(idea_text) > 50 else idea_text
                 log_message(f"🔍 Analizando idea {i}/{len(ideas_list)}: {preview}")
-                result = analyze_idea_exhaustive(idea_text)
-                if result and isinstance(result, tuple) and result[0]:
+                status = f"🔍 **Analizando idea {i}/{len(ideas_list)}:** {preview}"
+                yield status, "", None
+                
+                final_analysis = None
+                last_update = 0.0
+                # El PDF conjunto se genera al final: no hace falta el PDF individual de cada idea
+                for partial, _ in analyze_idea_exhaustive_stream(idea_text, build_pdf=False):
+                    if partial is None:
+                        final_analysis = None
+                        break
+                    final_analysis = partial
+                    now = time.monotonic()
+                    if now - last_update >= STREAM_UI_INTERVAL:
+                        last_update = now
+                        yield status, partial, None
+                
+                if final_analysis:
                     log_message(f"✅ Idea {i} analizada correctamente")
                     validated_ideas.append({
                         'idea': idea_text,
-                        'analysis': result[0]
+                        'analysis': final_analysis
                     })
+                    yield f"✅ **Idea {i}/{len(ideas_list)} analizada**", final_analysis, None
                 else:
                     log_message(f"⚠️ No se pudo analizar la idea {i}")
                     # --- MEJORA: incluir bloque en el informe aunque falle ---
@@ -1038,20 +1255,19 @@ def individual_analyze(ideas_list):
         if validated_ideas:
             log_message(f"📊 Se analizaron {len(validated_ideas)} ideas de {len(ideas_list)}")
             log_message("🔄 Generando PDF con los resultados...")
+            yield "🔄 **Generando PDF con los resultados...**", validated_ideas[-1]['analysis'], None
             pdf_path = generate_improved_pdf(validated_ideas)
             if pdf_path:
                 log_message(f"✅ PDF generado exitosamente: {pdf_path}")
                 set_analyzed_ideas_global(validated_ideas)
                 analysis_module2.analyzed_ideas_global = validated_ideas  # <--- SINCRONIZACIÓN CRÍTICA
-                return pdf_path
+                yield f"✅ **Análisis completado.** {len(validated_ideas)} ideas analizadas.", validated_ideas[-1]['analysis'], pdf_path
             else:
                 log_message("❌ Error: No se pudo generar el PDF")
-                # --- MEJORA: mensaje claro en la UI si el PDF no se genera ---
-                return None
+                yield "❌ **Error:** No se pudo generar el PDF", validated_ideas[-1]['analysis'], None
         else:
             log_message("❌ Error: No se pudo analizar ninguna idea")
-            # --- MEJORA: mensaje claro en la UI si no hay ideas válidas ---
-            return None
+            yield "❌ **Error:** No se pudo analizar ninguna idea", "", None
     except Exception as e:
         error_msg = str(e)
         log_message(f"❌ Error general en análisis individual: {error_msg}")
@@ -1059,7 +1275,22 @@ def individual_analyze(ideas_list):
         import traceback
         error_trace = traceback.format_exc()
         log_message(f"Detalles del error: {error_trace}")
-        return None
+        yield f"❌ **Error:** {error_msg}", "", None
+
+def individual_analyze(ideas_list):
+    """Analiza ideas individualmente utilizando analyze_idea_exhaustive_stream"""
+    pdf_path = None
+    for _, _, pdf_path in individual_analyze_stream(ideas_list):
+        pass
+    return pdf_path
+
+def run_individual_analysis_stream():
+    """Ejecuta el análisis individual de las ideas cargadas mostrando el texto a medida que se genera."""
+    global ideas_list
+    if not ideas_list:
+        yield "❌ **Error:** No hay ideas cargadas para analizar.", "", None
+        return
+    yield from individual_analyze_stream(ideas_list)
 
 def download_fonts():
     """
@@ -1143,8 +1374,8 @@ async def enhance_idea_with_ai(idea, context):
         basados en el contexto.
         """
         
-        # Llamar a la API de OpenAI usando el cliente de Azure
-        response = client.chat.completions.create(
+        # Llamar a la API de OpenAI usando el cliente asíncrono de Azure
+        response = await get_async_openai_client().chat.completions.create(
             model=DEPLOYMENT_NAME,
             messages=[
                 {"role": "system", "content": "Eres un experto en innovación y desarrollo de ideas."},
@@ -1,26 +1,65 @@
 def merge_llm_and_data(borrador: dict, datos_scrapeados: list[dict]) -> dict:
     from openai_config import get_openai_client, get_deployment_name
+    from token_budget import plan_call, get_model_limits
+    from prompt_builder import count_tokens, count_message_tokens
     import json
 
-    prompt = (
+    client = get_openai_client()
+    deployment = get_deployment_name()
+
+    instrucciones = (
         "Aquí tienes un informe preliminar (borrador) y una lista de datos extraídos de páginas web. "
         "Revisa el informe, completa los huecos, y añade los datos donde correspondan. "
         "Incluye citas o referencias cuando uses los datos externos. "
         "Devuelve SOLO un objeto JSON con la estructura final del informe, sin texto fuera del JSON.\n\n"
-        "BORRADOR:\n" + json.dumps(borrador, ensure_ascii=False) +
-        "\n\nDATOS SCRAPEADOS:\n" + json.dumps(datos_scrapeados, ensure_ascii=False)
     )
+    system = "Eres un analista que mejora un informe integrando datos externos."
+    borrador_json = json.dumps(borrador, ensure_ascii=False)
+    # Un bloque por documento para que el recorte reparta el presupuesto entre todos
+    datos_json = "\n\n".join(json.dumps(d, ensure_ascii=False) for d in datos_scrapeados)
 
-    client = get_openai_client()
-    deployment = get_deployment_name()
-    resp = client.chat.completions.create(
-        model=deployment,
-        messages=[
-            {"role": "system", "content": "Eres un analista que mejora un informe integrando datos externos."},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.3,
-        max_tokens=16000,
-        response_format={"type": "json_object"}
+    # La salida es el borrador completado: su tamaño más un margen por los datos añadidos,
+    # en lugar de reservar siempre 16000 tokens
+    expected_output = int(count_tokens(borrador_json) * 1.3) + 150 * min(len(datos_scrapeados), 10) + 300
+    plan = plan_call(
+        deployment,
+        [{"role": "system", "content": system},
+         {"role": "user", "content": instrucciones + "BORRADOR:\n" + borrador_json + "\n\nDATOS SCRAPEADOS:\n"}],
+        expected_output_tokens=expected_output,
+        variable_texts={"datos": datos_json},
+        previous_max_tokens=16000,
+    )
+    prompt = (
+        instrucciones +
+        "BORRADOR:\n" + borrador_json +
+        "\n\nDATOS SCRAPEADOS (un objeto JSON por bloque):\n" + plan.fit("datos", datos_json, strategy="documents")
     )
-    return json.loads(resp.choices[0].message.content) 
\ No newline at end of file
+
+    messages = [
+        {"role": "system", "content": system},
+        {"role": "user", "content": prompt}
+    ]
+    # Si la respuesta se corta por max_tokens se repite una vez con más margen
+    # (el presupuesto ajustado es una estimación; antes se reservaban 16000)
+    limits = get_model_limits(deployment)
+    retry_tokens = min(max(plan.max_tokens * 2, 16000), limits["max_output"],
+                       limits["context"] - count_message_tokens(messages) - 64)
+    budgets = [plan.max_tokens] + ([retry_tokens] if retry_tokens > plan.max_tokens else [])
+    for attempt, max_tokens in enumerate(budgets, 1):
+        resp = client.chat.completions.create(
+            model=deployment,
+            messages=messages,
+            temperature=0.3,
+            max_tokens=max_tokens,
+            response_format={"type": "json_object"}
+        )
+        choice = resp.choices[0]
+        if choice.finish_reason == "length":
+            print(f"⚠️ [integrator] Respuesta cortada por max_tokens={max_tokens} (intento {attempt}/{len(budgets)})")
+            continue
+        try:
+            return json.loads(choice.message.content)
+        except (TypeError, ValueError) as e:
+            print(f"⚠️ [integrator] La respuesta no es un JSON válido: {e}")
+            raise ValueError(f"La integración devolvió un JSON no válido: {e}") from e
+    raise ValueError(f"La integración se cortó por max_tokens incluso con {budgets[-1]} tokens")
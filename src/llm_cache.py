@@ -0,0 +1,260 @@
+"""
+Caché persistente (SQLite) de respuestas del LLM, compartida por todos los módulos.
+
+Las respuestas de `client.chat.completions.create` se guardan en disco con una
+clave derivada del contenido de la petición (deployment, mensajes, temperature,
+max_tokens, response_format...). Así, volver a lanzar un lote tras un fallo o un
+refresco de la UI reutiliza las respuestas ya pagadas en lugar de repetir las
+llamadas a Azure.
+
+Variables de entorno:
+    LLM_CACHE_ENABLED     "0" para desactivar la caché (por defecto activada)
+    LLM_CACHE_DIR         Directorio de la base de datos (por defecto ./cache)
+    LLM_CACHE_TTL         TTL por defecto de cada entrada en segundos (7 días)
+    LLM_CACHE_MAX_ENTRIES Número máximo de entradas antes de expulsar (LRU)
+    LLM_CACHE_MAX_MB      Tamaño máximo en MB antes de expulsar (LRU)
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+# Al grabar cassettes (LLM_MODE=record) la caché se desactiva por defecto para que
+# todas las peticiones lleguen a Azure y queden grabadas
+_CACHE_DEFAULT = "0" if os.getenv("LLM_MODE", "").lower() == "record" else "1"
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", _CACHE_DEFAULT).lower() not in ("0", "false", "no")
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", os.path.join(os.getcwd(), "cache"))
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "50000"))
+LLM_CACHE_MAX_MB = int(os.getenv("LLM_CACHE_MAX_MB", "512"))
+
+# Parámetros que no afectan al contenido de la respuesta y no forman parte de la clave
+_NON_KEY_PARAMS = {"timeout", "extra_headers", "extra_query", "stream", "user"}
+
+# Cada cuántas escrituras se comprueban los límites de tamaño
+_EVICTION_CHECK_EVERY = 50
+
+
+def make_request_key(**kwargs):
+    """
+    Calcula la clave de caché de una petición de chat completion.
+
+    Incluye el deployment (model), la lista completa de mensajes, temperature,
+    max_tokens, response_format y el resto de parámetros de muestreo.
+    """
+    payload = {k: v for k, v in kwargs.items() if k not in _NON_KEY_PARAMS and v is not None}
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Almacén clave/valor en SQLite con TTL por entrada, expulsión LRU por número
+    de entradas y tamaño, y contadores de aciertos/fallos.
+    """
+
+    def __init__(self, cache_dir=None, default_ttl=None, max_entries=None, max_mb=None):
+        self.cache_dir = cache_dir or LLM_CACHE_DIR
+        self.default_ttl = LLM_CACHE_TTL if default_ttl is None else default_ttl
+        self.max_entries = max_entries or LLM_CACHE_MAX_ENTRIES
+        self.max_bytes = (max_mb or LLM_CACHE_MAX_MB) * 1024 * 1024
+        self.db_path = os.path.join(self.cache_dir, "llm_cache.sqlite3")
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                expires_at REAL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries(last_access)")
+        self._conn.commit()
+        self._evict()
+
+    def get(self, key, count=True):
+        """Devuelve el valor almacenado (ya deserializado) o None si no existe o ha caducado."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (row[1] is not None and row[1] < now):
+                if row is not None:
+                    self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    self._conn.commit()
+                if count:
+                    self.misses += 1
+                return None
+            self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            if count:
+                self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        """Guarda un valor serializable en JSON. ttl=0 desactiva la caducidad de la entrada."""
+        try:
+            data = json.dumps(value, ensure_ascii=False)
+        except (TypeError, ValueError) as e:
+            print(f"⚠️ Valor no serializable, no se guarda en caché: {str(e)}")
+            return False
+        ttl = self.default_ttl if ttl is None else ttl
+        now = time.time()
+        expires_at = now + ttl if ttl and ttl > 0 else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created_at, last_access, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, data, len(data.encode("utf-8")), now, now, expires_at),
+            )
+            self._conn.commit()
+            self.writes += 1
+            check = self.writes % _EVICTION_CHECK_EVERY == 0
+        if check:
+            self._evict()
+        return True
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+        print("🗑️ Caché LLM vaciada")
+
+    def _evict(self):
+        """Elimina entradas caducadas y, si se superan los límites, las menos usadas (LRU)."""
+        with self._lock:
+            cur = self._conn.execute(
+                "DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at < ?", (time.time(),)
+            )
+            removed = cur.rowcount
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+            if count > self.max_entries or total > self.max_bytes:
+                # Se recorta hasta el 90% de los límites para no expulsar en cada escritura
+                target_count = int(self.max_entries * 0.9)
+                target_bytes = int(self.max_bytes * 0.9)
+                rows = self._conn.execute(
+                    "SELECT key, size FROM entries ORDER BY last_access ASC"
+                ).fetchall()
+                to_delete = []
+                for key, size in rows:
+                    if count <= target_count and total <= target_bytes:
+                        break
+                    to_delete.append((key,))
+                    count -= 1
+                    total -= size
+                self._conn.executemany("DELETE FROM entries WHERE key = ?", to_delete)
+                removed += len(to_delete)
+            self._conn.commit()
+            self.evictions += removed
+
+    def namespace(self, name, ttl=None):
+        """Vista tipo diccionario sobre la caché con un prefijo de clave propio."""
+        return CacheNamespace(self, name, ttl)
+
+    def stats(self):
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "entries": count,
+            "size_mb": round(total / (1024 * 1024), 2),
+            "path": self.db_path,
+        }
+
+
+class CacheNamespace:
+    """
+    Interfaz compatible con un dict (`in`, `[]`, `get`) para resultados derivados
+    que no son respuestas del LLM (por ejemplo los valores de la payoff matrix).
+    """
+
+    def __init__(self, cache, name, ttl=None):
+        self._cache = cache
+        self._prefix = f"{name}:"
+        self._ttl = ttl
+
+    def __contains__(self, key):
+        # Solo cuenta el fallo; el acierto se cuenta en __getitem__
+        found = self._cache.get(self._prefix + key, count=False) is not None
+        if not found:
+            self._cache.misses += 1
+        return found
+
+    def __getitem__(self, key):
+        value = self._cache.get(self._prefix + key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self._cache.set(self._prefix + key, value, ttl=self._ttl)
+
+    def get(self, key, default=None):
+        value = self._cache.get(self._prefix + key)
+        return default if value is None else value
+
+
+_cache_instance = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """Devuelve la instancia compartida de la caché (None si está desactivada o falla)."""
+    global _cache_instance
+    if not LLM_CACHE_ENABLED:
+        return None
+    if _cache_instance is None:
+        with _cache_lock:
+            if _cache_instance is None:
+                try:
+                    _cache_instance = LLMCache()
+                    print(f"💾 Caché LLM en disco: {_cache_instance.db_path}")
+                except Exception as e:
+                    print(f"⚠️ No se pudo inicializar la caché LLM en disco: {str(e)}")
+                    return None
+    return _cache_instance
+
+
+def print_cache_stats():
+    cache = get_llm_cache()
+    if cache is None:
+        print("💾 Caché LLM desactivada")
+        return
+    s = cache.stats()
+    print(
+        f"💾 Caché LLM: {s['hits']} aciertos / {s['misses']} fallos "
+        f"({s['hit_rate']*100:.1f}%), {s['entries']} entradas, {s['size_mb']} MB, "
+        f"{s['evictions']} expulsadas"
+    )
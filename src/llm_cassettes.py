@@ -0,0 +1,122 @@
+"""
+Grabación y reproducción de llamadas al LLM en ficheros "cassette".
+
+- LLM_MODE=record: las llamadas van a Azure como siempre y cada par
+  petición/respuesta se guarda en LLM_CASSETTE_DIR (un JSON por petición).
+- LLM_MODE=replay: no se usa la red; las respuestas se leen de los cassettes.
+  Una petición sin cassette lanza CassetteMissError.
+
+La clave de cada cassette es la misma que usa la caché en disco
+(`llm_cache.make_request_key`): la petición exacta, sin normalizar. Un prompt que
+cambie entre ejecuciones (fechas, IDs) no se puede reproducir.
+"""
+
+import os
+import json
+import time
+import threading
+
+from llm_cache import make_request_key
+from llm_client import ChatClientWrapper, _response_to_dict, _response_from_dict, _chunk_from_cached, _record_stream
+
+LLM_CASSETTE_DIR = os.getenv("LLM_CASSETTE_DIR", os.path.join(os.getcwd(), "cassettes"))
+
+
+class CassetteMissError(RuntimeError):
+    """No hay ninguna respuesta grabada para la petición (modo replay)."""
+
+
+class CassetteStore:
+    def __init__(self, cassette_dir=None):
+        self.cassette_dir = cassette_dir or LLM_CASSETTE_DIR
+        os.makedirs(self.cassette_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self.stats = {"recorded": 0, "replayed": 0, "missed": 0}
+
+    def _path(self, key):
+        return os.path.join(self.cassette_dir, f"{key}.json")
+
+    def save(self, kwargs, response_dict):
+        key = make_request_key(**kwargs)
+        request = {k: v for k, v in kwargs.items() if k not in ("timeout", "extra_headers")}
+        data = {"key": key, "recorded_at": time.time(), "request": request, "response": response_dict}
+        tmp_path = self._path(key) + ".tmp"
+        with self._lock:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=1, default=str)
+            os.replace(tmp_path, self._path(key))
+            self.stats["recorded"] += 1
+
+    def load(self, kwargs):
+        key = make_request_key(**kwargs)
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            with self._lock:
+                self.stats["missed"] += 1
+            return None
+        with self._lock:
+            self.stats["replayed"] += 1
+        return data["response"]
+
+
+class RecordingClient(ChatClientWrapper):
+    """Capa (sobre el cliente real) que guarda cada respuesta en un cassette."""
+
+    def __init__(self, inner, store):
+        super().__init__(inner)
+        self._store = store
+
+    def with_options(self, **options):
+        # Mantener la grabación cuando el gateway pide una copia del cliente sin reintentos
+        return type(self)(self._inner.with_options(**options), self._store)
+
+    def create(self, **kwargs):
+        response = self._inner.chat.completions.create(**kwargs)
+        if kwargs.get("stream"):
+            return _record_stream(response, lambda data: self._store.save(kwargs, data))
+        self._store.save(kwargs, _response_to_dict(response))
+        return response
+
+
+class ReplayClient(ChatClientWrapper):
+    """Sustituto del cliente de Azure que responde desde los cassettes, sin red."""
+
+    def __init__(self, store):
+        super().__init__(None)
+        self._store = store
+
+    def create(self, **kwargs):
+        data = self._store.load(kwargs)
+        if data is None:
+            raise CassetteMissError(
+                f"No hay cassette para la petición (deployment={kwargs.get('model')}) en {self._store.cassette_dir}"
+            )
+        if kwargs.get("stream"):
+            return iter([_chunk_from_cached(data)])
+        return _response_from_dict(data)
+
+
+class AsyncRecordingClient(RecordingClient):
+    async def create(self, **kwargs):
+        # El streaming asíncrono no se graba: se reenvía tal cual
+        response = await self._inner.chat.completions.create(**kwargs)
+        if not kwargs.get("stream"):
+            self._store.save(kwargs, _response_to_dict(response))
+        return response
+
+
+class AsyncReplayClient(ReplayClient):
+    async def create(self, **kwargs):
+        return ReplayClient.create(self, **kwargs)
+
+
+_store = None
+
+
+def get_cassette_store():
+    global _store
+    if _store is None:
+        _store = CassetteStore()
+    return _store
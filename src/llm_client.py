@@ -0,0 +1,358 @@
+"""
+Envoltorios sobre el cliente de Azure OpenAI.
+
+`openai_config.get_openai_client()` devuelve el cliente real envuelto en estas
+capas, de modo que todas las llamadas `client.chat.completions.create(...)` de
+la aplicación pasan por ellas sin tener que modificar cada módulo.
+"""
+
+from llm_cache import get_llm_cache, make_request_key
+from llm_gateway import (
+    LLM_GATEWAY_ENABLED, call_through_gateway, acall_through_gateway, current_job, current_route, llm_route,
+)
+from llm_resilience import get_resilience
+from llm_singleflight import get_single_flight
+from llm_telemetry import (
+    start_llm_call, note_llm_call, finish_llm_call, stream_with_telemetry, astream_with_telemetry,
+)
+
+try:
+    from openai.types.chat import ChatCompletion, ChatCompletionChunk
+except ImportError:
+    ChatCompletion = None
+    ChatCompletionChunk = None
+
+
+class _Completions:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def create(self, **kwargs):
+        # En las capas asíncronas devuelve la corrutina de owner.create
+        return self._owner.create(**kwargs)
+
+
+class _Chat:
+    def __init__(self, owner):
+        self.completions = _Completions(owner)
+
+
+class ChatClientWrapper:
+    """
+    Base de las capas: expone `.chat.completions.create` y delega cualquier
+    otro atributo en el cliente envuelto.
+    """
+
+    def __init__(self, inner):
+        self._inner = inner
+        self.chat = _Chat(self)
+
+    def create(self, **kwargs):
+        return self._inner.chat.completions.create(**kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
+
+
+def _response_to_dict(response):
+    if hasattr(response, "model_dump"):
+        return response.model_dump(mode="json")
+    return response
+
+
+def _response_from_dict(data):
+    if ChatCompletion is not None:
+        try:
+            return ChatCompletion.model_validate(data)
+        except Exception:
+            return ChatCompletion.model_construct(**data)
+    return data
+
+
+def _chunk_from_cached(data):
+    """Convierte una respuesta completa cacheada en un único chunk de streaming."""
+    choice = (data.get("choices") or [{}])[0]
+    chunk = {
+        "id": data.get("id", "cached"),
+        "object": "chat.completion.chunk",
+        "created": data.get("created", 0),
+        "model": data.get("model", ""),
+        "choices": [{
+            "index": 0,
+            "delta": {"role": "assistant", "content": (choice.get("message") or {}).get("content", "")},
+            "finish_reason": choice.get("finish_reason") or "stop",
+        }],
+    }
+    if ChatCompletionChunk is not None:
+        return ChatCompletionChunk.model_validate(chunk)
+    return chunk
+
+
+def _record_stream(stream, on_complete):
+    """
+    Reenvía los chunks de una respuesta en streaming y, si termina correctamente,
+    llama a on_complete con el texto completo en formato de respuesta normal.
+    """
+    parts = []
+    meta = {}
+    finish_reason = None
+    for chunk in stream:
+        if not meta:
+            meta = {"id": getattr(chunk, "id", ""), "created": getattr(chunk, "created", 0),
+                    "model": getattr(chunk, "model", "")}
+        choices = getattr(chunk, "choices", None)
+        if choices:
+            delta = getattr(choices[0].delta, "content", None)
+            if delta:
+                parts.append(delta)
+            finish_reason = choices[0].finish_reason or finish_reason
+        yield chunk
+
+    if parts:
+        on_complete({
+            **meta,
+            "object": "chat.completion",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "".join(parts)},
+                "finish_reason": finish_reason or "stop",
+            }],
+        })
+
+
+class CachedClient(ChatClientWrapper):
+    """
+    Capa de caché persistente. Admite dos parámetros propios que no se envían a Azure:
+    - use_cache: False para forzar la llamada
+    - cache_ttl: TTL en segundos de la entrada que se guarde
+    
+    Las peticiones con stream=True comparten entrada con las normales: un acierto se
+    devuelve como un único chunk y un fallo se guarda al terminar el streaming.
+    """
+
+    def create(self, use_cache=True, cache_ttl=None, **kwargs):
+        cache = get_llm_cache()
+        if cache is None or not use_cache:
+            note_llm_call(cache="disabled" if cache is None else "bypass")
+            return self._inner.chat.completions.create(**kwargs)
+
+        key = make_request_key(**kwargs)
+        if kwargs.get("stream"):
+            cached = cache.get(key)
+            if cached is not None:
+                note_llm_call(cache="hit")
+                return iter([_chunk_from_cached(cached)])
+            note_llm_call(cache="miss")
+            return _record_stream(self._inner.chat.completions.create(**kwargs),
+                                  lambda data: cache.set(key, data, ttl=cache_ttl))
+
+        cached = cache.get(key)
+        if cached is not None:
+            note_llm_call(cache="hit")
+            return _response_from_dict(cached)
+
+        note_llm_call(cache="miss")
+        response = self._inner.chat.completions.create(**kwargs)
+        try:
+            content = response.choices[0].message.content
+        except Exception:
+            content = None
+        # Las respuestas vacías no se guardan para que un fallo puntual no se perpetúe
+        if content:
+            cache.set(key, _response_to_dict(response), ttl=cache_ttl)
+        return response
+
+
+class GatewayClient(ChatClientWrapper):
+    """
+    Capa de gateway: concurrencia global, cuotas RPM/TPM y reintentos ante 429.
+    Los reintentos del SDK se desactivan porque dormirían fuera del control del gateway.
+    """
+
+    def __init__(self, inner):
+        if hasattr(inner, "with_options"):
+            inner = inner.with_options(max_retries=0)
+        super().__init__(inner)
+
+    def create(self, **kwargs):
+        return call_through_gateway(self._inner.chat.completions.create, kwargs)
+
+
+class ResilientClient(ChatClientWrapper):
+    """
+    Capa de resiliencia (llm_resilience): circuit breaker por deployment y petición
+    duplicada cuando una llamada supera el p95 de latencia. Va por debajo de la caché
+    para que solo actúe en los fallos y por encima del gateway para que los duplicados
+    respeten cuota y concurrencia.
+    """
+
+    def create(self, **kwargs):
+        return get_resilience().call(self._inner.chat.completions.create, kwargs,
+                                     gated=isinstance(self._inner, GatewayClient))
+
+
+class SingleFlightClient(ChatClientWrapper):
+    """Capa que agrupa las peticiones idénticas concurrentes en una sola llamada."""
+
+    def create(self, **kwargs):
+        if kwargs.get("stream"):
+            return self._inner.chat.completions.create(**kwargs)
+        key = make_request_key(**kwargs)
+        return get_single_flight().do(key, self._inner.chat.completions.create, **kwargs)
+
+
+class TelemetryClient(ChatClientWrapper):
+    """
+    Capa exterior que abre y cierra el registro de telemetría de cada llamada (llm_telemetry).
+    Cualquier salida, también una interrupción, cierra el registro; los streams se cierran al agotarse.
+    """
+
+    def create(self, **kwargs):
+        record, token = start_llm_call(kwargs, job=current_job(), route=current_route())
+        try:
+            response = self._inner.chat.completions.create(**kwargs)
+        except BaseException as e:
+            finish_llm_call(record, token, error=e)
+            raise
+        if kwargs.get("stream"):
+            return stream_with_telemetry(response, record, token)
+        finish_llm_call(record, token, response=response)
+        return response
+
+
+class RoutingClient(ChatClientWrapper):
+    """
+    Capa exterior de enrutado por clase de tarea. Admite el parámetro propio `task`
+    (p. ej. task="keywords"): la tarea se traduce a una ruta con task_routes y, si la
+    ruta tiene deployment, se usa en lugar de `model`. Las llamadas sin `task` van a
+    la ruta por defecto con su `model` original. La ruta queda en el contexto para
+    el límite de concurrencia del gateway y la telemetría.
+    """
+
+    def __init__(self, inner, routes=None, task_routes=None, default_route="heavy"):
+        super().__init__(inner)
+        self._routes = routes or {}
+        self._task_routes = task_routes or {}
+        self._default_route = default_route
+
+    def _resolve(self, task, kwargs):
+        route = self._task_routes.get(task, task) if task else self._default_route
+        deployment = (self._routes.get(route) or {}).get("deployment")
+        if task and deployment:
+            kwargs["model"] = deployment
+        return route
+
+    def create(self, task=None, **kwargs):
+        with llm_route(self._resolve(task, kwargs)):
+            return self._inner.chat.completions.create(**kwargs)
+
+
+def build_llm_client(raw_client, routes=None, task_routes=None):
+    """
+    Monta las capas sobre el cliente real de Azure OpenAI. Orden (de fuera a dentro):
+    enrutado -> telemetría -> single-flight -> caché -> resiliencia -> gateway -> Azure.
+    El single-flight va por fuera de la caché para que la respuesta ya esté guardada
+    cuando se liberan los hilos en espera, y los aciertos de caché y las peticiones
+    agrupadas no consumen cuota.
+    """
+    client = raw_client
+    if LLM_GATEWAY_ENABLED:
+        client = GatewayClient(client)
+    client = ResilientClient(client)
+    client = CachedClient(client)
+    client = SingleFlightClient(client)
+    client = TelemetryClient(client)
+    return RoutingClient(client, routes, task_routes)
+
+
+# ---------------------------------------------------------------------------
+# Capas asíncronas (AsyncAzureOpenAI)
+# ---------------------------------------------------------------------------
+
+class AsyncChatClientWrapper(ChatClientWrapper):
+    async def create(self, **kwargs):
+        return await self._inner.chat.completions.create(**kwargs)
+
+
+class AsyncCachedClient(AsyncChatClientWrapper):
+    """Versión asíncrona de CachedClient; comparte la misma caché en disco."""
+
+    async def create(self, use_cache=True, cache_ttl=None, **kwargs):
+        cache = get_llm_cache()
+        if cache is None or not use_cache or kwargs.get("stream"):
+            note_llm_call(cache="disabled" if cache is None else "bypass")
+            return await self._inner.chat.completions.create(**kwargs)
+
+        key = make_request_key(**kwargs)
+        cached = cache.get(key)
+        if cached is not None:
+            note_llm_call(cache="hit")
+            return _response_from_dict(cached)
+
+        note_llm_call(cache="miss")
+        response = await self._inner.chat.completions.create(**kwargs)
+        try:
+            content = response.choices[0].message.content
+        except Exception:
+            content = None
+        if content:
+            cache.set(key, _response_to_dict(response), ttl=cache_ttl)
+        return response
+
+
+class AsyncGatewayClient(AsyncChatClientWrapper):
+    """Versión asíncrona de GatewayClient; comparte cola, cuotas y concurrencia con los hilos."""
+
+    def __init__(self, inner):
+        if hasattr(inner, "with_options"):
+            inner = inner.with_options(max_retries=0)
+        super().__init__(inner)
+
+    async def create(self, **kwargs):
+        return await acall_through_gateway(self._inner.chat.completions.create, kwargs)
+
+
+class AsyncResilientClient(AsyncChatClientWrapper):
+    async def create(self, **kwargs):
+        return await get_resilience().acall(self._inner.chat.completions.create, kwargs,
+                                            gated=isinstance(self._inner, AsyncGatewayClient))
+
+
+class AsyncSingleFlightClient(AsyncChatClientWrapper):
+    async def create(self, **kwargs):
+        if kwargs.get("stream"):
+            return await self._inner.chat.completions.create(**kwargs)
+        key = make_request_key(**kwargs)
+        return await get_single_flight().do_async(key, self._inner.chat.completions.create, **kwargs)
+
+
+class AsyncTelemetryClient(AsyncChatClientWrapper):
+    async def create(self, **kwargs):
+        record, token = start_llm_call(kwargs, job=current_job(), route=current_route())
+        try:
+            response = await self._inner.chat.completions.create(**kwargs)
+        except BaseException as e:
+            finish_llm_call(record, token, error=e)
+            raise
+        if kwargs.get("stream"):
+            return astream_with_telemetry(response, record, token)
+        finish_llm_call(record, token, response=response)
+        return response
+
+
+class AsyncRoutingClient(RoutingClient):
+    async def create(self, task=None, **kwargs):
+        with llm_route(self._resolve(task, kwargs)):
+            return await self._inner.chat.completions.create(**kwargs)
+
+
+def build_async_llm_client(raw_async_client, routes=None, task_routes=None):
+    """Monta sobre AsyncAzureOpenAI las mismas capas que build_llm_client."""
+    client = raw_async_client
+    if LLM_GATEWAY_ENABLED:
+        client = AsyncGatewayClient(client)
+    client = AsyncResilientClient(client)
+    client = AsyncCachedClient(client)
+    client = AsyncSingleFlightClient(client)
+    client = AsyncTelemetryClient(client)
+    return AsyncRoutingClient(client, routes, task_routes)
@@ -0,0 +1,384 @@
+"""
+Servidor HTTP local que emula el endpoint chat-completions de Azure OpenAI.
+
+Permite ejecutar y medir los pipelines (ranking, análisis, competencia, PDF) sin
+red ni credenciales: el cliente AzureOpenAI real habla con este servidor cuando
+se arranca la aplicación con LLM_MODE=fake.
+
+Características:
+- Respuestas deterministas (mismo prompt -> misma respuesta) para medir de forma repetible.
+- Modo JSON (response_format json_object): si el prompt incluye un ejemplo JSON se
+  devuelve un objeto con esa misma estructura; si no, uno con las claves citadas.
+- Salida estructurada (response_format json_schema): objeto que cumple el esquema, con
+  números en el rango "A-B" citado en la descripción de cada campo.
+- Streaming SSE (stream=true).
+- Latencia configurable: fixed:S, uniform:A,B, normal:MEDIA,DESV, lognormal:MEDIANA,SIGMA o
+  tail:MEDIANA,SIGMA,PROB,LENTA (lognormal y, con probabilidad PROB, una respuesta de LENTA
+  segundos), más un coste opcional por token generado y por token de entrada (prefill).
+- Inyección de 429: con una probabilidad dada y/o al superar un límite RPM, con Retry-After.
+- Inyección de errores 500 con una probabilidad dada.
+- Prompts empaquetados ("IDEA #1", "IDEA #2"... con un ejemplo {"ideas": [...]}): una entrada
+  por idea, omitiendo cada una con probabilidad --packed-drop.
+- Texto libre: si el prompt pide secciones conocidas en una lista numerada ("1. Análisis Técnico: ..."),
+  solo esas secciones; si no, todas.
+
+Uso:
+    python llm_fake_server.py --port 8765 --latency lognormal:1.5,0.6 --rate-429 0.05
+    LLM_MODE=fake LLM_FAKE_SERVER_URL=http://127.0.0.1:8765 python gr1.py
+"""
+
+import re
+import sys
+import json
+import math
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_WORDS = (
+    "la propuesta integra sensores avanzados gemelo digital mantenimiento predictivo "
+    "eficiencia energética infraestructura ingeniería sistemas mercado riesgo tecnología "
+    "despliegue escalabilidad normativa inversión retorno clientes operación análisis "
+    "innovación plataforma datos modelo validación piloto sostenibilidad"
+).split()
+
+_SECTIONS = [
+    "RESUMEN EJECUTIVO", "ANÁLISIS TÉCNICO", "POTENCIAL DE INNOVACIÓN",
+    "ALINEACIÓN ESTRATÉGICA", "VIABILIDAD COMERCIAL", "VALORACIÓN GLOBAL",
+]
+
+
+def parse_latency(spec):
+    """Convierte 'tipo:param1,param2' en una función sin argumentos que devuelve segundos."""
+    if not spec:
+        return lambda: 0.0
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",") if v.strip()] if params else []
+    kind = kind.strip().lower()
+    if kind == "fixed":
+        return lambda: values[0]
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1])
+    if kind == "normal":
+        return lambda: max(0.0, random.gauss(values[0], values[1]))
+    if kind == "lognormal":
+        # values[0] es la mediana en segundos
+        return lambda: random.lognormvariate(math.log(values[0]), values[1])
+    if kind == "tail":
+        # Cola pesada: casi todas las respuestas lognormales y unas pocas muy lentas
+        return lambda: values[3] if random.random() < values[2] else \
+            random.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError(f"Distribución de latencia no soportada: {spec}")
+
+
+def _seeded_rng(payload):
+    digest = hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+    return random.Random(int(digest[:16], 16))
+
+
+def _prompt_text(messages):
+    return "\n".join(str(m.get("content", "")) for m in messages or [] if isinstance(m, dict))
+
+
+def _find_json_examples(text):
+    """Devuelve los objetos JSON que se pueden parsear dentro del prompt."""
+    examples = []
+    text = text.replace("{{", "{").replace("}}", "}")
+    for start in [m.start() for m in re.finditer(r"\{", text)]:
+        depth = 0
+        for end in range(start, min(len(text), start + 20000)):
+            if text[end] == "{":
+                depth += 1
+            elif text[end] == "}":
+                depth -= 1
+                if depth == 0:
+                    try:
+                        obj = json.loads(text[start:end + 1])
+                        if isinstance(obj, dict) and obj:
+                            examples.append(obj)
+                    except ValueError:
+                        pass
+                    break
+    return examples
+
+
+def _jitter(value, rng):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return round(max(1.0, value + rng.uniform(-0.5, 0.5)), 2)
+    if isinstance(value, dict):
+        return {k: _jitter(v, rng) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_jitter(v, rng) for v in value]
+    return value
+
+
+def build_json_content(text, rng, packed_drop=0.0):
+    examples = _find_json_examples(text)
+    if examples:
+        # El ejemplo más completo suele ser el formato de respuesta esperado
+        content = _jitter(max(examples, key=lambda e: len(json.dumps(e))), rng)
+        items = content.get("ideas")
+        idea_ids = list(dict.fromkeys(int(n) for n in re.findall(r"IDEA #(\d+)", text)))
+        if idea_ids and isinstance(items, list) and items and isinstance(items[0], dict):
+            # Prompt empaquetado: una entrada por cada "IDEA #n"; con packed_drop se omiten
+            # algunas para simular respuestas incompletas
+            content["ideas"] = [dict(_jitter(items[0], rng), id=idea_id) for idea_id in idea_ids
+                                if not (packed_drop and rng.random() < packed_drop)]
+        return content
+    keys = list(dict.fromkeys(re.findall(r'"([A-Za-z_][A-Za-z0-9_]{2,40})"\s*:', text)))
+    if keys:
+        return {k: round(rng.uniform(1, 5), 2) for k in keys[:30]}
+    return {"resultado": " ".join(rng.choice(_WORDS) for _ in range(20))}
+
+
+def build_schema_content(schema, rng):
+    """Valor aleatorio (determinista) que cumple un esquema JSON sencillo."""
+    kind = schema.get("type")
+    if isinstance(kind, list):
+        kind = next((k for k in kind if k != "null"), "string")
+    if "enum" in schema:
+        return rng.choice(schema["enum"])
+    if kind == "object":
+        return {k: build_schema_content(v, rng) for k, v in (schema.get("properties") or {}).items()}
+    if kind == "array":
+        return [build_schema_content(schema.get("items") or {}, rng) for _ in range(rng.randint(1, 3))]
+    if kind in ("number", "integer"):
+        match = re.search(r"(\d+)\s*-\s*(\d+)", schema.get("description", ""))
+        low, high = (float(match.group(1)), float(match.group(2))) if match else (1.0, 5.0)
+        return rng.randint(int(low), int(high)) if kind == "integer" else round(rng.uniform(low, high), 2)
+    if kind == "boolean":
+        return rng.random() < 0.5
+    return " ".join(rng.choice(_WORDS) for _ in range(rng.randint(15, 60))).capitalize() + "."
+
+
+_NUMBERED_LINE = re.compile(r"^\s*\d+\.\s*([^:\n]+)", re.MULTILINE)
+
+
+def requested_sections(text):
+    """Secciones de _SECTIONS pedidas como lista numerada en el prompt, en su orden."""
+    titles = [title.strip().upper() for title in _NUMBERED_LINE.findall(text or "")]
+    return [section for section in _SECTIONS if any(title.startswith(section) for title in titles)]
+
+
+def build_text_content(max_tokens, rng, sections=None):
+    """Texto con secciones, de longitud aproximada a max_tokens (~0.75 palabras/token)."""
+    words_left = max(20, int((max_tokens or 500) * 0.75))
+    parts = []
+    for section in sections or _SECTIONS:
+        if words_left <= 0:
+            break
+        n = min(words_left, rng.randint(40, 120))
+        words_left -= n
+        parts.append(f"{section}\n" + " ".join(rng.choice(_WORDS) for _ in range(n)).capitalize() + ".")
+    return "\n\n".join(parts)
+
+
+class FakeChatServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency="fixed:0.2", per_token_ms=0.0, rate_429=0.0,
+                 rpm_limit=0, retry_after=1.0, rate_500=0.0, packed_drop=0.0, per_prompt_token_ms=0.0):
+        super().__init__(address, FakeChatHandler)
+        self.latency = parse_latency(latency)
+        self.per_token_ms = per_token_ms
+        self.per_prompt_token_ms = per_prompt_token_ms
+        self.rate_429 = rate_429
+        self.rpm_limit = rpm_limit
+        self.retry_after = retry_after
+        self.rate_500 = rate_500
+        self.packed_drop = packed_drop
+        self._lock = threading.Lock()
+        self._window = []
+        self.stats = {"requests": 0, "responses": 0, "injected_429": 0, "injected_500": 0}
+
+    def should_throttle(self):
+        with self._lock:
+            self.stats["requests"] += 1
+            now = time.monotonic()
+            if self.rpm_limit:
+                self._window = [t for t in self._window if now - t < 60.0]
+                if len(self._window) >= self.rpm_limit:
+                    self.stats["injected_429"] += 1
+                    return True
+                self._window.append(now)
+            if self.rate_429 and random.random() < self.rate_429:
+                self.stats["injected_429"] += 1
+                return True
+            return False
+
+
+class FakeChatHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        path = self.path.split("?", 1)[0]
+        if not path.endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Ruta no soportada: {path}"}})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": {"message": "JSON inválido"}})
+            return
+
+        server = self.server
+        if server.should_throttle():
+            self._send_json(
+                429,
+                {"error": {"code": "429", "message": "Rate limit is exceeded (fake server)."}},
+                {"Retry-After": str(server.retry_after), "retry-after-ms": str(int(server.retry_after * 1000))},
+            )
+            return
+        if server.rate_500 and random.random() < server.rate_500:
+            with server._lock:
+                server.stats["injected_500"] += 1
+            self._send_json(500, {"error": {"code": "500", "message": "Internal server error (fake server)."}})
+            return
+
+        # Deployment: Azure lo pone en la ruta /openai/deployments/<nombre>/chat/completions
+        match = re.search(r"/deployments/([^/]+)/", path)
+        model = request.get("model") or (match.group(1) if match else "fake-deployment")
+        messages = request.get("messages", [])
+        max_tokens = request.get("max_tokens") or request.get("max_completion_tokens") or 500
+        rng = _seeded_rng({"model": model, "messages": messages, "max_tokens": max_tokens,
+                           "response_format": request.get("response_format")})
+
+        fmt = (request.get("response_format") or {}).get("type")
+        if fmt == "json_schema":
+            schema = (request.get("response_format").get("json_schema") or {}).get("schema") or {}
+            content = json.dumps(build_schema_content(schema, rng), ensure_ascii=False)
+        elif fmt == "json_object":
+            content = json.dumps(build_json_content(_prompt_text(messages), rng, server.packed_drop), ensure_ascii=False)
+        else:
+            user_text = str((messages[-1] or {}).get("content", "")) if messages else ""
+            content = build_text_content(max_tokens, rng, requested_sections(user_text))
+
+        prompt_tokens = len(_prompt_text(messages)) // 4 + 1
+        completion_tokens = len(content) // 4 + 1
+        delay = (server.latency() + completion_tokens * server.per_token_ms / 1000.0
+                 + prompt_tokens * server.per_prompt_token_ms / 1000.0)
+        completion_id = f"chatcmpl-fake-{rng.getrandbits(48):x}"
+        created = int(time.time())
+
+        if request.get("stream"):
+            self._stream(content, model, completion_id, created, delay)
+        else:
+            time.sleep(delay)
+            self._send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            })
+        with server._lock:
+            server.stats["responses"] += 1
+
+    def _stream(self, content, model, completion_id, created, delay):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        pieces = re.findall(r"\S+\s*", content) or [content]
+        # La primera parte de la latencia es el tiempo hasta el primer token
+        time.sleep(delay * 0.2)
+        step = delay * 0.8 / max(1, len(pieces))
+        for i, piece in enumerate(pieces):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "delta": {"role": "assistant", "content": piece} if i == 0 else {"content": piece},
+                    "finish_reason": "stop" if i == len(pieces) - 1 else None,
+                }],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            if step:
+                time.sleep(step)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+def start_fake_server_in_thread(host="127.0.0.1", port=0, **options):
+    """
+    Arranca el servidor en un hilo daemon (útil en benchmarks).
+    Devuelve (servidor, url_base); port=0 elige un puerto libre.
+    """
+    server = FakeChatServer((host, port), **options)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor local que emula Azure OpenAI chat-completions")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default="fixed:0.2",
+                        help="fixed:S | uniform:A,B | normal:MEDIA,DESV | lognormal:MEDIANA,SIGMA | "
+                             "tail:MEDIANA,SIGMA,PROB,LENTA (segundos)")
+    parser.add_argument("--per-token-ms", type=float, default=0.0, help="Latencia adicional por token generado")
+    parser.add_argument("--per-prompt-token-ms", type=float, default=0.0,
+                        help="Latencia adicional por token de entrada (prefill)")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Probabilidad de responder 429")
+    parser.add_argument("--rpm-limit", type=int, default=0, help="Responder 429 al superar N peticiones/minuto")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Valor de Retry-After en los 429 (segundos)")
+    parser.add_argument("--rate-500", type=float, default=0.0, help="Probabilidad de responder 500")
+    parser.add_argument("--packed-drop", type=float, default=0.0,
+                        help="Probabilidad de omitir cada idea en las respuestas a prompts empaquetados")
+    args = parser.parse_args(argv)
+
+    server = FakeChatServer(
+        (args.host, args.port), latency=args.latency, per_token_ms=args.per_token_ms,
+        rate_429=args.rate_429, rpm_limit=args.rpm_limit, retry_after=args.retry_after,
+        rate_500=args.rate_500, packed_drop=args.packed_drop, per_prompt_token_ms=args.per_prompt_token_ms,
+    )
+    print(f"🧪 Servidor LLM simulado escuchando en http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"📊 Estadísticas: {server.stats}")
+        server.server_close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
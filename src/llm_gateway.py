@@ -0,0 +1,703 @@
+"""
+Gateway central de llamadas al LLM.
+
+Todas las llamadas `client.chat.completions.create` pasan por aquí (ver
+`llm_client.build_llm_client`). El gateway:
+- limita el número global de peticiones simultáneas, por mucho que se aniden
+  los ThreadPoolExecutor de los módulos;
+- aplica presupuestos RPM/TPM por deployment con token buckets, usando una
+  estimación de los tokens del prompt + max_tokens (como cuenta Azure);
+- reparte los huecos en round-robin entre los trabajos concurrentes (ranking,
+  análisis, competencia...) para que un lote grande no acapare la cuota;
+- limita la concurrencia de cada ruta (clase de tarea, ver openai_config.LLM_ROUTES)
+  para que las llamadas pesadas no dejen sin huecos a las rápidas;
+- ante un 429 respeta Retry-After, pausa el deployment y reduce el ritmo de
+  forma adaptativa, recuperándolo poco a poco con las respuestas correctas.
+
+Variables de entorno:
+    LLM_GATEWAY_ENABLED   "0" para desactivar el gateway
+    LLM_MAX_CONCURRENCY   Peticiones simultáneas máximas (por defecto 16)
+    LLM_RPM / LLM_TPM     Presupuesto por minuto por deployment (0 = sin límite)
+    LLM_RATE_LIMITS       JSON con límites por deployment, p.ej.
+                          {"gpt-4o": {"rpm": 300, "tpm": 50000}}
+    LLM_MAX_RETRIES       Reintentos ante 429 / errores transitorios (por defecto 6)
+"""
+
+import os
+import json
+import time
+import random
+import asyncio
+import threading
+import inspect
+import functools
+import itertools
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import openai
+except ImportError:
+    openai = None
+
+from llm_telemetry import LLM_TELEMETRY_SUMMARY, note_llm_call, print_telemetry_summary, record_job
+
+LLM_GATEWAY_ENABLED = os.getenv("LLM_GATEWAY_ENABLED", "1").lower() not in ("0", "false", "no")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_RPM = int(os.getenv("LLM_RPM", "0"))
+LLM_TPM = int(os.getenv("LLM_TPM", "0"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "6"))
+
+try:
+    LLM_RATE_LIMITS = json.loads(os.getenv("LLM_RATE_LIMITS", "{}"))
+except ValueError:
+    print("⚠️ LLM_RATE_LIMITS no es un JSON válido, se ignora")
+    LLM_RATE_LIMITS = {}
+
+# Tokens reservados cuando la llamada no indica max_tokens
+_DEFAULT_COMPLETION_TOKENS = 1000
+
+# Límites del ajuste adaptativo del ritmo tras un 429
+_MIN_RATE_FACTOR = 0.25
+_RATE_DECREASE = 0.7
+_RATE_INCREASE = 0.02
+
+
+# ---------------------------------------------------------------------------
+# Identificación de trabajos (para el reparto equitativo)
+# ---------------------------------------------------------------------------
+
+_current_job = contextvars.ContextVar("llm_job", default="default")
+_job_counter = itertools.count(1)
+
+
+def current_job():
+    return _current_job.get()
+
+
+# Ruta (clase de tarea) de la llamada en curso; la fija RoutingClient (llm_client)
+_current_route = contextvars.ContextVar("llm_route", default=None)
+
+
+def current_route():
+    return _current_route.get()
+
+
+@contextmanager
+def llm_route(name):
+    token = _current_route.set(name)
+    try:
+        yield
+    finally:
+        _current_route.reset(token)
+
+
+class UpstreamAttempt:
+    """
+    Intento de la capa de resiliencia visto desde el gateway: on_start() se llama al
+    obtener el hueco (fin de la espera en cola) y upstream_seconds guarda lo que tardó
+    Azure en la petición que terminó bien.
+    """
+
+    def __init__(self, on_start=None):
+        self.on_start = on_start
+        self.upstream_seconds = None
+
+    def started(self):
+        if self.on_start is not None:
+            self.on_start()
+
+
+_current_attempt = contextvars.ContextVar("llm_upstream_attempt", default=None)
+
+
+@contextmanager
+def track_upstream(attempt):
+    token = _current_attempt.set(attempt)
+    try:
+        yield attempt
+    finally:
+        _current_attempt.reset(token)
+
+
+def llm_job(name):
+    """
+    Decorador que asigna las llamadas al LLM hechas dentro de la función a un
+    trabajo propio en la cola del gateway. Si ya hay un trabajo activo (llamada
+    anidada) se respeta el exterior. Al terminar se registra su duración y se
+    imprime el resumen de telemetría del trabajo.
+
+    En funciones generadoras el trabajo dura hasta que se agota el generador; cada
+    paso se ejecuta en un contexto propio, así que el consumidor (por ejemplo Gradio,
+    que puede avanzar el generador desde hilos distintos) no hereda el trabajo.
+    """
+    def decorator(func):
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def generator_wrapper(*args, **kwargs):
+                if _current_job.get() != "default":
+                    return (yield from func(*args, **kwargs))
+                ctx = contextvars.copy_context()
+                job = f"{name}-{next(_job_counter)}"
+                ctx.run(_current_job.set, job)
+                generator = ctx.run(func, *args, **kwargs)
+                start = time.perf_counter()
+                status = "ok"
+                try:
+                    while True:
+                        try:
+                            item = ctx.run(next, generator)
+                        except StopIteration as stop:
+                            return stop.value
+                        yield item
+                except GeneratorExit:
+                    # El consumidor dejó de iterar (p. ej. la UI canceló la tarea)
+                    status = "cancelled"
+                    ctx.run(generator.close)
+                    raise
+                except BaseException:
+                    status = "error"
+                    raise
+                finally:
+                    _finish_job(job, time.perf_counter() - start, status)
+            return generator_wrapper
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if _current_job.get() != "default":
+                    return await func(*args, **kwargs)
+                token = _current_job.set(f"{name}-{next(_job_counter)}")
+                start = time.perf_counter()
+                status = "ok"
+                try:
+                    return await func(*args, **kwargs)
+                except BaseException:
+                    status = "error"
+                    raise
+                finally:
+                    _finish_job(_current_job.get(), time.perf_counter() - start, status)
+                    _current_job.reset(token)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_job.get() != "default":
+                return func(*args, **kwargs)
+            token = _current_job.set(f"{name}-{next(_job_counter)}")
+            start = time.perf_counter()
+            status = "ok"
+            try:
+                return func(*args, **kwargs)
+            except BaseException:
+                status = "error"
+                raise
+            finally:
+                _finish_job(_current_job.get(), time.perf_counter() - start, status)
+                _current_job.reset(token)
+        return wrapper
+    return decorator
+
+
+def _finish_job(job, seconds, status="ok"):
+    # Duración del lote completo: permite medir el p99 de finalización de lotes
+    record_job(job, seconds, status)
+    if LLM_TELEMETRY_SUMMARY:
+        try:
+            print_telemetry_summary(job)
+        except Exception as e:
+            print(f"⚠️ No se pudo generar el resumen de telemetría: {str(e)}")
+
+
+class JobThreadPoolExecutor(ThreadPoolExecutor):
+    """ThreadPoolExecutor que propaga el trabajo actual (contextvars) a los hilos."""
+
+    def submit(self, fn, /, *args, **kwargs):
+        ctx = contextvars.copy_context()
+        return super().submit(ctx.run, fn, *args, **kwargs)
+
+
+# ---------------------------------------------------------------------------
+# Estimación de tokens
+# ---------------------------------------------------------------------------
+
+def estimate_prompt_tokens(messages):
+    """Estimación rápida (~4 caracteres por token) de los tokens de la lista de mensajes."""
+    chars = 0
+    for msg in messages or []:
+        content = msg.get("content") if isinstance(msg, dict) else None
+        if isinstance(content, str):
+            chars += len(content)
+        elif isinstance(content, list):
+            chars += sum(len(str(part.get("text", ""))) for part in content if isinstance(part, dict))
+        chars += 16  # rol y separadores
+    return chars // 4 + 1
+
+
+def estimate_request_tokens(kwargs):
+    max_tokens = kwargs.get("max_tokens") or kwargs.get("max_completion_tokens") or _DEFAULT_COMPLETION_TOKENS
+    return estimate_prompt_tokens(kwargs.get("messages")) + int(max_tokens)
+
+
+# ---------------------------------------------------------------------------
+# Limitadores
+# ---------------------------------------------------------------------------
+
+class TokenBucket:
+    """Token bucket con capacidad por minuto; `factor` escala capacidad y ritmo de recarga."""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now, factor):
+        limit = self.capacity * factor
+        self.tokens = min(limit, self.tokens + (now - self.updated) * limit / 60.0)
+        self.updated = now
+
+    def wait_time(self, amount, now, factor):
+        self._refill(now, factor)
+        # Una petición mayor que el bucket entero se limita a su capacidad para no bloquearse
+        amount = min(amount, self.capacity * factor)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) * 60.0 / (self.capacity * factor)
+
+    def consume(self, amount, factor):
+        self.tokens -= min(amount, self.capacity * factor)
+
+    def refund(self, amount):
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class DeploymentLimiter:
+    def __init__(self, rpm, tpm):
+        self.rpm = TokenBucket(rpm) if rpm else None
+        self.tpm = TokenBucket(tpm) if tpm else None
+        self.factor = 1.0
+        self.paused_until = 0.0
+
+    def wait_time(self, tokens, now):
+        wait = max(0.0, self.paused_until - now)
+        if self.rpm:
+            wait = max(wait, self.rpm.wait_time(1, now, self.factor))
+        if self.tpm:
+            wait = max(wait, self.tpm.wait_time(tokens, now, self.factor))
+        return wait
+
+    def consume(self, tokens):
+        if self.rpm:
+            self.rpm.consume(1, self.factor)
+        if self.tpm:
+            self.tpm.consume(tokens, self.factor)
+
+
+class _Ticket:
+    __slots__ = ("job", "deployment", "tokens", "route", "granted", "enqueued_at", "queue_wait", "waker")
+
+    def __init__(self, job, deployment, tokens, waker=None, route=None):
+        self.job = job
+        self.deployment = deployment
+        self.tokens = tokens
+        self.route = route
+        self.granted = False
+        self.enqueued_at = time.monotonic()
+        self.queue_wait = 0.0
+        # Solo para peticiones asíncronas: despierta la corrutina que espera el hueco
+        self.waker = waker
+
+
+class LLMGateway:
+    def __init__(self, max_concurrency=None, rpm=None, tpm=None, per_deployment=None):
+        self.max_concurrency = max_concurrency or LLM_MAX_CONCURRENCY
+        self.default_rpm = LLM_RPM if rpm is None else rpm
+        self.default_tpm = LLM_TPM if tpm is None else tpm
+        self.per_deployment = LLM_RATE_LIMITS if per_deployment is None else per_deployment
+
+        self._cond = threading.Condition()
+        self._active = 0
+        self._queues = {}
+        self._rr = deque()
+        self._limiters = {}
+        # Límite de peticiones simultáneas por ruta (p. ej. que "heavy" deje huecos a "fast")
+        self.route_limits = {}
+        self._route_active = {}
+
+        self.stats = {
+            "requests": 0,
+            "rate_limited": 0,
+            "retries": 0,
+            "queue_wait_total": 0.0,
+            "queue_wait_max": 0.0,
+            "max_active": 0,
+        }
+
+    def _limiter(self, deployment):
+        lim = self._limiters.get(deployment)
+        if lim is None:
+            cfg = self.per_deployment.get(deployment, {})
+            lim = DeploymentLimiter(cfg.get("rpm", self.default_rpm), cfg.get("tpm", self.default_tpm))
+            self._limiters[deployment] = lim
+        return lim
+
+    def set_route_limit(self, route, max_concurrency):
+        with self._cond:
+            if max_concurrency:
+                self.route_limits[route] = max_concurrency
+            else:
+                self.route_limits.pop(route, None)
+            self._dispatch()
+
+    def _route_full(self, route):
+        limit = self.route_limits.get(route)
+        return limit is not None and self._route_active.get(route, 0) >= limit
+
+    def _next_ticket(self, job):
+        """Primera petición del trabajo cuya ruta no ha llegado a su límite de concurrencia."""
+        for ticket in self._queues[job]:
+            if not self._route_full(ticket.route):
+                return ticket
+        return None
+
+    def _dispatch(self):
+        """
+        Concede huecos en round-robin entre trabajos. Devuelve los segundos hasta
+        que un trabajo bloqueado por cuota podría avanzar (None si solo espera huecos).
+        """
+        now = time.monotonic()
+        min_wait = None
+        blocked_deployments = set()
+        skipped = 0
+        granted = False
+        while self._rr and self._active < self.max_concurrency and skipped < len(self._rr):
+            job = self._rr[0]
+            ticket = self._next_ticket(job)
+            if ticket is None:
+                # Todas sus peticiones esperan hueco en su ruta
+                self._rr.rotate(-1)
+                skipped += 1
+                continue
+            # Si la cabeza de otro trabajo espera cuota en este deployment, se respeta su turno
+            wait = None if ticket.deployment in blocked_deployments else \
+                self._limiter(ticket.deployment).wait_time(ticket.tokens, now)
+            if wait is None or wait > 0:
+                if wait:
+                    blocked_deployments.add(ticket.deployment)
+                    min_wait = wait if min_wait is None else min(min_wait, wait)
+                self._rr.rotate(-1)
+                skipped += 1
+                continue
+
+            self._limiter(ticket.deployment).consume(ticket.tokens)
+            self._queues[job].remove(ticket)
+            ticket.granted = True
+            ticket.queue_wait = now - ticket.enqueued_at
+            self._active += 1
+            self._route_active[ticket.route] = self._route_active.get(ticket.route, 0) + 1
+            if ticket.waker is not None:
+                ticket.waker()
+            granted = True
+            skipped = 0
+            if self._queues[job]:
+                self._rr.rotate(-1)
+            else:
+                self._rr.popleft()
+                del self._queues[job]
+
+        if granted:
+            self.stats["max_active"] = max(self.stats["max_active"], self._active)
+            self._cond.notify_all()
+        return min_wait
+
+    def _enqueue(self, ticket):
+        if ticket.job not in self._queues:
+            self._queues[ticket.job] = deque()
+            self._rr.append(ticket.job)
+        self._queues[ticket.job].append(ticket)
+
+    def _record_grant(self, ticket):
+        self.stats["requests"] += 1
+        self.stats["queue_wait_total"] += ticket.queue_wait
+        self.stats["queue_wait_max"] = max(self.stats["queue_wait_max"], ticket.queue_wait)
+
+    def acquire(self, deployment, tokens, job=None):
+        ticket = _Ticket(job or current_job(), deployment, tokens, route=current_route())
+        with self._cond:
+            self._enqueue(ticket)
+            while not ticket.granted:
+                wait = self._dispatch()
+                if ticket.granted:
+                    break
+                self._cond.wait(timeout=wait)
+            self._record_grant(ticket)
+        return ticket
+
+    async def acquire_async(self, deployment, tokens, job=None):
+        """Equivalente a acquire() para corrutinas: espera el hueco sin bloquear el event loop."""
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        ticket = _Ticket(job or current_job(), deployment, tokens,
+                         waker=lambda: loop.call_soon_threadsafe(event.set), route=current_route())
+        with self._cond:
+            self._enqueue(ticket)
+            wait = self._dispatch()
+        try:
+            while not ticket.granted:
+                try:
+                    await asyncio.wait_for(event.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                event.clear()
+                with self._cond:
+                    if ticket.granted:
+                        break
+                    wait = self._dispatch()
+        except BaseException:
+            self._abandon(ticket)
+            raise
+        with self._cond:
+            self._record_grant(ticket)
+        return ticket
+
+    def _abandon(self, ticket):
+        """Saca de la cola una petición cancelada (o libera su hueco si ya se le concedió)."""
+        with self._cond:
+            granted = ticket.granted
+            queue = self._queues.get(ticket.job)
+            if not granted and queue is not None and ticket in queue:
+                queue.remove(ticket)
+                if not queue:
+                    del self._queues[ticket.job]
+                    self._rr.remove(ticket.job)
+        if granted:
+            self.release(ticket)
+
+    def release(self, ticket, used_tokens=None):
+        with self._cond:
+            self._active -= 1
+            self._route_active[ticket.route] -= 1
+            lim = self._limiter(ticket.deployment)
+            # Devolver al bucket lo reservado de más (max_tokens rara vez se consume entero)
+            if used_tokens is not None and lim.tpm and used_tokens < ticket.tokens:
+                lim.tpm.refund(ticket.tokens - used_tokens)
+            # Conceder el hueco liberado aquí mismo para despertar también a las corrutinas
+            self._dispatch()
+            self._cond.notify_all()
+
+    def report_rate_limited(self, deployment, retry_after, attempt):
+        delay = retry_after if retry_after is not None else min(60.0, 2 ** attempt + random.uniform(0, 1))
+        with self._cond:
+            lim = self._limiter(deployment)
+            lim.paused_until = max(lim.paused_until, time.monotonic() + delay)
+            lim.factor = max(_MIN_RATE_FACTOR, lim.factor * _RATE_DECREASE)
+            self.stats["rate_limited"] += 1
+            self._cond.notify_all()
+        print(f"⏳ 429 en '{deployment}': pausa de {delay:.1f}s, ritmo al {lim.factor*100:.0f}%")
+
+    def report_success(self, deployment):
+        with self._cond:
+            lim = self._limiter(deployment)
+            if lim.factor < 1.0:
+                lim.factor = min(1.0, lim.factor + _RATE_INCREASE)
+
+    def get_stats(self):
+        with self._cond:
+            stats = dict(self.stats)
+            stats["active"] = self._active
+            stats["queued"] = sum(len(q) for q in self._queues.values())
+            stats["rate_factor"] = {d: round(l.factor, 2) for d, l in self._limiters.items()}
+            stats["route_active"] = {r: n for r, n in self._route_active.items() if r is not None}
+        stats["queue_wait_avg"] = stats["queue_wait_total"] / stats["requests"] if stats["requests"] else 0.0
+        return stats
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway():
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = LLMGateway()
+    return _gateway
+
+
+# ---------------------------------------------------------------------------
+# Clasificación de errores
+# ---------------------------------------------------------------------------
+
+def _retry_after_seconds(error):
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+def _is_rate_limit(error):
+    if openai is not None and isinstance(error, openai.RateLimitError):
+        return True
+    return getattr(error, "status_code", None) == 429
+
+
+def _is_transient(error):
+    if openai is not None and isinstance(
+        error, (openai.APIConnectionError, openai.APITimeoutError, openai.InternalServerError)
+    ):
+        return True
+    return getattr(error, "status_code", None) in (500, 502, 503, 504)
+
+
+def is_upstream_error(error):
+    """True si el error indica un problema del servicio (429, timeout, conexión, 5xx) y no de la petición."""
+    return _is_rate_limit(error) or _is_transient(error)
+
+
+def call_through_gateway(create_fn, kwargs, gateway=None):
+    """Ejecuta `create_fn(**kwargs)` respetando concurrencia, cuota y reintentos del gateway."""
+    gateway = gateway or get_gateway()
+    deployment = kwargs.get("model") or "default"
+    tokens = estimate_request_tokens(kwargs)
+    upstream = _current_attempt.get()
+    attempt = 0
+    while True:
+        ticket = gateway.acquire(deployment, tokens)
+        note_llm_call(queue_wait=ticket.queue_wait)
+        if upstream is not None:
+            upstream.started()
+        started = time.perf_counter()
+        try:
+            response = create_fn(**kwargs)
+        except Exception as e:
+            note_llm_call(upstream_latency=time.perf_counter() - started)
+            gateway.release(ticket)
+            if attempt >= LLM_MAX_RETRIES or not (_is_rate_limit(e) or _is_transient(e)):
+                raise
+            attempt += 1
+            gateway.stats["retries"] += 1
+            note_llm_call(retries=1)
+            if _is_rate_limit(e):
+                gateway.report_rate_limited(deployment, _retry_after_seconds(e), attempt)
+            else:
+                time.sleep(min(30.0, 2 ** attempt * 0.5 + random.uniform(0, 0.5)))
+            continue
+
+        if kwargs.get("stream"):
+            note_llm_call(upstream_latency=time.perf_counter() - started)
+            # El hueco se mantiene ocupado mientras se consume el streaming
+            return _GatewayStream(response, gateway, ticket, deployment)
+
+        elapsed = time.perf_counter() - started
+        note_llm_call(upstream_latency=elapsed)
+        if upstream is not None:
+            upstream.upstream_seconds = elapsed
+        usage = getattr(response, "usage", None)
+        gateway.release(ticket, getattr(usage, "total_tokens", None))
+        gateway.report_success(deployment)
+        return response
+
+
+class _GatewayStream:
+    """
+    Envuelve una respuesta en streaming y libera el hueco del gateway al agotarla,
+    al cerrarla o cuando se destruye (aunque nunca se haya empezado a leer).
+    """
+
+    def __init__(self, stream, gateway, ticket, deployment):
+        self._stream = stream
+        self._iterator = iter(stream)
+        self._gateway = gateway
+        self._ticket = ticket
+        self._deployment = deployment
+        self._released = False
+
+    def _release(self, success):
+        if not self._released:
+            self._released = True
+            self._gateway.release(self._ticket)
+            if success:
+                self._gateway.report_success(self._deployment)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            self._release(True)
+            raise
+        except BaseException:
+            self._release(False)
+            raise
+
+    def close(self):
+        close = getattr(self._stream, "close", None)
+        if close is not None:
+            close()
+        self._release(False)
+
+    def __del__(self):
+        self._release(False)
+
+
+async def acall_through_gateway(create_fn, kwargs, gateway=None):
+    """Versión asíncrona de call_through_gateway para clientes AsyncAzureOpenAI."""
+    gateway = gateway or get_gateway()
+    deployment = kwargs.get("model") or "default"
+    tokens = estimate_request_tokens(kwargs)
+    upstream = _current_attempt.get()
+    attempt = 0
+    while True:
+        ticket = await gateway.acquire_async(deployment, tokens)
+        note_llm_call(queue_wait=ticket.queue_wait)
+        if upstream is not None:
+            upstream.started()
+        started = time.perf_counter()
+        try:
+            response = await create_fn(**kwargs)
+        except Exception as e:
+            note_llm_call(upstream_latency=time.perf_counter() - started)
+            gateway.release(ticket)
+            if attempt >= LLM_MAX_RETRIES or not (_is_rate_limit(e) or _is_transient(e)):
+                raise
+            attempt += 1
+            gateway.stats["retries"] += 1
+            note_llm_call(retries=1)
+            if _is_rate_limit(e):
+                gateway.report_rate_limited(deployment, _retry_after_seconds(e), attempt)
+            else:
+                await asyncio.sleep(min(30.0, 2 ** attempt * 0.5 + random.uniform(0, 0.5)))
+            continue
+        except BaseException:
+            # Cancelación de la corrutina: devolver el hueco antes de propagarla
+            gateway.release(ticket)
+            raise
+
+        elapsed = time.perf_counter() - started
+        note_llm_call(upstream_latency=elapsed)
+        if upstream is not None:
+            upstream.upstream_seconds = elapsed
+        usage = getattr(response, "usage", None)
+        gateway.release(ticket, getattr(usage, "total_tokens", None))
+        gateway.report_success(deployment)
+        return response
+
+
+def print_gateway_stats():
+    s = get_gateway().get_stats()
+    print(
+        f"🚦 Gateway LLM: {s['requests']} peticiones, máx. {s['max_active']} simultáneas, "
+        f"{s['rate_limited']} 429, {s['retries']} reintentos, "
+        f"espera media en cola {s['queue_wait_avg']:.2f}s (máx. {s['queue_wait_max']:.2f}s)"
+    )
@@ -0,0 +1,400 @@
+"""
+Resiliencia de las llamadas al LLM: peticiones duplicadas (hedging) y circuit breaker.
+
+Una sola respuesta lenta de Azure (60-120 s con los timeout= de obtener_respuesta
+o process_ideas_batch_optimized) retrasa un lote entero, porque generate_ranking y
+analyze_ideas_batch_competitor esperan a todos sus futures. Esta capa se sitúa
+entre la caché y el gateway (ver `llm_client.ResilientClient`):
+
+- hedging: si una llamada supera el p95 de la latencia reciente de llamadas
+  parecidas (mismo deployment y tamaño de max_tokens), se lanza un duplicado y se
+  usa la primera respuesta. Con el gateway debajo, la latencia observada es solo
+  la de Azure (sin la espera en cola) y el plazo cuenta desde que la llamada
+  obtiene su hueco: una llamada que sigue en cola no se duplica. La otra se cancela: en async se cancela la tarea (y su
+  petición HTTP); en hilos (un pool compartido del tamaño de la concurrencia del
+  gateway) la perdedora termina en segundo plano y se descarta.
+  Un presupuesto limita los duplicados a una fracción de las llamadas para no
+  multiplicar la carga cuando todo el servicio va lento. Los duplicados pasan por
+  el gateway como cualquier otra petición (cuota y concurrencia);
+- circuit breaker: tras N fallos consecutivos del servicio en un deployment (con
+  los reintentos del gateway ya agotados) el circuito se abre y las llamadas fallan
+  al instante con CircuitOpenError durante un enfriamiento; después se deja pasar
+  una llamada de prueba. Los módulos ya capturan las excepciones y devuelven su
+  estructura por defecto, así que con el circuito abierto caen a ella sin esperar.
+
+Variables de entorno:
+    LLM_HEDGE_ENABLED       "0" para desactivar el hedging
+    LLM_HEDGE_PERCENTILE    Percentil de latencia que dispara el duplicado (95)
+    LLM_HEDGE_MIN_DELAY     Espera mínima antes de duplicar, en segundos (2)
+    LLM_HEDGE_MIN_SAMPLES   Latencias observadas antes de empezar a duplicar (20)
+    LLM_HEDGE_BUDGET        Fracción máxima de llamadas duplicadas (0.1)
+    LLM_BREAKER_FAILURES    Fallos consecutivos que abren el circuito (5, 0 = desactivado)
+    LLM_BREAKER_COOLDOWN    Segundos con el circuito abierto antes de probar (30)
+"""
+
+import os
+import math
+import time
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from llm_gateway import LLM_MAX_CONCURRENCY, JobThreadPoolExecutor, UpstreamAttempt, is_upstream_error, track_upstream
+from llm_telemetry import note_llm_call, get_telemetry
+
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "1").lower() not in ("0", "false", "no")
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "2"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_HEDGE_BUDGET = float(os.getenv("LLM_HEDGE_BUDGET", "0.1"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+
+# Latencias recientes que se conservan por tipo de llamada
+_LATENCY_WINDOW = 500
+
+# Hilos de los intentos síncronos con hedging, compartidos por todo el proceso. El
+# gateway no deja salir más de LLM_MAX_CONCURRENCY peticiones a la vez, así que más
+# hilos solo esperarían en su cola
+_attempt_executor = JobThreadPoolExecutor(max_workers=LLM_MAX_CONCURRENCY, thread_name_prefix="llm-hedge")
+
+
+class CircuitOpenError(Exception):
+    """El circuito del deployment está abierto: la llamada se rechaza sin ir a Azure."""
+
+    def __init__(self, deployment, retry_in):
+        super().__init__(f"Circuito abierto para '{deployment}' (se reintentará en {retry_in:.0f}s)")
+        self.deployment = deployment
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Estados closed -> open (tras N fallos seguidos) -> half_open (una llamada de prueba)."""
+
+    def __init__(self, failures=None, cooldown=None):
+        self.failures = LLM_BREAKER_FAILURES if failures is None else failures
+        self.cooldown = LLM_BREAKER_COOLDOWN if cooldown is None else cooldown
+        self.state = "closed"
+        self.consecutive = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        if not self.failures:
+            return True
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = "half_open"
+                self.probe_in_flight = False
+            if self.state == "half_open" and not self.probe_in_flight:
+                self.probe_in_flight = True
+                return True
+            return False
+
+    def retry_in(self):
+        return max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.consecutive = 0
+            self.probe_in_flight = False
+
+    def record_failure(self):
+        """Devuelve True si este fallo abre el circuito."""
+        with self._lock:
+            self.consecutive += 1
+            self.probe_in_flight = False
+            if self.failures and (self.state == "half_open" or self.consecutive >= self.failures):
+                tripped = self.state != "open"
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                return tripped
+            return False
+
+
+def _latency_key(kwargs):
+    # La latencia depende sobre todo del tamaño de la salida: se agrupa por potencias de 2
+    max_tokens = kwargs.get("max_tokens") or kwargs.get("max_completion_tokens") or 1000
+    return kwargs.get("model") or "default", 2 ** math.ceil(math.log2(max(1, max_tokens)))
+
+
+class LLMResilience:
+    def __init__(self, hedge_enabled=None, percentile=None, min_delay=None, min_samples=None,
+                 budget=None, breaker_failures=None, breaker_cooldown=None):
+        self.hedge_enabled = LLM_HEDGE_ENABLED if hedge_enabled is None else hedge_enabled
+        self.percentile = percentile or LLM_HEDGE_PERCENTILE
+        self.min_delay = LLM_HEDGE_MIN_DELAY if min_delay is None else min_delay
+        self.min_samples = LLM_HEDGE_MIN_SAMPLES if min_samples is None else min_samples
+        self.budget = LLM_HEDGE_BUDGET if budget is None else budget
+        self.breaker_failures = breaker_failures
+        self.breaker_cooldown = breaker_cooldown
+
+        self._lock = threading.Lock()
+        self._latencies = {}
+        self._breakers = {}
+        self.stats = {
+            "calls": 0,
+            "hedges": 0,
+            "hedge_wins": 0,
+            "wasted_hedges": 0,
+            "breaker_trips": 0,
+            "fast_failures": 0,
+        }
+
+    # -- latencias y presupuesto --------------------------------------------
+
+    def observe(self, kwargs, seconds):
+        key = _latency_key(kwargs)
+        with self._lock:
+            window = self._latencies.get(key)
+            if window is None:
+                window = self._latencies[key] = deque(maxlen=_LATENCY_WINDOW)
+            window.append(seconds)
+
+    def hedge_delay(self, kwargs):
+        """Segundos de espera antes de duplicar la llamada (None si no se duplica)."""
+        if not self.hedge_enabled or kwargs.get("stream"):
+            return None
+        with self._lock:
+            window = self._latencies.get(_latency_key(kwargs))
+            if window is None or len(window) < self.min_samples:
+                return None
+            values = sorted(window)
+        idx = min(len(values) - 1, int(len(values) * self.percentile / 100))
+        return max(self.min_delay, values[idx])
+
+    def _take_hedge(self):
+        with self._lock:
+            if self.stats["hedges"] + 1 > self.budget * self.stats["calls"]:
+                return False
+            self.stats["hedges"] += 1
+            return True
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    # -- circuit breaker ------------------------------------------------------
+
+    def breaker(self, deployment):
+        with self._lock:
+            breaker = self._breakers.get(deployment)
+            if breaker is None:
+                breaker = self._breakers[deployment] = CircuitBreaker(self.breaker_failures, self.breaker_cooldown)
+            return breaker
+
+    def _check_breaker(self, kwargs):
+        deployment = kwargs.get("model") or "default"
+        breaker = self.breaker(deployment)
+        if not breaker.allow():
+            self._count("fast_failures")
+            note_llm_call(circuit="open")
+            raise CircuitOpenError(deployment, breaker.retry_in())
+        return breaker
+
+    def _record_outcome(self, breaker, error):
+        # Los errores de la petición (400, filtro de contenido...) no dicen nada de la salud del servicio
+        if error is None or not is_upstream_error(error):
+            breaker.record_success()
+        elif breaker.record_failure():
+            self._count("breaker_trips")
+            print(f"🔌 Circuito abierto: {breaker.consecutive} fallos seguidos, "
+                  f"llamadas rechazadas durante {breaker.cooldown:.0f}s")
+
+    # -- llamadas síncronas ---------------------------------------------------
+
+    def call(self, create_fn, kwargs, gated=False):
+        """
+        Ejecuta create_fn(**kwargs) con circuit breaker y, si procede, una petición duplicada.
+        gated=True indica que create_fn pasa por el gateway, que avisa al obtener el hueco.
+        """
+        breaker = self._check_breaker(kwargs)
+        self._count("calls")
+        delay = self.hedge_delay(kwargs)
+        try:
+            if delay is None:
+                response = self._run_attempt(create_fn, kwargs, gated)
+            else:
+                response = self._hedged(create_fn, kwargs, delay, gated)
+        except Exception as e:
+            self._record_outcome(breaker, e)
+            raise
+        self._record_outcome(breaker, None)
+        return response
+
+    def _run_attempt(self, create_fn, kwargs, gated, on_start=None):
+        """Un intento; observa la latencia de Azure que mide el gateway (o la total si no hay gateway)."""
+        upstream = UpstreamAttempt(on_start)
+        if not gated:
+            upstream.started()
+        start = time.perf_counter()
+        with track_upstream(upstream):
+            response = create_fn(**kwargs)
+        if not kwargs.get("stream"):
+            seconds = upstream.upstream_seconds
+            self.observe(kwargs, time.perf_counter() - start if seconds is None else seconds)
+        return response
+
+    def _start_attempt(self, create_fn, kwargs, gated):
+        """
+        Lanza un intento en el pool de hedging con una copia del contexto (trabajo, ruta, telemetría).
+        Devuelve el future y un evento que se activa al obtener el hueco del gateway o al terminar.
+        """
+        started = threading.Event()
+
+        def run():
+            try:
+                return self._run_attempt(create_fn, kwargs, gated, started.set)
+            finally:
+                started.set()
+
+        return _attempt_executor.submit(run), started
+
+    def _hedged(self, create_fn, kwargs, delay, gated):
+        primary, started = self._start_attempt(create_fn, kwargs, gated)
+        # El plazo cuenta desde que la llamada sale hacia Azure, no desde que entra en la cola
+        started.wait()
+        wait([primary], timeout=delay)
+        if primary.done() or not self._take_hedge():
+            return primary.result()
+
+        hedge, _ = self._start_attempt(create_fn, kwargs, gated)
+        pending = {primary, hedge}
+        winner = None
+        while pending and winner is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            winner = next((f for f in done if f.exception() is None), None)
+        if winner is None:
+            raise primary.exception()
+        # La perdedora se cancela si aún no había empezado; si no, se descarta su resultado
+        (hedge if winner is primary else primary).cancel()
+        self._note_hedge(winner is hedge)
+        return winner.result()
+
+    def _note_hedge(self, hedge_won):
+        self._count("hedge_wins" if hedge_won else "wasted_hedges")
+        note_llm_call(hedge_winner="hedge" if hedge_won else "primary")
+
+    # -- llamadas asíncronas --------------------------------------------------
+
+    async def acall(self, create_fn, kwargs, gated=False):
+        """Versión asíncrona de call(); la petición perdedora se cancela de verdad."""
+        breaker = self._check_breaker(kwargs)
+        self._count("calls")
+        delay = self.hedge_delay(kwargs)
+        try:
+            if delay is None:
+                response = await self._aattempt(create_fn, kwargs, gated)
+            else:
+                response = await self._ahedged(create_fn, kwargs, delay, gated)
+        except Exception as e:
+            self._record_outcome(breaker, e)
+            raise
+        self._record_outcome(breaker, None)
+        return response
+
+    async def _aattempt(self, create_fn, kwargs, gated, on_start=None):
+        upstream = UpstreamAttempt(on_start)
+        if not gated:
+            upstream.started()
+        start = time.perf_counter()
+        with track_upstream(upstream):
+            response = await create_fn(**kwargs)
+        if not kwargs.get("stream"):
+            seconds = upstream.upstream_seconds
+            self.observe(kwargs, time.perf_counter() - start if seconds is None else seconds)
+        return response
+
+    async def _ahedged(self, create_fn, kwargs, delay, gated):
+        # create_task copia el contexto actual, así que trabajo, ruta y telemetría se conservan
+        started = asyncio.Event()
+        primary = asyncio.ensure_future(self._aattempt(create_fn, kwargs, gated, started.set))
+        primary.add_done_callback(lambda _: started.set())
+        tasks = [primary]
+        try:
+            # El plazo cuenta desde que la llamada obtiene su hueco en el gateway
+            await started.wait()
+            await asyncio.wait(tasks, timeout=delay)
+            if primary.done() or not self._take_hedge():
+                return await primary
+
+            hedge = asyncio.ensure_future(self._aattempt(create_fn, kwargs, gated))
+            tasks.append(hedge)
+            pending = set(tasks)
+            winner = None
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((t for t in done if not t.cancelled() and t.exception() is None), None)
+            if winner is None:
+                return await primary
+            self._note_hedge(winner is hedge)
+            return winner.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["open_circuits"] = [d for d, b in self._breakers.items() if b.state != "closed"]
+        stats["wasted_hedge_rate"] = stats["wasted_hedges"] / stats["hedges"] if stats["hedges"] else 0.0
+        return stats
+
+
+_resilience = None
+_resilience_lock = threading.Lock()
+
+
+def get_resilience():
+    global _resilience
+    if _resilience is None:
+        with _resilience_lock:
+            if _resilience is None:
+                _resilience = LLMResilience()
+    return _resilience
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+def get_batch_times(name=None):
+    """Percentiles de la duración de los trabajos (llm_job) registrados en la telemetría, por nombre."""
+    groups = {}
+    for record in get_telemetry().snapshot():
+        if record.get("type") == "job" and (name is None or record.get("name") == name):
+            groups.setdefault(record.get("name"), []).append(record["latency"])
+    summary = {}
+    for job_name, values in groups.items():
+        values.sort()
+        summary[job_name] = {
+            "batches": len(values),
+            "p50": _percentile(values, 50),
+            "p95": _percentile(values, 95),
+            "p99": _percentile(values, 99),
+            "max": values[-1],
+        }
+    return summary
+
+
+def print_resilience_stats():
+    s = get_resilience().get_stats()
+    print(
+        f"🪁 Hedging LLM: {s['hedges']} duplicadas de {s['calls']} llamadas, "
+        f"{s['hedge_wins']} útiles, {s['wasted_hedges']} desperdiciadas ({s['wasted_hedge_rate']*100:.0f}%)"
+    )
+    print(
+        f"🔌 Circuit breaker: {s['breaker_trips']} aperturas, {s['fast_failures']} llamadas rechazadas"
+        + (f", abiertos: {', '.join(s['open_circuits'])}" if s["open_circuits"] else "")
+    )
+    for job_name, b in sorted(get_batch_times().items(), key=lambda item: str(item[0])):
+        print(f"⏱️ Lotes '{job_name}': {b['batches']}, p50 {b['p50']:.1f}s, p95 {b['p95']:.1f}s, "
+              f"p99 {b['p99']:.1f}s, máx. {b['max']:.1f}s")
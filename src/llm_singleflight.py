@@ -0,0 +1,113 @@
+"""
+Agrupación de peticiones idénticas en vuelo (single-flight).
+
+Si varios hilos (dos usuarios de Gradio, dos secciones del mismo informe...)
+lanzan a la vez la misma petición, solo el primero llama a Azure; el resto
+espera y recibe el mismo resultado (o la misma excepción).
+"""
+
+import asyncio
+import threading
+
+
+class _Call:
+    __slots__ = ("event", "result", "error", "waiters")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._async_calls = {}
+        self.stats = {"calls": 0, "upstream_calls": 0, "calls_saved": 0}
+
+    def do(self, key, fn, *args, **kwargs):
+        """Ejecuta fn una sola vez por clave entre las llamadas concurrentes."""
+        with self._lock:
+            self.stats["calls"] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.stats["calls_saved"] += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.stats["upstream_calls"] += 1
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    async def do_async(self, key, coro_fn, *args, **kwargs):
+        """Equivalente a do() para corrutinas del mismo event loop."""
+        loop = asyncio.get_running_loop()
+        loop_key = (id(loop), key)
+        with self._lock:
+            self.stats["calls"] += 1
+            future = self._async_calls.get(loop_key)
+            if future is not None:
+                self.stats["calls_saved"] += 1
+                leader = False
+            else:
+                future = loop.create_future()
+                self._async_calls[loop_key] = future
+                self.stats["upstream_calls"] += 1
+                leader = True
+
+        if not leader:
+            return await asyncio.shield(future)
+
+        try:
+            result = await coro_fn(*args, **kwargs)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            # Evita el aviso "exception was never retrieved" si nadie más esperaba
+            future.exception()
+            raise
+        finally:
+            with self._lock:
+                self._async_calls.pop(loop_key, None)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["in_flight"] = len(self._calls) + len(self._async_calls)
+        return stats
+
+
+_single_flight = SingleFlight()
+
+
+def get_single_flight():
+    return _single_flight
+
+
+def print_single_flight_stats():
+    s = _single_flight.get_stats()
+    print(
+        f"🔗 Single-flight LLM: {s['calls_saved']} llamadas ahorradas de {s['calls']} "
+        f"({s['upstream_calls']} enviadas a Azure)"
+    )
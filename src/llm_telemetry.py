@@ -0,0 +1,413 @@
+"""
+Telemetría por llamada al LLM.
+
+Cada `client.chat.completions.create(...)` genera un registro JSONL con:
+trabajo (job), módulo y función que hizo la llamada, sección (section_id, p. ej.
+COMPETITOR_MAPPING o BENCHMARK_MATRIX), índice de idea, espera en la cola del
+gateway, latencia upstream y total, tokens de prompt/respuesta, reintentos,
+estado de caché y coste estimado.
+
+Las capas de llm_client rellenan el registro de la llamada en curso mediante
+`note_llm_call(...)`; los módulos de negocio solo indican el contexto:
+
+    with llm_context(section_id="BENCHMARK_MATRIX"):
+        resp = client.chat.completions.create(...)
+
+    executor.submit(with_llm_context(worker, idea_index=idx), idea)
+
+Al terminar un trabajo (`llm_job`) se imprime un resumen con percentiles por etapa.
+
+Variables de entorno:
+    LLM_TELEMETRY_ENABLED   "0" para desactivar la telemetría (por defecto activada)
+    LLM_TELEMETRY_FILE      Fichero JSONL (por defecto ./telemetry/llm_calls.jsonl)
+    LLM_TELEMETRY_SUMMARY   "0" para no imprimir el resumen al terminar cada trabajo
+    LLM_PRICES              JSON con el precio por 1K tokens de cada deployment,
+                            p. ej. '{"gpt-4o": {"prompt": 0.0025, "completion": 0.01}}'
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+import contextvars
+import functools
+from collections import deque
+from contextlib import contextmanager
+
+LLM_TELEMETRY_ENABLED = os.getenv("LLM_TELEMETRY_ENABLED", "1").lower() not in ("0", "false", "no")
+LLM_TELEMETRY_FILE = os.getenv("LLM_TELEMETRY_FILE", os.path.join(os.getcwd(), "telemetry", "llm_calls.jsonl"))
+LLM_TELEMETRY_SUMMARY = os.getenv("LLM_TELEMETRY_SUMMARY", "1").lower() not in ("0", "false", "no")
+
+try:
+    LLM_PRICES = json.loads(os.getenv("LLM_PRICES", "") or "{}")
+except ValueError:
+    print("⚠️ LLM_PRICES no es un JSON válido, se ignora")
+    LLM_PRICES = {}
+
+# Registros que se conservan en memoria para los resúmenes
+_MAX_RECORDS_IN_MEMORY = 100000
+
+# Ficheros de las capas del cliente: no cuentan como "quién hizo la llamada"
+_LAYER_FILES = {
+    "llm_client.py", "llm_telemetry.py", "llm_gateway.py", "llm_singleflight.py",
+    "llm_cache.py", "llm_cassettes.py", "llm_resilience.py", "openai_config.py",
+}
+
+_call_context = contextvars.ContextVar("llm_call_context", default=None)
+_current_call = contextvars.ContextVar("llm_current_call", default=None)
+
+
+# ---------------------------------------------------------------------------
+# Contexto de negocio (sección, idea...)
+# ---------------------------------------------------------------------------
+
+@contextmanager
+def llm_context(**fields):
+    """Añade campos (section_id, idea_index...) a las llamadas hechas dentro del bloque."""
+    merged = dict(_call_context.get() or {})
+    merged.update({k: v for k, v in fields.items() if v is not None})
+    token = _call_context.set(merged)
+    try:
+        yield
+    finally:
+        _call_context.reset(token)
+
+
+def with_llm_context(fn, **fields):
+    """Devuelve fn envuelta en llm_context(**fields); útil al enviar tareas a un pool."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with llm_context(**fields):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+def current_llm_context():
+    return dict(_call_context.get() or {})
+
+
+@contextmanager
+def llm_stage(label, **fields):
+    """
+    Marca una etapa con nombre: las llamadas del bloque se agrupan bajo esa sección
+    (si no había ya una) y la duración total de la etapa se registra también.
+    """
+    ctx = _call_context.get() or {}
+    if "section_id" not in ctx:
+        fields.setdefault("section_id", label)
+    start = time.perf_counter()
+    status = "ok"
+    with llm_context(**fields):
+        try:
+            yield
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            _telemetry.write({
+                "type": "stage",
+                "ts": time.time(),
+                "stage": label,
+                **current_llm_context(),
+                "latency": round(time.perf_counter() - start, 4),
+                "status": status,
+            })
+
+
+def record_job(job, seconds, status="ok"):
+    """Registra la duración total de un trabajo (llm_job) para los percentiles por lote."""
+    _telemetry.write({
+        "type": "job",
+        "ts": time.time(),
+        "job": job,
+        "name": job.rsplit("-", 1)[0] if job else job,
+        "latency": round(seconds, 4),
+        "status": status,
+    })
+
+
+# ---------------------------------------------------------------------------
+# Registro de la llamada en curso
+# ---------------------------------------------------------------------------
+
+def _find_caller():
+    """Primer frame fuera de las capas del cliente y de la librería openai."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        base = os.path.basename(filename)
+        if base not in _LAYER_FILES and f"{os.sep}openai{os.sep}" not in filename \
+                and f"{os.sep}asyncio{os.sep}" not in filename and base != "contextlib.py":
+            module = frame.f_globals.get("__name__", base)
+            return module, frame.f_code.co_name
+        frame = frame.f_back
+    return "unknown", "unknown"
+
+
+def start_llm_call(kwargs, job=None, route=None):
+    """Crea el registro de una llamada y lo deja como llamada en curso del contexto."""
+    if not LLM_TELEMETRY_ENABLED:
+        return None, None
+    module, function = _find_caller()
+    record = {
+        "type": "llm_call",
+        "ts": time.time(),
+        "job": job,
+        "route": route,
+        "module": module,
+        "function": function,
+        **current_llm_context(),
+        "model": kwargs.get("model"),
+        "stream": bool(kwargs.get("stream")),
+        "max_tokens": kwargs.get("max_tokens"),
+        "cache": None,
+        "queue_wait": 0.0,
+        "upstream_latency": 0.0,
+        "retries": 0,
+        "_start": time.perf_counter(),
+    }
+    return record, _current_call.set(record)
+
+
+def note_llm_call(**fields):
+    """
+    Usado por las capas internas: actualiza el registro en curso. Los campos
+    numéricos queue_wait, upstream_latency y retries se acumulan.
+    """
+    record = _current_call.get()
+    if record is None:
+        return
+    for key, value in fields.items():
+        if key in ("queue_wait", "upstream_latency", "retries"):
+            record[key] = record.get(key, 0) + value
+        else:
+            record[key] = value
+
+
+def _estimate_cost(model, prompt_tokens, completion_tokens):
+    price = LLM_PRICES.get(model or "")
+    if not price or prompt_tokens is None:
+        return None
+    return round(
+        prompt_tokens / 1000 * price.get("prompt", 0) + (completion_tokens or 0) / 1000 * price.get("completion", 0), 6
+    )
+
+
+def finish_llm_call(record, token, response=None, error=None, completion_text=None):
+    """Cierra el registro (latencia, tokens, estado) y lo envía al fichero JSONL."""
+    if record is None:
+        return
+    if token is not None:
+        _current_call.reset(token)
+    record["latency"] = round(time.perf_counter() - record.pop("_start"), 4)
+    record["queue_wait"] = round(record["queue_wait"], 4)
+    record["upstream_latency"] = round(record["upstream_latency"], 4)
+    if record["cache"] is None and error is None:
+        # La respuesta llegó de otra petición idéntica en vuelo (single-flight)
+        record["cache"] = "coalesced"
+
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        record["prompt_tokens"] = getattr(usage, "prompt_tokens", None)
+        record["completion_tokens"] = getattr(usage, "completion_tokens", None)
+        # Tokens del prompt servidos desde la caché de prefijos del proveedor
+        details = getattr(usage, "prompt_tokens_details", None)
+        record["cached_tokens"] = getattr(details, "cached_tokens", None) if details is not None else None
+    elif completion_text is not None:
+        record["completion_tokens"] = len(completion_text) // 4 + 1
+    if record["cache"] in ("hit", "coalesced"):
+        record["cost"] = 0.0
+    else:
+        record["cost"] = _estimate_cost(record.get("model"), record.get("prompt_tokens"),
+                                        record.get("completion_tokens"))
+
+    if error is not None:
+        record["status"] = "error"
+        record["error"] = type(error).__name__
+    else:
+        record["status"] = "ok"
+    _telemetry.write(record)
+
+
+def stream_with_telemetry(stream, record, token):
+    """
+    Devuelve el streaming envuelto para cerrar el registro al agotarlo (con el tiempo
+    hasta el primer token). El registro deja de ser la llamada en curso del contexto.
+    """
+    if record is None:
+        return stream
+    _current_call.reset(token)
+    return _stream_records(stream, record)
+
+
+def astream_with_telemetry(stream, record, token):
+    """Equivalente a stream_with_telemetry para el streaming de AsyncAzureOpenAI."""
+    if record is None:
+        return stream
+    _current_call.reset(token)
+    return _astream_records(stream, record)
+
+
+def _note_chunk(record, parts, chunk):
+    if "ttft" not in record:
+        record["ttft"] = round(time.perf_counter() - record["_start"], 4)
+    choices = getattr(chunk, "choices", None)
+    if choices:
+        delta = getattr(choices[0].delta, "content", None)
+        if delta:
+            parts.append(delta)
+
+
+def _stream_records(stream, record):
+    parts = []
+    error = None
+    try:
+        for chunk in stream:
+            _note_chunk(record, parts, chunk)
+            yield chunk
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        finish_llm_call(record, None, error=error, completion_text="".join(parts))
+
+
+async def _astream_records(stream, record):
+    parts = []
+    error = None
+    try:
+        async for chunk in stream:
+            _note_chunk(record, parts, chunk)
+            yield chunk
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        finish_llm_call(record, None, error=error, completion_text="".join(parts))
+
+
+# ---------------------------------------------------------------------------
+# Sumidero JSONL y resúmenes
+# ---------------------------------------------------------------------------
+
+class TelemetrySink:
+    def __init__(self, path=None):
+        self.path = path or LLM_TELEMETRY_FILE
+        self._lock = threading.Lock()
+        self._file = None
+        self._failed = False
+        self.records = deque(maxlen=_MAX_RECORDS_IN_MEMORY)
+
+    def write(self, record):
+        if not LLM_TELEMETRY_ENABLED:
+            return
+        with self._lock:
+            self.records.append(record)
+            if self._failed:
+                return
+            try:
+                if self._file is None:
+                    os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                    self._file = open(self.path, "a", encoding="utf-8")
+                self._file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                self._file.flush()
+            except Exception as e:
+                # La telemetría nunca debe romper una llamada al LLM
+                self._failed = True
+                print(f"⚠️ No se pudo escribir la telemetría LLM en {self.path}: {str(e)}")
+
+    def snapshot(self, job=None):
+        with self._lock:
+            records = list(self.records)
+        if job is not None:
+            records = [r for r in records if r.get("job") == job]
+        return records
+
+
+_telemetry = TelemetrySink()
+
+
+def get_telemetry():
+    return _telemetry
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * (len(sorted_values) - 1)))))
+    return sorted_values[idx]
+
+
+def _stage_of(record):
+    if record.get("type") == "stage":
+        return record.get("stage")
+    if record.get("section_id"):
+        # La misma sección se extrae y se redacta en funciones distintas
+        return f"{record['section_id']} ({record.get('function')})"
+    return f"{record.get('module')}.{record.get('function')}"
+
+
+def summarize_telemetry(job=None, group_by="stage"):
+    """
+    Agrega los registros en memoria por etapa (section_id y función, o módulo.función
+    si no hay sección) o por otro campo del registro (group_by="route", "model"...)
+    con percentiles de latencia total, upstream y espera en cola.
+    """
+    groups = {}
+    for record in _telemetry.snapshot(job):
+        if record.get("type") != "llm_call":
+            continue
+        key = _stage_of(record) if group_by == "stage" else record.get(group_by)
+        groups.setdefault(key, []).append(record)
+
+    summary = {}
+    for stage, records in groups.items():
+        latencies = sorted(r.get("latency", 0.0) for r in records)
+        upstream = sorted(r.get("upstream_latency", 0.0) for r in records if r.get("cache") == "miss")
+        waits = sorted(r.get("queue_wait", 0.0) for r in records)
+        hits = sum(1 for r in records if r.get("cache") in ("hit", "coalesced"))
+        costs = [r["cost"] for r in records if r.get("cost") is not None]
+        summary[stage] = {
+            "calls": len(records),
+            "errors": sum(1 for r in records if r.get("status") == "error"),
+            "cache_hit_rate": round(hits / len(records), 3),
+            "retries": sum(r.get("retries", 0) for r in records),
+            "latency_p50": _percentile(latencies, 50),
+            "latency_p95": _percentile(latencies, 95),
+            "latency_p99": _percentile(latencies, 99),
+            "latency_total": round(sum(latencies), 2),
+            "upstream_p50": _percentile(upstream, 50),
+            "upstream_p95": _percentile(upstream, 95),
+            "queue_wait_p50": _percentile(waits, 50),
+            "queue_wait_p95": _percentile(waits, 95),
+            "prompt_tokens": sum(r.get("prompt_tokens") or 0 for r in records),
+            "completion_tokens": sum(r.get("completion_tokens") or 0 for r in records),
+            "cost": round(sum(costs), 4) if costs else None,
+        }
+    return summary
+
+
+def print_telemetry_summary(job=None):
+    summary = summarize_telemetry(job)
+    if not summary:
+        return
+    title = f"trabajo {job}" if job else "todas las llamadas"
+    print(f"\n📈 Telemetría LLM ({title}) — latencias en segundos")
+    print(f"{'Etapa':<42}{'N':>5}{'p50':>8}{'p95':>8}{'p99':>8}{'Cola95':>8}"
+          f"{'Caché':>7}{'Reint':>6}{'Tok in':>9}{'Tok out':>9}")
+    for stage, s in sorted(summary.items(), key=lambda item: -item[1]["latency_total"]):
+        print(
+            f"{str(stage)[:41]:<42}{s['calls']:>5}{s['latency_p50']:>8.2f}{s['latency_p95']:>8.2f}"
+            f"{s['latency_p99']:>8.2f}{s['queue_wait_p95']:>8.2f}{s['cache_hit_rate']*100:>6.0f}%"
+            f"{s['retries']:>6}{s['prompt_tokens']:>9}{s['completion_tokens']:>9}"
+        )
+    costs = [s["cost"] for s in summary.values() if s["cost"] is not None]
+    if costs:
+        print(f"💶 Coste estimado: {sum(costs):.4f}")
+    hedged = [r for r in _telemetry.snapshot(job) if r.get("hedge_winner")]
+    if hedged:
+        wins = sum(1 for r in hedged if r["hedge_winner"] == "hedge")
+        print(f"🪁 Peticiones duplicadas (hedging): {len(hedged)}, {wins} útiles, "
+              f"{len(hedged) - wins} desperdiciadas")
+    print(f"🗂️ Registro detallado: {_telemetry.path}")
@@ -14,7 +14,8 @@ def get_llm_keywords(text, k=3, lang='es'):
             {"role": "user", "content": prompt}
         ],
         temperature=0,
-        max_tokens=20
+        max_tokens=20,
+        task="keywords"
     )
     kws = [w.strip() for w in rsp.choices[0].message.content.split(",") if w.strip()]
     return " ".join(kws[:k]) 
\ No newline at end of file
@@ -0,0 +1,329 @@
+"""
+Extracción de métricas por reglas, antes de preguntar al LLM.
+
+Muchos análisis ya dicen explícitamente el TRL ("TRL 4-6"), el tamaño de mercado
+("mercado de 2.000 M€"), el payback ("recuperación de la inversión en 18 meses") o el
+nivel de riesgo ("riesgo técnico: bajo"). extract_metrics_by_rules busca esos valores
+con expresiones regulares precompiladas y los convierte a la misma escala que pide
+el prompt de extract_metrics_from_analysis; el LLM solo se consulta para las métricas
+que no aparecen.
+
+    from metric_rules import extract_metrics_by_rules
+    values, evidence = extract_metrics_by_rules(analysis_text)
+    values   -> {"trl_inicial": 4, "tamano_mercado": 2.85, ...}
+    evidence -> {"trl_inicial": "TRL 4", ...}
+
+Las reglas solo devuelven un valor cuando el texto es inequívoco (p. ej. un único TRL
+sin rango, o un importe junto a "mercado" sin palabras de inversión o costes en medio).
+Lo que admite otra lectura se deja al LLM: un ROI en porcentaje no es un payback y un
+margen bruto u operativo no es el ratio de costes sobre ingresos.
+get_fast_path_stats() acumula por métrica cuántas veces se resolvió por reglas y la
+latencia de las llamadas al LLM que quedaron, para medir el ahorro.
+"""
+
+import math
+import re
+import threading
+
+# Métricas que puede resolver el camino rápido (mismas claves que extract_metrics_from_analysis)
+RULE_METRICS = [
+    "riesgo_tecnico", "tiempo_desarrollo", "trl_inicial", "trl_final",
+    "ratio_costes_ingresos", "ingresos_previstos", "payback_roi",
+    "tamano_mercado", "riesgo_mercado", "alineacion_estrategica", "evaluacion_cualitativa",
+]
+
+_FLAGS = re.IGNORECASE | re.UNICODE
+
+# Números con separadores de miles y decimales en formato español o inglés
+_NUMBER = r"\d{1,3}(?:[.,]\d{3})+(?:[.,]\d+)?|\d+(?:[.,]\d+)?"
+
+# Importes: número, magnitud opcional y moneda ("2.000 M€", "3,5 mil millones de euros", "500k€")
+_AMOUNT = (
+    rf"(?P<amount>{_NUMBER})\s*"
+    r"(?P<magnitude>mil\s+millones|millones|mill\.|mm|bn|miles|mil|[mbk])?\.?\s*(?:de\s+)?"
+    r"(?P<currency>€|eur(?:os?)?\b|usd\b|us\$|\$|d[óo]lares)"
+)
+
+# Duraciones: número o rango y unidad ("18 meses", "2-3 años")
+_DURATION = (
+    rf"(?P<duration>{_NUMBER})(?:\s*(?:-|–|a)\s*(?P<duration_to>{_NUMBER}))?\s*"
+    r"(?P<unit>mes(?:es)?|años?|anos?|trimestres?|semanas?)\b"
+)
+
+_LEVEL = r"(?P<level>muy\s+alto|muy\s+bajo|alto|elevado|medio|moderado|bajo|reducido|alta|media|baja)\b"
+
+# Texto entre la palabra clave y el valor: sin cambiar de frase
+_GAP = r"[^.;:\n]{0,60}?"
+_SHORT_GAP = r"[^.;\n]{0,30}?"
+# Como _GAP, pero sin porcentajes: "ROI del 25% en 2 años" no es un periodo de recuperación
+_DURATION_GAP = r"[^.;:\n%]{0,60}?"
+# Etiqueta opcional tras la palabra clave o tras su calificativo
+# ("Payback: 3 años", "Ingresos previstos: 5 M€")
+_LABEL = r"(?:\s*:\s*)?"
+
+_TRL_RANGE = re.compile(
+    r"\bTRL\s*(?:de\s+)?(?P<start>[1-9])\s*(?:-|–|a|al|hasta(?:\s+el)?)\s*(?:(?:un\s+|el\s+)?TRL\s*)?(?P<end>[1-9])\b",
+    _FLAGS,
+)
+_TRL_INITIAL = [
+    re.compile(r"\bTRL\s+(?:actual|inicial|de\s+partida)\s*(?:es\s+(?:de\s+)?|de\s+|:\s*|=\s*)?(?P<value>[1-9])\b", _FLAGS),
+    re.compile(r"\b(?:actualmente|hoy)\b[^.;\n]{0,40}?\bTRL\s*(?P<value>[1-9])\b", _FLAGS),
+]
+_TRL_FINAL = [
+    re.compile(r"\bTRL\s+(?:final|objetivo|esperado|previsto|meta)\s*(?:es\s+(?:de\s+)?|de\s+|:\s*|=\s*)?(?P<value>[1-9])\b", _FLAGS),
+    re.compile(r"\b(?:alcanzar|llegar\s+a|hasta)\s+(?:un\s+|el\s+)?TRL\s*(?P<value>[1-9])\b", _FLAGS),
+]
+_TRL_ANY = re.compile(r"\bTRL\s*(?:de\s+)?(?P<value>[1-9])\b", _FLAGS)
+
+_MARKET_SIZE = re.compile(
+    r"\b(?:TAM|SAM|tama[ñn]o\s+(?:total\s+)?(?:del|de)\s+mercado|mercado)\b" + _LABEL + f"(?P<gap>{_GAP})" + _LABEL + _AMOUNT,
+    _FLAGS,
+)
+_REVENUE = re.compile(
+    r"\b(?:ingresos|facturaci[óo]n|ventas)\b" + _LABEL + f"(?P<gap>{_GAP})" + _LABEL + _AMOUNT,
+    _FLAGS,
+)
+# Palabras que indican que el importe encontrado tras la palabra clave es otra cosa
+_MARKET_GAP_EXCLUDE = re.compile(r"inversi[óo]n|invertir|coste|gasto|presupuesto|ingreso|factura|venta|financiaci", _FLAGS)
+_REVENUE_GAP_EXCLUDE = re.compile(r"mercado|inversi[óo]n|invertir|coste|gasto|presupuesto|financiaci", _FLAGS)
+
+_COST_RATIO = [
+    re.compile(
+        r"\b(?:costes?|gastos?)\b(?:\s+\w+){0,3}?" + _SHORT_GAP + rf"(?P<percent>{_NUMBER})\s*%\s*(?:de\s+(?:los\s+|las\s+)?)?(?:ingresos|facturaci[óo]n|ventas)",
+        _FLAGS,
+    ),
+    re.compile(r"\bratio\s+(?:de\s+)?costes?\s*(?:/|e|sobre)\s*ingresos\b" + _SHORT_GAP + rf"(?P<percent>{_NUMBER})\s*%", _FLAGS),
+]
+
+# Solo redacción explícita de payback; "ROI" suele ir con un porcentaje y se deja al LLM
+_PAYBACK = re.compile(
+    r"\b(?:payback|retorno\s+de\s+(?:la\s+)?inversi[óo]n|recuperaci[óo]n\s+de\s+(?:la\s+)?inversi[óo]n|"
+    r"periodo\s+de\s+(?:retorno|recuperaci[óo]n)|amortiza(?:ci[óo]n|rse|r))\b" + _LABEL + _DURATION_GAP + _LABEL + _DURATION,
+    _FLAGS,
+)
+_DEVELOPMENT_TIME = re.compile(
+    r"\b(?:(?:tiempo|plazo|periodo|fase)\s+de\s+desarrollo|time[\s-]to[\s-]market|desarrollo\s+(?:de|en|durante|estimado\s+en)|"
+    r"lanzamiento\s+(?:en|tras)|comercializaci[óo]n\s+en)\b" + _LABEL + _GAP + _LABEL + _DURATION,
+    _FLAGS,
+)
+
+_TECH_RISK = re.compile(r"\briesgo\s+(?:t[ée]cnico|tecnol[óo]gico)\s*(?::|es|ser[áa]|se\s+considera|=)?\s*" + _LEVEL, _FLAGS)
+_MARKET_RISK = re.compile(r"\briesgo\s+(?:de\s+|del\s+)?(?:mercado|comercial)\s*(?::|es|ser[áa]|se\s+considera|=)?\s*" + _LEVEL, _FLAGS)
+_ALIGNMENT_LEVEL = re.compile(r"\balineaci[óo]n\s+estrat[ée]gica\s*(?::|es|=)?\s*" + _LEVEL, _FLAGS)
+
+# Puntuaciones explícitas sobre 5 o sobre 10 ("alineación estratégica: 4/5")
+_OUT_OF = rf"(?P<score>{_NUMBER})\s*(?:/|sobre|de)\s*(?P<scale>5|10)\b"
+_ALIGNMENT_SCORE = re.compile(r"\balineaci[óo]n\s+estrat[ée]gica\b" + _SHORT_GAP + _OUT_OF, _FLAGS)
+_OVERALL_SCORE = re.compile(
+    r"\b(?:valoraci[óo]n|evaluaci[óo]n|puntuaci[óo]n)\s+(?:global|general|cualitativa|final)\b" + _SHORT_GAP + _OUT_OF,
+    _FLAGS,
+)
+
+_LEVEL_SCORES = {
+    "muy alto": 1.0, "alto": 1.5, "alta": 1.5, "elevado": 1.5,
+    "medio": 3.0, "media": 3.0, "moderado": 3.0,
+    "bajo": 4.5, "baja": 4.5, "reducido": 4.5, "muy bajo": 5.0,
+}
+
+# Millones de euros por unidad de magnitud
+_MAGNITUDES = {
+    None: 1e-6, "mil millones": 1000.0, "bn": 1000.0, "b": 1000.0,
+    "millones": 1.0, "mill.": 1.0, "mm": 1.0, "m": 1.0,
+    "miles": 1e-3, "mil": 1e-3, "k": 1e-3,
+}
+
+_MONTHS_PER_UNIT = {"mes": 1.0, "año": 12.0, "ano": 12.0, "trimestre": 3.0, "semana": 0.25}
+
+
+def parse_number(text):
+    """Convierte '2.000', '3,5', '1,250.5' o '1.250,5' a float."""
+    text = text.strip()
+    if "." in text and "," in text:
+        decimal = "." if text.rfind(".") > text.rfind(",") else ","
+        thousands = "," if decimal == "." else "."
+        return float(text.replace(thousands, "").replace(decimal, "."))
+    for sep in (".", ","):
+        if sep in text:
+            groups = text.split(sep)
+            # "2.000" o "1.000.000" son miles; "3,5" o "2.5" son decimales
+            if all(len(group) == 3 for group in groups[1:]) and (sep == "." or len(groups) > 2):
+                return float(text.replace(sep, ""))
+            return float(text.replace(sep, "."))
+    return float(text)
+
+
+def _amount_millions(match):
+    value = parse_number(match.group("amount"))
+    magnitude = match.group("magnitude")
+    magnitude = re.sub(r"\s+", " ", magnitude.lower()) if magnitude else None
+    return value * _MAGNITUDES.get(magnitude, 1.0)
+
+
+def _duration_months(match):
+    start = parse_number(match.group("duration"))
+    end = parse_number(match.group("duration_to")) if match.group("duration_to") else start
+    unit = match.group("unit").lower().rstrip("s")
+    unit = "mes" if unit.startswith("mes") else unit
+    return (start + end) / 2 * _MONTHS_PER_UNIT.get(unit, 1.0)
+
+
+def _log_scale(value, low, high):
+    """1 por debajo de `low`, 5 por encima de `high` e interpolación logarítmica entre ambos."""
+    if value <= 0:
+        return None
+    return round(max(1.0, min(5.0, 1 + 4 * math.log(value / low) / math.log(high / low))), 2)
+
+
+def _linear_scale(value, worst, best):
+    """1 en `worst`, 5 en `best` (en cualquier sentido) e interpolación lineal entre ambos."""
+    return round(max(1.0, min(5.0, 1 + 4 * (value - worst) / (best - worst))), 2)
+
+
+def _snippet(match):
+    return re.sub(r"\s+", " ", match.group(0)).strip()[:150]
+
+
+def _first_amount(pattern, text, gap_exclude):
+    for match in pattern.finditer(text):
+        if not gap_exclude.search(match.group("gap")):
+            return match
+    return None
+
+
+def extract_metrics_by_rules(text):
+    """
+    Busca en el texto valores explícitos de las métricas de extract_metrics_from_analysis.
+
+    Retorna (valores, evidencias): valores con la misma escala que el prompt del LLM
+    (TRL entero 1-9, el resto 1-5 con decimales) y, para cada métrica encontrada, el
+    fragmento de texto del que sale. Las métricas no encontradas no aparecen.
+    """
+    values, evidence = {}, {}
+    if not text or not isinstance(text, str):
+        return values, evidence
+
+    def found(key, value, match):
+        if value is not None and key not in values:
+            values[key] = value
+            evidence[key] = _snippet(match)
+
+    # TRL: rango explícito, etiquetas actual/objetivo o un único TRL mencionado
+    match = _TRL_RANGE.search(text)
+    if match and int(match.group("start")) <= int(match.group("end")):
+        found("trl_inicial", int(match.group("start")), match)
+        found("trl_final", int(match.group("end")), match)
+    for key, patterns in (("trl_inicial", _TRL_INITIAL), ("trl_final", _TRL_FINAL)):
+        for pattern in patterns:
+            match = pattern.search(text)
+            if match:
+                found(key, int(match.group("value")), match)
+                break
+    if "trl_inicial" not in values:
+        # El único TRL mencionado (aparte del objetivo, si lo hay) es el actual
+        mentions = [m for m in _TRL_ANY.finditer(text) if int(m.group("value")) != values.get("trl_final")]
+        if mentions and len({m.group("value") for m in mentions}) == 1:
+            found("trl_inicial", int(mentions[0].group("value")), mentions[0])
+    if values.get("trl_final", 9) < values.get("trl_inicial", 1):
+        values.pop("trl_final")
+        evidence.pop("trl_final")
+
+    # Importes: tamaño de mercado (1 = <0,5 B€, 5 = >10 B€) e ingresos (1 = <0,5 M€, 5 = >20 M€)
+    match = _first_amount(_MARKET_SIZE, text, _MARKET_GAP_EXCLUDE)
+    if match:
+        found("tamano_mercado", _log_scale(_amount_millions(match) / 1000, 0.5, 10), match)
+    match = _first_amount(_REVENUE, text, _REVENUE_GAP_EXCLUDE)
+    if match:
+        found("ingresos_previstos", _log_scale(_amount_millions(match), 0.5, 20), match)
+
+    # Porcentajes: costes sobre ingresos (1 = >75%, 5 = <10%), solo si el texto los relaciona
+    for pattern in _COST_RATIO:
+        match = pattern.search(text)
+        if match:
+            found("ratio_costes_ingresos", _linear_scale(parse_number(match.group("percent")), 75, 10), match)
+            break
+
+    # Horizontes temporales: payback (1 = >5 años, 5 = <1 año) y desarrollo (1 = >3 años, 5 = <6 meses)
+    match = _PAYBACK.search(text)
+    if match:
+        found("payback_roi", _linear_scale(_duration_months(match), 60, 12), match)
+    match = _DEVELOPMENT_TIME.search(text)
+    if match:
+        found("tiempo_desarrollo", _linear_scale(_duration_months(match), 36, 6), match)
+
+    # Niveles cualitativos explícitos (alto = 1,5 ... bajo = 4,5; en alineación la escala es directa)
+    for key, pattern in (("riesgo_tecnico", _TECH_RISK), ("riesgo_mercado", _MARKET_RISK)):
+        match = pattern.search(text)
+        if match:
+            found(key, _LEVEL_SCORES[re.sub(r"\s+", " ", match.group("level").lower())], match)
+    match = _ALIGNMENT_SCORE.search(text) or _ALIGNMENT_LEVEL.search(text)
+    if match:
+        if "score" in match.groupdict():
+            found("alineacion_estrategica", _out_of_five(match), match)
+        else:
+            found("alineacion_estrategica", round(6 - _LEVEL_SCORES[re.sub(r"\s+", " ", match.group("level").lower())], 2), match)
+    match = _OVERALL_SCORE.search(text)
+    if match:
+        found("evaluacion_cualitativa", _out_of_five(match), match)
+
+    return values, evidence
+
+
+def _out_of_five(match):
+    score = parse_number(match.group("score")) * 5 / float(match.group("scale"))
+    return round(max(1.0, min(5.0, score)), 2)
+
+
+_stats_lock = threading.Lock()
+_stats = {}
+
+
+def reset_fast_path_stats():
+    with _stats_lock:
+        _stats.clear()
+        _stats.update({
+            "analyses": 0,
+            "hits": {key: 0 for key in RULE_METRICS},
+            "llm_calls": 0,
+            "llm_skipped": 0,
+            "llm_seconds": 0.0,
+            "llm_fields": 0,
+        })
+
+
+reset_fast_path_stats()
+
+
+def record_fast_path(values, llm_seconds=None, llm_fields=0):
+    """
+    Registra un análisis procesado: métricas resueltas por reglas y, si hubo llamada
+    al LLM, su duración y cuántas métricas se le pidieron.
+    """
+    with _stats_lock:
+        _stats["analyses"] += 1
+        for key in values:
+            if key in _stats["hits"]:
+                _stats["hits"][key] += 1
+        if llm_seconds is None:
+            _stats["llm_skipped"] += 1
+        else:
+            _stats["llm_calls"] += 1
+            _stats["llm_seconds"] += llm_seconds
+            _stats["llm_fields"] += llm_fields
+
+
+def get_fast_path_stats():
+    """
+    Resumen acumulado: análisis procesados, tasa de acierto por métrica, llamadas al
+    LLM evitadas, latencia media de las restantes y métricas pedidas por llamada.
+    """
+    with _stats_lock:
+        analyses = _stats["analyses"]
+        calls = _stats["llm_calls"]
+        return {
+            "analyses": analyses,
+            "hit_rate": {key: (hits / analyses if analyses else 0.0) for key, hits in _stats["hits"].items()},
+            "llm_calls": calls,
+            "llm_skipped": _stats["llm_skipped"],
+            "llm_mean_seconds": _stats["llm_seconds"] / calls if calls else 0.0,
+            "llm_mean_fields": _stats["llm_fields"] / calls if calls else 0.0,
+        }
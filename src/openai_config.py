@@ -3,7 +3,13 @@ import warnings
 warnings.filterwarnings('ignore')
 
 import os
-from openai import AzureOpenAI
+import json
+import asyncio
+import weakref
+import threading
+from openai import AzureOpenAI, AsyncAzureOpenAI
+from llm_client import build_llm_client, build_async_llm_client
+from llm_gateway import LLM_MAX_CONCURRENCY, get_gateway
 
 # Configuración de Azure OpenAI
 #AZURE_OPENAI_ENDPOINT = "end pointt"
@@ -26,6 +32,53 @@ AZURE_OPENAI_API_KEY = os.getenv("AZURE_OPENAI_API_KEY")
 DEPLOYMENT_NAME = os.getenv("DEPLOYMENT_NAME", "gpt-o3-mini")  # Valor por defecto
 API_VERSION = os.getenv("API_VERSION", "2025-01-31-preview")   # Valor por defecto
 
+# Modo de acceso al LLM:
+#   live   -> Azure OpenAI real (por defecto)
+#   record -> Azure OpenAI real + grabación de cada petición/respuesta en cassettes
+#   replay -> sin red, respuestas leídas de los cassettes (llm_cassettes.py)
+#   fake   -> servidor local que emula chat-completions (llm_fake_server.py)
+LLM_MODE = os.getenv("LLM_MODE", "live").lower()
+LLM_FAKE_SERVER_URL = os.getenv("LLM_FAKE_SERVER_URL", "http://127.0.0.1:8765")
+
+# Enrutado por clase de tarea: las tareas cortas (palabras clave, descripciones
+# breves, términos de sector, resúmenes) van a un deployment pequeño y rápido y
+# cada ruta tiene su propio límite de concurrencia en el gateway, para que un
+# lote de análisis pesados no deje esperando a las llamadas de 20 tokens.
+# LLM_ROUTES admite un JSON que sustituye o amplía las rutas, p. ej.
+#   {"fast": {"deployment": "gpt-4o-mini", "max_concurrency": 12}}
+LLM_FAST_DEPLOYMENT = os.getenv("LLM_FAST_DEPLOYMENT", DEPLOYMENT_NAME)
+
+LLM_ROUTES = {
+    "heavy": {"deployment": DEPLOYMENT_NAME, "max_concurrency": max(1, LLM_MAX_CONCURRENCY - 4)},
+    "fast": {"deployment": LLM_FAST_DEPLOYMENT, "max_concurrency": 8},
+}
+try:
+    for _route, _cfg in json.loads(os.getenv("LLM_ROUTES", "{}")).items():
+        LLM_ROUTES[_route] = {**LLM_ROUTES.get(_route, {}), **_cfg}
+except (ValueError, AttributeError) as e:
+    print(f"⚠️ LLM_ROUTES no es un JSON válido, se usan las rutas por defecto: {str(e)}")
+
+# Clase de tarea (parámetro `task` de create) -> ruta
+TASK_ROUTES = {
+    "keywords": "fast",
+    "brief": "fast",
+    "sector_terms": "fast",
+    "summary": "fast",
+    "analysis": "heavy",
+    "report": "heavy",
+}
+
+if LLM_MODE not in ("live", "record", "replay", "fake"):
+    raise ValueError(f"❌ ERROR: LLM_MODE no válido: {LLM_MODE} (live, record, replay o fake)")
+
+# En los modos offline no hacen falta credenciales reales
+if LLM_MODE == "fake":
+    AZURE_OPENAI_ENDPOINT = LLM_FAKE_SERVER_URL
+    AZURE_OPENAI_API_KEY = AZURE_OPENAI_API_KEY or "fake-key"
+elif LLM_MODE == "replay":
+    AZURE_OPENAI_ENDPOINT = AZURE_OPENAI_ENDPOINT or "http://replay.invalid"
+    AZURE_OPENAI_API_KEY = AZURE_OPENAI_API_KEY or "replay-key"
+
 # Verificar que las variables obligatorias estén configuradas
 if not AZURE_OPENAI_ENDPOINT:
     raise ValueError("❌ ERROR: La variable de entorno AZURE_OPENAI_ENDPOINT no está configurada")
@@ -35,29 +88,101 @@ if not AZURE_OPENAI_API_KEY:
 
 # Mostrar configuración (sin mostrar la clave completa por seguridad)
 print(f"🔧 Configuración Azure OpenAI:")
+print(f"   - Modo: {LLM_MODE}")
 print(f"   - Endpoint: {AZURE_OPENAI_ENDPOINT}")
 print(f"   - API Key: {AZURE_OPENAI_API_KEY[:10]}...{AZURE_OPENAI_API_KEY[-4:] if len(AZURE_OPENAI_API_KEY) > 14 else '***'}")
 print(f"   - Deployment: {DEPLOYMENT_NAME}")
+print(f"   - Rutas: " + ", ".join(f"{r}={c.get('deployment')}" for r, c in LLM_ROUTES.items()))
 print(f"   - API Version: {API_VERSION}")
 
-# Inicializar el cliente de Azure OpenAI
-try:
-    client = AzureOpenAI(
+
+def _create_raw_client(use_async=False):
+    """Crea el cliente base (Azure real, grabador o reproductor) según LLM_MODE"""
+    if LLM_MODE == "replay":
+        from llm_cassettes import ReplayClient, AsyncReplayClient, get_cassette_store
+        store = get_cassette_store()
+        print(f"📼 Reproduciendo respuestas LLM desde {store.cassette_dir}")
+        return AsyncReplayClient(store) if use_async else ReplayClient(store)
+
+    # Sin azure_deployment fijo: el deployment de cada llamada lo decide `model`,
+    # que es lo que permite enrutar tareas a deployments distintos
+    client_class = AsyncAzureOpenAI if use_async else AzureOpenAI
+    raw = client_class(
         api_key=AZURE_OPENAI_API_KEY,
         api_version=API_VERSION,
         azure_endpoint=AZURE_OPENAI_ENDPOINT,
-        azure_deployment=DEPLOYMENT_NAME,
         max_retries=3
     )
+    if LLM_MODE == "record":
+        from llm_cassettes import RecordingClient, AsyncRecordingClient, get_cassette_store
+        store = get_cassette_store()
+        print(f"📼 Grabando respuestas LLM en {store.cassette_dir}")
+        return AsyncRecordingClient(raw, store) if use_async else RecordingClient(raw, store)
+    return raw
+
+
+# Inicializar el cliente de Azure OpenAI
+try:
+    raw_client = _create_raw_client()
+    # Todas las llamadas pasan por las capas comunes (caché en disco, etc.)
+    client = build_llm_client(raw_client, LLM_ROUTES, TASK_ROUTES)
+    for _route, _cfg in LLM_ROUTES.items():
+        get_gateway().set_route_limit(_route, _cfg.get("max_concurrency"))
     print("✅ Cliente Azure OpenAI inicializado correctamente")
 except Exception as e:
     print(f"❌ Error inicializando cliente Azure OpenAI: {str(e)}")
     raise
 
+# Clientes asíncronos, uno por event loop (se crean bajo demanda, solo los usan las
+# rutas async). El cliente HTTP de AsyncAzureOpenAI queda ligado al loop en el que se
+# usa: compartirlo entre varios asyncio.run() falla con "Event loop is closed".
+_async_clients = weakref.WeakKeyDictionary()
+_async_clients_lock = threading.Lock()
+
 def get_openai_client():
     """Retorna el cliente de OpenAI configurado"""
     return client
 
+def get_async_openai_client():
+    """
+    Retorna el cliente asíncrono de OpenAI (AsyncAzureOpenAI) con las mismas capas que el
+    síncrono, propio del event loop en curso (se descarta cuando el loop desaparece).
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    with _async_clients_lock:
+        async_client = _async_clients.get(loop) if loop is not None else None
+        if async_client is None:
+            async_client = build_async_llm_client(_create_raw_client(use_async=True), LLM_ROUTES, TASK_ROUTES)
+            if loop is not None:
+                _async_clients[loop] = async_client
+    return async_client
+
 def get_deployment_name():
     """Retorna el nombre del deployment"""
-    return DEPLOYMENT_NAME 
\ No newline at end of file
+    return DEPLOYMENT_NAME
+
+
+def get_deployment_for(task):
+    """Retorna el deployment al que se enruta una clase de tarea (el principal si no tiene ruta)"""
+    route = LLM_ROUTES.get(TASK_ROUTES.get(task, task)) or {}
+    return route.get("deployment") or DEPLOYMENT_NAME
+
+
+def print_route_stats():
+    """Muestra latencias y espera en cola por ruta a partir de la telemetría"""
+    from llm_telemetry import summarize_telemetry
+    summary = summarize_telemetry(group_by="route")
+    if not summary:
+        return
+    print("\n🛣️ Rutas LLM — latencias en segundos")
+    print(f"{'Ruta':<10}{'Deployment':<24}{'N':>6}{'p50':>8}{'p95':>8}{'Cola95':>8}{'Límite':>8}")
+    for route, s in sorted(summary.items(), key=lambda item: str(item[0])):
+        cfg = LLM_ROUTES.get(route, {})
+        print(
+            f"{str(route):<10}{str(cfg.get('deployment', '-'))[:23]:<24}{s['calls']:>6}"
+            f"{s['latency_p50']:>8.2f}{s['latency_p95']:>8.2f}{s['queue_wait_p95']:>8.2f}"
+            f"{str(cfg.get('max_concurrency', '-')):>8}"
+        )
@@ -258,7 +258,7 @@ def save_payoff_matrix_to_file(ranked_ideas, output_path=None, width=10, height=
     
     return output_path
 
-def add_payoff_matrix_to_pdf(pdf, ranked_ideas, y_position=None):
+def add_payoff_matrix_to_pdf(pdf, ranked_ideas, y_position=None, dpi=300):
     """
     Añade la matriz de payoff a un PDF existente.
     
@@ -266,12 +266,13 @@ def add_payoff_matrix_to_pdf(pdf, ranked_ideas, y_position=None):
         pdf: objeto FPDF
         ranked_ideas: lista de ideas rankeadas
         y_position: posición Y donde insertar la matriz (optional)
+        dpi: resolución de la imagen de la matriz
         
     Returns:
         y_position actualizada después de insertar la matriz
     """
     # Generar matriz de payoff
-    matrix_path = save_payoff_matrix_to_file(ranked_ideas)
+    matrix_path = save_payoff_matrix_to_file(ranked_ideas, dpi=dpi)
     
     # Si no se especifica posición, usar la actual
     if y_position is None:
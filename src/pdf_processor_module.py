@@ -13,7 +13,9 @@ import json
 import traceback
 
 # Importar configuración centralizada de OpenAI
-from openai_config import get_openai_client, get_deployment_name
+from openai_config import get_openai_client, get_async_openai_client, get_deployment_name
+from llm_gateway import JobThreadPoolExecutor, llm_job
+from llm_telemetry import llm_context
 
 # Obtener el cliente y configuración de OpenAI desde el módulo centralizado
 client = get_openai_client()
@@ -205,7 +207,7 @@ async def enhance_idea_with_ai(idea, context):
         Puntos clave: [lista]
         """
         
-        response = await client.chat.completions.create(
+        response = await get_async_openai_client().chat.completions.create(
             model=DEPLOYMENT_NAME,
             messages=[
                 {"role": "system", "content": "Eres un experto en análisis y mejora de ideas innovadoras."},
@@ -258,7 +260,7 @@ async def process_and_structure_idea(idea):
         TEXTO: [un párrafo único que combine toda la información sin bullet points ni listas]
         """
 
-        response = client.chat.completions.create(
+        response = await get_async_openai_client().chat.completions.create(
             model=DEPLOYMENT_NAME,
             messages=[
                 {"role": "system", "content": "Eres un experto en redacción técnica. Reformatea ideas manteniendo su esencia técnica pero presentándolas en un formato simple de título y párrafo único."},
@@ -372,185 +374,236 @@ def clean_text_for_pdf(text):
     
     return cleaned_text
 
-def process_idea_sync(idea, context=None):
+def _prepare_idea_request(idea, context=None):
     """
-    Procesa una idea extrayendo SOLO el título original (breve) y usando el CONTENIDO descriptivo
-    del PDF original como base para generar un texto fluido y coherente con OpenAI.
+    Parte de process_idea_sync previa a la llamada a OpenAI: separa el título del
+    contenido, limpia los marcadores y construye los mensajes.
+    
+    Returns:
+        (idea_resultante, None) si no hace falta llamar al LLM, o
+        (None, (real_title, clean_content, messages)) si hay que llamarlo
     """
+    # Verificar que tenemos contenido para procesar
+    idea_text = str(idea.get('idea', '')).strip()
+    if not idea_text or len(idea_text) < 10:
+        return idea, None
+
+    # Primera etapa: Extracción simple y directa del título
+    # Buscar el título en formato "Idea X: [título]" o similar
+    title_pattern = r'^(Idea\s*\d+[\.:]\s*|\d+[\.:]\s*)([^-\n]+)'
+    title_match = re.search(title_pattern, idea_text, re.IGNORECASE)
+
+    if title_match:
+        # IMPORTANTE: Extraer SOLO el título real (lo que viene después de "Idea X:")
+        # y NO incluir "Idea X:" en el título
+        prefix = title_match.group(1).strip()  # "Idea X:" o "X."
+        real_title = title_match.group(2).strip()  # El título real
+
+        # Extraer el contenido (todo lo que viene después del título completo)
+        title_end = title_match.end()
+        content = idea_text[title_end:].strip()
+
+        # Para debugging
+        print(f"Prefijo: '{prefix}', Título real: '{real_title}'")
+    else:
+        # Si no tiene el formato estándar, tomar la primera línea como título
+        if "\n" in idea_text:
+            parts = idea_text.split("\n", 1)
+            real_title = parts[0].strip()
+            content = parts[1].strip()
+        else:
+            # Si no hay separación, usar todo como título y no hay contenido
+            real_title = idea_text
+            content = ""
+
+    # IMPORTANTE: Si no hay contenido suficiente, NO generar uno a partir del título
+    # En lugar de esto, usar el título como está y dejarlo sin descripción adicional
+    if not content or len(content) < 5:
+        print(f"⚠️ No hay contenido descriptivo suficiente después del título: '{real_title[:50]}...'")
+        # Devolver idea con solo el título real, sin inventar una descripción
+        return {
+            'idea': real_title,
+            'analysis': str(idea.get('analysis', '')).strip(),
+            'metrics': idea.get('metrics', {})
+        }, None
+
+    # Segunda etapa: Pre-procesamiento directo del contenido original para eliminar marcadores
+    # Eliminar "- Descripción general:" y otros marcadores similares
+    content = re.sub(r'-\s*Descripción\s+general\s*:\s*', '', content, flags=re.IGNORECASE)
+    content = re.sub(r'-\s*Mecanismo\s+de\s+acción\s*:\s*', '', content, flags=re.IGNORECASE)
+    content = re.sub(r'-\s*Aplicación[^:]*:\s*', '', content, flags=re.IGNORECASE)
+    content = re.sub(r'-\s*Ventajas\s*:\s*', '', content, flags=re.IGNORECASE)
+    content = re.sub(r'-\s*Desafíos\s*:\s*', '', content, flags=re.IGNORECASE)
+    content = re.sub(r'-\s*\w+(?:\s+\w+){0,3}\s*:\s*', '', content, flags=re.IGNORECASE)  # Patrón general para otros marcadores
+
+    # Eliminar guiones al inicio de líneas y normalizar espacios
+    content = re.sub(r'(?:^|\n)\s*-\s*', ' ', content)
+    content = re.sub(r'\s+', ' ', content).strip()
+
+    # Verificación de seguridad: asegurarnos de que hay contenido real para procesar
+    if not content or len(content) < 10:
+        print(f"⚠️ Después de limpiar marcadores, no queda contenido descriptivo para: '{real_title[:50]}...'")
+        # Devolver solo el título real en este caso
+        return {
+            'idea': real_title,
+            'analysis': str(idea.get('analysis', '')).strip(),
+            'metrics': idea.get('metrics', {})
+        }, None
+
+    print(f"✓ Contenido descriptivo encontrado ({len(content)} caracteres) para título: '{real_title[:40]}...'")
+    print(f"   Primeros 80 caracteres del contenido: '{content[:80]}...'")
+
+    # Tercera etapa: usar OpenAI para mejorar el CONTENIDO extraído del PDF
+    clean_content = clean_text_for_pdf(content)
+
+    # Usar OpenAI para reformatear el contenido en un párrafo cohesivo
+    prompt = f"""
+    Reescribe el siguiente contenido técnico en un párrafo único y cohesivo,
+    manteniendo todos los detalles técnicos importantes:
+
+    {clean_content}
+
+    Instrucciones:
+    1. NO introduzcas ni menciones etiquetas como "Descripción general", "Mecanismo de acción", etc.
+    2. El resultado debe ser UN SOLO PÁRRAFO cohesivo sin subdivisiones
+    3. Mantén TODOS los detalles técnicos y valores numéricos exactos del texto original
+    4. Usa lenguaje sencillo y profesional
+    5. NO agregues información extra que no esté explícitamente en el texto original
+    """
+
+    if context and isinstance(context, str) and len(context.strip()) > 0:
+        prompt += f"\n\nContexto adicional (APLICA ESTE CONTEXTO ESPECÍFICAMENTE A LA IDEA '{real_title}'): {context.strip()}\n\n- Asegúrate de explicar cómo esta idea específica se relaciona con el contexto proporcionado.\n- IMPORTANTE: Integra conceptos del contexto de manera relevante y específica para esta idea en particular."
+
+    messages = [
+        {
+            "role": "system", 
+            "content": "Tu tarea es convertir un texto técnico fragmentado en un párrafo cohesivo y bien estructurado, sin usar marcadores ni etiquetas. No debes añadir información nueva pero DEBES integrar el contexto proporcionado de manera específica para esta idea en particular. Mantén TODOS los detalles técnicos, cifras y valores específicos del texto original y relaciona la idea con el contexto de manera relevante."
+        },
+        {"role": "user", "content": prompt}
+    ]
+    return None, (real_title, clean_content, messages)
+
+def _build_processed_idea(idea, real_title, clean_content, response):
+    """
+    Parte de process_idea_sync posterior a la llamada a OpenAI: compone la idea final
+    (título real + contenido reescrito) a partir de la respuesta.
+    """
+    # Extraer el contenido reescrito
+    if response and response.choices and response.choices[0].message:
+        rewritten_content = response.choices[0].message.content.strip()
+
+        # Limpieza final para evitar problemas de codificación
+        clean_rewritten_content = clean_text_for_pdf(rewritten_content)
+
+        # Verificar que el contenido reescrito no esté vacío
+        if not clean_rewritten_content:
+            clean_rewritten_content = "No se pudo procesar el contenido descriptivo para esta idea."
+
+        # Devolver la idea formateada: título real + contenido reescrito
+        # Asegurar que hay exactamente un doble salto de línea entre título y contenido
+        formatted_text = f"{real_title.strip()}\n\n{clean_rewritten_content.strip()}"
+
+        # Log de debugging
+        print(f"✅ Idea procesada: Título real: '{real_title[:30]}...' + Contenido reescrito: '{clean_rewritten_content[:30]}...'")
+
+        return {
+            'idea': formatted_text,
+            'analysis': str(idea.get('analysis', '')).strip(),
+            'metrics': idea.get('metrics', {})
+        }
+    else:
+        # Si la API falla, devolver el título y el contenido pre-procesado
+        formatted_text = f"{real_title.strip()}\n\n{clean_content.strip()}"
+        print(f"⚠️ Usando contenido pre-procesado (sin AI) debido a fallo de API: '{real_title[:30]}...'")
+
+        return {
+            'idea': formatted_text,
+            'analysis': str(idea.get('analysis', '')).strip(),
+            'metrics': idea.get('metrics', {})
+        }
+
+def _fallback_processed_idea(idea):
+    """En caso de error, intenta devolver al menos el título de la idea."""
     try:
-        # Verificar que tenemos contenido para procesar
         idea_text = str(idea.get('idea', '')).strip()
-        if not idea_text or len(idea_text) < 10:
-            return idea
 
-        # Primera etapa: Extracción simple y directa del título
-        # Buscar el título en formato "Idea X: [título]" o similar
-        title_pattern = r'^(Idea\s*\d+[\.:]\s*|\d+[\.:]\s*)([^-\n]+)'
-        title_match = re.search(title_pattern, idea_text, re.IGNORECASE)
-        
-        if title_match:
-            # IMPORTANTE: Extraer SOLO el título real (lo que viene después de "Idea X:")
-            # y NO incluir "Idea X:" en el título
-            prefix = title_match.group(1).strip()  # "Idea X:" o "X."
-            real_title = title_match.group(2).strip()  # El título real
-            
-            # Extraer el contenido (todo lo que viene después del título completo)
-            title_end = title_match.end()
-            content = idea_text[title_end:].strip()
-            
-            # Para debugging
-            print(f"Prefijo: '{prefix}', Título real: '{real_title}'")
-        else:
-            # Si no tiene el formato estándar, tomar la primera línea como título
-            if "\n" in idea_text:
-                parts = idea_text.split("\n", 1)
-                real_title = parts[0].strip()
-                content = parts[1].strip()
+        # Intentar extraer título y contenido de forma básica
+        if "\n" in idea_text:
+            title, content = idea_text.split("\n", 1)
+            title = title.strip()
+            content = content.strip()
+
+            # Si hay contenido, formatearlo correctamente
+            if content:
+                formatted_text = f"{title}\n\n{content}"
             else:
-                # Si no hay separación, usar todo como título y no hay contenido
-                real_title = idea_text
-                content = ""
-
-        # IMPORTANTE: Si no hay contenido suficiente, NO generar uno a partir del título
-        # En lugar de esto, usar el título como está y dejarlo sin descripción adicional
-        if not content or len(content) < 5:
-            print(f"⚠️ No hay contenido descriptivo suficiente después del título: '{real_title[:50]}...'")
-            # Devolver idea con solo el título real, sin inventar una descripción
-            return {
-                'idea': real_title,
-                'analysis': str(idea.get('analysis', '')).strip(),
-                'metrics': idea.get('metrics', {})
-            }
-
-        # Segunda etapa: Pre-procesamiento directo del contenido original para eliminar marcadores
-        # Eliminar "- Descripción general:" y otros marcadores similares
-        content = re.sub(r'-\s*Descripción\s+general\s*:\s*', '', content, flags=re.IGNORECASE)
-        content = re.sub(r'-\s*Mecanismo\s+de\s+acción\s*:\s*', '', content, flags=re.IGNORECASE)
-        content = re.sub(r'-\s*Aplicación[^:]*:\s*', '', content, flags=re.IGNORECASE)
-        content = re.sub(r'-\s*Ventajas\s*:\s*', '', content, flags=re.IGNORECASE)
-        content = re.sub(r'-\s*Desafíos\s*:\s*', '', content, flags=re.IGNORECASE)
-        content = re.sub(r'-\s*\w+(?:\s+\w+){0,3}\s*:\s*', '', content, flags=re.IGNORECASE)  # Patrón general para otros marcadores
-        
-        # Eliminar guiones al inicio de líneas y normalizar espacios
-        content = re.sub(r'(?:^|\n)\s*-\s*', ' ', content)
-        content = re.sub(r'\s+', ' ', content).strip()
-
-        # Verificación de seguridad: asegurarnos de que hay contenido real para procesar
-        if not content or len(content) < 10:
-            print(f"⚠️ Después de limpiar marcadores, no queda contenido descriptivo para: '{real_title[:50]}...'")
-            # Devolver solo el título real en este caso
-            return {
-                'idea': real_title,
-                'analysis': str(idea.get('analysis', '')).strip(),
-                'metrics': idea.get('metrics', {})
-            }
-        
-        print(f"✓ Contenido descriptivo encontrado ({len(content)} caracteres) para título: '{real_title[:40]}...'")
-        print(f"   Primeros 80 caracteres del contenido: '{content[:80]}...'")
-
-        # Tercera etapa: usar OpenAI para mejorar el CONTENIDO extraído del PDF
-        clean_content = clean_text_for_pdf(content)
-        
-        # Usar OpenAI para reformatear el contenido en un párrafo cohesivo
-        prompt = f"""
-        Reescribe el siguiente contenido técnico en un párrafo único y cohesivo,
-        manteniendo todos los detalles técnicos importantes:
-        
-        {clean_content}
-        
-        Instrucciones:
-        1. NO introduzcas ni menciones etiquetas como "Descripción general", "Mecanismo de acción", etc.
-        2. El resultado debe ser UN SOLO PÁRRAFO cohesivo sin subdivisiones
-        3. Mantén TODOS los detalles técnicos y valores numéricos exactos del texto original
-        4. Usa lenguaje sencillo y profesional
-        5. NO agregues información extra que no esté explícitamente en el texto original
-        """
-        
-        if context and isinstance(context, str) and len(context.strip()) > 0:
-            prompt += f"\n\nContexto adicional (APLICA ESTE CONTEXTO ESPECÍFICAMENTE A LA IDEA '{real_title}'): {context.strip()}\n\n- Asegúrate de explicar cómo esta idea específica se relaciona con el contexto proporcionado.\n- IMPORTANTE: Integra conceptos del contexto de manera relevante y específica para esta idea en particular."
+                formatted_text = title
+        else:
+            # Si no hay salto de línea, usar todo como título
+            formatted_text = idea_text
+
+        # Limpiar para evitar problemas de codificación
+        formatted_text = clean_text_for_pdf(formatted_text)
+
+        return {
+            'idea': formatted_text,
+            'analysis': str(idea.get('analysis', '')).strip(),
+            'metrics': idea.get('metrics', {})
+        }
+    except:
+        # Si todo falla, devolver la idea original sin cambios
+        return idea
+
+def process_idea_sync(idea, context=None):
+    """
+    Procesa una idea extrayendo SOLO el título original (breve) y usando el CONTENIDO descriptivo
+    del PDF original como base para generar un texto fluido y coherente con OpenAI.
+    """
+    try:
+        result, request = _prepare_idea_request(idea, context)
+        if request is None:
+            return result
+        real_title, clean_content, messages = request
 
         # Usar la API de OpenAI con una temperatura muy baja para mayor fidelidad al texto original
         response = client.chat.completions.create(
             model=DEPLOYMENT_NAME,
-            messages=[
-                {
-                    "role": "system", 
-                    "content": "Tu tarea es convertir un texto técnico fragmentado en un párrafo cohesivo y bien estructurado, sin usar marcadores ni etiquetas. No debes añadir información nueva pero DEBES integrar el contexto proporcionado de manera específica para esta idea en particular. Mantén TODOS los detalles técnicos, cifras y valores específicos del texto original y relaciona la idea con el contexto de manera relevante."
-                },
-                {"role": "user", "content": prompt}
-            ],
+            messages=messages,
             temperature=0.1,  # Temperatura muy baja = seguir instrucciones estrictamente
             max_tokens=1000
         )
         
-        # Extraer el contenido reescrito
-        if response and response.choices and response.choices[0].message:
-            rewritten_content = response.choices[0].message.content.strip()
-            
-            # Limpieza final para evitar problemas de codificación
-            clean_rewritten_content = clean_text_for_pdf(rewritten_content)
-            
-            # Verificar que el contenido reescrito no esté vacío
-            if not clean_rewritten_content:
-                clean_rewritten_content = "No se pudo procesar el contenido descriptivo para esta idea."
-            
-            # Devolver la idea formateada: título real + contenido reescrito
-            # Asegurar que hay exactamente un doble salto de línea entre título y contenido
-            formatted_text = f"{real_title.strip()}\n\n{clean_rewritten_content.strip()}"
-            
-            # Log de debugging
-            print(f"✅ Idea procesada: Título real: '{real_title[:30]}...' + Contenido reescrito: '{clean_rewritten_content[:30]}...'")
-            
-            return {
-                'idea': formatted_text,
-                'analysis': str(idea.get('analysis', '')).strip(),
-                'metrics': idea.get('metrics', {})
-            }
-        else:
-            # Si la API falla, devolver el título y el contenido pre-procesado
-            formatted_text = f"{real_title.strip()}\n\n{clean_content.strip()}"
-            print(f"⚠️ Usando contenido pre-procesado (sin AI) debido a fallo de API: '{real_title[:30]}...'")
-            
-            return {
-                'idea': formatted_text,
-                'analysis': str(idea.get('analysis', '')).strip(),
-                'metrics': idea.get('metrics', {})
-            }
+        return _build_processed_idea(idea, real_title, clean_content, response)
     except Exception as e:
         print(f"❌ Error procesando idea: {str(e)}")
         traceback.print_exc()
+        return _fallback_processed_idea(idea)
+
+async def process_idea_async(idea, context=None):
+    """
+    Versión asíncrona de process_idea_sync: misma lógica, pero la llamada a OpenAI
+    se hace con AsyncAzureOpenAI para no bloquear el event loop.
+    """
+    try:
+        result, request = _prepare_idea_request(idea, context)
+        if request is None:
+            return result
+        real_title, clean_content, messages = request
+
+        response = await get_async_openai_client().chat.completions.create(
+            model=DEPLOYMENT_NAME,
+            messages=messages,
+            temperature=0.1,
+            max_tokens=1000
+        )
         
-        # En caso de error, intentar devolver al menos el título
-        try:
-            idea_text = str(idea.get('idea', '')).strip()
-            
-            # Intentar extraer título y contenido de forma básica
-            if "\n" in idea_text:
-                title, content = idea_text.split("\n", 1)
-                title = title.strip()
-                content = content.strip()
-                
-                # Si hay contenido, formatearlo correctamente
-                if content:
-                    formatted_text = f"{title}\n\n{content}"
-                else:
-                    formatted_text = title
-            else:
-                # Si no hay salto de línea, usar todo como título
-                formatted_text = idea_text
-            
-            # Limpiar para evitar problemas de codificación
-            formatted_text = clean_text_for_pdf(formatted_text)
-            
-            return {
-                'idea': formatted_text,
-                'analysis': str(idea.get('analysis', '')).strip(),
-                'metrics': idea.get('metrics', {})
-            }
-        except:
-            # Si todo falla, devolver la idea original sin cambios
-            return idea
+        return _build_processed_idea(idea, real_title, clean_content, response)
+    except Exception as e:
+        print(f"❌ Error procesando idea: {str(e)}")
+        traceback.print_exc()
+        return _fallback_processed_idea(idea)
 
+@llm_job("pdf")
 def batch_process_ideas(ideas, batch_size=12, progress_callback=None, context=None):
     """
     Procesa un lote de ideas en paralelo para optimizar tiempo,
@@ -603,7 +656,7 @@ def batch_process_ideas(ideas, batch_size=12, progress_callback=None, context=No
     total_processed = 0
     
     # Crear un pool de workers para procesar en paralelo
-    with concurrent.futures.ThreadPoolExecutor(max_workers=batch_size) as executor:
+    with JobThreadPoolExecutor(max_workers=batch_size) as executor:
         # Dividir las ideas en lotes
         batches = [ideas[i:i + batch_size] for i in range(0, len(ideas), batch_size)]
         
@@ -649,6 +702,111 @@ def batch_process_ideas(ideas, batch_size=12, progress_callback=None, context=No
     
     return all_processed
 
+@llm_job("pdf")
+async def batch_process_ideas_async(ideas, max_concurrency=32, progress_callback=None, context=None):
+    """
+    Versión asíncrona de batch_process_ideas: procesa todas las ideas a la vez con
+    asyncio.gather, limitando a max_concurrency las que están en curso. El límite real
+    de peticiones simultáneas a Azure lo impone el gateway LLM.
+    
+    Args:
+        ideas (list): Lista de ideas a procesar
+        max_concurrency (int): Número máximo de ideas en curso a la vez
+        progress_callback (function): Función para reportar progreso
+        context (str): Contexto opcional proporcionado por el usuario
+        
+    Returns:
+        list: Lista de ideas procesadas, en el orden original
+    """
+    if not ideas:
+        return []
+    
+    print(f"Procesando {len(ideas)} ideas de forma asíncrona (máx. {max_concurrency} en curso)...")
+    semaphore = asyncio.Semaphore(max_concurrency)
+    completed = 0
+    
+    async def process_one(index, idea):
+        nonlocal completed
+        async with semaphore:
+            with llm_context(idea_index=index):
+                result = await process_idea_async(idea, context)
+        completed += 1
+        if progress_callback:
+            progress_callback(completed, len(ideas))
+        return result
+    
+    results = await asyncio.gather(*(process_one(i, idea) for i, idea in enumerate(ideas)), return_exceptions=True)
+    
+    processed_ideas = []
+    for result in results:
+        if isinstance(result, Exception):
+            print(f"  ❌ Error procesando idea: {str(result)}")
+        elif result and isinstance(result, dict) and result.get('idea'):
+            processed_ideas.append(result)
+    
+    print(f"Progreso: {len(processed_ideas)}/{len(ideas)} ideas procesadas")
+    return processed_ideas
+
+def _process_with_competitor_module(text, context=None):
+    """
+    Intenta procesar las ideas del texto con el método optimizado de CompetitorAnalysis.
+    
+    Returns:
+        Tupla (lista_de_ideas, mensaje_de_estado) o None si hay que usar el método tradicional
+    """
+    try:
+        # Importar el módulo de análisis competitivo
+        from competitor_analysis_module import CompetitorAnalysis
+
+        # Inicializar el analizador
+        analyzer = CompetitorAnalysis()
+
+        # Usar el nuevo método para procesar ideas del PDF
+        print("Utilizando método optimizado para procesamiento de ideas...")
+
+        # IMPORTANTE: Asegurarse de que el contexto nunca sea None para evitar problemas
+        # con las comprobaciones de contexto en los métodos siguientes
+        context_text = ""
+        if context is not None:
+            context_text = str(context)  # Convertir a string para garantizar compatibilidad
+
+        print(f"\n==== PASANDO CONTEXTO AL MÉTODO OPTIMIZADO ====")
+        print(f"Longitud del contexto pasado: {len(context_text)} caracteres")
+        print(f"Primeros 100 caracteres: {context_text[:100]}")
+        print(f"==============================================\n")
+
+        processed_ideas = analyzer.process_pdf_ideas(text, context_text)
+
+        if processed_ideas:
+            print(f"✅ Se procesaron {len(processed_ideas)} ideas con el método optimizado")
+
+            # Transformar al formato esperado por la interfaz
+            formatted_ideas = []
+            for idea_dict in processed_ideas:
+                title = idea_dict.get("idea", "")
+                description = idea_dict.get("descripcion", "")
+                tags = idea_dict.get("tags", [])
+
+                # Crear la estructura esperada
+                # El formato de idea es: título en la primera línea, 
+                # seguido por doble salto de línea y luego la descripción completa
+                formatted_idea = {
+                    'idea': f"{title}\n\n{description}",
+                    'analysis': f"Tags identificados: {', '.join(tags)}",
+                    'metrics': {}
+                }
+                formatted_ideas.append(formatted_idea)
+
+            return formatted_ideas, f"✅ Se procesaron {len(formatted_ideas)} ideas con el método optimizado"
+        else:
+            print("⚠️ El método optimizado no encontró ideas, usando método tradicional...")
+            return None
+    except Exception as opt_error:
+        print(f"⚠️ No se pudo usar el método optimizado: {str(opt_error)}")
+        traceback.print_exc()
+        print("Utilizando método tradicional...")
+        return None
+
 def process_pdf_file(pdf_path, context=None):
     """
     Procesa un archivo PDF para extraer y estructurar ideas.
@@ -682,56 +840,9 @@ def process_pdf_file(pdf_path, context=None):
         print(f"✅ Texto extraído: {len(text)} caracteres")
         
         # Verificar si podemos usar el nuevo método optimizado
-        try:
-            # Importar el módulo de análisis competitivo
-            from competitor_analysis_module import CompetitorAnalysis
-            
-            # Inicializar el analizador
-            analyzer = CompetitorAnalysis()
-            
-            # Usar el nuevo método para procesar ideas del PDF
-            print("Utilizando método optimizado para procesamiento de ideas...")
-            
-            # IMPORTANTE: Asegurarse de que el contexto nunca sea None para evitar problemas
-            # con las comprobaciones de contexto en los métodos siguientes
-            context_text = ""
-            if context is not None:
-                context_text = str(context)  # Convertir a string para garantizar compatibilidad
-                
-            print(f"\n==== PASANDO CONTEXTO AL MÉTODO OPTIMIZADO ====")
-            print(f"Longitud del contexto pasado: {len(context_text)} caracteres")
-            print(f"Primeros 100 caracteres: {context_text[:100]}")
-            print(f"==============================================\n")
-            
-            processed_ideas = analyzer.process_pdf_ideas(text, context_text)
-            
-            if processed_ideas:
-                print(f"✅ Se procesaron {len(processed_ideas)} ideas con el método optimizado")
-                
-                # Transformar al formato esperado por la interfaz
-                formatted_ideas = []
-                for idea_dict in processed_ideas:
-                    title = idea_dict.get("idea", "")
-                    description = idea_dict.get("descripcion", "")
-                    tags = idea_dict.get("tags", [])
-                    
-                    # Crear la estructura esperada
-                    # El formato de idea es: título en la primera línea, 
-                    # seguido por doble salto de línea y luego la descripción completa
-                    formatted_idea = {
-                        'idea': f"{title}\n\n{description}",
-                        'analysis': f"Tags identificados: {', '.join(tags)}",
-                        'metrics': {}
-                    }
-                    formatted_ideas.append(formatted_idea)
-                    
-                return formatted_ideas, f"✅ Se procesaron {len(formatted_ideas)} ideas con el método optimizado"
-            else:
-                print("⚠️ El método optimizado no encontró ideas, usando método tradicional...")
-        except Exception as opt_error:
-            print(f"⚠️ No se pudo usar el método optimizado: {str(opt_error)}")
-            traceback.print_exc()
-            print("Utilizando método tradicional...")
+        optimized = _process_with_competitor_module(text, context)
+        if optimized is not None:
+            return optimized
         
         # Si llegamos aquí, usamos el método tradicional
         ideas = detect_ideas_basic(text)
@@ -752,6 +863,45 @@ def process_pdf_file(pdf_path, context=None):
         traceback.print_exc()
         return None, f"Error procesando PDF: {str(e)}"
 
+async def process_pdf_file_async(pdf_path, context=None, max_concurrency=32):
+    """
+    Versión asíncrona de process_pdf_file para usar desde Gradio sin bloquear el event loop.
+    La extracción de texto y el método optimizado se ejecutan en un hilo; la mejora de
+    ideas con contexto usa batch_process_ideas_async.
+    
+    Returns:
+        Tupla de (lista_de_ideas, mensaje_de_estado)
+    """
+    try:
+        print(f"Procesando PDF (async): {pdf_path}")
+        
+        text = await asyncio.to_thread(extract_text_from_pdf, pdf_path)
+        if not text:
+            print("❌ No se pudo extraer texto del PDF")
+            return None, "No se pudo extraer texto del PDF"
+            
+        print(f"✅ Texto extraído: {len(text)} caracteres")
+        
+        optimized = await asyncio.to_thread(_process_with_competitor_module, text, context)
+        if optimized is not None:
+            return optimized
+        
+        ideas = detect_ideas_basic(text)
+        print(f"✅ Se detectaron {len(ideas)} ideas")
+        
+        if context:
+            print("Mejorando ideas con contexto adicional...")
+            processed_ideas = await batch_process_ideas_async(ideas, max_concurrency=max_concurrency, context=context)
+            print(f"✅ Se procesaron {len(processed_ideas)} ideas")
+            return processed_ideas, f"✅ Se procesaron {len(processed_ideas)} ideas con el método tradicional"
+        else:
+            return ideas, f"✅ Se detectaron {len(ideas)} ideas con el método tradicional"
+            
+    except Exception as e:
+        print(f"❌ Error procesando PDF: {str(e)}")
+        traceback.print_exc()
+        return None, f"Error procesando PDF: {str(e)}"
+
 def generate_robust_pdf(items, title="Ideas Procesadas", template="default"):
     """
     Función robusta para generar PDFs usando reportlab.
@@ -0,0 +1,351 @@
+"""
+Puntuación vectorizada (NumPy) de carteras grandes de ideas.
+
+`ranking_module.calculate_final_score` puntúa un diccionario de métricas cada vez,
+con ramas de Python. Para puntuar o re-puntuar miles de ideas históricas este
+módulo hace el mismo cálculo por columnas, en una sola pasada:
+
+    from portfolio_scoring import score_portfolio
+    scores = score_portfolio([idea["metrics"] for idea in ranked_ideas])
+    scores.sort_values("rank")
+
+Los resultados coinciden exactamente con calculate_final_score (mismo orden de las
+operaciones en coma flotante y el mismo redondeo: round() sobre los np.float64 de
+np.mean redondea como np.round, y sobre el float del score cualitativo como
+Python). Una fila con
+métricas obligatorias ausentes o no numéricas recibe score 50 y el resto de
+columnas vacías, igual que el valor por defecto de calculate_final_score (que lee
+los TRL con int(): un TRL en texto no entero, como '3.5', también da score 50).
+
+Los pesos de calculate_final_score son fijos; aquí se pueden cambiar (DEFAULT_WEIGHTS)
+para simular otro perfil sobre un ranking ya guardado, sin llamadas al LLM:
+
+    from portfolio_scoring import reweight_ranking
+    what_if = reweight_ranking(ranked_ideas, {"tecnica": 2, "cualitativo": 0.3})
+"""
+
+import os
+import json
+
+import numpy as np
+import pandas as pd
+
+# Métricas sin valor por defecto en calculate_final_score: si faltan, score 50
+REQUIRED_METRICS = [
+    "riesgo_tecnico", "tiempo_desarrollo", "trl_inicial", "trl_final",
+    "ingresos_previstos", "riesgo_mercado",
+]
+
+# Métricas opcionales y su valor por defecto
+OPTIONAL_METRICS = {
+    "payback_roi": 3.0,
+    "tamano_mercado": 3.0,
+    "alineacion_estrategica": 3.0,
+    "evaluacion_cualitativa": 3.0,
+}
+
+SCORE_COLUMNS = [
+    "score", "score_quantitative", "score_qualitative",
+    "dimension_tecnica", "dimension_economica", "dimension_mercado",
+]
+
+DEFAULT_SCORE = 50
+
+# Pesos de calculate_final_score: las tres dimensiones por igual y 50/50 cuantitativo/cualitativo.
+# Los pesos de las dimensiones son relativos (se normalizan); "cualitativo" es la fracción
+# del score final que aporta la evaluación cualitativa (0-1)
+DEFAULT_WEIGHTS = {
+    "tecnica": 1.0,
+    "economica": 1.0,
+    "mercado": 1.0,
+    "cualitativo": 0.5,
+}
+
+# Perfiles de pesos con nombre guardados por los usuarios
+WEIGHT_PROFILES_FILE = os.getenv("WEIGHT_PROFILES_FILE", "weight_profiles.json")
+BUILTIN_WEIGHT_PROFILES = {
+    "equilibrado": dict(DEFAULT_WEIGHTS),
+}
+
+
+def _to_float(values):
+    """Convierte a float64; lo que no es numérico (None, texto) queda como NaN."""
+    try:
+        return np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        return pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").to_numpy(dtype=np.float64)
+
+
+# calculate_final_score lee los TRL con int(): un texto no entero ('3.5') falla y da el score por defecto
+_INT_METRICS = ("trl_inicial", "trl_final")
+
+
+def _int_like(value):
+    if isinstance(value, (str, bytes)):
+        try:
+            return float(int(value))
+        except ValueError:
+            return np.nan
+    return value
+
+
+def _to_int_float(values):
+    """Como _to_float, pero los textos solo valen si int() los acepta (mismo criterio que el cálculo escalar)."""
+    if getattr(values, "dtype", None) is not None and values.dtype.kind in "biuf":
+        return _to_float(values)
+    return _to_float([_int_like(v) for v in values])
+
+
+def _columns_from_records(records):
+    """Columnas de métricas a partir de una lista de diccionarios, con los mismos .get() que el cálculo escalar."""
+    records = [r or {} for r in records]
+    columns = {key: (_to_int_float if key in _INT_METRICS else _to_float)([r.get(key) for r in records])
+               for key in REQUIRED_METRICS}
+    for key, default in OPTIONAL_METRICS.items():
+        columns[key] = _to_float([r.get(key, default) for r in records])
+    columns["ratio_costes_ingresos"] = _to_float(
+        [r.get("ratio_costes_ingresos", r.get("costes_ingresos", 3.0)) for r in records]
+    )
+    return columns
+
+
+def _columns_from_frame(frame):
+    """Columnas de métricas de un DataFrame; una columna ausente toma el valor por defecto."""
+    n = len(frame)
+    columns = {}
+    for key in REQUIRED_METRICS:
+        convert = _to_int_float if key in _INT_METRICS else _to_float
+        columns[key] = convert(frame[key]) if key in frame else np.full(n, np.nan)
+    for key, default in OPTIONAL_METRICS.items():
+        columns[key] = _to_float(frame[key]) if key in frame else np.full(n, default)
+    if "ratio_costes_ingresos" in frame:
+        columns["ratio_costes_ingresos"] = _to_float(frame["ratio_costes_ingresos"])
+    elif "costes_ingresos" in frame:
+        columns["ratio_costes_ingresos"] = _to_float(frame["costes_ingresos"])
+    else:
+        columns["ratio_costes_ingresos"] = np.full(n, 3.0)
+    return columns
+
+
+# Columnas que calculate_final_score redondea como float de Python; el resto son np.float64
+_PYTHON_FLOAT_COLUMNS = ("score_qualitative",)
+
+
+def round_like_python(values, decimals=1):
+    """
+    round(x, decimals) de Python (float) para un array. np.round multiplica por 10 antes
+    de redondear y puede diferir en los empates; esos casos (muy pocos) se recalculan
+    con round() de Python.
+    """
+    rounded = np.round(values, decimals)
+    scaled = values * 10 ** decimals
+    ties = np.isfinite(scaled) & (np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    if ties.any():
+        rounded[ties] = [round(float(v), decimals) for v in values[ties]]
+    return rounded
+
+
+def normalize_weights(weights=None):
+    """
+    Valida un perfil de pesos y completa las claves ausentes con DEFAULT_WEIGHTS.
+    Lanza ValueError si algún peso es negativo, las tres dimensiones suman 0 o
+    "cualitativo" no está entre 0 y 1.
+    """
+    normalized = dict(DEFAULT_WEIGHTS)
+    for key, value in (weights or {}).items():
+        if key not in DEFAULT_WEIGHTS:
+            raise ValueError(f"Peso desconocido: {key}")
+        normalized[key] = float(value)
+    if any(value < 0 for value in normalized.values()):
+        raise ValueError("Los pesos no pueden ser negativos")
+    if normalized["tecnica"] + normalized["economica"] + normalized["mercado"] <= 0:
+        raise ValueError("Al menos una dimensión debe tener peso")
+    if normalized["cualitativo"] > 1:
+        raise ValueError("El peso cualitativo debe estar entre 0 y 1")
+    return normalized
+
+
+def weight_shares(weights=None):
+    """
+    Parte del score final (0-1) que aporta cada componente con un perfil de pesos:
+    cuantitativo, cualitativo y cada dimensión. Con DEFAULT_WEIGHTS, 0.5 y 1/6 por dimensión.
+    """
+    weights = normalize_weights(weights)
+    quantitative = 1 - weights["cualitativo"]
+    dimension_weight = weights["tecnica"] + weights["economica"] + weights["mercado"]
+    shares = {"cuantitativo": quantitative, "cualitativo": weights["cualitativo"]}
+    for key in ("tecnica", "economica", "mercado"):
+        shares[key] = quantitative * weights[key] / dimension_weight
+    return shares
+
+
+def compute_dimensions(columns, weights=None):
+    """
+    Subtotales sin redondear: dimensiones normalizadas a 0-100, componente
+    cuantitativo y cualitativo y score final. Con los pesos por defecto hace las
+    mismas operaciones que calculate_final_score (multiplicar por 1.0 o 0.5 es exacto).
+    """
+    weights = normalize_weights(weights)
+    trl_delta = np.trunc(columns["trl_final"]) - np.trunc(columns["trl_inicial"])
+    progreso_trl = np.select(
+        [trl_delta >= 6, trl_delta >= 4, trl_delta >= 2, trl_delta == 1],
+        [5.0, 4.0 + (trl_delta - 4) * 0.5, 3.0 + (trl_delta - 2) * 0.5, 2.0],
+        default=1.0,
+    )
+
+    dimension_tecnica = (columns["riesgo_tecnico"] + columns["tiempo_desarrollo"] + progreso_trl) / 3
+    dimension_economica = (
+        columns["ratio_costes_ingresos"] + columns["ingresos_previstos"] + columns["payback_roi"]
+    ) / 3
+    dimension_mercado = (
+        columns["tamano_mercado"] + columns["riesgo_mercado"] + columns["alineacion_estrategica"]
+    ) / 3
+
+    tech = ((dimension_tecnica - 1.0) / 4.0) * 100
+    econ = ((dimension_economica - 1.0) / 4.0) * 100
+    market = ((dimension_mercado - 1.0) / 4.0) * 100
+    dimension_weight = weights["tecnica"] + weights["economica"] + weights["mercado"]
+    quantitative = (
+        tech * weights["tecnica"] + econ * weights["economica"] + market * weights["mercado"]
+    ) / dimension_weight
+    qualitative = columns["evaluacion_cualitativa"] * 20
+    return {
+        "score": quantitative * (1 - weights["cualitativo"]) + qualitative * weights["cualitativo"],
+        "score_quantitative": quantitative,
+        "score_qualitative": qualitative,
+        "dimension_tecnica": tech,
+        "dimension_economica": econ,
+        "dimension_mercado": market,
+    }
+
+
+def _valid_rows(columns):
+    # int(nan) o float(None) hacen que calculate_final_score devuelva el valor por defecto
+    valid = np.ones(len(columns["trl_final"]), dtype=bool)
+    for values in columns.values():
+        valid &= ~np.isnan(values)
+    return valid
+
+
+def score_portfolio(metrics, with_ranks=True, weights=None):
+    """
+    Puntúa una cartera de ideas en una pasada vectorizada.
+
+    Parámetros:
+    - metrics: lista de diccionarios de métricas (como los de extract_metrics_from_analysis),
+      DataFrame con una columna por métrica o diccionario de columnas
+    - with_ranks: añadir la columna rank (1 = mejor; los empates conservan el orden de entrada,
+      como el sort estable de generate_ranking)
+    - weights: perfil de pesos (ver DEFAULT_WEIGHTS); por defecto los de calculate_final_score
+
+    Retorna un DataFrame con score, score_quantitative, score_qualitative,
+    dimension_tecnica, dimension_economica, dimension_mercado (y rank), en el orden de entrada.
+    """
+    if isinstance(metrics, pd.DataFrame):
+        columns = _columns_from_frame(metrics)
+        index = metrics.index
+    elif isinstance(metrics, dict):
+        frame = pd.DataFrame(metrics)
+        columns = _columns_from_frame(frame)
+        index = frame.index
+    else:
+        columns = _columns_from_records(list(metrics))
+        index = pd.RangeIndex(len(columns["trl_final"]))
+
+    valid = _valid_rows(columns)
+    with np.errstate(invalid="ignore"):
+        raw = compute_dimensions(columns, weights)
+
+    result = {}
+    for name in SCORE_COLUMNS:
+        if name in _PYTHON_FLOAT_COLUMNS:
+            values = round_like_python(raw[name])
+        else:
+            values = np.round(raw[name], 1)
+        values[~valid] = np.nan
+        result[name] = values
+    result["score"][~valid] = DEFAULT_SCORE
+
+    scores = pd.DataFrame(result, index=index)
+    if with_ranks:
+        order = np.argsort(-result["score"], kind="stable")
+        ranks = np.empty(len(order), dtype=np.int64)
+        ranks[order] = np.arange(1, len(order) + 1)
+        scores["rank"] = ranks
+    return scores
+
+
+def reweight_ranking(ranked_ideas, weights=None):
+    """
+    Simulación "what-if": recalcula score y orden de ideas ya rankeadas con otro perfil
+    de pesos, usando solo las métricas guardadas (sin llamadas al LLM).
+
+    Las ideas sin métricas (resultados por defecto) conservan su score. Retorna copias
+    de las ideas ordenadas por el nuevo score, con previous_rank (posición con el score
+    guardado) y rank; las re-puntuadas llevan además score_weights, el perfil aplicado.
+    """
+    ideas = [dict(idea) for idea in ranked_ideas if isinstance(idea, dict)]
+    if not ideas:
+        return []
+
+    previous_order = sorted(range(len(ideas)), key=lambda i: -float(ideas[i].get("score", 0) or 0))
+    for rank, i in enumerate(previous_order, 1):
+        ideas[i]["previous_rank"] = rank
+
+    with_metrics = [i for i, idea in enumerate(ideas) if isinstance(idea.get("metrics"), dict)]
+    if with_metrics:
+        scores = score_portfolio([ideas[i]["metrics"] for i in with_metrics], with_ranks=False, weights=weights)
+        applied = normalize_weights(weights)
+        for name in SCORE_COLUMNS:
+            values = scores[name].to_numpy()
+            for row, i in enumerate(with_metrics):
+                value = values[row]
+                if not np.isnan(value):
+                    ideas[i][name] = float(value)
+                    ideas[i]["score_weights"] = dict(applied)
+
+    ideas.sort(key=lambda idea: float(idea.get("score", 0) or 0), reverse=True)
+    for rank, idea in enumerate(ideas, 1):
+        idea["rank"] = rank
+    return ideas
+
+
+def load_weight_profiles(path=None):
+    """Perfiles de pesos disponibles: los predefinidos más los guardados en WEIGHT_PROFILES_FILE."""
+    profiles = {name: dict(weights) for name, weights in BUILTIN_WEIGHT_PROFILES.items()}
+    path = path or WEIGHT_PROFILES_FILE
+    try:
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+            for name, weights in (saved or {}).items():
+                try:
+                    profiles[name] = normalize_weights(weights)
+                except (TypeError, ValueError) as e:
+                    print(f"⚠️ Perfil de pesos '{name}' no válido, se ignora: {str(e)}")
+    except Exception as e:
+        print(f"⚠️ No se pudieron cargar los perfiles de pesos: {str(e)}")
+    return profiles
+
+
+def save_weight_profile(name, weights, path=None):
+    """Guarda (o sobrescribe) un perfil de pesos con nombre. Retorna los pesos normalizados."""
+    name = (name or "").strip()
+    if not name:
+        raise ValueError("El perfil de pesos necesita un nombre")
+    if name in BUILTIN_WEIGHT_PROFILES:
+        raise ValueError(f"'{name}' es un perfil predefinido")
+    weights = normalize_weights(weights)
+
+    path = path or WEIGHT_PROFILES_FILE
+    saved = {}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            saved = json.load(f) or {}
+    saved[name] = weights
+    # Escribir en un temporal y renombrar para no dejar el archivo a medias
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(saved, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+    return weights
@@ -0,0 +1,248 @@
+"""
+Construcción de prompts con un prefijo compartido estable.
+
+El contexto de Sener se enviaba pegado dentro de varios prompts, en una posición
+distinta cada vez, lo que impide la caché de prefijos del proveedor (Azure OpenAI
+reutiliza el cómputo de los prompts que comparten los primeros >=1024 tokens).
+`build_messages` pone siempre primero el mismo mensaje de sistema (SHARED_PREFIX,
+byte a byte idéntico en todas las llamadas) y después las instrucciones de la
+tarea y el material de cada idea. La lista de competidores de referencia solo va
+en las tareas de competencia (COMPETITOR_PREFIX = SHARED_PREFIX + COMPETITOR_CONTEXT).
+
+Los tokens se cuentan con tiktoken si está instalado (dependencia opcional) y,
+si no, con una estimación de ~4 caracteres por token. `print_prompt_savings`
+resume los tokens del prefijo, los tokens servidos desde la caché del proveedor
+(telemetría LLM) y la latencia de las llamadas con y sin prefijo cacheado.
+"""
+
+import threading
+
+from llm_telemetry import get_telemetry
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Mínimo de tokens de prefijo común para que Azure OpenAI aplique la caché de prompts
+PREFIX_CACHE_MIN_TOKENS = 1024
+
+SENER_CONTEXT = '''Sener: Ingeniería, tecnología e innovación con visión global
+
+Sener es un grupo privado de ingeniería y tecnología fundado en 1956, con sede en España y una sólida proyección internacional. A lo largo de sus más de seis décadas de trayectoria, Sener se ha consolidado como un referente en la ejecución de proyectos de alta complejidad técnica, aportando soluciones innovadoras en sectores estratégicos clave para el desarrollo sostenible y el progreso tecnológico.
+
+Áreas de especialización:
+
+Sener combina ingeniería avanzada, desarrollo tecnológico y capacidad constructiva para ofrecer soluciones integrales que abarcan desde la consultoría y diseño hasta la implementación y operación de sistemas complejos. Sus principales áreas de enfoque incluyen:
+
+Ingeniería y construcción en sectores críticos, aplicando altos estándares de calidad, seguridad y sostenibilidad.
+
+Desarrollo de sistemas y software a medida para sectores de alto valor estratégico, como defensa, energía y transporte.
+
+Innovación tecnológica, con una fuerte inversión en I+D para el desarrollo de soluciones avanzadas que aporten valor diferencial a sus clientes.
+
+Sectores clave de actividad:
+
+Aeroespacial: Sener participa en misiones espaciales internacionales con el diseño, integración y fabricación de componentes y sistemas para satélites, vehículos espaciales y estaciones orbitales.
+
+Infraestructuras y Transporte: Especialista en proyectos de gran escala como ferrocarriles, metros, carreteras y obras hidráulicas, incluyendo diseño de trazados, estructuras, sistemas y gestión del transporte. Las líneas estratégicas que se estan abriendo y explorando en innovación son hospital adaptable, transformación de instalaciones deportivas y de entretenimiento en espacios multifuncionales, infraestructura para el vehículo autónomo, puertos flotantes, centrales hidroeléctricas reversibles usando agua de mar, hiper-aprovechamiento de la infraestructura del metro.
+
+Energía: Impulsa la transición energética mediante proyectos en energías renovables (solar, eólica, hidrógeno verde), eficiencia energética, almacenamiento y soluciones inteligentes de red.
+
+Digitalización: Lidera procesos de transformación digital con soluciones de automatización, gemelos digitales, inteligencia artificial y sistemas ciberfísicos aplicados a sectores industriales complejos.
+
+Centros de datos: Infraestructura para los centros de datos
+'''
+
+# Solo para las tareas de competencia: en el análisis o el ranking de una idea la lista
+# empuja al modelo a citar a estas empresas aunque no vengan al caso
+COMPETITOR_CONTEXT = '''
+# -----------------------------------------------------------------------------
+# COMPETIDORES BASE MONITORIZADOS (DEBEN VERIFICARSE PARA CADA IDEA)
+# -----------------------------------------------------------------------------
+# IMPORTANTE PARA EL LLM: La siguiente lista constituye una base de referencia
+# de compañías que históricamente compiten con Sener.  NO significa que deban
+# aparecer automáticamente como competidores en todos los análisis.  Para cada
+# nueva idea o sector analizado, SOLO deben incluirse aquellos que presenten
+# evidencia real (proyectos, patentes, soluciones, comunicación oficial)
+# alineada con la idea concreta.  Si la evidencia no existe o es débil, el LLM
+# deberá omitirlos y buscar otros actores más pertinentes.
+#  •  NUNCA incluyas a Sener como competidor.
+#  •  Justifica internamente (no en la respuesta) la inclusión de cada empresa.
+#  •  Prefiere siempre datos verificados sobre tamaño, país y foco tecnológico.
+#
+# 1) IDOM:  Movilidad sostenible; big-data/IA; soluciones energéticas; optimización de procesos; innovación y digitalización.
+# 2) Abengoa:  Infraestructura ferroviaria; redes inteligentes 5E reversibles; proyectos de hidrógeno.
+# 3) Typsa: Ingeniería multidisciplinar; participación ocasional en infraestructuras de transporte (baja relevancia tecnológica actual).
+# 4) AECOM: Servicios globales de ingeniería y consultoría; proyectos de transporte y energía (revisar caso a caso).
+# 5) Elecnor: Ingeniería y construcción de grandes infraestructuras; presencia internacional (datos públicos limitados en áreas deep-tech).
+# 6) Atkins: Desarrollo de software y servicios de ingeniería; experiencia en movilidad y planificación.
+# 7) ARUP: Diseño de infraestructuras; asset-management; mantenimiento; consultoría digital avanzada.
+# 8) Jacobs: Climate response; data solutions; consultoría y advisory en grandes proyectos de infraestructura.
+# 9) Indra: Automatización aérea; navegación; drones; comunicaciones críticas y sistemas de información.
+# 10) Ineco: Cambio climático; renovables; optimización de procesos; innovación y digitalización en transporte.
+#
+# El modelo debe evaluar críticamente esta base y complementar O SUSTITUIR los
+# nombres con otros competidores más adecuados si el ámbito tecnológico o de
+# mercado de la IDEA lo requiere. MUY IMPORTANTE ANALIZARLO CRITICAMENTE
+# -----------------------------------------------------------------------------
+'''
+
+SHARED_PREFIX = (
+    "Trabajas para el equipo de innovación de Sener evaluando ideas, retos y competidores. "
+    "Usa el siguiente contexto corporativo como referencia en todas tus respuestas; "
+    "las instrucciones concretas de cada tarea vienen a continuación.\n\n"
+    "=== CONTEXTO DE SENER ===\n"
+    + SENER_CONTEXT
+    + "=== FIN DEL CONTEXTO DE SENER ==="
+)
+
+# Prefijo de las tareas de competencia: empieza por SHARED_PREFIX byte a byte, así que
+# comparte con él la parte cacheada y además supera por sí solo el mínimo de la caché
+COMPETITOR_PREFIX = SHARED_PREFIX + "\n\n" + COMPETITOR_CONTEXT
+
+
+# ---------------------------------------------------------------------------
+# Recuento de tokens
+# ---------------------------------------------------------------------------
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def get_token_encoding():
+    global _encoding
+    if tiktoken is None:
+        return None
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None:
+                try:
+                    # Codificación de gpt-4o / o3-mini
+                    _encoding = tiktoken.get_encoding("o200k_base")
+                except Exception:
+                    try:
+                        _encoding = tiktoken.get_encoding("cl100k_base")
+                    except Exception as e:
+                        print(f"⚠️ tiktoken no disponible, se estiman los tokens: {str(e)}")
+                        _encoding = False
+    return _encoding or None
+
+
+def count_tokens(text):
+    """Tokens de un texto (tiktoken si está disponible; si no, ~4 caracteres por token)."""
+    if not text:
+        return 0
+    encoding = get_token_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def count_message_tokens(messages):
+    """Tokens de una lista de mensajes de chat (incluye ~4 tokens de formato por mensaje)."""
+    total = 3
+    for msg in messages or []:
+        content = msg.get("content") if isinstance(msg, dict) else None
+        if isinstance(content, str):
+            total += count_tokens(content)
+        total += 4
+    return total
+
+
+# ---------------------------------------------------------------------------
+# Construcción de mensajes
+# ---------------------------------------------------------------------------
+
+class PromptStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.prompts = 0
+        self.input_tokens = 0
+        self.prefix_tokens = 0
+        self.by_task = {}
+
+    def record(self, task, total_tokens, prefix_tokens):
+        with self._lock:
+            self.prompts += 1
+            self.input_tokens += total_tokens
+            self.prefix_tokens += prefix_tokens
+            task_stats = self.by_task.setdefault(task, {"prompts": 0, "input_tokens": 0, "prefix_tokens": 0})
+            task_stats["prompts"] += 1
+            task_stats["prefix_tokens"] = prefix_tokens
+            task_stats["input_tokens"] += total_tokens
+
+
+_stats = PromptStats()
+_prefix_tokens = {}
+
+
+def get_prefix_tokens(prefix=SHARED_PREFIX):
+    if prefix not in _prefix_tokens:
+        _prefix_tokens[prefix] = count_tokens(prefix)
+    return _prefix_tokens[prefix]
+
+
+def build_messages(task_instructions, user_content, task="general", prefix=SHARED_PREFIX):
+    """
+    Mensajes de chat con el prefijo compartido primero:
+    [sistema: prefix] + [sistema: instrucciones de la tarea] + [usuario: material de la idea].
+    prefix es SHARED_PREFIX o, en las tareas de competencia, COMPETITOR_PREFIX.
+    Nada variable (IDs, fechas, texto de la idea) debe ir en los dos primeros mensajes.
+    """
+    messages = [{"role": "system", "content": prefix}]
+    if task_instructions:
+        messages.append({"role": "system", "content": task_instructions})
+    messages.append({"role": "user", "content": user_content})
+    # Parte fija del prompt: prefijo e instrucciones de la tarea
+    stable_tokens = get_prefix_tokens(prefix) + (count_tokens(task_instructions) + 4 if task_instructions else 0)
+    _stats.record(task, count_message_tokens(messages), stable_tokens)
+    return messages
+
+
+def get_prompt_stats():
+    with _stats._lock:
+        return {
+            "prompts": _stats.prompts,
+            "input_tokens": _stats.input_tokens,
+            "prefix_tokens": _stats.prefix_tokens,
+            "shared_prefix_tokens": get_prefix_tokens(),
+            "by_task": {k: dict(v) for k, v in _stats.by_task.items()},
+        }
+
+
+def print_prompt_savings():
+    """Resumen del ahorro del prefijo compartido: tokens cacheados y latencia con/sin caché."""
+    s = get_prompt_stats()
+    prefix = s["shared_prefix_tokens"]
+    tokenizer = "tiktoken" if get_token_encoding() is not None else "estimación ~4 car./token"
+    print(f"\n🧩 Prompts con prefijo compartido ({tokenizer}): {s['prompts']} prompts, "
+          f"{s['input_tokens']} tokens de entrada, prefijo general de {prefix} tokens "
+          f"(competencia: {get_prefix_tokens(COMPETITOR_PREFIX)})")
+    # Por tarea, la parte fija (prefijo + instrucciones) decide si el proveedor la cachea
+    cacheable = sum((t["prompts"] - 1) * t["prefix_tokens"] for t in s["by_task"].values()
+                    if t["prefix_tokens"] >= PREFIX_CACHE_MIN_TOKENS)
+    if cacheable:
+        print(f"   Tokens cacheables (prefijo repetido): {cacheable} "
+              f"({cacheable / max(1, s['input_tokens']) * 100:.1f}% de la entrada)")
+    for task, t in sorted(s["by_task"].items()):
+        warning = " ⚠️ por debajo del mínimo de caché" if t["prefix_tokens"] < PREFIX_CACHE_MIN_TOKENS else ""
+        print(f"   - {task}: {t['prompts']} prompts, {t['input_tokens'] / max(1, t['prompts']):.0f} tokens/prompt, "
+              f"parte fija de {t['prefix_tokens']}{warning}")
+
+    # Datos reales del proveedor (usage.prompt_tokens_details.cached_tokens) vía telemetría
+    calls = [r for r in get_telemetry().snapshot() if r.get("type") == "llm_call" and r.get("cache") == "miss"]
+    with_cache = [r for r in calls if (r.get("cached_tokens") or 0) > 0]
+    if not calls:
+        return
+    cached = sum(r.get("cached_tokens") or 0 for r in calls)
+    prompt_total = sum(r.get("prompt_tokens") or 0 for r in calls)
+    print(f"   Caché del proveedor: {cached} de {prompt_total} tokens de entrada "
+          f"({cached / max(1, prompt_total) * 100:.1f}%) en {len(with_cache)}/{len(calls)} llamadas")
+    without_cache = [r for r in calls if not (r.get("cached_tokens") or 0)]
+    if with_cache and without_cache:
+        def _median(records):
+            values = sorted(r.get("upstream_latency", 0.0) for r in records)
+            return values[len(values) // 2]
+        print(f"   Latencia upstream mediana: {_median(with_cache):.2f}s con prefijo cacheado "
+              f"vs {_median(without_cache):.2f}s sin él")
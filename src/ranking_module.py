@@ -7,25 +7,64 @@ from io import BytesIO
 from fpdf import FPDF
 import tempfile
 import os
-from datetime import datetime
 import numpy as np
 import json
 import base64
 # IMPORTACIÓN REMOVIDA: from pdf_processor_module import generate_robust_pdf
 # Se usará función interna para evitar dependencias circulares
 import traceback
-import random
 import time
 import concurrent.futures
+import threading
 from tqdm import tqdm
 import hashlib
 from typing import List, Dict, Any
 from pathlib import Path
+from llm_cache import get_llm_cache
+from llm_gateway import JobThreadPoolExecutor, llm_job
+from llm_telemetry import llm_context
+from portfolio_scoring import reweight_ranking
+from ranking_tournament import generate_tournament_ranking
+from ranking_store import get_ranking_store
+from metric_rules import extract_metrics_by_rules, record_fast_path
+from prompt_builder import count_tokens
+from token_budget import LLM_MAX_INPUT_TOKENS, get_model_limits
 
 # Asegurarnos de que matplotlib use un backend que no requiera pantalla
 import matplotlib
 matplotlib.use('Agg')
 
+# Modo de puntuación del ranking:
+#   chain      -> cadena de llamadas por idea (análisis, métricas, evaluación cualitativa,
+#                 justificación y payoff matrix)
+#   structured -> una sola llamada por idea con salida JSON según esquema
+RANKING_SCORING_MODE = os.getenv("RANKING_SCORING_MODE", "chain").lower()
+
+# Orden final del ranking:
+#   score      -> por la puntuación de cada idea
+#   tournament -> torneo de comparaciones por pares (ranking_tournament) sembrado con la
+#                 puntuación; score y métricas se conservan para la matriz de payoff y el PDF
+RANKING_ORDER_MODE = os.getenv("RANKING_ORDER_MODE", "score").lower()
+RANKING_TOURNAMENT_TOP_K = int(os.getenv("RANKING_TOURNAMENT_TOP_K", "10"))
+
+# Campos del orden por torneo: son de la ejecución que los calculó, no de la idea
+_TOURNAMENT_FIELDS = ("tournament_rank", "tournament_wins")
+
+# Versión de la puntuación. Forma parte de la huella de cada idea rankeada: al cambiar
+# prompts, métricas o calculate_final_score hay que subirla para que se re-puntúe todo
+RANKING_SCORING_VERSION = "2"
+
+# Modo empaquetado de la cadena: el análisis simplificado y la evaluación cualitativa se
+# piden para varias ideas en cada llamada ("IDEA #1", "IDEA #2"...), con el tamaño del lote
+# según el presupuesto de tokens. Las ideas sin respuesta válida se reenvían una a una
+RANKING_PACKED_CALLS = os.getenv("RANKING_PACKED_CALLS", "0") == "1"
+RANKING_PACKED_MAX_BATCH = int(os.getenv("RANKING_PACKED_MAX_BATCH", "10"))
+RANKING_PACKED_MAX_OUTPUT_TOKENS = int(os.getenv("RANKING_PACKED_MAX_OUTPUT_TOKENS", "8000"))
+
+# Extraer por reglas (metric_rules) las métricas explícitas en el análisis antes de
+# llamar al LLM, que solo recibe las que falten. "0" para pedirlas todas al LLM
+METRICS_FAST_PATH = os.getenv("METRICS_FAST_PATH", "1") != "0"
+
 # Importar configuración de OpenAI
 try:
     from openai_config import get_openai_client, get_deployment_name
@@ -248,6 +287,77 @@ def analyze_idea_for_ranking(idea):
     except Exception as e:
         return f"Error en el análisis: {str(e)}"
 
+# Descripción de cada métrica en el prompt de extract_metrics_from_analysis, por dimensión
+_METRIC_PROMPT_SECTIONS = [
+    ("DIMENSIÓN TÉCNICA (33,3% del componente cuantitativo):", [
+        ("riesgo_tecnico", "riesgo_tecnico (1.0 = viabilidad dudosa, 5.0 = tecnología probada)", [
+            "Evalúa el riesgo tecnológico según la viabilidad y madurez",
+            "Permite valores decimales para reflejar matices en la evaluación"]),
+        ("tiempo_desarrollo", "tiempo_desarrollo (1.0 = >3 años, 5.0 = <6 meses)", [
+            "Evalúa el tiempo necesario para completar el desarrollo",
+            "Permite valores decimales para reflejar estimaciones más precisas"]),
+        ("trl_inicial", "trl_inicial (1-9, Nivel actual de Preparación Tecnológica)", [
+            "Nivel actual de madurez tecnológica (TRL)",
+            "Solo valores enteros"]),
+        ("trl_final", "trl_final (1-9, Nivel de Preparación Tecnológica esperado)", [
+            "Nivel de madurez tecnológica esperado tras el desarrollo",
+            "Solo valores enteros"]),
+    ]),
+    ("DIMENSIÓN ECONÓMICA (33,3% del componente cuantitativo):", [
+        ("ratio_costes_ingresos", "ratio_costes_ingresos (1.0 = >75%, 5.0 = <10%)", [
+            "Proporción entre costes operativos e ingresos",
+            "Permite valores decimales para reflejar proporciones específicas"]),
+        ("ingresos_previstos", "ingresos_previstos (1.0 = <0,5 M€, 5.0 = >20 M€)", [
+            "Volumen de ingresos esperados",
+            "Permite valores decimales para ajustes más precisos"]),
+        ("payback_roi", "payback_roi (1.0 = retorno >5 años, 5.0 = retorno <1 año)", [
+            "Período de recuperación de la inversión",
+            "Permite valores decimales para períodos intermedios"]),
+    ]),
+    ("DIMENSIÓN DE MERCADO (33,3% del componente cuantitativo):", [
+        ("tamano_mercado", "tamano_mercado (1.0 = TAM <0,5 B€, 5.0 = TAM >10 B€)", [
+            "Tamaño total del mercado direccionable",
+            "Permite valores decimales para mercados intermedios"]),
+        ("riesgo_mercado", "riesgo_mercado (1.0 = riesgo ALTO, 5.0 = riesgo BAJO)", [
+            "Nivel de riesgo en la entrada al mercado",
+            "1.0-2.0: Riesgo ALTO - Barreras significativas, adopción lenta",
+            "2.1-3.9: Riesgo MEDIO - Barreras moderadas, adopción media",
+            "4.0-5.0: Riesgo BAJO - Barreras mínimas, adopción rápida",
+            "Permite valores decimales para una evaluación más granular"]),
+        ("alineacion_estrategica", "alineacion_estrategica (1.0 = baja sinergia SENER, 5.0 = encaje perfecto)", [
+            "Grado de alineación con la estrategia de SENER",
+            "Permite valores decimales para reflejar niveles intermedios de alineación"]),
+    ]),
+    (None, [
+        ("evaluacion_cualitativa", "evaluacion_cualitativa (5.0 = excelente, 1.0 = pobre)", [
+            "Evaluación general basada en todos los aspectos analizados",
+            "Permite valores decimales para una evaluación más matizada"]),
+    ]),
+]
+
+
+# Métricas que no se piden al LLM si faltan (se quedan con el valor neutro)
+_METRICS_NOT_REQUIRED = ('evaluacion_cualitativa',)
+
+
+def _build_metrics_prompt_section(keys):
+    """Bloque del prompt con la descripción de las métricas `keys`, numeradas y agrupadas por dimensión."""
+    lines = []
+    number = 0
+    for dimension, metrics in _METRIC_PROMPT_SECTIONS:
+        selected = [metric for metric in metrics if metric[0] in keys]
+        if not selected:
+            continue
+        lines.append("")
+        if dimension:
+            lines.append(f"    {dimension}")
+        for _, title, details in selected:
+            number += 1
+            lines.append(f"    {number}. {title}")
+            lines.extend(f"       - {detail}" for detail in details)
+    return "\n".join(lines) + "\n"
+
+
 def extract_metrics_from_analysis(analysis_text, idea_text="", ranking_context=""):
     """
     Extrae métricas cuantitativas y cualitativas del análisis de una idea.
@@ -259,6 +369,10 @@ def extract_metrics_from_analysis(analysis_text, idea_text="", ranking_context="
     - Dimensión Técnica: riesgo_técnico, tiempo_desarrollo, progreso_TRL
     - Dimensión Económica: ratio_costes_ingresos, ingresos_previstos, payback_ROI
     - Dimensión de Mercado: tamaño_mercado, riesgo_mercado, alineacion_estrategica
+    
+    Las métricas que el análisis indica de forma explícita (TRL, importes, porcentajes,
+    plazos, niveles de riesgo) se extraen antes por reglas (metric_rules) y el LLM solo
+    recibe las que faltan; si las reglas las encuentran todas no se llama al LLM.
     """
     # Métricas por defecto - valores neutros para casos donde no se pueda extraer información
     default_metrics = {
@@ -299,6 +413,46 @@ def extract_metrics_from_analysis(analysis_text, idea_text="", ranking_context="
         print(f"⚠️ Análisis demasiado corto ({len(analysis_text.strip())} caracteres)")
         return default_metrics
     
+    # Camino rápido: métricas explícitas en el texto (TRL, importes, porcentajes, plazos)
+    fast_metrics, fast_evidence = extract_metrics_by_rules(analysis_text) if METRICS_FAST_PATH else ({}, {})
+    # evaluacion_cualitativa no cuenta como pendiente: generate_ranking la sustituye por la
+    # evaluación cualitativa propia, así que no justifica por sí sola una llamada al LLM
+    missing_metrics = [key for key in default_metrics
+                       if key not in fast_metrics and key not in _METRICS_NOT_REQUIRED]
+    if fast_metrics:
+        print(f"⚡ Métricas extraídas por reglas ({len(fast_metrics)}/{len(default_metrics) - len(_METRICS_NOT_REQUIRED)}): "
+              f"{', '.join(fast_metrics)}")
+
+    def _with_fast_path(metrics):
+        # Las métricas encontradas por reglas prevalecen sobre las del LLM y los valores neutros
+        merged = dict(metrics)
+        merged.update(fast_metrics)
+        if fast_evidence:
+            justifications = dict(merged.get('justificacion') or {})
+            for key, snippet in fast_evidence.items():
+                justifications[key] = f"Extraído del texto: {snippet}".replace('%', '%%').replace('{', '{{').replace('}', '}}')
+            merged['justificacion'] = justifications
+        return merged
+
+    if not missing_metrics:
+        record_fast_path(fast_metrics)
+        print("✅ Todas las métricas extraídas por reglas, sin llamada al LLM")
+        return _with_fast_path(default_metrics)
+
+    metrics_section = _build_metrics_prompt_section(missing_metrics)
+    if fast_metrics:
+        known = ", ".join(f"{key}={value}" for key, value in fast_metrics.items())
+        metrics_section += f"\n    Ya extraídas del texto (no las incluyas en la respuesta): {known}\n"
+    example_keys = missing_metrics[:2]
+    example_json = json.dumps(
+        {
+            **{key: (4 if key.startswith('trl_') else value) for key, value in zip(example_keys, (3.75, 2.8))},
+            "justificacion": {example_keys[0]: "Fragmento del análisis que respalda el valor."},
+        },
+        ensure_ascii=False,
+        indent=4,
+    ).replace('\n', '\n    ')
+
     # Sanitizar el texto del análisis para evitar problemas de formato
     safe_analysis_text = analysis_text.replace('%', '%%').replace('{', '{{').replace('}', '}}')
     
@@ -331,12 +485,7 @@ def extract_metrics_from_analysis(analysis_text, idea_text="", ranking_context="
     # Limpiar el texto para el procesamiento
     clean_analysis = safe_analysis_text.replace('\r', ' ').replace('\n\n', '\n').strip()
     
-    # ID único para esta evaluación
-    evaluation_id = f"metrics_extract_{int(time.time())}_{random.randint(1000, 9999)}"
-    
     prompt = f"""
-    EVALUACIÓN ID: {evaluation_id}
-    
     Como analista especializado en evaluación de proyectos de innovación, tu tarea es extraer métricas cuantitativas de la siguiente idea y su análisis detallado.
     Debes basarte ÚNICAMENTE en lo que está explícitamente mencionado o puede inferirse razonablemente del texto.
     
@@ -358,76 +507,19 @@ def extract_metrics_from_analysis(analysis_text, idea_text="", ranking_context="
     - IMPORTANTE: Todas las métricas en escala 1-5 pueden usar valores decimales (por ejemplo: 3.75, 4.2, 2.8) para una evaluación más precisa.
     
     MÉTRICAS A EXTRAER (todas en escala 1-5 con decimales permitidos, excepto TRL que es 1-9 entero):
-    
-    DIMENSIÓN TÉCNICA (33,3% del componente cuantitativo):
-    1. riesgo_tecnico (1.0 = viabilidad dudosa, 5.0 = tecnología probada)
-       - Evalúa el riesgo tecnológico según la viabilidad y madurez
-       - Permite valores decimales para reflejar matices en la evaluación
-       
-    2. tiempo_desarrollo (1.0 = >3 años, 5.0 = <6 meses)
-       - Evalúa el tiempo necesario para completar el desarrollo
-       - Permite valores decimales para reflejar estimaciones más precisas
-       
-    3. trl_inicial (1-9, Nivel actual de Preparación Tecnológica)
-       - Nivel actual de madurez tecnológica (TRL)
-       - Solo valores enteros
-       
-    4. trl_final (1-9, Nivel de Preparación Tecnológica esperado)
-       - Nivel de madurez tecnológica esperado tras el desarrollo
-       - Solo valores enteros
-       
-    DIMENSIÓN ECONÓMICA (33,3% del componente cuantitativo):
-    5. ratio_costes_ingresos (1.0 = >75%, 5.0 = <10%)
-       - Proporción entre costes operativos e ingresos
-       - Permite valores decimales para reflejar proporciones específicas
-       
-    6. ingresos_previstos (1.0 = <0,5 M€, 5.0 = >20 M€)
-       - Volumen de ingresos esperados
-       - Permite valores decimales para ajustes más precisos
-       
-    7. payback_roi (1.0 = retorno >5 años, 5.0 = retorno <1 año)
-       - Período de recuperación de la inversión
-       - Permite valores decimales para períodos intermedios
-       
-    DIMENSIÓN DE MERCADO (33,3% del componente cuantitativo):
-    8. tamano_mercado (1.0 = TAM <0,5 B€, 5.0 = TAM >10 B€)
-       - Tamaño total del mercado direccionable
-       - Permite valores decimales para mercados intermedios
-       
-    9. riesgo_mercado (1.0 = riesgo ALTO, 5.0 = riesgo BAJO)
-       - Nivel de riesgo en la entrada al mercado
-       - 1.0-2.0: Riesgo ALTO - Barreras significativas, adopción lenta
-       - 2.1-3.9: Riesgo MEDIO - Barreras moderadas, adopción media
-       - 4.0-5.0: Riesgo BAJO - Barreras mínimas, adopción rápida
-       - Permite valores decimales para una evaluación más granular
-       
-    10. alineacion_estrategica (1.0 = baja sinergia SENER, 5.0 = encaje perfecto)
-        - Grado de alineación con la estrategia de SENER
-        - Permite valores decimales para reflejar niveles intermedios de alineación
-    
-    11. evaluacion_cualitativa (5.0 = excelente, 1.0 = pobre)
-        - Evaluación general basada en todos los aspectos analizados
-        - Permite valores decimales para una evaluación más matizada
-    
+    {metrics_section}
     FORMATO DE RESPUESTA:
     Responde ÚNICAMENTE con un objeto JSON que contenga:
     1. Las métricas con sus valores numéricos (usando decimales cuando sea apropiado)
     2. Una breve justificación para cada métrica basada en el texto (max 1-2 oraciones)
     
     Por ejemplo:
-    {{
-        "riesgo_tecnico": 3.75,
-        "tiempo_desarrollo": 2.8,
-        ...
-        "justificacion": {{
-            "riesgo_tecnico": "Tecnología probada pero con desafíos de integración específicos.",
-            ...
-        }}
-    }}
+    {example_json}
     """
     
     try:
         # Usar el cliente de OpenAI importado
+        llm_start = time.perf_counter()
         try:
             # Usar client.chat.completions
             response = client.chat.completions.create(
@@ -442,15 +534,17 @@ def extract_metrics_from_analysis(analysis_text, idea_text="", ranking_context="
                 timeout=60
             )
             
+            record_fast_path(fast_metrics, time.perf_counter() - llm_start, len(missing_metrics))
             if response and response.choices and response.choices[0].message:
                 metrics_text = response.choices[0].message.content.strip()
             else:
                 print("⚠️ Respuesta vacía de la API")
-                return default_metrics
+                return _with_fast_path(default_metrics)
         except Exception as api_error:
+            record_fast_path(fast_metrics, time.perf_counter() - llm_start, len(missing_metrics))
             print(f"❌ Error en la llamada a la API: {str(api_error)}")
             traceback.print_exc()
-            return default_metrics
+            return _with_fast_path(default_metrics)
         
         # Limpiar la respuesta para asegurar que sea un JSON válido
         metrics_text = metrics_text.replace('```json', '').replace('```', '').strip()
@@ -468,7 +562,9 @@ def extract_metrics_from_analysis(analysis_text, idea_text="", ranking_context="
             # Extraer solo las métricas numéricas (sin las justificaciones)
             extracted_metrics = {}
             for key in default_metrics.keys():
-                if key in metrics_data:
+                if key in fast_metrics:
+                    extracted_metrics[key] = fast_metrics[key]
+                elif key in metrics_data:
                     # Convertir a número y validar el rango
                     try:
                         value = float(metrics_data[key])
@@ -489,6 +585,7 @@ def extract_metrics_from_analysis(analysis_text, idea_text="", ranking_context="
             # IMPORTANTE: Guardar las justificaciones sanitizadas en las métricas extraídas
             if 'justificacion' in metrics_data and isinstance(metrics_data['justificacion'], dict):
                 extracted_metrics['justificacion'] = metrics_data['justificacion']
+            extracted_metrics = _with_fast_path(extracted_metrics)
             
             # Registrar para depuración
             print(f"✅ Métricas extraídas del análisis:")
@@ -520,15 +617,15 @@ def extract_metrics_from_analysis(analysis_text, idea_text="", ranking_context="
                         else:
                             extracted_metrics[key] = max(1, min(5, value))
                 
-                return extracted_metrics
+                return _with_fast_path(extracted_metrics)
             except:
                 print("❌ Falló la extracción de respaldo mediante regex")
-                return default_metrics
+                return _with_fast_path(default_metrics)
                 
     except Exception as e:
         print(f"❌ Error general extrayendo métricas: {str(e)}")
         traceback.print_exc()
-        return default_metrics
+        return _with_fast_path(default_metrics)
 
 def calculate_final_score(metrics):
     """
@@ -631,6 +728,11 @@ def generate_ranking_pdf(ideas, ranking_context):
         traceback.print_exc()
         return None
 
+def _simplified_analysis_cache_key(idea_text):
+    shortened_idea = idea_text[:800] + "..." if len(idea_text) > 800 else idea_text
+    return f"simplified_analysis_{hashlib.md5(shortened_idea.encode()).hexdigest()}"
+
+
 def generate_simplified_analysis(idea_text):
     """
     Genera un análisis simplificado de una idea cuando no hay análisis previo
@@ -644,11 +746,8 @@ def generate_simplified_analysis(idea_text):
         # Acortar la idea si es muy larga para reducir tokens
         shortened_idea = idea_text[:800] + "..." if len(idea_text) > 800 else idea_text
             
-        # Generar un ID único para esta evaluación
-        eval_id = f"analysis_{int(time.time())}_{random.randint(1000, 9999)}"
-        
         # Crear una clave única para caché
-        cache_key = f"simplified_analysis_{hashlib.md5(shortened_idea.encode()).hexdigest()}"
+        cache_key = _simplified_analysis_cache_key(idea_text)
         
         # Verificar si ya tenemos este resultado en caché
         if cache_key in _api_cache:
@@ -656,8 +755,6 @@ def generate_simplified_analysis(idea_text):
             return _api_cache[cache_key]
         
         prompt = f"""
-        EVALUACIÓN ID: {eval_id}
-        
         Como consultor experto en análisis de innovación tecnológica, realiza un análisis conciso pero completo de la siguiente idea:
         
         IDEA: {shortened_idea}
@@ -715,6 +812,29 @@ def generate_simplified_analysis(idea_text):
         traceback.print_exc()
         return f"Error al generar análisis: {str(e)}"
 
+def _qualitative_cache_key(idea_text, analysis_text="", context=""):
+    return f"qual_eval_{hashlib.md5((idea_text[:300] + (analysis_text[:300] if analysis_text else '') + (context[:100] if context else '')).encode()).hexdigest()}"
+
+
+def _qualitative_analysis_extract(analysis_text):
+    """Partes del análisis que se envían a la evaluación cualitativa (resumen, valoración y viabilidad)."""
+    if not analysis_text or not isinstance(analysis_text, str) or len(analysis_text.strip()) <= 100:
+        return ""
+    # Extraer solo las partes más relevantes del análisis
+    sections = ["RESUMEN EJECUTIVO", "VALORACIÓN GLOBAL", "VIABILIDAD COMERCIAL"]
+    extracted = []
+    
+    for section in sections:
+        pattern = f"{section}.*?(?=\n\n|$)"
+        matches = re.findall(pattern, analysis_text, re.DOTALL | re.IGNORECASE)
+        if matches:
+            extracted.append(matches[0][:200])
+    
+    if extracted:
+        return "\n\n".join(extracted)
+    return analysis_text[:500] + "..." if len(analysis_text) > 500 else analysis_text
+
+
 def generate_qualitative_evaluation(idea_text, analysis_text="", context=""):
     """
     Genera una evaluación cualitativa de una idea que representará el 50% de la puntuación final.
@@ -733,7 +853,7 @@ def generate_qualitative_evaluation(idea_text, analysis_text="", context=""):
             }
         
         # Crear una clave única para caché
-        cache_key = f"qual_eval_{hashlib.md5((idea_text[:300] + (analysis_text[:300] if analysis_text else '') + (context[:100] if context else '')).encode()).hexdigest()}"
+        cache_key = _qualitative_cache_key(idea_text, analysis_text, context)
         
         # Verificar si ya tenemos este resultado en caché
         if cache_key in _api_cache:
@@ -742,33 +862,12 @@ def generate_qualitative_evaluation(idea_text, analysis_text="", context=""):
             
         # Acortar textos si son demasiado largos para reducir tokens
         shortened_idea = idea_text[:500] + "..." if len(idea_text) > 500 else idea_text
-        shortened_analysis = ""
-        
-        if analysis_text and isinstance(analysis_text, str) and len(analysis_text.strip()) > 100:
-            # Extraer solo las partes más relevantes del análisis
-            sections = ["RESUMEN EJECUTIVO", "VALORACIÓN GLOBAL", "VIABILIDAD COMERCIAL"]
-            extracted = []
-            
-            for section in sections:
-                pattern = f"{section}.*?(?=\n\n|$)"
-                matches = re.findall(pattern, analysis_text, re.DOTALL | re.IGNORECASE)
-                if matches:
-                    extracted.append(matches[0][:200])
-            
-            if extracted:
-                shortened_analysis = "\n\n".join(extracted)
-            else:
-                shortened_analysis = analysis_text[:500] + "..." if len(analysis_text) > 500 else analysis_text
+        shortened_analysis = _qualitative_analysis_extract(analysis_text)
         
         # Incluir contexto si existe, acortado
         context_text = f"\nCONTEXTO DE PRIORIZACIÓN:\n{context[:300]}\n\n" if context and len(context.strip()) > 5 else ""
         
-        # ID único para esta evaluación
-        eval_id = f"qual_eval_{int(time.time())}_{random.randint(1000, 9999)}"
-        
         prompt = f"""
-        EVALUACIÓN ID: {eval_id}
-        
         Como consultor experto en evaluación de ideas innovadoras, realiza una evaluación cualitativa 
         de la siguiente idea, que representará el 50% de su puntuación final de ranking.
         
@@ -1015,9 +1114,6 @@ def generate_justification_v2(idea_text, analysis_text, score_data, ranking_cont
                 except:
                     safe_ranking_context = ""
         
-        # ID para esta evaluación
-        eval_id = f"justification_{int(time.time())}_{random.randint(1000, 9999)}"
-        
         # Obtener los componentes de la puntuación
         score = score_data.get('score', 0)
         score_quantitative = score_data.get('score_quantitative', 0)
@@ -1094,8 +1190,6 @@ def generate_justification_v2(idea_text, analysis_text, score_data, ranking_cont
         
         # Crear prompt para generar la justificación
         prompt = f"""
-        ID EVALUACIÓN: {eval_id}
-        
         Como consultor estratégico senior de Sener, genera un análisis detallado y completo para la siguiente idea:
         
         IDEA: {safe_idea_text}
@@ -1195,590 +1289,256 @@ def generate_justification_v2(idea_text, analysis_text, score_data, ranking_cont
         traceback.print_exc()
         return f"Error general: {error_msg}"
 
-def generate_ranking_pdf_improved(ideas, ranking_context):
+def generate_ranking_pdf_improved(ideas, ranking_context, layout=None, top_n=None):
     """
     Genera un PDF profesional con el ranking de ideas incluyendo portada,
     tabla de calificaciones, análisis detallado, y matriz de payoff.
+
+    El informe se escribe idea a idea con ranking_pdf.RankingReportWriter; con
+    layout="top" solo las top_n primeras ideas llevan página de detalle.
     
     Args:
         ideas: Lista de ideas rankeadas
         ranking_context: Contexto utilizado para la priorización
+        layout: "full" o "top" (por defecto RANKING_PDF_LAYOUT)
+        top_n: Ideas con detalle en el layout "top" (por defecto RANKING_PDF_TOP_N)
         
     Returns:
         Ruta del archivo PDF generado
     """
+    from ranking_pdf import write_ranking_pdf
+    return write_ranking_pdf(ideas, ranking_context, layout=layout, top_n=top_n)
+
+# Resumen ejecutivo map-reduce: con más de RANKING_SUMMARY_CHUNK_SIZE ideas el ranking se ordena
+# por banda de puntuación y cuadrante de payoff, se parte en unos RANKING_SUMMARY_MAX_GROUPS
+# grupos que se resumen en paralelo (map) y los resúmenes parciales se fusionan por niveles de
+# RANKING_SUMMARY_FAN_IN (reduce). Los grupos crecen con N (hasta RANKING_SUMMARY_MAX_CHUNK ideas)
+# para que el número de llamadas en paralelo, y con él la latencia, no crezca con N
+RANKING_SUMMARY_CHUNK_SIZE = int(os.getenv("RANKING_SUMMARY_CHUNK_SIZE", "25"))
+RANKING_SUMMARY_MAX_CHUNK = int(os.getenv("RANKING_SUMMARY_MAX_CHUNK", "150"))
+RANKING_SUMMARY_MAX_GROUPS = int(os.getenv("RANKING_SUMMARY_MAX_GROUPS", "8"))
+RANKING_SUMMARY_FAN_IN = int(os.getenv("RANKING_SUMMARY_FAN_IN", "16"))
+RANKING_SUMMARY_MAX_WORKERS = int(os.getenv("RANKING_SUMMARY_MAX_WORKERS", "16"))
+
+# Subir al cambiar los prompts del resumen para no reutilizar resultados antiguos
+_RANKING_SUMMARY_VERSION = 2
+
+_SCORE_BANDS = ((70, "alta (>=70)"), (50, "media (50-70)"), (0, "baja (<50)"))
+
+# Cuadrantes de la matriz de payoff (esfuerzo en x, beneficio en y, corte en 50)
+_PAYOFF_QUADRANTS = {
+    (False, True): "Quick Win (poco esfuerzo, alto beneficio)",
+    (True, True): "Estratégica (mucho esfuerzo, alto beneficio)",
+    (False, False): "Mejora menor (poco esfuerzo, bajo beneficio)",
+    (True, False): "Descartable (mucho esfuerzo, bajo beneficio)",
+}
+
+RANKING_SUMMARY_SYSTEM_PROMPT = (
+    "Eres un consultor estratégico senior especializado en evaluación y priorización de ideas "
+    "innovadoras para grandes empresas tecnológicas y de ingeniería."
+)
+
+
+def _summary_number(value, default=0.0):
     try:
-        # Verificar que tenemos ideas
-        if not ideas or not isinstance(ideas, list) or len(ideas) == 0:
-            print("❌ No hay ideas para generar el PDF de ranking")
-            return None
-            
-        # Obtener resumen ejecutivo
-        ranking_summary = generate_ranking_summary(ideas, ranking_context)
-        
-        # Crear PDF
-        from fpdf import FPDF
-        
-        class PDF(FPDF):
-            def header(self):
-                # Logo (solo a partir de la página 2)
-                if self.page_no() > 1:
-                    try:
-                        logo_paths = ["logo.png", "static/logo.png", "assets/logo.png", "../static/logo.png"]
-                        for logo_path in logo_paths:
-                            if os.path.exists(logo_path):
-                                self.image(logo_path, 10, 8, 33)
-                                break
-                    except:
-                        pass
-                    
-                    # Título del documento en cada página (excepto portada)
-                    self.set_font('Helvetica', 'B', 12)
-                    self.cell(0, 10, 'Ranking de Ideas - Análisis de Priorización', 0, 1, 'C')
-                    self.ln(5)
-                
-            def footer(self):
-                # Posicionar a 1.5 cm del final
-                self.set_y(-15)
-                # Fuente y color de texto del pie
-                self.set_font('Helvetica', 'I', 8)
-                self.set_text_color(128, 128, 128)
-                # Número de página centrado
-                self.cell(0, 10, f'Página {self.page_no()}', 0, 0, 'C')
-        
-        # Inicializar PDF con fuente Unicode
-        pdf = PDF()
-        pdf.add_page()
-        pdf.set_auto_page_break(auto=True, margin=15)
-        
-        # Intentar usar fuentes que soporten Unicode
-        try:
-            pdf.add_font('DejaVu', '', 'DejaVuSansCondensed.ttf', uni=True)
-            pdf.add_font('DejaVu', 'B', 'DejaVuSansCondensed-Bold.ttf', uni=True)
-            font_family = 'DejaVu'
-            print("✅ Usando fuente DejaVu con soporte Unicode")
-        except:
-            # Fallback a Arial/Helvetica
-            font_family = 'Helvetica'
-            print("⚠️ Usando fuente Helvetica (limitado soporte Unicode)")
-        
-        # Portada con logo grande y centrado
-        try:
-            logo_paths = ["logo.png", "static/logo.png", "assets/logo.png", "../static/logo.png"]
-            for logo_path in logo_paths:
-                if os.path.exists(logo_path):
-                    # Cálculo para posicionar el logo en el centro
-                    logo_width = 80  # Ancho del logo más grande
-                    logo_x = (210 - logo_width) / 2  # Centrado (A4 = 210mm)
-                    pdf.image(logo_path, x=logo_x, y=40, w=logo_width)
-                    break
-        except Exception as e:
-            print(f"⚠️ No se pudo añadir el logo en la portada: {str(e)}")
-        
-        pdf.set_font(font_family, 'B', 24)
-        pdf.set_text_color(44, 62, 80)  # Azul oscuro
-        pdf.ln(130)  # Espacio después del logo
-        pdf.cell(0, 20, 'RANKING DE IDEAS', ln=True, align='C')
-        pdf.set_font(font_family, '', 16)
-        pdf.cell(0, 10, 'Informe de Priorización', ln=True, align='C')
-        
-        # Fecha y número de ideas
-        pdf.ln(20)
-        pdf.set_font(font_family, '', 12)
-        pdf.set_text_color(100, 100, 100)
-        pdf.cell(0, 10, f'Fecha: {datetime.now().strftime("%d/%m/%Y")}', ln=True, align='C')
-        pdf.cell(0, 10, f'Total de ideas analizadas: {len(ideas)}', ln=True, align='C')
-        
-        # Contexto si existe
-        if ranking_context and isinstance(ranking_context, str) and len(ranking_context.strip()) > 5:
-            # Eliminamos esta sección según la solicitud del usuario
-            # pdf.add_page()
-            # pdf.set_font(font_family, 'B', 16)
-            # pdf.set_text_color(44, 62, 80)
-            # pdf.cell(0, 10, 'Contexto de Priorización', ln=True)
-            # pdf.ln(5)
-            # pdf.set_font(font_family, '', 12)
-            # pdf.set_text_color(0, 0, 0)
-            # clean_context = clean_text_for_pdf(ranking_context)
-            # pdf.multi_cell(0, 6, clean_context)
-            pass
-        
-        # Resumen ejecutivo
-        pdf.add_page()
-        pdf.set_font(font_family, 'B', 16)
-        pdf.set_text_color(44, 62, 80)
-        pdf.cell(0, 10, 'Resumen Ejecutivo', ln=True)
-        pdf.ln(5)
-        pdf.set_font(font_family, '', 12)
-        pdf.set_text_color(0, 0, 0)
-        clean_summary = clean_text_for_pdf(ranking_summary)
-        pdf.multi_cell(0, 6, clean_summary)
-        
-        # Tabla de ideas rankeadas
-        pdf.add_page()
-        pdf.set_font(font_family, 'B', 16)
-        pdf.set_text_color(44, 62, 80)
-        pdf.cell(0, 10, 'Ranking de Ideas', ln=True)
-        pdf.ln(5)
-        
-        # Encabezados de tabla simplificada (solo posición, idea, nota total y página)
-        pdf.set_font(font_family, 'B', 12)
-        pdf.set_fill_color(240, 240, 240)
-        pdf.cell(15, 10, 'Pos.', 1, 0, 'C', True)
-        pdf.cell(130, 10, 'Idea', 1, 0, 'C', True)
-        pdf.cell(25, 10, 'Total', 1, 0, 'C', True)
-        pdf.cell(20, 10, 'Página', 1, 1, 'C', True)
-        
-        # Variables para seguimiento de páginas
-        idea_pages = {}
-        current_page = pdf.page_no()
-        
-        # Datos de la tabla
-        pdf.set_font(font_family, '', 10)
-        for i, idea in enumerate(ideas, 1):
-            if not isinstance(idea, dict):
-                continue
-                
-            # Extraer título
-            title = idea.get('title', '')
-            if not title and 'idea' in idea:
-                idea_text = str(idea['idea'])
-                title = idea_text.split('\n')[0][:50] if '\n' in idea_text else idea_text[:50]
-                if len(title) >= 50:
-                    title += "..."
-            
-            # Si aún no hay título, usar uno genérico
-            if not title:
-                title = f"Idea {i}"
-            
-            # Limpiar título para PDF
-            title = clean_text_for_pdf(title)
-            
-            # Color de fondo alternante
-            fill = i % 2 == 0
-            bg_color = (245, 245, 245) if fill else (255, 255, 255)
-            pdf.set_fill_color(*bg_color)
-            
-            # Puntuación
-            score = idea.get('score', 0)
-            
-            # Página estimada (se actualizará después)
-            idea_pages[i] = "TBD"
-            
-            # Añadir fila
-            pdf.cell(15, 10, str(i), 1, 0, 'C', fill)
-            
-            # Título con altura variable
-            current_x = pdf.get_x()
-            current_y = pdf.get_y()
-            pdf.multi_cell(130, 10, title, 1, 'L', fill)
-            pdf.set_xy(current_x + 130, current_y)
-            
-            # Puntuación total y página (temporal)
-            pdf.cell(25, 10, f"{score:.1f}", 1, 0, 'C', fill)
-            pdf.cell(20, 10, "TBD", 1, 1, 'C', fill)
-            
-            # Si el título era largo y causó un salto de línea, ajustar
-            if pdf.get_y() > current_y + 10:
-                pdf.set_y(pdf.get_y())
-        
-        # Añadir matriz de payoff al PDF
-        from payoff_matrix_generator import add_payoff_matrix_to_pdf
-        try:
-            print("🔄 Generando matriz de payoff para el PDF...")
-            pdf.add_page()
-            add_payoff_matrix_to_pdf(pdf, ideas)
-        except Exception as e:
-            print(f"⚠️ Error al generar matriz de payoff: {str(e)}")
-            traceback.print_exc()
-            # Continuar sin la matriz de payoff
-        
-        # Detalles de cada idea
-        for i, idea in enumerate(ideas, 1):
-            if not isinstance(idea, dict):
-                continue
-                
-            # Nueva página para cada idea
-            pdf.add_page()
-            
-            # Guardar página actual para la tabla de contenidos
-            idea_pages[i] = pdf.page_no()
-            
-            # Título con número de ranking
-            pdf.set_font(font_family, 'B', 14)
-            pdf.set_text_color(44, 62, 80)
-            
-            # Extraer título
-            title = idea.get('title', '')
-            if not title and 'idea' in idea:
-                idea_text = str(idea['idea'])
-                title = idea_text.split('\n')[0][:70] if '\n' in idea_text else idea_text[:70]
-                if len(title) >= 70:
-                    title += "..."
-            
-            # Si aún no hay título, usar uno genérico
-            if not title:
-                title = f"Idea {i}"
-                
-            # Limpiar para PDF
-            title = clean_text_for_pdf(title)
-            
-            # Mostrar título con número de ranking
-            pdf.cell(0, 10, f"{i}. {title}", ln=True)
-            
-            # Insertar resumen ejecutivo de la idea justo después del título
-            pdf.ln(3)
-            pdf.set_font(font_family, '', 10)
-            pdf.set_text_color(60, 60, 60)  # Gris oscuro para diferenciarlo
-            
-            # Generar resumen inteligente en lugar del texto completo
-            if 'idea' in idea:
-                idea_summary = generate_idea_summary(str(idea['idea']), max_chars=300)
-                pdf.multi_cell(0, 5, idea_summary)
-                pdf.ln(3)
-            
-            # Opcional: Agregar indicador de que hay más texto si se truncó
-            original_text = str(idea.get('idea', ''))
-            if len(original_text) > 300:
-                pdf.set_font(font_family, 'I', 8)
-                pdf.set_text_color(120, 120, 120)
-                pdf.cell(0, 4, "(Resumen ejecutivo - ver texto completo al final del documento)", ln=True)
-                pdf.ln(2)
-            
-            # Restablecer color y fuente para la siguiente sección
-            pdf.set_font(font_family, '', 11)
-            pdf.set_text_color(0, 0, 0)
-            
-            # Crear visualización de puntuación
-            try:
-                score = idea.get('score', 0)
-                score_img = generate_score_wheel(score)
-                
-                if score_img:
-                    # Posicionar la rueda a la derecha
-                    current_y = pdf.get_y()
-                    img_width = 40  # Ancho en mm
-                    pdf.image(score_img, x=pdf.w - img_width - 10, y=current_y, w=img_width)
-                    
-                    # Texto explicativo a la izquierda
-                    pdf.set_xy(10, current_y)
-                    pdf.set_font(font_family, 'B', 12)
-                    pdf.cell(pdf.w - img_width - 20, 10, f"Puntuación: {score:.1f}/100", ln=True)
-                    
-                    # Restaurar posición vertical después de la imagen
-                    pdf.set_y(current_y + img_width + 5)
-                else:
-                    # Si no se pudo generar la rueda, mostrar solo texto
-                    pdf.set_font(font_family, 'B', 12)
-                    pdf.cell(0, 10, f"Puntuación: {score:.1f}/100", ln=True)
-            except Exception as e:
-                print(f"⚠️ Error al generar rueda de puntuación: {str(e)}")
-                pdf.set_font(font_family, 'B', 12)
-                pdf.cell(0, 10, f"Puntuación: {score:.1f}/100", ln=True)
-            
-            # Resumen de puntuaciones
-            pdf.ln(5)
-            pdf.set_font(font_family, 'B', 12)
-            pdf.cell(0, 10, 'Resumen de Puntuaciones:', ln=True)
-            
-            # Tabla de puntuaciones
-            pdf.set_font(font_family, '', 10)
-            pdf.set_fill_color(240, 240, 240)
-            
-            # Puntuaciones
-            score = idea.get('score', 0)
-            score_quant = idea.get('score_quantitative', 0)
-            score_qual = idea.get('score_qualitative', 0)
-            
-            # Obtener las métricas originales en su escala (1-5 o 1-9)
-            if 'metrics' in idea and isinstance(idea['metrics'], dict):
-                metrics = idea['metrics']
-                # Valores originales (escala 1-5, excepto TRL que es 1-9)
-                riesgo_tecnico = metrics.get('riesgo_tecnico', 3)
-                tiempo_desarrollo = metrics.get('tiempo_desarrollo', 3)
-                trl_inicial = metrics.get('trl_inicial', 3)
-                trl_final = metrics.get('trl_final', 6)
-                costes_ingresos = metrics.get('ratio_costes_ingresos', metrics.get('costes_ingresos', 3))
-                ingresos_previstos = metrics.get('ingresos_previstos', 3)
-                payback_roi = metrics.get('payback_roi', 3)
-                tamano_mercado = metrics.get('tamano_mercado', 3)
-                riesgo_mercado = metrics.get('riesgo_mercado', 3)
-                alineacion_estrategica = metrics.get('alineacion_estrategica', 3)
-                evaluacion_cualitativa = metrics.get('evaluacion_cualitativa', 3)
-                # Calcular dimensiones en escala 0-100 (igual que en calculate_final_score)
-                # Dimensión Técnica
-                trl_delta = trl_final - trl_inicial
-                if trl_delta >= 6:
-                    progreso_trl = 5.0
-                elif trl_delta >= 4 and trl_delta <= 5:
-                    progreso_trl = 4.0 + (trl_delta - 4) * 0.5
-                elif trl_delta >= 2 and trl_delta <= 3:
-                    progreso_trl = 3.0 + (trl_delta - 2) * 0.5
-                elif trl_delta == 1:
-                    progreso_trl = 2.0
-                else:
-                    progreso_trl = 1.0
-                dim_tecnica = ((float(riesgo_tecnico) + float(tiempo_desarrollo) + float(progreso_trl)) / 3 - 1.0) / 4.0 * 100
-                dim_economica = ((float(costes_ingresos) + float(ingresos_previstos) + float(payback_roi)) / 3 - 1.0) / 4.0 * 100
-                dim_mercado = ((float(tamano_mercado) + float(riesgo_mercado) + float(alineacion_estrategica)) / 3 - 1.0) / 4.0 * 100
-            else:
-                # Convertir valores de 0-100 a escala 0-100 (ya están normalizados)
-                dim_tecnica = idea.get('dimension_tecnica', 60)
-                dim_economica = idea.get('dimension_economica', 60)
-                dim_mercado = idea.get('dimension_mercado', 60)
-            
-            # Primera fila de tabla
-            pdf.set_font(font_family, 'B', 10)
-            pdf.cell(90, 8, "Categoría", 1, 0, 'C', True)
-            pdf.cell(45, 8, "Puntuación", 1, 0, 'C', True)
-            pdf.cell(45, 8, "Peso", 1, 1, 'C', True)
-
-            # Componente Cuantitativo (negrita)
-            pdf.set_font(font_family, 'B', 10)
-            pdf.cell(90, 8, "Componente Cuantitativo", 1, 0, 'L')
-            pdf.cell(45, 8, f"{score_quant:.1f}/100", 1, 0, 'C')
-            pdf.cell(45, 8, "50%", 1, 1, 'C')
-
-            # Dimensiones (guion y texto normal)
-            pdf.set_font(font_family, '', 10)
-            pdf.cell(90, 8, "- Dimensión Técnica", 1, 0, 'L')
-            pdf.cell(45, 8, f"{dim_tecnica:.1f}/100", 1, 0, 'C')
-            pdf.cell(45, 8, "16.7%", 1, 1, 'C')
-
-            pdf.cell(90, 8, "- Dimensión Económica", 1, 0, 'L')
-            pdf.cell(45, 8, f"{dim_economica:.1f}/100", 1, 0, 'C')
-            pdf.cell(45, 8, "16.7%", 1, 1, 'C')
-
-            pdf.cell(90, 8, "- Dimensión de Mercado", 1, 0, 'L')
-            pdf.cell(45, 8, f"{dim_mercado:.1f}/100", 1, 0, 'C')
-            pdf.cell(45, 8, "16.7%", 1, 1, 'C')
-
-            # Evaluación Cualitativa (negrita)
-            pdf.set_font(font_family, 'B', 10)
-            pdf.cell(90, 8, "Evaluación Cualitativa", 1, 0, 'L')
-            pdf.cell(45, 8, f"{score_qual:.1f}/100", 1, 0, 'C')
-            pdf.cell(45, 8, "50%", 1, 1, 'C')
-
-            # Puntuación total (ya estaba en negrita)
-            pdf.set_font(font_family, 'B', 10)
-            pdf.cell(90, 8, "PUNTUACIÓN TOTAL", 1, 0, 'L', True)
-            pdf.cell(45, 8, f"{score:.1f}/100", 1, 0, 'C', True)
-            pdf.cell(45, 8, "100%", 1, 1, 'C', True)
-            
-            # Extraer y añadir métricas si están disponibles
-            pdf.ln(5)
-            if 'metrics' in idea and isinstance(idea['metrics'], dict):
-                pdf.set_font(font_family, 'B', 12)
-                pdf.cell(0, 10, 'Métricas Clave:', ln=True)
-                
-                pdf.set_font(font_family, '', 10)
-                metrics = idea['metrics']
-                
-                # Tabla de métricas - Encabezado
-                pdf.cell(120, 8, "Dimensión y Métrica", 1, 0, 'C', True)
-                pdf.cell(60, 8, "Valor", 1, 1, 'C', True)
-                
-                # Calcular progreso TRL para mostrar
-                trl_inicial = metrics.get('trl_inicial', 3)
-                trl_final = metrics.get('trl_final', 6)
-                trl_delta = trl_final - trl_inicial
-                if trl_delta >= 6:
-                    progreso_trl = 5
-                elif trl_delta >= 4 and trl_delta <= 5:
-                    progreso_trl = 4
-                elif trl_delta >= 2 and trl_delta <= 3:
-                    progreso_trl = 3
-                elif trl_delta == 1:
-                    progreso_trl = 2
-                else:  # trl_delta <= 0
-                    progreso_trl = 1
-                # Dimensión Técnica (mostrar en 1-5 para submétricas)
-                media_tecnica = (float(riesgo_tecnico) + float(tiempo_desarrollo) + float(progreso_trl)) / 3
-                pdf.set_font(font_family, 'B', 10)
-                pdf.cell(120, 8, "Dimensión Técnica (media)", 1, 0, 'L')
-                pdf.cell(60, 8, f"{media_tecnica:.2f}/5", 1, 1, 'C')
-                pdf.set_font(font_family, '', 10)
-                pdf.cell(120, 8, "   - Riesgo Técnico", 1, 0, 'L')
-                pdf.cell(60, 8, f"{riesgo_tecnico:.2f}/5", 1, 1, 'C')
-                pdf.cell(120, 8, "   - Tiempo de Desarrollo", 1, 0, 'L')
-                pdf.cell(60, 8, f"{tiempo_desarrollo:.2f}/5", 1, 1, 'C')
-                pdf.cell(120, 8, "   - Progreso TRL", 1, 0, 'L')
-                pdf.cell(60, 8, f"{progreso_trl}/5 (delta={trl_delta})", 1, 1, 'C')
-                pdf.cell(120, 8, "   - TRL Inicial / Final", 1, 0, 'L')
-                pdf.cell(60, 8, f"{trl_inicial}/9 -> {trl_final}/9", 1, 1, 'C')
-                # Dimensión Económica
-                media_economica = (float(costes_ingresos) + float(ingresos_previstos) + float(payback_roi)) / 3
-                pdf.set_font(font_family, 'B', 10)
-                pdf.cell(120, 8, "Dimensión Económica (media)", 1, 0, 'L')
-                pdf.cell(60, 8, f"{media_economica:.2f}/5", 1, 1, 'C')
-                pdf.set_font(font_family, '', 10)
-                pdf.cell(120, 8, "   - Ratio Costes/Ingresos", 1, 0, 'L')
-                pdf.cell(60, 8, f"{costes_ingresos:.2f}/5", 1, 1, 'C')
-                pdf.cell(120, 8, "   - Ingresos Previstos", 1, 0, 'L')
-                pdf.cell(60, 8, f"{ingresos_previstos:.2f}/5", 1, 1, 'C')
-                pdf.cell(120, 8, "   - Payback/ROI", 1, 0, 'L')
-                pdf.cell(60, 8, f"{payback_roi:.2f}/5", 1, 1, 'C')
-                # Dimensión de Mercado
-                media_mercado = (float(tamano_mercado) + float(riesgo_mercado) + float(alineacion_estrategica)) / 3
-                pdf.set_font(font_family, 'B', 10)
-                pdf.cell(120, 8, "Dimensión de Mercado (media)", 1, 0, 'L')
-                pdf.cell(60, 8, f"{media_mercado:.2f}/5", 1, 1, 'C')
-                pdf.set_font(font_family, '', 10)
-                pdf.cell(120, 8, "   - Tamaño de Mercado", 1, 0, 'L')
-                pdf.cell(60, 8, f"{tamano_mercado:.2f}/5", 1, 1, 'C')
-                pdf.cell(120, 8, "   - Riesgo de Mercado", 1, 0, 'L')
-                pdf.cell(60, 8, f"{riesgo_mercado:.2f}/5", 1, 1, 'C')
-                pdf.cell(120, 8, "   - Alineación Estratégica", 1, 0, 'L')
-                pdf.cell(60, 8, f"{alineacion_estrategica:.2f}/5", 1, 1, 'C')
-                # Evaluación cualitativa (componente separado)
-                pdf.set_font(font_family, 'B', 10)
-                pdf.cell(120, 8, "Evaluación Cualitativa", 1, 0, 'L')
-                pdf.cell(60, 8, f"{evaluacion_cualitativa:.2f}/5", 1, 1, 'C')
-            
-            # Añadir la sección de justificación
-            pdf.ln(10)
-            pdf.set_font(font_family, 'B', 14)
-            pdf.set_text_color(44, 62, 80)
-            pdf.cell(0, 10, 'Justificación:', ln=True)
-            pdf.ln(2)
-            
-            # Extraer y añadir la justificación
-            if 'justification' in idea and idea['justification']:
-                justification_text = clean_text_for_pdf(str(idea['justification']))
-                pdf.set_font(font_family, '', 11)
-                pdf.set_text_color(0, 0, 0)
-                pdf.multi_cell(0, 6, justification_text)
-            else:
-                pdf.set_font(font_family, '', 11)
-                pdf.set_text_color(100, 100, 100)
-                pdf.multi_cell(0, 6, "No se ha proporcionado una justificación detallada para esta idea.")
-        
-        # Volver a la página de tabla de ranking para actualizar los números de página
-        # La siguiente línea puede causar errores:
-        # pdf.page = current_page
-        
-        # En lugar de intentar volver a una página anterior, vamos a crear
-        # páginas de referencias por separado al final
-        
-        # Guardar la página actual antes de añadir la página de referencias
-        current_page_final = pdf.page_no()
-        
-        # Añadir una página para referencias
-        pdf.add_page()
-        pdf.set_font(font_family, 'B', 16)
-        pdf.set_text_color(44, 62, 80)  # Azul oscuro
-        pdf.cell(0, 10, "Referencias de Ideas", 0, 1, 'C')
-        pdf.ln(5)
-        
-        # Tabla de referencias
-        pdf.set_font(font_family, 'B', 12)
-        pdf.set_fill_color(240, 240, 240)
-        pdf.cell(15, 10, 'Pos.', 1, 0, 'C', True)
-        pdf.cell(130, 10, 'Idea', 1, 0, 'C', True)
-        pdf.cell(45, 10, 'Página', 1, 1, 'C', True)
-        
-        # Datos de la tabla
-        pdf.set_font(font_family, '', 10)
-        for i, idea in enumerate(ideas, 1):
-            if not isinstance(idea, dict):
-                continue
-                
-            # Extraer título
-            title = idea.get('title', '')
-            if not title and 'idea' in idea:
-                idea_text = str(idea['idea'])
-                title = idea_text.split('\n')[0][:50] if '\n' in idea_text else idea_text[:50]
-                if len(title) >= 50:
-                    title += "..."
-            
-            # Si aún no hay título, usar uno genérico
-            if not title:
-                title = f"Idea {i}"
-                
-            # Limpiar título para PDF
-            title = clean_text_for_pdf(title)
-            
-            # Color de fondo alternante
-            fill = i % 2 == 0
-            bg_color = (245, 245, 245) if fill else (255, 255, 255)
-            pdf.set_fill_color(*bg_color)
-            
-            # Página
-            page_num = idea_pages[i]
-            
-            # Añadir fila
-            pdf.cell(15, 10, str(i), 1, 0, 'C', fill)
-            
-            # Título con altura variable
-            current_x = pdf.get_x()
-            current_y = pdf.get_y()
-            pdf.multi_cell(130, 10, title, 1, 'L', fill)
-            pdf.set_xy(current_x + 130, current_y)
-            
-            # Página
-            pdf.cell(45, 10, str(page_num), 1, 1, 'C', fill)
-        
-        # Añadir sección de textos completos al final (solo para ideas que fueron resumidas)
-        long_ideas = [idea for idea in ideas if len(str(idea.get('idea', ''))) > 300]
-        if long_ideas:
-            pdf.add_page()
-            pdf.set_font(font_family, 'B', 16)
-            pdf.set_text_color(44, 62, 80)
-            pdf.cell(0, 10, 'Anexo: Textos Completos de Ideas', ln=True)
-            pdf.ln(5)
-            
-            pdf.set_font(font_family, '', 10)
-            pdf.set_text_color(100, 100, 100)
-            pdf.cell(0, 6, 'Esta sección contiene el texto completo de las ideas que fueron resumidas en las páginas anteriores.', ln=True)
-            pdf.ln(8)
-            
-            for idea in long_ideas:
-                # Buscar el número de ranking
-                idea_index = next((i+1 for i, ranked_idea in enumerate(ideas) if ranked_idea == idea), 0)
-                
-                # Título
-                pdf.set_font(font_family, 'B', 12)
-                pdf.set_text_color(44, 62, 80)
-                title = idea.get('title', '')
-                if not title and 'idea' in idea:
-                    idea_text = str(idea['idea'])
-                    title = idea_text.split('\n')[0][:70] if '\n' in idea_text else idea_text[:70]
-                    if len(title) >= 70:
-                        title += "..."
-                if not title:
-                    title = f"Idea {idea_index}"
-                
-                pdf.cell(0, 8, f"{idea_index}. {clean_text_for_pdf(title)}", ln=True)
-                pdf.ln(3)
-                
-                # Texto completo
-                pdf.set_font(font_family, '', 9)
-                pdf.set_text_color(0, 0, 0)
-                full_text = clean_text_for_pdf(str(idea.get('idea', '')))
-                pdf.multi_cell(0, 5, full_text)
-                pdf.ln(8)
-        
-        # Guardar PDF
-        output_dir = "output"
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-        
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        pdf_path = os.path.join(output_dir, f"ranking_{timestamp}.pdf")
-        pdf.output(pdf_path)
-        
-        print(f"✅ PDF de ranking generado exitosamente: {pdf_path}")
-        return pdf_path
-        
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _score_band(score):
+    for threshold, label in _SCORE_BANDS:
+        if score >= threshold:
+            return label
+    return _SCORE_BANDS[-1][1]
+
+
+def _payoff_quadrant(idea):
+    effort = _summary_number(idea.get('effort', 50), 50)
+    benefit = _summary_number(idea.get('benefit', 50), 50)
+    return _PAYOFF_QUADRANTS[(effort >= 50, benefit >= 50)]
+
+
+def _summary_idea_line(position, idea):
+    """Una línea compacta por idea: posición, título, puntuaciones, payoff y motivo."""
+    title = idea.get('title') or str(idea.get('idea', '')).split('\n')[0][:80] or f"Idea {position}"
+    reason = re.sub(r'\s+', ' ', str(idea.get('justification') or idea.get('idea') or '')).strip()[:200]
+    return (f"{position}. {title} | {_summary_number(idea.get('score')):.1f}/100 "
+            f"(cuant. {_summary_number(idea.get('score_quantitative')):.0f}, "
+            f"cualit. {_summary_number(idea.get('score_qualitative')):.0f}) | "
+            f"esfuerzo {_summary_number(idea.get('effort', 50), 50):.0f}, "
+            f"beneficio {_summary_number(idea.get('benefit', 50), 50):.0f} | {reason}")
+
+
+def _ranking_summary_groups(indexed_ideas):
+    """
+    Grupos del map. Las ideas se ordenan por banda de puntuación y cuadrante de payoff
+    (y dentro de cada uno por posición) y se cortan en grupos de tamaño parecido, así
+    que cada grupo cubre uno o pocos conjuntos banda/cuadrante contiguos.
+
+    Returns:
+        Lista de grupos; cada grupo es una lista de ((banda, cuadrante), [(posición, idea), ...])
+    """
+    clusters = {}
+    for position, idea in indexed_ideas:
+        score = _summary_number(idea.get('score'))
+        clusters.setdefault((_score_band(score), _payoff_quadrant(idea)), []).append((position, idea))
+    # Bandas de mayor a menor puntuación; dentro de cada una, por la mejor posición del cuadrante
+    band_order = {label: i for i, (_, label) in enumerate(_SCORE_BANDS)}
+    ordered = sorted(clusters.items(), key=lambda item: (band_order[item[0][0]], item[1][0][0]))
+
+    total = len(indexed_ideas)
+    chunk_size = max(RANKING_SUMMARY_CHUNK_SIZE, (total + RANKING_SUMMARY_MAX_GROUPS - 1) // max(1, RANKING_SUMMARY_MAX_GROUPS))
+    chunk_size = max(1, min(chunk_size, RANKING_SUMMARY_MAX_CHUNK))
+    # Repartir por igual para no dejar un último grupo casi vacío
+    group_count = (total + chunk_size - 1) // chunk_size
+    chunk_size = (total + group_count - 1) // group_count
+
+    groups, current, current_size = [], [], 0
+    for cluster, members in ordered:
+        while members:
+            take = members[:chunk_size - current_size]
+            members = members[len(take):]
+            current.append((cluster, take))
+            current_size += len(take)
+            if current_size >= chunk_size:
+                groups.append(current)
+                current, current_size = [], 0
+    if current:
+        groups.append(current)
+    return groups
+
+
+def _ranking_summary_stats(indexed_ideas, ranking_context):
+    """Datos globales del ranking calculados localmente: puntuaciones, distribución y fortalezas del top."""
+    scores = [_summary_number(idea.get('score')) for _, idea in indexed_ideas]
+    distribution = {}
+    for (position, idea), score in zip(indexed_ideas, scores):
+        distribution.setdefault((_score_band(score), _payoff_quadrant(idea)), []).append(score)
+    distribution_text = "\n".join(
+        f"    - Puntuación {band} / {quadrant}: {len(values)} ideas (media {sum(values) / len(values):.1f})"
+        for (band, quadrant), values in sorted(distribution.items(), key=lambda item: -len(item[1]))
+    )
+    top_ideas_info = "\n".join(
+        f"    - {position}. {idea.get('title', 'Idea sin título')} ({_summary_number(idea.get('score')):.1f}/100)"
+        for position, idea in indexed_ideas[:3]
+    )
+
+    # Métricas en las que destaca la primera idea
+    top_strengths = []
+    metrics = indexed_ideas[0][1].get('metrics')
+    if isinstance(metrics, dict):
+        for key, label in (('riesgo_tecnico', "bajo riesgo técnico"),
+                           ('tiempo_desarrollo', "corto tiempo de desarrollo"),
+                           ('costes_ingresos', "excelente relación costes-ingresos"),
+                           ('ingresos_previstos', "alto potencial de ingresos"),
+                           ('riesgo_mercado', "bajo riesgo de mercado")):
+            if _summary_number(metrics.get(key, 0)) >= 4:
+                top_strengths.append(label)
+
+    return {
+        "num_ideas": len(indexed_ideas),
+        "max_score": max(scores),
+        "min_score": min(scores),
+        "avg_score": sum(scores) / len(scores),
+        "top_ideas_info": top_ideas_info,
+        "distribution_text": distribution_text,
+        "strengths_text": ", ".join(top_strengths) if top_strengths else "múltiples áreas",
+        "context": ranking_context if ranking_context else "No se ha especificado un contexto particular de priorización.",
+    }
+
+
+def _summary_call(prompt, max_tokens, task=None, timeout=60):
+    kwargs = {"task": task} if task else {}
+    response = client.chat.completions.create(
+        model=DEPLOYMENT_NAME,
+        messages=[
+            {"role": "system", "content": RANKING_SUMMARY_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.3 if task else 0.7,
+        max_tokens=max_tokens,
+        timeout=timeout,
+        **kwargs
+    )
+    if response and response.choices and response.choices[0].message and response.choices[0].message.content:
+        return response.choices[0].message.content.strip()
+    raise ValueError("respuesta vacía del LLM")
+
+
+def _summarize_ranking_group(group, ranking_context):
+    """Map: resumen breve de un grupo de ideas, separadas por banda de puntuación y cuadrante."""
+    labels = ", ".join(f"puntuación {band} / {quadrant} ({len(members)} ideas)" for (band, quadrant), members in group)
+    sections = "\n\n".join(
+        f"    PUNTUACIÓN {band.upper()} / {quadrant.upper()}:\n"
+        + "\n".join(_summary_idea_line(position, idea) for position, idea in members)
+        for (band, quadrant), members in group
+    )
+    cache_key = "ranking_summary_group_" + hashlib.md5(
+        f"{_RANKING_SUMMARY_VERSION}|{ranking_context}|{sections}".encode()).hexdigest()
+    if cache_key in _api_cache:
+        return _api_cache[cache_key]
+
+    prompt = f"""
+    Resume en 80-120 palabras este grupo de ideas de un ranking de ideas innovadoras.
+    Contiene: {labels}.
+
+    CONTEXTO DE PRIORIZACIÓN: {ranking_context or "No especificado."}
+
+    IDEAS (posición. título | puntuación | esfuerzo y beneficio | motivo):
+{sections}
+
+    Indica, para cada banda y cuadrante, los temas comunes y por qué puntúan así, y cita por su
+    posición las ideas más destacables. Texto fluido, sin listas ni subtítulos, solo ASCII básico.
+    """
+    try:
+        summary = _summary_call(prompt, max_tokens=300, task="summary")
     except Exception as e:
-        print(f"❌ Error al generar PDF de ranking: {str(e)}")
-        traceback.print_exc()
-        return None
+        # Sin resumen del grupo, el reduce sigue con los datos mínimos del grupo
+        print(f"⚠️ Error resumiendo el grupo del ranking ({labels}): {str(e)}")
+        return f"[{labels}] " + "; ".join(
+            f"{position}. {idea.get('title', 'Idea sin título')}" for _, members in group for position, idea in members[:3])
+    summary = f"[{labels}] {summary}"
+    _api_cache[cache_key] = summary
+    return summary
+
+
+def _merge_ranking_summaries(partials, ranking_context):
+    """Reduce intermedio: funde varios resúmenes parciales en uno solo."""
+    joined = "\n\n".join(partials)
+    cache_key = "ranking_summary_merge_" + hashlib.md5(
+        f"{_RANKING_SUMMARY_VERSION}|{ranking_context}|{joined}".encode()).hexdigest()
+    if cache_key in _api_cache:
+        return _api_cache[cache_key]
+    prompt = f"""
+    Fusiona estos resúmenes parciales de grupos de un ranking de ideas en un único resumen de
+    150-200 palabras. Conserva las bandas de puntuación y cuadrantes de payoff, los temas
+    comunes y las posiciones de las ideas más destacables. Solo ASCII básico, sin listas.
+
+    CONTEXTO DE PRIORIZACIÓN: {ranking_context or "No especificado."}
+
+    RESÚMENES PARCIALES:
+    {joined}
+    """
+    try:
+        merged = _summary_call(prompt, max_tokens=450, task="summary")
+    except Exception as e:
+        print(f"⚠️ Error fusionando resúmenes parciales del ranking: {str(e)}")
+        # Sin fusión, se conserva el principio de cada resumen parcial
+        return "\n".join(partial[:300] for partial in partials)
+    _api_cache[cache_key] = merged
+    return merged
+
 
 def generate_ranking_summary(ranked_ideas, ranking_context=""):
     """
     Genera un resumen ejecutivo del ranking global de ideas, explicando patrones, 
     criterios de priorización y razones por las que algunas ideas destacan sobre otras.
+
+    Con pocas ideas todas van en el prompt final. Con más de RANKING_SUMMARY_CHUNK_SIZE
+    se resumen en paralelo por grupos (banda de puntuación x cuadrante de payoff) y los
+    resúmenes se fusionan por niveles, así que el prompt final tiene un tamaño acotado
+    y la latencia crece con log(N) en lugar de con N.
     
     Args:
         ranked_ideas: Lista de ideas ya ordenadas por puntuación
@@ -1787,73 +1547,66 @@ def generate_ranking_summary(ranked_ideas, ranking_context=""):
     Returns:
         Un texto con el resumen ejecutivo del ranking
     """
-    if not ranked_ideas or len(ranked_ideas) == 0:
+    indexed_ideas = [(position, idea) for position, idea in enumerate(ranked_ideas or [], 1) if isinstance(idea, dict)]
+    if not indexed_ideas:
         return "No hay ideas suficientes para generar un resumen del ranking."
-    
-    # Extraer información clave de las ideas rankeadas
-    num_ideas = len(ranked_ideas)
-    max_score = ranked_ideas[0].get('score', 0) if num_ideas > 0 else 0
-    min_score = ranked_ideas[-1].get('score', 0) if num_ideas > 0 else 0
-    avg_score = sum(idea.get('score', 0) for idea in ranked_ideas) / num_ideas if num_ideas > 0 else 0
-    
-    # Extraer títulos de las ideas mejor rankeadas (top 3 o menos)
-    top_ideas = ranked_ideas[:min(3, num_ideas)]
-    top_ideas_info = "\n".join([f"- {i+1}. {idea.get('title', 'Idea sin título')} ({idea.get('score', 0):.1f}/100)" 
-                               for i, idea in enumerate(top_ideas)])
-    
-    # Obtener las categorías/métricas donde las ideas mejor rankeadas destacan
-    top_strengths = []
-    if num_ideas > 0 and 'metrics' in ranked_ideas[0]:
-        metrics = ranked_ideas[0]['metrics']
-        # Identificar las métricas más altas
-        if metrics.get('riesgo_tecnico', 0) >= 4:
-            top_strengths.append("bajo riesgo técnico")
-        if metrics.get('tiempo_desarrollo', 0) >= 4:
-            top_strengths.append("corto tiempo de desarrollo")
-        if metrics.get('costes_ingresos', 0) >= 4:
-            top_strengths.append("excelente relación costes-ingresos")
-        if metrics.get('ingresos_previstos', 0) >= 4:
-            top_strengths.append("alto potencial de ingresos")
-        if metrics.get('riesgo_mercado', 0) >= 4:
-            top_strengths.append("bajo riesgo de mercado")
-    
-    strengths_text = ", ".join(top_strengths) if top_strengths else "múltiples áreas"
-    
-    # Crear un ID único para esta solicitud
-    eval_id = f"ranking_summary_{int(time.time())}_{random.randint(1000, 9999)}"
-    
-    # Crear clave de caché
-    cache_key = f"ranking_summary_{hashlib.md5((str(max_score) + str(min_score) + str(num_ideas) + (ranking_context[:100] if ranking_context else '')).encode()).hexdigest()}"
-    
-    # Verificar si ya tenemos este resultado en caché
+
+    # La clave cubre el ranking completo: misma lista y contexto, mismo resumen
+    fingerprint = "\n".join(f"{position}|{idea.get('title', '')}|{_summary_number(idea.get('score')):.1f}"
+                            for position, idea in indexed_ideas)
+    cache_key = "ranking_summary_" + hashlib.md5(
+        f"{_RANKING_SUMMARY_VERSION}|{ranking_context}|{fingerprint}".encode()).hexdigest()
     if cache_key in _api_cache:
         print(f"🔄 Usando resumen de ranking en caché")
         return _api_cache[cache_key]
-    
-    # Crear el prompt para generar el resumen ejecutivo
+
+    stats = _ranking_summary_stats(indexed_ideas, ranking_context)
+
+    if len(indexed_ideas) <= RANKING_SUMMARY_CHUNK_SIZE:
+        material_title = "IDEAS DEL RANKING (posición. título | puntuación | esfuerzo y beneficio | motivo)"
+        material = "\n".join(_summary_idea_line(position, idea) for position, idea in indexed_ideas)
+    else:
+        groups = _ranking_summary_groups(indexed_ideas)
+        workers = max(1, RANKING_SUMMARY_MAX_WORKERS)
+        fan_in = max(2, RANKING_SUMMARY_FAN_IN)
+        with JobThreadPoolExecutor(max_workers=workers) as executor:
+            partials = list(executor.map(lambda group: _summarize_ranking_group(group, ranking_context), groups))
+            levels = 0
+            while len(partials) > fan_in:
+                batches = [partials[i:i + fan_in] for i in range(0, len(partials), fan_in)]
+                partials = list(executor.map(lambda batch: _merge_ranking_summaries(batch, ranking_context), batches))
+                levels += 1
+        print(f"📝 Resumen del ranking: {len(indexed_ideas)} ideas en {len(groups)} grupos, "
+              f"{levels} niveles de fusión")
+        material_title = "RESÚMENES POR GRUPOS (banda de puntuación / cuadrante de payoff)"
+        material = "\n\n".join(partials)
+
     prompt = f"""
-    ID EVALUACIÓN: {eval_id}
-    
     Como consultor estratégico senior de Sener, genera un RESUMEN EJECUTIVO GLOBAL del ranking de ideas innovadoras.
     
     DATOS DEL RANKING:
-    - Número total de ideas evaluadas: {num_ideas}
-    - Puntuación más alta: {max_score:.1f}/100
-    - Puntuación más baja: {min_score:.1f}/100
-    - Puntuación media: {avg_score:.1f}/100
+    - Número total de ideas evaluadas: {stats['num_ideas']}
+    - Puntuación más alta: {stats['max_score']:.1f}/100
+    - Puntuación más baja: {stats['min_score']:.1f}/100
+    - Puntuación media: {stats['avg_score']:.1f}/100
     - Ideas mejor rankeadas:
-    {top_ideas_info}
+{stats['top_ideas_info']}
+    - Distribución por banda de puntuación y cuadrante de payoff:
+{stats['distribution_text']}
     
     CONTEXTO DE PRIORIZACIÓN:
-    {ranking_context if ranking_context else "No se ha especificado un contexto particular de priorización."}
+    {stats['context']}
+
+    {material_title}:
+    {material}
     
     INSTRUCCIONES:
     Genera un análisis global del ranking (350-450 palabras) que:
     
     1. Explique las tendencias generales observadas en el ranking y por qué ciertas ideas destacan sobre otras.
-    2. Analice los patrones comunes entre las ideas mejor puntuadas (p.ej., destacan en {strengths_text}).
+    2. Analice los patrones comunes entre las ideas mejor puntuadas (p.ej., destacan en {stats['strengths_text']}).
     3. Interprete cómo el contexto de priorización (si existe) ha influido en la evaluación.
-    4. Proporcione recomendaciones globales sobre cómo proceder con las ideas rankeadas.
+    4. Proporcione recomendaciones globales sobre cómo proceder con las ideas rankeadas, por cuadrante de payoff.
     5. Destaque diferencias clave entre las ideas de alta y baja puntuación.
     
     El resumen debe ser profesional, estratégico y útil para la toma de decisiones ejecutivas.
@@ -1862,55 +1615,299 @@ def generate_ranking_summary(ranked_ideas, ranking_context=""):
     """
     
     try:
-        # Usar client.chat.completions.create para llamar a la API
+        summary = _summary_call(prompt, max_tokens=1000)
+        # Limpiar el resumen para eliminar caracteres problemáticos
+        clean_summary = clean_text_for_pdf(summary)
+        _api_cache[cache_key] = clean_summary
+        return clean_summary
+    except Exception as api_error:
+        print(f"❌ Error generando resumen del ranking: {str(api_error)}")
+        return f"Error al generar el resumen ejecutivo: {str(api_error)}"
+
+
+# Métricas 1-5 que se piden en el modo estructurado (mismas claves que extract_metrics_from_analysis)
+_STRUCTURED_METRICS = {
+    "riesgo_tecnico": "Escala 1-5: 1 = viabilidad dudosa, 5 = tecnología probada",
+    "tiempo_desarrollo": "Escala 1-5: 1 = más de 3 años, 5 = menos de 6 meses",
+    "ratio_costes_ingresos": "Escala 1-5: 1 = costes >75% de ingresos, 5 = <10%",
+    "ingresos_previstos": "Escala 1-5: 1 = <0,5 M€, 5 = >20 M€",
+    "payback_roi": "Escala 1-5: 1 = retorno >5 años, 5 = retorno <1 año",
+    "tamano_mercado": "Escala 1-5: 1 = TAM <0,5 B€, 5 = TAM >10 B€",
+    "riesgo_mercado": "Escala 1-5: 1 = riesgo alto, 5 = riesgo bajo",
+    "alineacion_estrategica": "Escala 1-5: 1 = baja sinergia con SENER, 5 = encaje perfecto",
+}
+
+STRUCTURED_MAX_TOKENS = 2500
+
+STRUCTURED_SYSTEM_PROMPT = (
+    "Eres un consultor estratégico sénior de SENER especializado en evaluar y priorizar ideas "
+    "innovadoras. Evalúas con criterio firme, basándote en la idea y su análisis, sin inventar datos: "
+    "si falta información para una métrica usa el valor neutro (3). Respondes solo con el JSON pedido."
+)
+
+
+def _structured_ranking_schema(include_analysis):
+    properties = {key: {"type": "number", "description": desc} for key, desc in _STRUCTURED_METRICS.items()}
+    properties.update({
+        "trl_inicial": {"type": "integer", "description": "TRL actual 1-9"},
+        "trl_final": {"type": "integer", "description": "TRL esperado tras el desarrollo 1-9"},
+        "puntuacion_cualitativa": {"type": "number", "description": "Evaluación cualitativa global 0-100"},
+        "justificacion_cualitativa": {"type": "string", "description": "Motivo de la evaluación cualitativa"},
+        "justificacion": {"type": "string", "description": "Análisis de la valoración (250-400 palabras)"},
+        "effort": {"type": "number", "description": "Esfuerzo de implementación 0-100"},
+        "benefit": {"type": "number", "description": "Beneficio esperado 0-100"},
+        "effort_justification": {"type": "string", "description": "Motivo del esfuerzo"},
+        "benefit_justification": {"type": "string", "description": "Motivo del beneficio"},
+    })
+    if include_analysis:
+        properties["analisis"] = {
+            "type": "string",
+            "description": "Análisis conciso con secciones RESUMEN EJECUTIVO, ANÁLISIS TÉCNICO, "
+                           "VIABILIDAD COMERCIAL y VALORACIÓN GLOBAL (títulos en mayúsculas)",
+        }
+    return {
+        "name": "evaluacion_idea",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": properties,
+            "required": list(properties),
+            "additionalProperties": False,
+        },
+    }
+
+
+def evaluate_idea_structured(idea_text, analysis_text="", ranking_context=""):
+    """
+    Evalúa una idea con una sola llamada al LLM (modo de ranking "structured").
+
+    Devuelve en una respuesta JSON con esquema todo lo que el modo "chain" obtiene con
+    cinco llamadas: métricas, evaluación cualitativa, justificación y effort/benefit
+    (y un análisis breve si la idea no lo traía). La puntuación final se sigue
+    calculando localmente con calculate_final_score. Retorna None si falla, para que
+    el llamante use la cadena de llamadas.
+    """
+    has_analysis = bool(analysis_text) and len(analysis_text.strip()) >= 100
+    context_text = f"CONTEXTO DE PRIORIZACIÓN:\n{ranking_context[:1000]}\n\n" if ranking_context and ranking_context.strip() else ""
+    analysis_block = f"ANÁLISIS DETALLADO:\n{analysis_text[:6000]}\n\n" if has_analysis else ""
+    prompt = (
+        f"IDEA A EVALUAR:\n{idea_text[:2000]}\n\n"
+        f"{analysis_block}{context_text}"
+        "Evalúa la idea y rellena todos los campos del esquema:\n"
+        "- Métricas en escala 1-5 con decimales (TRL entero 1-9), basadas solo en la evidencia disponible.\n"
+        "- puntuacion_cualitativa 0-100: calidad, innovación, viabilidad y potencial "
+        "(0-20 inviable, 41-60 media, 81-100 excepcional).\n"
+        "- justificacion: texto fluido de 250-400 palabras con la valoración general, las dimensiones "
+        "técnica, económica y de mercado, la alineación con el contexto de priorización, fortalezas, "
+        "debilidades y siguientes pasos. Solo caracteres ASCII básicos.\n"
+        "- effort y benefit 0-100 para la payoff matrix; polariza los valores y evita quedarte en 50 "
+        "salvo que el caso esté claramente equilibrado.\n"
+        + ("- analisis: la idea no trae análisis previo; redacta uno conciso.\n" if not has_analysis else "")
+    )
+
+    try:
         response = client.chat.completions.create(
             model=DEPLOYMENT_NAME,
             messages=[
-                {"role": "system", "content": "Eres un consultor estratégico senior especializado en evaluación y priorización de ideas innovadoras para grandes empresas tecnológicas y de ingeniería."},
+                {"role": "system", "content": STRUCTURED_SYSTEM_PROMPT},
                 {"role": "user", "content": prompt}
             ],
-            temperature=0.7,
-            max_tokens=1000,
-            timeout=60
+            temperature=0.2,
+            max_tokens=STRUCTURED_MAX_TOKENS,
+            response_format={"type": "json_schema", "json_schema": _structured_ranking_schema(not has_analysis)},
+            timeout=90
         )
-        
-        if response and response.choices and response.choices[0].message:
-            summary = response.choices[0].message.content.strip()
-            # Limpiar el resumen para eliminar caracteres problemáticos
-            clean_summary = clean_text_for_pdf(summary)
-            # Guardar en caché
-            _api_cache[cache_key] = clean_summary
-            return clean_summary
-        else:
-            return "No se pudo generar un resumen ejecutivo del ranking. Por favor, revise los detalles individuales de cada idea."
-            
-    except Exception as api_error:
-        print(f"❌ Error generando resumen del ranking: {str(api_error)}")
-        return f"Error al generar el resumen ejecutivo: {str(api_error)}"
+        result = json.loads(response.choices[0].message.content)
+    except Exception as e:
+        print(f"⚠️ Evaluación estructurada fallida, se usa la cadena de llamadas: {str(e)}")
+        return None
+
+    try:
+        metrics = {}
+        for key in _STRUCTURED_METRICS:
+            metrics[key] = max(1, min(5, float(result.get(key, 3))))
+        metrics['trl_inicial'] = max(1, min(9, int(result.get('trl_inicial', 3))))
+        metrics['trl_final'] = max(1, min(9, int(result.get('trl_final', 6))))
+        qualitative_score = max(0, min(100, float(result.get('puntuacion_cualitativa', 50))))
+        return {
+            "metrics": metrics,
+            "qualitative_score": qualitative_score,
+            "qualitative_justification": str(result.get('justificacion_cualitativa', '')),
+            "justification": clean_text_for_pdf(str(result.get('justificacion', ''))),
+            # Mismo rango que calculate_payoff_matrix_values
+            "effort": min(99, max(1, float(result.get('effort', 50)))),
+            "benefit": min(99, max(1, float(result.get('benefit', 50)))),
+            # Solo si la idea no traía análisis
+            "analysis": None if has_analysis else str(result.get('analisis', '')),
+        }
+    except (TypeError, ValueError) as e:
+        print(f"⚠️ Respuesta estructurada con valores no válidos: {str(e)}")
+        return None
+
+
+def compute_idea_fingerprint(idea_text, analysis_text="", ranking_context="", scoring_mode=None):
+    """
+    Huella (sha256) de lo que determina la puntuación de una idea: texto de la idea,
+    análisis de entrada, contexto del ranking, versión de la puntuación y modo.
+    """
+    payload = json.dumps(
+        [
+            RANKING_SCORING_VERSION,
+            scoring_mode or RANKING_SCORING_MODE,
+            str(idea_text or "").strip(),
+            str(analysis_text or "").strip(),
+            str(ranking_context or "").strip(),
+        ],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _idea_fingerprint(idea, ranking_context, scoring_mode):
+    """Huella de una entrada de generate_ranking (texto o diccionario con idea/analysis)."""
+    if isinstance(idea, dict):
+        return compute_idea_fingerprint(idea.get('idea', ''), idea.get('analysis', ''), ranking_context, scoring_mode)
+    if isinstance(idea, str):
+        return compute_idea_fingerprint(idea, "", ranking_context, scoring_mode)
+    return None
+
+
+def _reuse_ranked_idea(stored, idea_index):
+    """
+    Reconstruye el resultado de una idea ya rankeada sin llamar al LLM: recalcula el
+    score con las métricas guardadas y regenera la rueda de puntuación, que no se guarda.
+    """
+    result = {key: value for key, value in stored.items() if key not in _TOURNAMENT_FIELDS}
+    score_data = calculate_final_score(dict(stored["metrics"]))
+    for key in ("score", "score_quantitative", "score_qualitative",
+                "dimension_tecnica", "dimension_economica", "dimension_mercado"):
+        if key in score_data:
+            result[key] = score_data[key]
+    result["wheel_img"] = generate_score_wheel(result["score"])
+    result["index"] = idea_index
+    return result
 
-def generate_ranking(ideas_list, ranking_context="", max_workers=10, batch_size=None):
+
+def sort_ranked_ideas(ranked_ideas):
+    """
+    Orden del ranking: el del torneo si todas las ideas lo tienen (RANKING_ORDER_MODE=tournament)
+    y si no por puntuación; en empate, por orden de entrada (también con ideas reutilizadas).
+    """
+    ordered = sorted(ranked_ideas, key=lambda x: x.get('index', 0))
+    if ordered and all(isinstance(x.get('tournament_rank'), int) for x in ordered):
+        ordered.sort(key=lambda x: x['tournament_rank'])
+    else:
+        ordered.sort(key=lambda x: x.get('score', 0), reverse=True)
+    return ordered
+
+
+def _order_by_tournament(ranked_ideas, ranking_context):
+    """Reordena las ideas puntuadas con el torneo por pares; si falla, se quedan en orden de puntuación."""
+    try:
+        result = generate_tournament_ranking(sort_ranked_ideas(ranked_ideas), ranking_context,
+                                             top_k=RANKING_TOURNAMENT_TOP_K)
+        if len(result["ranking"]) == len(ranked_ideas):
+            return result["ranking"]
+    except Exception as e:
+        print(f"⚠️ Error en el torneo, se mantiene el orden por puntuación: {str(e)}")
+        traceback.print_exc()
+    return ranked_ideas
+
+
+@llm_job("ranking")
+def generate_ranking(ideas_list, ranking_context="", max_workers=10, batch_size=None, scoring_mode=None,
+                     previous_ranking=None, packed=None, order_mode=None):
     """
     Genera un ranking basado en el análisis de las ideas, extrayendo métricas y calculando scores.
     Utiliza procesamiento en paralelo para reducir significativamente el tiempo de cálculo.
+    Mismos parámetros que iter_ranking; retorna la lista final ordenada por puntuación
+    (o por el torneo con order_mode="tournament").
+    """
+    ranked_ideas = []
+    for ranked_ideas, _, _ in iter_ranking(ideas_list, ranking_context, max_workers=max_workers,
+                                           batch_size=batch_size, scoring_mode=scoring_mode,
+                                           previous_ranking=previous_ranking, packed=packed,
+                                           order_mode=order_mode):
+        pass
+    return ranked_ideas
+
+
+@llm_job("ranking")
+def iter_ranking(ideas_list, ranking_context="", max_workers=10, batch_size=None, scoring_mode=None,
+                 previous_ranking=None, packed=None, order_mode=None):
+    """
+    Versión progresiva de generate_ranking: generador que produce una tupla
+    (ranking_parcial, ideas_completadas, total) al empezar (con las ideas reutilizadas)
+    y cada vez que termina una idea, con el ranking parcial ya ordenado.
+    La última tupla contiene el ranking completo.
     
     Parámetros:
     - ideas_list: Lista de ideas a procesar
     - ranking_context: Contexto opcional para la priorización
     - max_workers: Número máximo de workers para procesamiento en paralelo (default: 10)
     - batch_size: Tamaño de lote para procesar ideas (default: None = procesar todas a la vez)
+    - scoring_mode: "chain" (cinco llamadas por idea) o "structured" (una llamada con salida
+      JSON según esquema); por defecto RANKING_SCORING_MODE
+    - previous_ranking: ideas rankeadas en una ejecución anterior (RankingModule.get_ranked_ideas()).
+      Las ideas cuya huella coincide reutilizan sus métricas y solo se envían al LLM las
+      nuevas o modificadas
+    - packed: en modo "chain", pedir el análisis simplificado y la evaluación cualitativa
+      de varias ideas por llamada antes de procesar cada lote; por defecto RANKING_PACKED_CALLS
+    - order_mode: "score" (orden por puntuación) o "tournament" (al terminar, el torneo por
+      pares de ranking_tournament fija el orden final); por defecto RANKING_ORDER_MODE.
+      Los rankings parciales van siempre por puntuación
     """
     try:
-        print(f"🔄 Iniciando generación de ranking en paralelo con {max_workers} workers...")
+        scoring_mode = scoring_mode or RANKING_SCORING_MODE
+        structured = scoring_mode == "structured"
+        packed = (RANKING_PACKED_CALLS if packed is None else packed) and not structured
+        tournament = (order_mode or RANKING_ORDER_MODE) == "tournament"
+        print(f"🔄 Iniciando generación de ranking en paralelo con {max_workers} workers "
+              f"(modo {'structured' if structured else 'chain'})...")
         
         # Verificar que tenemos un array de ideas no vacío
         if not ideas_list or not isinstance(ideas_list, list) or len(ideas_list) == 0:
             print("❌ No hay ideas para generar ranking")
-            return []
+            yield [], 0, 0
+            return
             
         # Preparar información para el rankeo
         ranked_ideas = []
         
+        # Ranking incremental: reutilizar las ideas cuya huella ya está en el ranking anterior.
+        # Solo se reutilizan resultados completos (con métricas), no los valores por defecto
+        fingerprints = {i: _idea_fingerprint(idea, ranking_context, scoring_mode)
+                        for i, idea in enumerate(ideas_list, 1)}
+        reused = {}
+        if previous_ranking:
+            stored_by_fingerprint = {
+                stored["fingerprint"]: stored for stored in previous_ranking
+                if isinstance(stored, dict) and stored.get("fingerprint") and isinstance(stored.get("metrics"), dict)
+            }
+            for idea_index, fingerprint in fingerprints.items():
+                stored = stored_by_fingerprint.get(fingerprint)
+                if stored is not None:
+                    try:
+                        reused[idea_index] = _reuse_ranked_idea(stored, idea_index)
+                    except Exception as e:
+                        print(f"⚠️ No se pudo reutilizar la idea {idea_index}, se volverá a puntuar: {str(e)}")
+            print(f"♻️ Ranking incremental: {len(reused)} ideas sin cambios reutilizadas, "
+                  f"{len(ideas_list) - len(reused)} nuevas o modificadas se envían al LLM")
+        ranked_ideas.extend(reused.values())
+        
+        # Resultados del modo empaquetado por índice de idea (se rellenan antes de cada lote)
+        packed_analyses = {}
+        packed_evaluations = {}
+        
         # Función para procesar una idea individual (para paralelización)
+        def process_single_idea_traced(idea_data):
+            # Índice de idea en los registros de telemetría de sus llamadas LLM
+            with llm_context(idea_index=idea_data[0]):
+                result = process_single_idea(idea_data)
+            if isinstance(result, dict) and not result.get("error"):
+                result["fingerprint"] = fingerprints.get(idea_data[0])
+            return result
+
         def process_single_idea(idea_data):
             idea_index, idea = idea_data
             try:
@@ -1945,9 +1942,14 @@ def generate_ranking(ideas_list, ranking_context="", max_workers=10, batch_size=
                     analysis_text = analysis_text.replace('%', '%%')
                     analysis_text = analysis_text.replace('{', '{{').replace('}', '}}')
                 
+                # Modo estructurado: una sola llamada con métricas, evaluación, justificación y payoff
+                evaluation = evaluate_idea_structured(idea_text, analysis_text, ranking_context) if structured else None
+                if evaluation is not None and evaluation["analysis"]:
+                    analysis_text = evaluation["analysis"].replace('%', '%%').replace('{', '{{').replace('}', '}}')
+                
                 # Si no hay análisis, generar un análisis simplificado
-                if not analysis_text or len(analysis_text.strip()) < 100:
-                    analysis_text = generate_simplified_analysis(idea_text)
+                if evaluation is None and (not analysis_text or len(analysis_text.strip()) < 100):
+                    analysis_text = packed_analyses.get(idea_index) or generate_simplified_analysis(idea_text)
                     if analysis_text:
                         # Sanitizar el análisis generado
                         analysis_text = analysis_text.replace('%', '%%')
@@ -1967,15 +1969,25 @@ def generate_ranking(ideas_list, ranking_context="", max_workers=10, batch_size=
                 try:
                     # Extraer métricas del análisis con cache para evitar llamadas duplicadas
                         # Pero modificamos cómo manejamos las métricas para evitar el problema de formato
-                    metrics = extract_metrics_from_analysis(analysis_text, idea_text, ranking_context)
-                        
+                    if evaluation is not None:
+                        metrics = evaluation["metrics"]
+                        qualitative_eval = {
+                            "score": evaluation["qualitative_score"],
+                            "justification": evaluation["qualitative_justification"],
+                        }
+                    else:
+                        metrics = extract_metrics_from_analysis(analysis_text, idea_text, ranking_context)
+
                         # IMPORTANTE: Eliminar completamente la justificación para evitar problemas
-                    if 'justificacion' in metrics:
+                        if 'justificacion' in metrics:
                             del metrics['justificacion']
-                    
-                    # Generar evaluación cualitativa (50% de la puntuación)
-                    print(f"ℹ️ Generando evaluación cualitativa para idea {idea_index}...")
-                    qualitative_eval = generate_qualitative_evaluation(idea_text, analysis_text, ranking_context)
+
+                        # Generar evaluación cualitativa (50% de la puntuación)
+                        print(f"ℹ️ Generando evaluación cualitativa para idea {idea_index}...")
+                        if idea_index in packed_evaluations:
+                            qualitative_eval = dict(packed_evaluations[idea_index])
+                        else:
+                            qualitative_eval = generate_qualitative_evaluation(idea_text, analysis_text, ranking_context)
                     
                         # Sanitizar la justificación cualitativa
                     if qualitative_eval and 'justification' in qualitative_eval:
@@ -2003,19 +2015,25 @@ def generate_ranking(ideas_list, ranking_context="", max_workers=10, batch_size=
                         score_data['metrics'] = metrics  # Métricas ya sanitizadas
                         
                     # Generar justificación personalizada
-                    justification = generate_justification_v2(idea_text, analysis_text, score_data, ranking_context)
+                    if evaluation is not None:
+                        justification = evaluation["justification"]
+                    else:
+                        justification = generate_justification_v2(idea_text, analysis_text, score_data, ranking_context)
                     
                         # Sanitizar la justificación final
                     if justification:
                             justification = str(justification).replace('%', '%%').replace('{', '{{').replace('}', '}}')
                         
                     # CAMBIO: Calcular valores de effort y benefit después de tener todos los análisis
-                    effort_value, benefit_value = calculate_payoff_matrix_values(
-                        idea_text, 
-                        analysis_text, 
-                        metrics, 
-                        score_data
-                    )
+                    if evaluation is not None:
+                        effort_value, benefit_value = evaluation["effort"], evaluation["benefit"]
+                    else:
+                        effort_value, benefit_value = calculate_payoff_matrix_values(
+                            idea_text, 
+                            analysis_text, 
+                            metrics, 
+                            score_data
+                        )
                     
                     # Generar visualización de la puntuación
                     wheel_img = generate_score_wheel(score_data['score'])
@@ -2099,70 +2117,68 @@ def generate_ranking(ideas_list, ranking_context="", max_workers=10, batch_size=
                     "exception": error_msg
                 }
         
-        # Si hay un tamaño de lote, procesar las ideas en lotes
+        # Crear lista de tuplas (índice, idea); si hay un tamaño de lote, procesar en lotes
+        indexed_ideas = [(i, idea) for i, idea in enumerate(ideas_list, 1)]
         if batch_size and batch_size > 0 and batch_size < len(ideas_list):
-            batches = [ideas_list[i:i+batch_size] for i in range(0, len(ideas_list), batch_size)]
+            batches = [indexed_ideas[i:i+batch_size] for i in range(0, len(indexed_ideas), batch_size)]
             print(f"🔄 Procesando ideas en {len(batches)} lotes de {batch_size} ideas...")
-            
-            for batch_num, batch in enumerate(batches, 1):
-                print(f"🔄 Procesando lote {batch_num}/{len(batches)} ({len(batch)} ideas)...")
-                
-                # Crear lista de tuplas (índice, idea) para este lote
-                indexed_batch = [(i + (batch_num-1)*batch_size, idea) for i, idea in enumerate(batch, 1)]
-                
-                # Procesar el lote actual en paralelo
-                with concurrent.futures.ThreadPoolExecutor(max_workers=min(max_workers, len(batch))) as executor:
-                    batch_results = list(tqdm(
-                        executor.map(process_single_idea, indexed_batch),
-                        total=len(batch),
-                        desc=f"Lote {batch_num}"
-                    ))
-                
-                # Filtrar resultados válidos y manejar errores
-                for result in batch_results:
-                    if result and isinstance(result, dict):
-                        if result.get("error"):
-                            print(f"⚠️ {result.get('message', 'Error desconocido')}")
-                        else:
-                            ranked_ideas.append(result)
-                
-                print(f"✅ Lote {batch_num} completado: {len(batch_results)} ideas procesadas")
-        
         else:
-            # Procesar todas las ideas en paralelo de una vez
-            # Crear lista de tuplas (índice, idea)
-            indexed_ideas = [(i, idea) for i, idea in enumerate(ideas_list, 1)]
-            
-            # Usar ThreadPoolExecutor para paralelizar el procesamiento
-            with concurrent.futures.ThreadPoolExecutor(max_workers=min(max_workers, len(ideas_list))) as executor:
-                # Usar tqdm para mostrar progreso
-                results = list(tqdm(
-                    executor.map(process_single_idea, indexed_ideas),
-                    total=len(ideas_list),
-                    desc="Procesando ideas"
-                ))
-            
-            # Filtrar resultados válidos
-            for result in results:
-                if result and isinstance(result, dict):
-                    if result.get("error"):
-                        print(f"⚠️ {result.get('message', 'Error desconocido')}")
-                    else:
-                        ranked_ideas.append(result)
+            batches = [indexed_ideas]
+        
+        total = len(ideas_list)
+        completed = len(reused)
+        yield sort_ranked_ideas(ranked_ideas), completed, total
         
-        # Ordenar ideas por puntuación
-        ranked_ideas.sort(key=lambda x: x.get('score', 0), reverse=True)
+        for batch_num, batch in enumerate(batches, 1):
+            # Sin las ideas ya reutilizadas
+            pending = [item for item in batch if item[0] not in reused]
+            if not pending:
+                continue
+            if len(batches) > 1:
+                print(f"🔄 Procesando lote {batch_num}/{len(batches)} ({len(pending)} ideas)...")
+            if packed:
+                batch_analyses, batch_evaluations = prefetch_packed_chain_calls(pending, ranking_context, max_workers)
+                packed_analyses.update(batch_analyses)
+                packed_evaluations.update(batch_evaluations)
+            
+            # Procesar en paralelo y publicar cada idea en cuanto termina
+            with JobThreadPoolExecutor(max_workers=min(max_workers, len(pending))) as executor:
+                futures = [executor.submit(process_single_idea_traced, item) for item in pending]
+                try:
+                    with tqdm(total=len(pending), desc=f"Lote {batch_num}" if len(batches) > 1 else "Procesando ideas") as progress:
+                        for future in concurrent.futures.as_completed(futures):
+                            result = future.result()
+                            progress.update(1)
+                            completed += 1
+                            
+                            # Filtrar resultados válidos y manejar errores
+                            if result and isinstance(result, dict):
+                                if result.get("error"):
+                                    print(f"⚠️ {result.get('message', 'Error desconocido')}")
+                                else:
+                                    ranked_ideas.append(result)
+                            yield sort_ranked_ideas(ranked_ideas), completed, total
+                except GeneratorExit:
+                    # El consumidor dejó de iterar: no lanzar las ideas que aún no han empezado
+                    for future in futures:
+                        future.cancel()
+                    raise
+            
+            if len(batches) > 1:
+                print(f"✅ Lote {batch_num} completado: {len(pending)} ideas procesadas")
         
         print(f"✅ Ranking completado: {len(ranked_ideas)} ideas procesadas")
-        return ranked_ideas
+        if tournament and len(ranked_ideas) > 1:
+            yield sort_ranked_ideas(_order_by_tournament(ranked_ideas, ranking_context)), completed, total
         
     except Exception as e:
         print(f"❌ Error general generando ranking: {str(e)}")
         traceback.print_exc()
-        return []
+        yield [], 0, 0
 
 # Función optimizada para el procesamiento en lotes de LLM
-def process_ideas_batch_optimized(ideas_batch, system_prompt, user_prompt_template, temperature=0.7, max_tokens=2000):
+def process_ideas_batch_optimized(ideas_batch, system_prompt, user_prompt_template, temperature=0.7, max_tokens=2000,
+                                  response_format=None):
     """
     Procesa un lote de ideas con una sola llamada a la API, reduciendo el número total de llamadas.
     
@@ -2172,6 +2188,7 @@ def process_ideas_batch_optimized(ideas_batch, system_prompt, user_prompt_templa
     - user_prompt_template: Plantilla para el prompt de usuario (debe contener '{ideas}')
     - temperature: Temperatura para la llamada API
     - max_tokens: Tokens máximos para la respuesta
+    - response_format: response_format de la API (p. ej. {"type": "json_object"}), opcional
     
     Retorna:
     - Texto con los resultados combinados del procesamiento
@@ -2195,6 +2212,7 @@ def process_ideas_batch_optimized(ideas_batch, system_prompt, user_prompt_templa
         
         # Realizar una única llamada a la API para todo el lote
         try:
+            extra = {"response_format": response_format} if response_format else {}
             response = client.chat.completions.create(
                 model=DEPLOYMENT_NAME,
                 messages=[
@@ -2203,7 +2221,8 @@ def process_ideas_batch_optimized(ideas_batch, system_prompt, user_prompt_templa
                 ],
                 temperature=temperature,
                 max_tokens=max_tokens,
-                timeout=120  # Aumentar timeout para lotes grandes
+                timeout=120,  # Aumentar timeout para lotes grandes
+                **extra
             )
             
             if response and response.choices and response.choices[0].message:
@@ -2220,6 +2239,324 @@ def process_ideas_batch_optimized(ideas_batch, system_prompt, user_prompt_templa
         traceback.print_exc()
         return f"Error en procesamiento: {str(e)}"
 
+def _escape_template(text):
+    # Texto fijo dentro de una plantilla de process_ideas_batch_optimized (str.format)
+    return str(text).replace('{', '{{').replace('}', '}}')
+
+
+def plan_packed_batches(items, fixed_prompt, output_tokens_per_item, max_batch=None):
+    """
+    Reparte items [(índice, texto), ...] en lotes para prompts empaquetados. Cada lote cabe
+    en la entrada (LLM_MAX_INPUT_TOKENS y ventana del deployment) y su salida esperada en
+    RANKING_PACKED_MAX_OUTPUT_TOKENS (o la salida máxima del modelo, si es menor).
+    Retorna (lotes, tope de salida en tokens).
+    """
+    limits = get_model_limits(DEPLOYMENT_NAME)
+    output_cap = min(RANKING_PACKED_MAX_OUTPUT_TOKENS, limits["max_output"])
+    by_output = max(1, int(output_cap / (output_tokens_per_item * 1.25)))
+    size_cap = max(1, min(max_batch or RANKING_PACKED_MAX_BATCH, by_output))
+    input_cap = max(1, min(LLM_MAX_INPUT_TOKENS, limits["context"] - output_cap) - count_tokens(fixed_prompt))
+
+    batches, current, current_tokens = [], [], 0
+    for item in items:
+        # Marcador "IDEA #n:" y separadores
+        tokens = count_tokens(item[1]) + 8
+        if current and (len(current) >= size_cap or current_tokens + tokens > input_cap):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(item)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches, output_cap
+
+
+def split_packed_response(text, expected_ids):
+    """
+    Separa la respuesta JSON de un prompt empaquetado en {id: objeto}.
+
+    Acepta {"ideas": [{"id": 1, ...}, ...]}, una lista de objetos o un objeto con una
+    clave por idea ("1", "IDEA #1"...). Si el JSON no es válido (p. ej. cortado por
+    max_tokens) recupera los objetos {"id": ...} completos que haya. Los ids que no
+    estén en expected_ids o repetidos se descartan.
+    """
+    if not text or not isinstance(text, str):
+        return {}
+    text = text.replace('```json', '').replace('```', '').strip()
+    objects = None
+    try:
+        data = json.loads(text)
+        if isinstance(data, dict) and isinstance(data.get("ideas"), list):
+            objects = data["ideas"]
+        elif isinstance(data, list):
+            objects = data
+        elif isinstance(data, dict):
+            objects = []
+            for key, value in data.items():
+                key_number = re.search(r"(\d+)", str(key))
+                if isinstance(value, dict) and key_number:
+                    objects.append(dict(value, id=value.get("id", key_number.group(1))))
+    except ValueError:
+        pass
+    if objects is None:
+        objects = []
+        decoder = json.JSONDecoder()
+        for match in re.finditer(r'\{\s*"id"\s*:', text):
+            try:
+                obj, _ = decoder.raw_decode(text, match.start())
+                objects.append(obj)
+            except ValueError:
+                continue
+
+    expected = set(expected_ids)
+    parsed = {}
+    for obj in objects:
+        if not isinstance(obj, dict):
+            continue
+        try:
+            obj_id = int(re.search(r"\d+", str(obj.get("id"))).group(0))
+        except (AttributeError, TypeError, ValueError):
+            continue
+        if obj_id in expected and obj_id not in parsed:
+            parsed[obj_id] = obj
+    return parsed
+
+
+def run_packed_calls(items, system_prompt, user_prompt_template, output_tokens_per_item, parse_item, single_call,
+                     temperature=0.4, max_workers=10, label="Llamadas empaquetadas"):
+    """
+    Ejecuta una llamada por lote de ideas con process_ideas_batch_optimized (JSON por idea)
+    y reenvía una a una las ideas cuya respuesta falta o no es válida.
+
+    Parámetros:
+    - items: diccionario índice de idea -> texto del bloque "IDEA #n"
+    - user_prompt_template: plantilla con '{ideas}'; debe pedir {"ideas": [{"id": n, ...}]}
+    - output_tokens_per_item: salida esperada por idea (para el tamaño del lote y max_tokens)
+    - parse_item: objeto de la respuesta -> resultado, o None si no es válido
+    - single_call: índice de idea -> resultado de la llamada individual
+    
+    Retorna (resultados por índice, estadísticas con llamadas empaquetadas e individuales)
+    """
+    batches, output_cap = plan_packed_batches(list(items.items()), system_prompt + user_prompt_template,
+                                              output_tokens_per_item)
+
+    def run_batch(batch):
+        max_tokens = min(output_cap, int(len(batch) * output_tokens_per_item * 1.25) + 1)
+        raw = process_ideas_batch_optimized([text for _, text in batch], system_prompt, user_prompt_template,
+                                            temperature=temperature, max_tokens=max_tokens,
+                                            response_format={"type": "json_object"})
+        # Dentro del prompt las ideas se numeran 1..n según su posición en el lote
+        parsed = split_packed_response(raw, range(1, len(batch) + 1))
+        results = {}
+        for position, (index, _) in enumerate(batch, 1):
+            value = parse_item(parsed[position]) if position in parsed else None
+            if value is not None:
+                results[index] = value
+        return results
+
+    results = {}
+    if batches:
+        with JobThreadPoolExecutor(max_workers=max(1, min(max_workers, len(batches)))) as executor:
+            for batch_results in executor.map(run_batch, batches):
+                results.update(batch_results)
+
+    # Reenvío individual de las ideas sin respuesta válida
+    missing = [index for index in items if index not in results]
+    packed_indexes = set(results)
+    if missing:
+        with JobThreadPoolExecutor(max_workers=max(1, min(max_workers, len(missing)))) as executor:
+            for index, value in zip(missing, executor.map(single_call, missing)):
+                results[index] = value
+
+    print(f"📦 {label}: {len(items)} ideas en {len(batches)} llamadas empaquetadas"
+          f" + {len(missing)} reenviadas una a una")
+    return results, {"items": len(items), "packed_calls": len(batches), "single_calls": len(missing),
+                     "packed_indexes": packed_indexes}
+
+
+_PACKED_ANALYSIS_EXAMPLE = {"ideas": [{"id": 1, "analisis": (
+    "RESUMEN EJECUTIVO\nVisión general de la idea, impacto potencial, desafíos y oportunidades.\n\n"
+    "ANÁLISIS TÉCNICO\nViabilidad técnica, recursos necesarios y complejidades.\n\n"
+    "POTENCIAL DE INNOVACIÓN\nNovedad, ventajas competitivas y propiedad intelectual.\n\n"
+    "ALINEACIÓN ESTRATÉGICA\nEncaje con el mercado de ingeniería y los sistemas existentes.\n\n"
+    "VIABILIDAD COMERCIAL\nPotencial de mercado, modelo de negocio y ROI estimado.\n\n"
+    "VALORACIÓN GLOBAL\nFactores favorables y desfavorables y recomendación."
+)}]}
+
+
+def generate_simplified_analyses_packed(idea_texts, max_workers=10):
+    """
+    Versión empaquetada de generate_simplified_analysis para varias ideas.
+    idea_texts: diccionario índice -> texto de la idea. Retorna índice -> análisis
+    (o el mensaje de error de generate_simplified_analysis si también falla de forma individual).
+    """
+    results, pending = {}, {}
+    for index, idea_text in idea_texts.items():
+        cache_key = _simplified_analysis_cache_key(idea_text)
+        if cache_key in _api_cache:
+            results[index] = _api_cache[cache_key]
+        else:
+            pending[index] = idea_text
+    if not pending:
+        return results
+
+    template = f"""
+        Como consultor experto en análisis de innovación tecnológica, realiza un análisis conciso pero completo de CADA UNA de las siguientes ideas, por separado y sin mezclar información entre ellas:
+        
+        {{ideas}}
+        
+        Para cada idea analiza, con títulos en MAYÚSCULAS para cada sección:
+        
+        1. RESUMEN EJECUTIVO: Visión general, impacto potencial, desafíos y oportunidades principales.
+        2. ANÁLISIS TÉCNICO: Viabilidad técnica, recursos necesarios, complejidades técnicas.
+        3. POTENCIAL DE INNOVACIÓN: Novedad en el mercado, ventajas competitivas, propiedad intelectual.
+        4. ALINEACIÓN ESTRATÉGICA: Compatibilidad con mercado de ingeniería, integración con sistemas existentes.
+        5. VIABILIDAD COMERCIAL: Potencial de mercado, modelo de negocio, ROI estimado.
+        6. VALORACIÓN GLOBAL: Evaluación ponderada, factores favorables/desfavorables, recomendación.
+        
+        IMPORTANTE:
+        - Estilo profesional y ejecutivo
+        - Análisis específico de cada idea, no genérico
+        - Incluir datos cuantitativos cuando sea posible
+        
+        FORMATO DE RESPUESTA:
+        Responde ÚNICAMENTE con un objeto JSON con una entrada por idea, usando como "id" el número de "IDEA #n":
+        {_escape_template(json.dumps(_PACKED_ANALYSIS_EXAMPLE, ensure_ascii=False))}
+        """
+
+    def parse_item(obj):
+        analysis = obj.get("analisis")
+        if isinstance(analysis, str) and len(analysis.strip()) >= 100:
+            return analysis.strip()
+        return None
+
+    packed, stats = run_packed_calls(
+        {index: text[:800] + "..." if len(text) > 800 else text for index, text in pending.items()},
+        "Eres un consultor analítico sénior especializado en evaluación de ideas innovadoras para empresas tecnológicas e ingenierías avanzadas.",
+        template,
+        output_tokens_per_item=1000,
+        parse_item=parse_item,
+        single_call=lambda index: generate_simplified_analysis(pending[index]),
+        temperature=0.7,
+        max_workers=max_workers,
+        label="Análisis simplificados",
+    )
+    for index in stats["packed_indexes"]:
+        _api_cache[_simplified_analysis_cache_key(pending[index])] = packed[index]
+    results.update(packed)
+    return results
+
+
+def generate_qualitative_evaluations_packed(items, context="", max_workers=10):
+    """
+    Versión empaquetada de generate_qualitative_evaluation para varias ideas.
+    items: diccionario índice -> (texto de la idea, análisis). Retorna índice -> {"score", "justification"}.
+    """
+    results, pending = {}, {}
+    for index, (idea_text, analysis_text) in items.items():
+        cache_key = _qualitative_cache_key(idea_text, analysis_text, context)
+        if cache_key in _api_cache:
+            results[index] = _api_cache[cache_key]
+        else:
+            pending[index] = (idea_text, analysis_text)
+    if not pending:
+        return results
+
+    blocks = {}
+    for index, (idea_text, analysis_text) in pending.items():
+        block = idea_text[:500] + "..." if len(idea_text) > 500 else idea_text
+        extract = _qualitative_analysis_extract(analysis_text)
+        if extract:
+            block += f"\nANÁLISIS:\n{extract}"
+        blocks[index] = block
+    context_text = f"\n        CONTEXTO DE PRIORIZACIÓN:\n        {_escape_template(context[:300])}\n" if context and len(context.strip()) > 5 else ""
+    example = {"ideas": [{"id": 1, "score": 72, "justification": "Justificación breve pero fundamentada de la puntuación."}]}
+
+    template = f"""
+        Como consultor experto en evaluación de ideas innovadoras, realiza una evaluación cualitativa 
+        de CADA UNA de las siguientes ideas, que representará el 50% de su puntuación final de ranking.
+        Evalúa cada idea por separado, sin compararla con las demás.
+        {context_text}
+        {{ideas}}
+        
+        INSTRUCCIONES:
+        1. Evalúa la calidad, innovación, viabilidad y potencial de cada idea.
+        2. Asigna una puntuación de 0 a 100, donde:
+           - 0-20: Idea muy pobre o inviable
+           - 21-40: Idea con problemas significativos
+           - 41-60: Idea de calidad media
+           - 61-80: Idea buena con potencial
+           - 81-100: Idea excepcional de alto potencial
+        3. Proporciona una justificación breve pero fundamentada de cada evaluación.
+        
+        FORMATO DE RESPUESTA:
+        Responde ÚNICAMENTE con un objeto JSON con una entrada por idea, usando como "id" el número de "IDEA #n":
+        {_escape_template(json.dumps(example, ensure_ascii=False))}
+        """
+
+    def parse_item(obj):
+        try:
+            score = max(0, min(100, float(obj.get("score"))))
+        except (TypeError, ValueError):
+            return None
+        justification = obj.get("justification")
+        if not isinstance(justification, str) or not justification.strip():
+            return None
+        return {"score": score, "justification": justification.strip()}
+
+    packed, stats = run_packed_calls(
+        blocks,
+        "Eres un consultor experto en evaluación de ideas innovadoras con amplia experiencia en priorización de proyectos de tecnología, ingeniería y ciencia.",
+        template,
+        output_tokens_per_item=250,
+        parse_item=parse_item,
+        single_call=lambda index: generate_qualitative_evaluation(pending[index][0], pending[index][1], context),
+        temperature=0.4,
+        max_workers=max_workers,
+        label="Evaluaciones cualitativas",
+    )
+    for index in stats["packed_indexes"]:
+        _api_cache[_qualitative_cache_key(pending[index][0], pending[index][1], context)] = packed[index]
+    results.update(packed)
+    return results
+
+
+def prefetch_packed_chain_calls(indexed_ideas, ranking_context="", max_workers=10):
+    """
+    Modo empaquetado de iter_ranking (cadena de llamadas): resuelve de antemano, varias
+    ideas por llamada, el análisis simplificado de las ideas sin análisis y la evaluación
+    cualitativa de todas. Retorna (análisis generados, evaluaciones) por índice de idea.
+    """
+    idea_texts, analyses, need_analysis = {}, {}, {}
+    for index, idea in indexed_ideas:
+        if isinstance(idea, str):
+            idea_text, analysis_text = idea, ""
+        elif isinstance(idea, dict):
+            idea_text, analysis_text = str(idea.get('idea', '')), str(idea.get('analysis', ''))
+        else:
+            continue
+        if not idea_text or len(idea_text.strip()) < 10:
+            continue
+        idea_texts[index] = idea_text
+        # Misma sanitización que process_single_idea, para que coincidan las claves de caché
+        analyses[index] = analysis_text.replace('%', '%%').replace('{', '{{').replace('}', '}}') if analysis_text else ""
+        if not analyses[index] or len(analyses[index].strip()) < 100:
+            need_analysis[index] = idea_text
+
+    generated = generate_simplified_analyses_packed(need_analysis, max_workers) if need_analysis else {}
+    for index, analysis in generated.items():
+        if not analysis or "Error" in analysis:
+            # process_single_idea descarta estas ideas sin evaluarlas
+            idea_texts.pop(index, None)
+        else:
+            analyses[index] = analysis.replace('%', '%%').replace('{', '{{').replace('}', '}}')
+
+    evaluations = generate_qualitative_evaluations_packed(
+        {index: (idea_texts[index], analyses[index]) for index in idea_texts}, ranking_context, max_workers
+    ) if idea_texts else {}
+    return generated, evaluations
+
+
 # Optimización del cliente de OpenAI para reducir sobrecarga de conexión
 def optimize_openai_client():
     """
@@ -2245,8 +2582,9 @@ def optimize_openai_client():
         print(f"⚠️ No se pudo optimizar cliente OpenAI: {str(e)}")
         return None
 
-# Cache para almacenar llamadas a la API y evitar repeticiones
-_api_cache = {}
+# Cache persistente para almacenar llamadas a la API y evitar repeticiones entre ejecuciones
+_llm_cache = get_llm_cache()
+_api_cache = _llm_cache.namespace("ranking") if _llm_cache is not None else {}
 
 def cached_api_call(prompt_key, call_function, *args, **kwargs):
     """
@@ -2260,10 +2598,8 @@ def cached_api_call(prompt_key, call_function, *args, **kwargs):
     Retorna:
     - Resultado de la función, ya sea desde caché o de una nueva llamada
     """
-    global _api_cache
-    
     # Generar un hash de la clave del prompt
-    key_hash = hashlib.md5(prompt_key.encode()).hexdigest()
+    key_hash = f"api_call_{hashlib.md5(prompt_key.encode()).hexdigest()}"
     
     # Verificar si ya tenemos este resultado en caché
     if key_hash in _api_cache:
@@ -2278,38 +2614,57 @@ def cached_api_call(prompt_key, call_function, *args, **kwargs):
     
     return result
 
-def generate_score_wheel(score):
+# Rueda de puntuación: la imagen solo depende del score con un decimal (el que se muestra)
+# y de su banda de color, así que se cachea en memoria y en disco entre ejecuciones.
+# SCORE_WHEEL_RENDERER="vector" dibuja la rueda en el PDF con primitivas de fpdf2
+SCORE_WHEEL_RENDERER = os.getenv("SCORE_WHEEL_RENDERER", "png").lower()
+SCORE_WHEEL_CACHE_DIR = os.getenv("SCORE_WHEEL_CACHE_DIR", os.path.join(os.getcwd(), "cache", "score_wheels"))
+# Subir al cambiar el dibujo para no reutilizar imágenes antiguas del disco
+_SCORE_WHEEL_VERSION = 1
+_score_wheel_cache = {}
+_score_wheel_lock = threading.Lock()
+
+# Colores base del colormap RdYlGn de matplotlib, para el degradado de la versión vectorial
+_RDYLGN = ['#a50026', '#d73027', '#f46d43', '#fdae61', '#fee08b', '#ffffbf',
+           '#d9ef8b', '#a6d96a', '#66bd63', '#1a9850', '#006837']
+
+
+def _score_wheel_color(score):
+    """Color de la barra de puntuación según su rango."""
+    if score < 30:
+        return '#FF5252'  # Rojo para puntuaciones bajas
+    elif score < 50:
+        return '#FFA726'  # Naranja para puntuaciones medias-bajas
+    elif score < 70:
+        return '#FFEB3B'  # Amarillo para puntuaciones medias
+    elif score < 85:
+        return '#66BB6A'  # Verde claro para puntuaciones buenas
+    return '#00C853'  # Verde intenso para puntuaciones excelentes
+
+
+def _render_score_wheel_png(score):
     """
     Genera una visualización en forma de rueda polar para una puntuación
-    con gradientes de color según rangos de puntuación
+    con gradientes de color según rangos de puntuación (PNG en bytes)
     """
+    # Crear figura con fondo transparente
+    fig = plt.figure(figsize=(6, 6), facecolor='none')
     try:
-        # Crear figura con fondo transparente
-        fig = plt.figure(figsize=(6, 6), facecolor='none')
         ax = fig.add_subplot(111, polar=True)
-        
-        # Definir rangos de puntuación y sus colores correspondientes
-        # Usamos una escala de colores personalizada
-        if score < 30:
-            color = '#FF5252'  # Rojo para puntuaciones bajas
-        elif score < 50:
-            color = '#FFA726'  # Naranja para puntuaciones medias-bajas
-        elif score < 70:
-            color = '#FFEB3B'  # Amarillo para puntuaciones medias
-        elif score < 85:
-            color = '#66BB6A'  # Verde claro para puntuaciones buenas
-        else:
-            color = '#00C853'  # Verde intenso para puntuaciones excelentes
+        color = _score_wheel_color(score)
         
         # Normalizar puntuación a radianes (0-100 a 0-2π)
         score_radians = (score / 100) * 2 * np.pi
         
         # Crear un gradiente para la rueda
-        cmap = plt.cm.get_cmap('RdYlGn')
+        try:
+            cmap = matplotlib.colormaps['RdYlGn']
+        except AttributeError:
+            cmap = plt.cm.get_cmap('RdYlGn')
         colors = [cmap(i) for i in np.linspace(0, 1, 100)]
         
         # Dibujar la rueda con colores degradados
-        bars = ax.bar(
+        ax.bar(
             x=np.linspace(0, 2*np.pi, 100),
             height=np.ones(100),
             width=2*np.pi/100,
@@ -2338,170 +2693,216 @@ def generate_score_wheel(score):
         for spine in ax.spines.values():
             spine.set_visible(False)
         
-        # Guardar la imagen en un objeto BytesIO para permitir su uso en PDF
         img_stream = BytesIO()
-        plt.savefig(img_stream, format='png', bbox_inches='tight', transparent=True, dpi=100)
-        img_stream.seek(0)
-        plt.close()
-        
-        return img_stream
+        fig.savefig(img_stream, format='png', bbox_inches='tight', transparent=True, dpi=100)
+        return img_stream.getvalue()
+    finally:
+        # Cerrar siempre la figura, también si falla el dibujo
+        plt.close(fig)
+
+
+def generate_score_wheel(score):
+    """
+    Rueda de puntuación como BytesIO (PNG) para insertar en el PDF.
+    Se reutiliza la imagen ya generada para el mismo score redondeado a un decimal.
+    """
+    try:
+        score = round(float(score), 1)
+        key = f"{score:.1f}"
+        data = _score_wheel_cache.get(key)
+        if data is None:
+            path = os.path.join(SCORE_WHEEL_CACHE_DIR, f"wheel_v{_SCORE_WHEEL_VERSION}_{key}.png")
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+            except OSError:
+                data = _render_score_wheel_png(score)
+                try:
+                    os.makedirs(SCORE_WHEEL_CACHE_DIR, exist_ok=True)
+                    # Escribir en un temporal y renombrar: otra ejecución puede estar leyendo
+                    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                    with open(tmp_path, 'wb') as f:
+                        f.write(data)
+                    os.replace(tmp_path, path)
+                except OSError as e:
+                    print(f"⚠️ No se pudo guardar la rueda de puntuación en disco: {str(e)}")
+            with _score_wheel_lock:
+                _score_wheel_cache[key] = data
+        # Un BytesIO nuevo por llamada: quien lo usa lo consume
+        return BytesIO(data)
     except Exception as e:
         print(f"❌ Error generando visualización de puntuación: {str(e)}")
         traceback.print_exc()
         return None
 
+
+def _hex_to_rgb(color):
+    color = color.lstrip('#')
+    return tuple(int(color[i:i + 2], 16) for i in (0, 2, 4))
+
+
+def _blend_with_white(rgb, alpha):
+    # Equivalente a dibujar con transparencia sobre fondo blanco
+    return tuple(round(c * alpha + 255 * (1 - alpha)) for c in rgb)
+
+
+def _rdylgn(t):
+    """Color del degradado RdYlGn en t (0-1), interpolando entre los colores base."""
+    position = t * (len(_RDYLGN) - 1)
+    i = min(int(position), len(_RDYLGN) - 2)
+    frac = position - i
+    start, end = _hex_to_rgb(_RDYLGN[i]), _hex_to_rgb(_RDYLGN[i + 1])
+    return tuple(s + (e - s) * frac for s, e in zip(start, end))
+
+
+def _wedge_points(cx, cy, radius, start, end, steps):
+    # Ángulos en sentido antihorario desde el este, como la rueda polar de matplotlib;
+    # en el PDF el eje y crece hacia abajo
+    points = [(cx, cy)]
+    for k in range(steps + 1):
+        angle = start + (end - start) * k / steps
+        points.append((cx + radius * np.cos(angle), cy - radius * np.sin(angle)))
+    return points
+
+
+def draw_score_wheel_pdf(pdf, score, x, y, size=40, font_family='Arial'):
+    """
+    Dibuja la rueda de puntuación directamente en el PDF con primitivas vectoriales
+    de fpdf2 (sin matplotlib ni imagen): x, y es la esquina superior izquierda y size el lado en mm.
+    """
+    score = round(float(score), 1)
+    cx, cy = x + size / 2, y + size / 2
+    # Misma proporción que la imagen: la rueda ocupa radio 1 de 1.2 y la barra 0.9
+    outer = size / 2 * 0.8
+    segments = 100
+
+    # Anillo de fondo con el degradado (alpha 0.6 sobre blanco)
+    for k in range(segments):
+        rgb = _blend_with_white(_rdylgn(k / (segments - 1)), 0.6)
+        pdf.set_fill_color(*rgb)
+        start = 2 * np.pi * (k - 0.5) / segments
+        pdf.polygon(_wedge_points(cx, cy, outer, start, start + 2 * np.pi / segments, 2), style="F")
+
+    # Barra de puntuación
+    if score > 0:
+        pdf.set_fill_color(*_blend_with_white(_hex_to_rgb(_score_wheel_color(score)), 0.9))
+        end = (score / 100) * 2 * np.pi
+        pdf.polygon(_wedge_points(cx, cy, outer * 0.9, 0, end, max(2, int(score))), style="F")
+
+    # Marcas y puntuación central
+    pdf.set_text_color(80, 80, 80)
+    pdf.set_font(font_family, '', 7)
+    label_radius = outer + 3
+    for angle, label in ((0, '100'), (np.pi / 2, '75'), (np.pi, '50'), (3 * np.pi / 2, '25')):
+        lx, ly = cx + label_radius * np.cos(angle), cy - label_radius * np.sin(angle)
+        pdf.set_xy(lx - 4, ly - 2)
+        pdf.cell(8, 4, label, align='C')
+    pdf.set_text_color(0, 0, 0)
+    pdf.set_font(font_family, 'B', 12)
+    pdf.set_xy(cx - 10, cy - 3)
+    pdf.cell(20, 6, f"{score:.1f}", align='C')
+
+
 class RankingModule:
-    def __init__(self):
-        self.ideas = []
+    def __init__(self, db_path=None):
+        # Las ideas se guardan en SQLite (ranking_store); ranked_ideas.json es el formato
+        # anterior y solo se lee para migrarlo la primera vez
         self.ideas_file = "ranked_ideas.json"
-        self._load_ideas()
-        
-    def _load_ideas(self):
-        """
-        Carga las ideas desde el archivo JSON
-        """
+        self.store = get_ranking_store(db_path)
         try:
-            if os.path.exists(self.ideas_file):
-                try:
-                    with open(self.ideas_file, 'r', encoding='utf-8') as f:
-                        content = f.read().strip()
-                        if not content:
-                            self.ideas = []
-                            return
-                        
-                        loaded_ideas = json.loads(content)
-                        if not isinstance(loaded_ideas, list):
-                            self.ideas = []
-                            self._save_ideas()
-                            return
-                        
-                        # Validar y limpiar ideas cargadas
-                        self.ideas = [self._clean_idea(idea) for idea in loaded_ideas if isinstance(idea, dict)]
-                except json.JSONDecodeError:
-                    self.ideas = []
-                    self._save_ideas()
-                except Exception as e:
-                    self.ideas = []
-            else:
-                self.ideas = []
-                self._save_ideas()
+            self.store.migrate_from_json(self.ideas_file)
         except Exception as e:
-            self.ideas = []
+            print(f"⚠️ Error migrando {self.ideas_file}: {str(e)}")
 
-    def _clean_idea(self, idea: dict) -> dict:
-        """
-        Limpia una idea para asegurar que es serializable
-        """
-        clean = {}
-        try:
-            # Solo mantener campos esenciales
-            if "idea" in idea:
-                clean["idea"] = str(idea["idea"])
-            if "score" in idea:
-                clean["score"] = float(idea["score"])
-            if "title" in idea:
-                clean["title"] = str(idea["title"])
-                
-            # Excluir explícitamente campos problemáticos
-            exclude = ["wheel_img", "bytes_io", "image"]
-            for key, value in idea.items():
-                if key not in exclude and key not in clean:
-                    try:
-                        # Intentar serializar para verificar si es válido
-                        json.dumps({key: value})
-                        clean[key] = value
-                    except:
-                        # Si no es serializable, convertir a string
-                        clean[key] = str(value)
-                        
-            return clean
-        except Exception as e:
-            print(f"Error limpiando idea: {str(e)}")
-            return {"idea": str(idea.get("idea", "")), "score": float(idea.get("score", 0))}
-            
-    def _save_ideas(self):
-        """
-        Guarda las ideas en formato JSON
-        """
-        try:
-            # Limpiar ideas antes de guardar
-            clean_ideas = [self._clean_idea(idea) for idea in self.ideas]
-            
-            # Asegurar que el directorio existe
-            os.makedirs(os.path.dirname(self.ideas_file) if os.path.dirname(self.ideas_file) else '.', exist_ok=True)
-            
-            with open(self.ideas_file, 'w', encoding='utf-8') as f:
-                json.dump(clean_ideas, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"❌ Error guardando ideas: {str(e)}")
-            traceback.print_exc()
+    @property
+    def ideas(self) -> List[Dict[str, Any]]:
+        return self.store.get_ideas()
 
     def update_rankings(self, new_ideas: List[Dict[str, Any]]):
         """
-        Actualiza la lista de ideas con nuevos rankings
+        Sustituye el ranking guardado por las nuevas ideas en una sola transacción
         """
         try:
             if not new_ideas:
                 return False
                 
-            # Limpiar nuevas ideas
-            self.ideas = [self._clean_idea(idea) for idea in new_ideas if isinstance(idea, dict)]
-            
-            # Guardar cambios
-            self._save_ideas()
+            run_id = self.store.replace_all(new_ideas)
             
-            print(f"✅ Rankings actualizados: {len(self.ideas)} ideas disponibles para análisis")
+            print(f"✅ Rankings actualizados: {self.store.count()} ideas disponibles para análisis (ejecución {run_id})")
             return True
         except Exception as e:
             print(f"❌ Error actualizando rankings: {str(e)}")
             traceback.print_exc()
             return False
 
-    def get_ranked_ideas(self) -> List[Dict[str, Any]]:
+    def get_ranked_ideas(self, limit=None, offset=0) -> List[Dict[str, Any]]:
         """
-        Retorna la lista de ideas rankeadas ordenadas por puntuación
+        Retorna las ideas rankeadas ordenadas por puntuación (o por el torneo, si el ranking
+        se generó con RANKING_ORDER_MODE=tournament), opcionalmente paginadas por puntuación
+        (limit ideas a partir de la posición offset)
         """
         try:
-            # Recargar ideas del archivo para asegurar datos actualizados
-            self._load_ideas()
-            
-            # Ordenar ideas por puntuación de mayor a menor
-            return sorted(
-                self.ideas,
-                key=lambda x: float(x.get('score', 0)),
-                reverse=True
-            )
+            # Sin paginar se respeta el orden del torneo, que no es una columna del almacén
+            if limit is None and not offset:
+                return sort_ranked_ideas(self.store.get_ideas())
+            return self.store.get_ideas(limit=limit, offset=offset)
         except Exception as e:
             print(f"❌ Error obteniendo ideas rankeadas: {str(e)}")
             traceback.print_exc()
             return []
 
+    def count_ranked_ideas(self) -> int:
+        """
+        Número de ideas guardadas, para paginar get_ranked_ideas
+        """
+        try:
+            return self.store.count()
+        except Exception as e:
+            print(f"❌ Error contando ideas rankeadas: {str(e)}")
+            return 0
+
+    def rank_ideas(self, ideas_list, ranking_context="", **kwargs) -> List[Dict[str, Any]]:
+        """
+        Rankea las ideas de forma incremental y guarda el resultado: las ideas cuya huella
+        (idea, análisis, contexto y versión de la puntuación) coincide con una ya guardada
+        reutilizan sus métricas; solo las nuevas o modificadas pasan por el LLM.
+        """
+        ranked_ideas = []
+        for ranked_ideas, _, _ in self.iter_rank_ideas(ideas_list, ranking_context, **kwargs):
+            pass
+        return ranked_ideas
+
+    def iter_rank_ideas(self, ideas_list, ranking_context="", **kwargs):
+        """
+        Como rank_ideas, pero produce el ranking parcial a medida que terminan las ideas
+        (tuplas de iter_ranking). El ranking se guarda al terminar.
+        """
+        ranked_ideas = []
+        for ranked_ideas, completed, total in iter_ranking(ideas_list, ranking_context,
+                                                           previous_ranking=self.get_ranked_ideas(), **kwargs):
+            yield ranked_ideas, completed, total
+        if ranked_ideas:
+            self.update_rankings(ranked_ideas)
+
+    def reweight(self, weights=None) -> List[Dict[str, Any]]:
+        """
+        Recalcula score y orden de las ideas guardadas con otro perfil de pesos
+        (ver portfolio_scoring.DEFAULT_WEIGHTS), solo con las métricas guardadas.
+        No modifica el ranking guardado.
+        """
+        return reweight_ranking(self.get_ranked_ideas(), weights)
+
     def add_idea(self, idea: Dict[str, Any]):
         """
-        Añade una nueva idea al ranking
+        Añade una idea al ranking; si ya existe una con el mismo texto, la actualiza
         """
         try:
             if not isinstance(idea, dict) or 'idea' not in idea or 'score' not in idea:
                 print("Formato de idea inválido")
                 return False
             
-            # Limpiar la idea antes de agregarla
-            cleaned_idea = {
-                'idea': str(idea['idea']),
-                'score': float(idea['score'])
-            }
-            # Agregar otros campos si son serializables
-            for key, value in idea.items():
-                if key not in ['idea', 'score']:
-                    try:
-                        json.dumps(value)
-                        cleaned_idea[key] = value
-                    except (TypeError, OverflowError):
-                        cleaned_idea[key] = str(value)
-            
-            self.ideas.append(cleaned_idea)
-            self._save_ideas()
-            print(f"Idea añadida correctamente: {cleaned_idea['idea'][:50]}...")
+            self.store.upsert(idea)
+            print(f"Idea añadida correctamente: {str(idea['idea'])[:50]}...")
             return True
         except Exception as e:
             print(f"Error añadiendo idea: {str(e)}")
@@ -2512,8 +2913,7 @@ class RankingModule:
         Limpia todas las ideas rankeadas
         """
         try:
-            self.ideas = []
-            self._save_ideas()
+            self.store.clear()
             print("Rankings limpiados correctamente")
             return True
         except Exception as e:
@@ -2603,12 +3003,7 @@ def calculate_payoff_matrix_values(idea_text, analysis_text, metrics, score_data
         # Acortar análisis si es muy largo
         shortened_analysis = safe_analysis_text[:800] + "..." if len(safe_analysis_text) > 800 else safe_analysis_text
         
-        # ID único para esta evaluación
-        eval_id = f"payoff_matrix_{int(time.time())}_{random.randint(1000, 9999)}"
-        
         prompt = f"""
-        EVALUACIÓN ID: {eval_id}
-        
         Como consultor especializado en evaluación estratégica de ideas innovadoras, necesito calcular los valores
         para una matriz de payoff para la siguiente idea, utilizando todos los análisis y métricas disponibles.
         
@@ -2806,7 +3201,8 @@ def generate_idea_summary(idea_text, max_chars=350):
             ],
             temperature=0.3,
             max_tokens=150,
-            timeout=15
+            timeout=15,
+            task="summary"
         )
         
         if response and response.choices and response.choices[0].message:
@@ -0,0 +1,568 @@
+"""
+PDF del ranking por streaming, pensado para cientos de ideas.
+
+generate_ranking_pdf_improved montaba todo el informe de golpe: una clase PDF nueva
+en cada llamada, cuatro rutas de logo comprobadas en cada cabecera, un resumen con
+el LLM por idea larga pedido en serie y una búsqueda O(n²) para numerar el anexo.
+RankingReportWriter escribe el mismo informe sección a sección:
+
+- RankingPDF se define una vez; el logo y las fuentes Unicode se resuelven una vez
+  por proceso.
+- Las ideas se dibujan de una en una. La rueda vectorial no crea imagen; la PNG sale
+  de la caché de generate_score_wheel y el BytesIO se suelta en cuanto se inserta.
+- Los resúmenes de las ideas largas se piden en paralelo con una ventana acotada por
+  delante de la idea que se está dibujando, y el resumen ejecutivo en paralelo con
+  la portada y la tabla.
+- Con layout "top" el informe lleva la tabla resumen de todas las ideas y el detalle
+  (rueda, métricas, justificación y anexo) solo de las top N.
+
+    from ranking_pdf import write_ranking_pdf
+    path = write_ranking_pdf(ranked_ideas, ranking_context, layout="top", top_n=20)
+
+Variables de entorno:
+    RANKING_PDF_LAYOUT            "full" (detalle de todas las ideas) o "top" (full)
+    RANKING_PDF_TOP_N             Ideas con detalle en el layout "top" (20)
+    RANKING_PDF_SUMMARY_WORKERS   Resúmenes de ideas pedidos en paralelo (8)
+    RANKING_PDF_MATRIX_DPI        Resolución de la matriz de payoff (150)
+"""
+
+import os
+import traceback
+from collections import deque
+from datetime import datetime
+from functools import lru_cache
+
+from fpdf import FPDF
+
+from llm_gateway import JobThreadPoolExecutor, llm_job
+from portfolio_scoring import weight_shares
+import ranking_module as rm
+
+RANKING_PDF_LAYOUT = os.getenv("RANKING_PDF_LAYOUT", "full").lower()
+RANKING_PDF_TOP_N = int(os.getenv("RANKING_PDF_TOP_N", "20"))
+RANKING_PDF_SUMMARY_WORKERS = int(os.getenv("RANKING_PDF_SUMMARY_WORKERS", "8"))
+RANKING_PDF_MATRIX_DPI = int(os.getenv("RANKING_PDF_MATRIX_DPI", "150"))
+
+LOGO_PATHS = ["logo.png", "static/logo.png", "assets/logo.png", "../static/logo.png"]
+UNICODE_FONT_FILES = {'': 'DejaVuSansCondensed.ttf', 'B': 'DejaVuSansCondensed-Bold.ttf'}
+
+# Las ideas con el texto más largo se resumen con el LLM en el detalle y van completas al anexo
+SUMMARY_MAX_CHARS = 300
+
+WHEEL_SIZE = 40  # Lado de la rueda de puntuación en mm
+
+
+@lru_cache(maxsize=1)
+def find_logo():
+    """Primera ruta de logo que existe (o None); se busca una vez por proceso."""
+    for logo_path in LOGO_PATHS:
+        if os.path.exists(logo_path):
+            return logo_path
+    return None
+
+
+@lru_cache(maxsize=1)
+def _unicode_fonts_available():
+    return all(os.path.exists(path) for path in UNICODE_FONT_FILES.values())
+
+
+class RankingPDF(FPDF):
+    """Documento del ranking: logo y título en la cabecera (salvo portada) y número de página en el pie."""
+
+    def __init__(self, logo_path=None):
+        super().__init__()
+        self.logo_path = logo_path
+        self.font_family_name = 'Helvetica'
+        if _unicode_fonts_available():
+            try:
+                for style, path in UNICODE_FONT_FILES.items():
+                    self.add_font('DejaVu', style, path, uni=True)
+                self.font_family_name = 'DejaVu'
+            except Exception as e:
+                print(f"⚠️ No se pudo cargar la fuente DejaVu: {str(e)}")
+
+    def header(self):
+        # Logo y título solo a partir de la página 2
+        if self.page_no() > 1:
+            if self.logo_path:
+                try:
+                    self.image(self.logo_path, 10, 8, 33)
+                except Exception:
+                    pass
+            self.set_font('Helvetica', 'B', 12)
+            self.cell(0, 10, 'Ranking de Ideas - Análisis de Priorización', 0, 1, 'C')
+            self.ln(5)
+
+    def footer(self):
+        # Número de página centrado a 1.5 cm del final
+        self.set_y(-15)
+        self.set_font('Helvetica', 'I', 8)
+        self.set_text_color(128, 128, 128)
+        self.cell(0, 10, f'Página {self.page_no()}', 0, 0, 'C')
+
+
+def idea_title(idea, position, max_chars=70):
+    """Título de la idea para el PDF: 'title' o la primera línea del texto, truncada."""
+    title = idea.get('title', '')
+    if not title and 'idea' in idea:
+        idea_text = str(idea['idea'])
+        title = idea_text.split('\n')[0][:max_chars] if '\n' in idea_text else idea_text[:max_chars]
+        if len(title) >= max_chars:
+            title += "..."
+    if not title:
+        title = f"Idea {position}"
+    return rm.clean_text_for_pdf(str(title))
+
+
+def _metric(metrics, key, default=3.0):
+    try:
+        return float(metrics.get(key, default))
+    except (TypeError, ValueError):
+        return float(default)
+
+
+def _trl_progress(trl_delta):
+    # Misma escala de progreso TRL que calculate_final_score
+    if trl_delta >= 6:
+        return 5.0
+    if trl_delta >= 4:
+        return 4.0 + (trl_delta - 4) * 0.5
+    if trl_delta >= 2:
+        return 3.0 + (trl_delta - 2) * 0.5
+    if trl_delta == 1:
+        return 2.0
+    return 1.0
+
+
+def idea_dimensions(idea):
+    """
+    Dimensiones técnica, económica y de mercado (0-100) de una idea y, si trae
+    'metrics', sus submétricas en la escala original (1-5, TRL 1-9).
+    """
+    metrics = idea.get('metrics')
+    if not isinstance(metrics, dict):
+        return {
+            'tecnica': float(idea.get('dimension_tecnica', 60) or 0),
+            'economica': float(idea.get('dimension_economica', 60) or 0),
+            'mercado': float(idea.get('dimension_mercado', 60) or 0),
+            'metrics': None,
+        }
+
+    values = {
+        'riesgo_tecnico': _metric(metrics, 'riesgo_tecnico'),
+        'tiempo_desarrollo': _metric(metrics, 'tiempo_desarrollo'),
+        'trl_inicial': _metric(metrics, 'trl_inicial', 3),
+        'trl_final': _metric(metrics, 'trl_final', 6),
+        'costes_ingresos': _metric(metrics, 'ratio_costes_ingresos', metrics.get('costes_ingresos', 3)),
+        'ingresos_previstos': _metric(metrics, 'ingresos_previstos'),
+        'payback_roi': _metric(metrics, 'payback_roi'),
+        'tamano_mercado': _metric(metrics, 'tamano_mercado'),
+        'riesgo_mercado': _metric(metrics, 'riesgo_mercado'),
+        'alineacion_estrategica': _metric(metrics, 'alineacion_estrategica'),
+        'evaluacion_cualitativa': _metric(metrics, 'evaluacion_cualitativa'),
+    }
+    values['trl_delta'] = values['trl_final'] - values['trl_inicial']
+    values['progreso_trl'] = _trl_progress(values['trl_delta'])
+    values['media_tecnica'] = (values['riesgo_tecnico'] + values['tiempo_desarrollo'] + values['progreso_trl']) / 3
+    values['media_economica'] = (values['costes_ingresos'] + values['ingresos_previstos'] + values['payback_roi']) / 3
+    values['media_mercado'] = (values['tamano_mercado'] + values['riesgo_mercado'] + values['alineacion_estrategica']) / 3
+    return {
+        'tecnica': (values['media_tecnica'] - 1.0) / 4.0 * 100,
+        'economica': (values['media_economica'] - 1.0) / 4.0 * 100,
+        'mercado': (values['media_mercado'] - 1.0) / 4.0 * 100,
+        'metrics': values,
+    }
+
+
+def _score(value):
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _percent(share):
+    """0.5 -> "50%", 1/6 -> "16.7%"."""
+    return f"{share * 100:.1f}".rstrip('0').rstrip('.') + "%"
+
+
+def score_weight_labels(idea):
+    """
+    Pesos de la tabla de puntuaciones: los del perfil con el que se puntuó la idea
+    (score_weights, si se re-puntuó) o los de calculate_final_score.
+    """
+    try:
+        shares = weight_shares(idea.get('score_weights'))
+    except (TypeError, ValueError, AttributeError):
+        shares = weight_shares()
+    return {key: _percent(value) for key, value in shares.items()}
+
+
+class RankingReportWriter:
+    """
+    Escribe el PDF del ranking sección a sección. Las ideas se añaden de una en una
+    con add_idea; el documento solo guarda de cada una su página y si va al anexo.
+    """
+
+    def __init__(self):
+        self.pdf = RankingPDF(find_logo())
+        self.pdf.set_auto_page_break(auto=True, margin=15)
+        self.font = self.pdf.font_family_name
+        # Posición en el ranking -> página del detalle
+        self.idea_pages = {}
+        # Posiciones de las ideas resumidas en el detalle, para el anexo
+        self.summarized = []
+
+    def _heading(self, text, size=16, align=''):
+        self.pdf.set_font(self.font, 'B', size)
+        self.pdf.set_text_color(44, 62, 80)  # Azul oscuro
+        self.pdf.cell(0, 10, text, 0, 1, align)
+
+    def write_cover(self, total_ideas):
+        pdf = self.pdf
+        pdf.add_page()
+        if pdf.logo_path:
+            try:
+                logo_width = 80
+                pdf.image(pdf.logo_path, x=(pdf.w - logo_width) / 2, y=40, w=logo_width)
+            except Exception as e:
+                print(f"⚠️ No se pudo añadir el logo en la portada: {str(e)}")
+        pdf.set_font(self.font, 'B', 24)
+        pdf.set_text_color(44, 62, 80)
+        pdf.ln(130)  # Espacio después del logo
+        pdf.cell(0, 20, 'RANKING DE IDEAS', ln=True, align='C')
+        pdf.set_font(self.font, '', 16)
+        pdf.cell(0, 10, 'Informe de Priorización', ln=True, align='C')
+        pdf.ln(20)
+        pdf.set_font(self.font, '', 12)
+        pdf.set_text_color(100, 100, 100)
+        pdf.cell(0, 10, f'Fecha: {datetime.now().strftime("%d/%m/%Y")}', ln=True, align='C')
+        pdf.cell(0, 10, f'Total de ideas analizadas: {total_ideas}', ln=True, align='C')
+
+    def write_executive_summary(self, summary):
+        pdf = self.pdf
+        pdf.add_page()
+        self._heading('Resumen Ejecutivo')
+        pdf.ln(5)
+        pdf.set_font(self.font, '', 12)
+        pdf.set_text_color(0, 0, 0)
+        pdf.multi_cell(0, 6, rm.clean_text_for_pdf(summary))
+
+    def write_ranking_table(self, ideas, detail_count):
+        """Tabla de todas las ideas con sus dimensiones; una fila de altura fija por idea."""
+        pdf = self.pdf
+        pdf.add_page()
+        self._heading('Ranking de Ideas')
+        if detail_count < len(ideas):
+            pdf.set_font(self.font, '', 10)
+            pdf.set_text_color(100, 100, 100)
+            pdf.cell(0, 6, f'Se detallan las {detail_count} primeras ideas; el resto solo aparece en esta tabla.', ln=True)
+        pdf.ln(3)
+
+        columns = (('Pos.', 15), ('Idea', 100), ('Técnica', 20), ('Económica', 20), ('Mercado', 20), ('Total', 15))
+
+        def table_header():
+            pdf.set_font(self.font, 'B', 9)
+            pdf.set_text_color(0, 0, 0)
+            pdf.set_fill_color(240, 240, 240)
+            for label, width in columns:
+                pdf.cell(width, 8, label, 1, 0, 'C', True)
+            pdf.ln()
+            pdf.set_font(self.font, '', 9)
+
+        table_header()
+        for position, idea in enumerate(ideas, 1):
+            if not isinstance(idea, dict):
+                continue
+            # Repetir la cabecera de la tabla en cada página
+            if pdf.get_y() + 7 > pdf.page_break_trigger:
+                pdf.add_page()
+                table_header()
+            dims = idea_dimensions(idea)
+            fill = position % 2 == 0
+            pdf.set_fill_color(*((245, 245, 245) if fill else (255, 255, 255)))
+            pdf.cell(15, 7, str(position), 1, 0, 'C', fill)
+            pdf.cell(100, 7, idea_title(idea, position, max_chars=55), 1, 0, 'L', fill)
+            pdf.cell(20, 7, f"{dims['tecnica']:.1f}", 1, 0, 'C', fill)
+            pdf.cell(20, 7, f"{dims['economica']:.1f}", 1, 0, 'C', fill)
+            pdf.cell(20, 7, f"{dims['mercado']:.1f}", 1, 0, 'C', fill)
+            pdf.cell(15, 7, f"{_score(idea.get('score')):.1f}", 1, 1, 'C', fill)
+
+    def write_payoff_matrix(self, ideas):
+        from payoff_matrix_generator import add_payoff_matrix_to_pdf
+        try:
+            print("🔄 Generando matriz de payoff para el PDF...")
+            self.pdf.add_page()
+            add_payoff_matrix_to_pdf(self.pdf, ideas, dpi=RANKING_PDF_MATRIX_DPI)
+        except Exception as e:
+            # Continuar sin la matriz de payoff
+            print(f"⚠️ Error al generar matriz de payoff: {str(e)}")
+            traceback.print_exc()
+
+    def _draw_wheel(self, score):
+        pdf = self.pdf
+        current_y = pdf.get_y()
+        try:
+            x = pdf.w - WHEEL_SIZE - 10
+            if rm.SCORE_WHEEL_RENDERER == "vector":
+                rm.draw_score_wheel_pdf(pdf, score, x, current_y, WHEEL_SIZE, self.font)
+            else:
+                wheel = rm.generate_score_wheel(score)
+                if wheel is None:
+                    raise ValueError("no se pudo generar la rueda")
+                pdf.image(wheel, x=x, y=current_y, w=WHEEL_SIZE)
+                # fpdf2 ya guarda la imagen (una vez por score distinto); soltar el BytesIO
+                wheel.close()
+        except Exception as e:
+            print(f"⚠️ Error al generar rueda de puntuación: {str(e)}")
+            pdf.set_font(self.font, 'B', 12)
+            pdf.cell(0, 10, f"Puntuación: {score:.1f}/100", ln=True)
+            return
+        pdf.set_xy(10, current_y)
+        pdf.set_font(self.font, 'B', 12)
+        pdf.set_text_color(0, 0, 0)
+        pdf.cell(pdf.w - WHEEL_SIZE - 20, 10, f"Puntuación: {score:.1f}/100", ln=True)
+        pdf.set_y(current_y + WHEEL_SIZE + 5)
+
+    def _score_table(self, idea, dims):
+        pdf = self.pdf
+        score = _score(idea.get('score'))
+        weights = score_weight_labels(idea)
+        rows = (
+            ('B', "Componente Cuantitativo", _score(idea.get('score_quantitative')), weights['cuantitativo']),
+            ('', "- Dimensión Técnica", dims['tecnica'], weights['tecnica']),
+            ('', "- Dimensión Económica", dims['economica'], weights['economica']),
+            ('', "- Dimensión de Mercado", dims['mercado'], weights['mercado']),
+            ('B', "Evaluación Cualitativa", _score(idea.get('score_qualitative')), weights['cualitativo']),
+        )
+        pdf.ln(5)
+        pdf.set_font(self.font, 'B', 12)
+        pdf.cell(0, 10, 'Resumen de Puntuaciones:', ln=True)
+        pdf.set_fill_color(240, 240, 240)
+        pdf.set_font(self.font, 'B', 10)
+        pdf.cell(90, 8, "Categoría", 1, 0, 'C', True)
+        pdf.cell(45, 8, "Puntuación", 1, 0, 'C', True)
+        pdf.cell(45, 8, "Peso", 1, 1, 'C', True)
+        for style, label, value, weight in rows:
+            pdf.set_font(self.font, style, 10)
+            pdf.cell(90, 8, label, 1, 0, 'L')
+            pdf.cell(45, 8, f"{value:.1f}/100", 1, 0, 'C')
+            pdf.cell(45, 8, weight, 1, 1, 'C')
+        pdf.set_font(self.font, 'B', 10)
+        pdf.cell(90, 8, "PUNTUACIÓN TOTAL", 1, 0, 'L', True)
+        pdf.cell(45, 8, f"{score:.1f}/100", 1, 0, 'C', True)
+        pdf.cell(45, 8, "100%", 1, 1, 'C', True)
+
+    def _metrics_table(self, m):
+        pdf = self.pdf
+        rows = (
+            ('B', "Dimensión Técnica (media)", f"{m['media_tecnica']:.2f}/5"),
+            ('', "   - Riesgo Técnico", f"{m['riesgo_tecnico']:.2f}/5"),
+            ('', "   - Tiempo de Desarrollo", f"{m['tiempo_desarrollo']:.2f}/5"),
+            ('', "   - Progreso TRL", f"{m['progreso_trl']:g}/5 (delta={m['trl_delta']:g})"),
+            ('', "   - TRL Inicial / Final", f"{m['trl_inicial']:g}/9 -> {m['trl_final']:g}/9"),
+            ('B', "Dimensión Económica (media)", f"{m['media_economica']:.2f}/5"),
+            ('', "   - Ratio Costes/Ingresos", f"{m['costes_ingresos']:.2f}/5"),
+            ('', "   - Ingresos Previstos", f"{m['ingresos_previstos']:.2f}/5"),
+            ('', "   - Payback/ROI", f"{m['payback_roi']:.2f}/5"),
+            ('B', "Dimensión de Mercado (media)", f"{m['media_mercado']:.2f}/5"),
+            ('', "   - Tamaño de Mercado", f"{m['tamano_mercado']:.2f}/5"),
+            ('', "   - Riesgo de Mercado", f"{m['riesgo_mercado']:.2f}/5"),
+            ('', "   - Alineación Estratégica", f"{m['alineacion_estrategica']:.2f}/5"),
+            ('B', "Evaluación Cualitativa", f"{m['evaluacion_cualitativa']:.2f}/5"),
+        )
+        pdf.set_font(self.font, 'B', 12)
+        pdf.cell(0, 10, 'Métricas Clave:', ln=True)
+        pdf.set_font(self.font, '', 10)
+        pdf.cell(120, 8, "Dimensión y Métrica", 1, 0, 'C', True)
+        pdf.cell(60, 8, "Valor", 1, 1, 'C', True)
+        for style, label, value in rows:
+            pdf.set_font(self.font, style, 10)
+            pdf.cell(120, 8, label, 1, 0, 'L')
+            pdf.cell(60, 8, value, 1, 1, 'C')
+
+    def add_idea(self, position, idea, summary=None):
+        """Página de detalle de una idea: resumen, rueda, puntuaciones, métricas y justificación."""
+        if not isinstance(idea, dict):
+            return
+        pdf = self.pdf
+        pdf.add_page()
+        self.idea_pages[position] = pdf.page_no()
+
+        pdf.set_font(self.font, 'B', 14)
+        pdf.set_text_color(44, 62, 80)
+        pdf.cell(0, 10, f"{position}. {idea_title(idea, position)}", ln=True)
+
+        # Resumen de la idea justo después del título
+        pdf.ln(3)
+        if 'idea' in idea:
+            pdf.set_font(self.font, '', 10)
+            pdf.set_text_color(60, 60, 60)
+            if summary is None:
+                summary = rm.generate_idea_summary(str(idea['idea']), max_chars=SUMMARY_MAX_CHARS)
+            pdf.multi_cell(0, 5, summary)
+            pdf.ln(3)
+            if len(str(idea['idea'])) > SUMMARY_MAX_CHARS:
+                self.summarized.append(position)
+                pdf.set_font(self.font, 'I', 8)
+                pdf.set_text_color(120, 120, 120)
+                pdf.cell(0, 4, "(Resumen ejecutivo - ver texto completo al final del documento)", ln=True)
+                pdf.ln(2)
+
+        pdf.set_font(self.font, '', 11)
+        pdf.set_text_color(0, 0, 0)
+        self._draw_wheel(_score(idea.get('score')))
+
+        dims = idea_dimensions(idea)
+        self._score_table(idea, dims)
+        pdf.ln(5)
+        if dims['metrics']:
+            self._metrics_table(dims['metrics'])
+
+        pdf.ln(10)
+        self._heading('Justificación:', size=14)
+        pdf.ln(2)
+        pdf.set_font(self.font, '', 11)
+        if idea.get('justification'):
+            pdf.set_text_color(0, 0, 0)
+            pdf.multi_cell(0, 6, rm.clean_text_for_pdf(str(idea['justification'])))
+        else:
+            pdf.set_text_color(100, 100, 100)
+            pdf.multi_cell(0, 6, "No se ha proporcionado una justificación detallada para esta idea.")
+
+    def write_references(self, ideas):
+        """Tabla con la página del detalle de cada idea dibujada."""
+        if not self.idea_pages:
+            return
+        pdf = self.pdf
+        pdf.add_page()
+        self._heading("Referencias de Ideas", align='C')
+        pdf.ln(5)
+        pdf.set_font(self.font, 'B', 12)
+        pdf.set_text_color(0, 0, 0)
+        pdf.set_fill_color(240, 240, 240)
+        pdf.cell(15, 10, 'Pos.', 1, 0, 'C', True)
+        pdf.cell(130, 10, 'Idea', 1, 0, 'C', True)
+        pdf.cell(45, 10, 'Página', 1, 1, 'C', True)
+        pdf.set_font(self.font, '', 10)
+        for position, page in self.idea_pages.items():
+            fill = position % 2 == 0
+            pdf.set_fill_color(*((245, 245, 245) if fill else (255, 255, 255)))
+            pdf.cell(15, 10, str(position), 1, 0, 'C', fill)
+            pdf.cell(130, 10, idea_title(ideas[position - 1], position, max_chars=50), 1, 0, 'L', fill)
+            pdf.cell(45, 10, str(page), 1, 1, 'C', fill)
+
+    def write_annex(self, ideas):
+        """Texto completo de las ideas que se resumieron en su página de detalle."""
+        if not self.summarized:
+            return
+        pdf = self.pdf
+        pdf.add_page()
+        self._heading('Anexo: Textos Completos de Ideas')
+        pdf.ln(5)
+        pdf.set_font(self.font, '', 10)
+        pdf.set_text_color(100, 100, 100)
+        pdf.cell(0, 6, 'Esta sección contiene el texto completo de las ideas que fueron resumidas en las páginas anteriores.', ln=True)
+        pdf.ln(8)
+        for position in self.summarized:
+            idea = ideas[position - 1]
+            pdf.set_font(self.font, 'B', 12)
+            pdf.set_text_color(44, 62, 80)
+            pdf.cell(0, 8, f"{position}. {idea_title(idea, position)}", ln=True)
+            pdf.ln(3)
+            pdf.set_font(self.font, '', 9)
+            pdf.set_text_color(0, 0, 0)
+            pdf.multi_cell(0, 5, rm.clean_text_for_pdf(str(idea.get('idea', ''))))
+            pdf.ln(8)
+
+    def save(self, path):
+        self.pdf.output(path)
+        return path
+
+
+def _summaries_ahead(executor, detail_ideas, window):
+    """
+    Recorre (posición, idea, resumen) pidiendo los resúmenes de las siguientes `window`
+    ideas en paralelo: solo hay `window` resúmenes en vuelo o esperando a dibujarse.
+    """
+    pending = deque()
+    items = iter(detail_ideas)
+
+    def submit_next():
+        for position, idea in items:
+            if isinstance(idea, dict) and 'idea' in idea:
+                future = executor.submit(rm.generate_idea_summary, str(idea['idea']), SUMMARY_MAX_CHARS)
+            else:
+                future = None
+            pending.append((position, idea, future))
+            return
+
+    def drain():
+        while pending:
+            position, idea, future = pending.popleft()
+            submit_next()
+            yield position, idea, (future.result() if future else None)
+
+    # La primera ventana se pide ya, no al empezar a recorrer
+    for _ in range(window):
+        submit_next()
+    return drain()
+
+
+@llm_job("ranking_pdf")
+def write_ranking_pdf(ideas, ranking_context, layout=None, top_n=None, output_path=None):
+    """
+    Genera el PDF del ranking con RankingReportWriter.
+
+    Args:
+        ideas: Lista de ideas rankeadas (en orden)
+        ranking_context: Contexto utilizado para la priorización
+        layout: "full" (detalle de todas las ideas) o "top" (tabla + detalle de las top N);
+            por defecto RANKING_PDF_LAYOUT
+        top_n: Ideas con detalle en el layout "top"; por defecto RANKING_PDF_TOP_N
+        output_path: Ruta del PDF; por defecto output/ranking_<fecha>.pdf
+
+    Returns:
+        Ruta del archivo PDF generado o None si falla
+    """
+    try:
+        if not ideas or not isinstance(ideas, list):
+            print("❌ No hay ideas para generar el PDF de ranking")
+            return None
+
+        layout = (layout or RANKING_PDF_LAYOUT).lower()
+        top_n = RANKING_PDF_TOP_N if top_n is None else top_n
+        detail_count = min(len(ideas), max(0, top_n)) if layout == "top" else len(ideas)
+        workers = max(1, RANKING_PDF_SUMMARY_WORKERS)
+
+        if not output_path:
+            output_dir = "output"
+            os.makedirs(output_dir, exist_ok=True)
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            output_path = os.path.join(output_dir, f"ranking_{timestamp}.pdf")
+
+        writer = RankingReportWriter()
+        with JobThreadPoolExecutor(max_workers=workers + 1) as executor:
+            # El resumen ejecutivo se genera mientras se dibuja la portada
+            summary_future = executor.submit(rm.generate_ranking_summary, ideas, ranking_context)
+            detail = _summaries_ahead(executor, enumerate(ideas[:detail_count], 1), 2 * workers)
+
+            writer.write_cover(len(ideas))
+            writer.write_executive_summary(summary_future.result())
+            writer.write_ranking_table(ideas, detail_count)
+            writer.write_payoff_matrix(ideas)
+            for position, idea, summary in detail:
+                writer.add_idea(position, idea, summary)
+
+        writer.write_references(ideas)
+        writer.write_annex(ideas)
+        writer.save(output_path)
+
+        print(f"✅ PDF de ranking generado exitosamente: {output_path} "
+              f"({len(ideas)} ideas, {detail_count} con detalle, {writer.pdf.page_no()} páginas)")
+        return output_path
+
+    except Exception as e:
+        print(f"❌ Error al generar PDF de ranking: {str(e)}")
+        traceback.print_exc()
+        return None
@@ -0,0 +1,238 @@
+"""
+Almacén transaccional (SQLite en modo WAL) de las ideas rankeadas de RankingModule.
+
+Sustituye a ranked_ideas.json, que se reescribía entero en cada actualización:
+cada idea es una fila con columnas indexadas (score, título, ejecución y fecha)
+y el resto de campos en JSON. Las escrituras son transacciones, así que un fallo
+a mitad de una actualización deja el ranking anterior intacto.
+
+- Una idea se identifica por el hash de su texto: add_idea hace upsert.
+- update_rankings sustituye el ranking actual en una sola transacción y registra
+  la ejecución (run) que lo generó.
+- get_ideas admite paginación (limit/offset) ordenada por score.
+- Al abrirse por primera vez importa ranked_ideas.json si existe (el archivo no se borra).
+
+Variables de entorno:
+    RANKING_DB_PATH   Ruta de la base de datos (por defecto ./ranked_ideas.sqlite3)
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import hashlib
+import threading
+
+RANKING_DB_PATH = os.getenv("RANKING_DB_PATH", "ranked_ideas.sqlite3")
+LEGACY_IDEAS_FILE = "ranked_ideas.json"
+
+# Campos que no se guardan (imágenes generadas en memoria)
+_EXCLUDED_FIELDS = ("wheel_img", "bytes_io", "image")
+
+
+def idea_key(idea_text):
+    """Clave estable de una idea: hash de su texto."""
+    return hashlib.sha256(str(idea_text or "").strip().encode("utf-8")).hexdigest()
+
+
+def clean_idea(idea):
+    """
+    Copia serializable de una idea, sin imágenes. Se serializa el diccionario entero
+    una vez; solo si falla se revisa campo a campo y lo no serializable pasa a texto.
+    """
+    clean = {key: value for key, value in idea.items() if key not in _EXCLUDED_FIELDS}
+    if "idea" in clean:
+        clean["idea"] = str(clean["idea"])
+    if "title" in clean:
+        clean["title"] = str(clean["title"])
+    try:
+        clean["score"] = float(clean.get("score", 0) or 0)
+    except (TypeError, ValueError):
+        clean["score"] = 0.0
+    try:
+        json.dumps(clean, ensure_ascii=False)
+    except (TypeError, ValueError):
+        for key, value in list(clean.items()):
+            try:
+                json.dumps(value, ensure_ascii=False)
+            except (TypeError, ValueError):
+                clean[key] = str(value)
+    return clean
+
+
+class RankingStore:
+    """Ideas rankeadas en SQLite, con escrituras atómicas y lectura paginada por score."""
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or RANKING_DB_PATH
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS ideas (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    idea_key TEXT NOT NULL UNIQUE,
+                    title TEXT,
+                    score REAL NOT NULL,
+                    run_id TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    data TEXT NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_ideas_score ON ideas(score DESC, id)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_ideas_title ON ideas(title)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_ideas_run ON ideas(run_id)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_ideas_updated ON ideas(updated_at)")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS runs (
+                    run_id TEXT PRIMARY KEY,
+                    created_at REAL NOT NULL,
+                    idea_count INTEGER NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_created ON runs(created_at)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def _row_values(self, idea, run_id, now):
+        clean = clean_idea(idea)
+        return (
+            idea_key(clean.get("idea", "")),
+            clean.get("title"),
+            clean["score"],
+            run_id,
+            now,
+            now,
+            json.dumps(clean, ensure_ascii=False),
+        )
+
+    def _upsert(self, rows):
+        # created_at se conserva al actualizar una idea existente
+        self._conn.executemany(
+            """
+            INSERT INTO ideas (idea_key, title, score, run_id, created_at, updated_at, data)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(idea_key) DO UPDATE SET
+                title = excluded.title,
+                score = excluded.score,
+                run_id = excluded.run_id,
+                updated_at = excluded.updated_at,
+                data = excluded.data
+            """,
+            rows,
+        )
+
+    def replace_all(self, ideas, run_id=None):
+        """Sustituye el ranking actual por `ideas` en una transacción. Retorna el run_id."""
+        run_id = run_id or uuid.uuid4().hex[:12]
+        now = time.time()
+        rows = [self._row_values(idea, run_id, now) for idea in ideas if isinstance(idea, dict)]
+        with self._lock, self._conn:
+            self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS keep_keys (idea_key TEXT PRIMARY KEY)")
+            self._conn.execute("DELETE FROM keep_keys")
+            self._conn.executemany("INSERT OR IGNORE INTO keep_keys VALUES (?)", [(row[0],) for row in rows])
+            self._conn.execute("DELETE FROM ideas WHERE idea_key NOT IN (SELECT idea_key FROM keep_keys)")
+            self._upsert(rows)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO runs (run_id, created_at, idea_count) VALUES (?, ?, ?)",
+                (run_id, now, len(rows)),
+            )
+        return run_id
+
+    def upsert(self, idea, run_id=None):
+        """Inserta una idea o actualiza la existente con el mismo texto."""
+        with self._lock, self._conn:
+            self._upsert([self._row_values(idea, run_id, time.time())])
+
+    def get_ideas(self, limit=None, offset=0, run_id=None):
+        """Ideas ordenadas por score (mayor primero); limit=None devuelve todas desde offset."""
+        query = "SELECT data FROM ideas"
+        params = []
+        if run_id:
+            query += " WHERE run_id = ?"
+            params.append(run_id)
+        query += " ORDER BY score DESC, id ASC LIMIT ? OFFSET ?"
+        params += [-1 if limit is None else int(limit), max(0, int(offset or 0))]
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def count(self, run_id=None):
+        with self._lock:
+            if run_id:
+                return self._conn.execute("SELECT COUNT(*) FROM ideas WHERE run_id = ?", (run_id,)).fetchone()[0]
+            return self._conn.execute("SELECT COUNT(*) FROM ideas").fetchone()[0]
+
+    def latest_run(self):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT run_id, created_at, idea_count FROM runs ORDER BY created_at DESC LIMIT 1"
+            ).fetchone()
+        return {"run_id": row[0], "created_at": row[1], "idea_count": row[2]} if row else None
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM ideas")
+
+    def migrate_from_json(self, json_path=None):
+        """
+        Importa un ranked_ideas.json del formato anterior, una sola vez por base de datos.
+        Retorna el número de ideas importadas (0 si ya se migró o no hay archivo).
+        """
+        json_path = json_path or LEGACY_IDEAS_FILE
+        with self._lock:
+            done = self._conn.execute("SELECT value FROM meta WHERE key = 'migrated_from_json'").fetchone()
+        if done or not os.path.exists(json_path):
+            return 0
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                content = f.read().strip()
+            legacy = json.loads(content) if content else []
+        except (OSError, ValueError) as e:
+            # Sin marcar la migración: se reintenta en el próximo arranque
+            print(f"⚠️ No se pudo leer {json_path} para migrarlo: {str(e)}")
+            return 0
+        if not isinstance(legacy, list):
+            print(f"⚠️ {json_path} no contiene una lista de ideas; no se migra")
+            return 0
+
+        now = time.time()
+        rows = [self._row_values(idea, "json_migration", now) for idea in legacy if isinstance(idea, dict)]
+        with self._lock, self._conn:
+            self._upsert(rows)
+            if rows:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO runs (run_id, created_at, idea_count) VALUES (?, ?, ?)",
+                    ("json_migration", now, len(rows)),
+                )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated_from_json', ?)",
+                (os.path.abspath(json_path),),
+            )
+        if rows:
+            print(f"📦 Migradas {len(rows)} ideas de {json_path} a {self.db_path}")
+        return len(rows)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_ranking_store(db_path=None):
+    """Instancia compartida del almacén para cada ruta de base de datos."""
+    path = os.path.abspath(db_path or RANKING_DB_PATH)
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = RankingStore(path)
+        return _stores[path]
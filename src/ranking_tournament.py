@@ -0,0 +1,379 @@
+"""
+Ranking por torneo: comparaciones por pares con el LLM en lugar de puntuaciones absolutas.
+
+Las puntuaciones absolutas de generate_qualitative_evaluation tienen ruido y afinarlas
+obliga a re-puntuar todas las ideas. Decidir cuál de dos ideas es mejor es una pregunta
+más estable para el LLM. Comparar todas contra todas cuesta n(n-1)/2 llamadas (19.900
+para 200 ideas); este motor usa un torneo suizo:
+
+- En cada ronda se emparejan ideas con el mismo número de victorias (sin repetir
+  rivales) y las comparaciones de la ronda van en paralelo: unas n/2 por ronda y
+  del orden de log2(n) rondas, O(n log n) en total.
+- Se para antes cuando el top-k no cambia durante TOURNAMENT_STABLE_ROUNDS rondas
+  seguidas (tras un mínimo de rondas), o al agotar el presupuesto max_comparisons.
+- Los candidatos al top-k (k y la mitad más) juegan una liguilla final todos contra
+  todos para ordenar el top-k; muchas de esas comparaciones ya están en la caché.
+
+Las comparaciones se guardan en una caché simétrica (A-B sirve para B-A), en memoria
+y en la caché persistente del LLM, así que repetir o ampliar un torneo solo paga los
+pares nuevos. Qué idea se presenta como "A" lo decide su clave, no la clasificación:
+el líder de cada emparejamiento no sale siempre primero (el LLM tiende a favorecer
+una de las posiciones) y la pregunta de un par es la misma en cualquier ronda.
+
+generate_ranking lo usa con RANKING_ORDER_MODE=tournament (ver ranking_module).
+
+    from ranking_tournament import generate_tournament_ranking
+    result = generate_tournament_ranking(ideas, ranking_context, top_k=10)
+    result["top_k"], result["comparisons"]
+
+Variables de entorno:
+    TOURNAMENT_STABLE_ROUNDS   Rondas seguidas con el mismo top-k para parar (2)
+    TOURNAMENT_MAX_WORKERS     Comparaciones en paralelo (8)
+"""
+
+import os
+import json
+import math
+import hashlib
+import threading
+
+from llm_cache import get_llm_cache
+from llm_gateway import JobThreadPoolExecutor, llm_job
+
+# Importar configuración de OpenAI
+from openai_config import get_openai_client, get_deployment_name
+client = get_openai_client()
+DEPLOYMENT_NAME = get_deployment_name()
+
+TOURNAMENT_STABLE_ROUNDS = int(os.getenv("TOURNAMENT_STABLE_ROUNDS", "2"))
+TOURNAMENT_MAX_WORKERS = int(os.getenv("TOURNAMENT_MAX_WORKERS", "8"))
+
+# Cambiar si cambia el prompt de comparación, para no reutilizar resultados antiguos
+_COMPARE_VERSION = 1
+
+COMPARE_SYSTEM_PROMPT = (
+    "Eres un consultor estratégico sénior de SENER que prioriza ideas innovadoras. Comparas dos "
+    "ideas y eliges la que merece más prioridad según su valor, viabilidad técnica, potencial de "
+    "mercado y alineación con el contexto. Decides siempre; no hay empates. Respondes solo con el JSON pedido."
+)
+
+_COMPARE_SCHEMA = {
+    "name": "comparacion_ideas",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "ganadora": {"type": "string", "enum": ["A", "B"], "description": "Idea con más prioridad"},
+            "motivo": {"type": "string", "description": "Motivo de la elección en una o dos frases"},
+        },
+        "required": ["ganadora", "motivo"],
+        "additionalProperties": False,
+    },
+}
+
+
+def _idea_text(idea):
+    if isinstance(idea, dict):
+        return str(idea.get('idea', '')), str(idea.get('analysis', '') or '')
+    return str(idea), ""
+
+
+def idea_compare_key(idea):
+    """Clave de una idea para la caché de comparaciones (texto de la idea y análisis)."""
+    idea_text, analysis_text = _idea_text(idea)
+    return hashlib.sha256(f"{idea_text.strip()}\n{analysis_text.strip()}".encode("utf-8")).hexdigest()[:32]
+
+
+class ComparisonCache:
+    """Resultados de comparaciones por par. Simétrica: el resultado de (A, B) sirve para (B, A)."""
+
+    def __init__(self, ranking_context=""):
+        self._context = hashlib.sha256(str(ranking_context or "").strip().encode("utf-8")).hexdigest()[:16]
+        self._memory = {}
+        self._lock = threading.Lock()
+        llm_cache = get_llm_cache()
+        self._persistent = llm_cache.namespace("tournament", ttl=0) if llm_cache is not None else None
+
+    def _key(self, key_a, key_b):
+        first, second = sorted((key_a, key_b))
+        return f"v{_COMPARE_VERSION}:{self._context}:{first}:{second}", first
+
+    def get(self, key_a, key_b):
+        """True si gana A, False si gana B, None si no se ha comparado."""
+        key, first = self._key(key_a, key_b)
+        with self._lock:
+            winner = self._memory.get(key)
+        if winner is None and self._persistent is not None:
+            winner = self._persistent.get(key)
+            if winner is not None:
+                with self._lock:
+                    self._memory[key] = winner
+        if winner is None:
+            return None
+        return winner == key_a
+
+    def set(self, key_a, key_b, a_wins):
+        key, _ = self._key(key_a, key_b)
+        winner = key_a if a_wins else key_b
+        with self._lock:
+            self._memory[key] = winner
+        if self._persistent is not None:
+            self._persistent[key] = winner
+
+
+def llm_compare(idea_a, idea_b, ranking_context=""):
+    """
+    Pregunta al LLM cuál de dos ideas merece más prioridad.
+    Retorna True si gana A, False si gana B y None si la llamada falla.
+    """
+    blocks = []
+    for label, idea in (("A", idea_a), ("B", idea_b)):
+        idea_text, analysis_text = _idea_text(idea)
+        block = f"IDEA {label}:\n{idea_text[:1500]}"
+        if analysis_text.strip():
+            block += f"\n\nANÁLISIS DE LA IDEA {label} (extracto):\n{analysis_text[:1500]}"
+        blocks.append(block)
+    context_text = f"\n\nCONTEXTO DE PRIORIZACIÓN:\n{ranking_context[:1000]}" if ranking_context and ranking_context.strip() else ""
+    prompt = "\n\n".join(blocks) + context_text + "\n\n¿Qué idea debería priorizarse, A o B?"
+
+    try:
+        response = client.chat.completions.create(
+            model=DEPLOYMENT_NAME,
+            messages=[
+                {"role": "system", "content": COMPARE_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.0,
+            max_tokens=150,
+            response_format={"type": "json_schema", "json_schema": _COMPARE_SCHEMA},
+            timeout=60
+        )
+        winner = json.loads(response.choices[0].message.content).get("ganadora")
+        if winner not in ("A", "B"):
+            return None
+        return winner == "A"
+    except Exception as e:
+        print(f"⚠️ Comparación fallida: {str(e)}")
+        return None
+
+
+class _Referee:
+    """Aplica la caché y el presupuesto a un comparador, y cuenta las comparaciones pagadas."""
+
+    def __init__(self, ideas, compare, cache, max_comparisons=None):
+        self.ideas = ideas
+        self.keys = [idea_compare_key(idea) for idea in ideas]
+        self.compare = compare
+        self.cache = cache
+        self.max_comparisons = max_comparisons
+        self.comparisons = 0
+        self.cache_hits = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    @property
+    def exhausted(self):
+        return self.max_comparisons is not None and self.comparisons >= self.max_comparisons
+
+    def __call__(self, pair):
+        """True si gana la primera idea del par, False si gana la segunda, None sin resultado."""
+        i, j = pair
+        cached = self.cache.get(self.keys[i], self.keys[j])
+        if cached is not None:
+            with self._lock:
+                self.cache_hits += 1
+            return cached
+        with self._lock:
+            if self.exhausted:
+                return None
+            self.comparisons += 1
+        # "A" es la idea de clave menor, no la mejor clasificada del emparejamiento
+        if self.keys[i] <= self.keys[j]:
+            result = self.compare(self.ideas[i], self.ideas[j])
+        else:
+            result = self.compare(self.ideas[j], self.ideas[i])
+            result = None if result is None else not result
+        if result is None:
+            with self._lock:
+                self.failures += 1
+            return None
+        self.cache.set(self.keys[i], self.keys[j], result)
+        return result
+
+
+def _play(referee, pairs, wins, opponents, max_workers):
+    """Juega una tanda de comparaciones en paralelo y suma las victorias."""
+    if not pairs:
+        return
+    with JobThreadPoolExecutor(max_workers=max(1, min(max_workers, len(pairs)))) as executor:
+        results = list(executor.map(referee, pairs))
+    for (i, j), first_wins in zip(pairs, results):
+        opponents[i].add(j)
+        opponents[j].add(i)
+        if first_wins is None:
+            # Sin resultado (fallo o presupuesto agotado): medio punto a cada una
+            wins[i] += 0.5
+            wins[j] += 0.5
+        elif first_wins:
+            wins[i] += 1
+        else:
+            wins[j] += 1
+
+
+def _standings(wins, opponents, seed_rank):
+    # Victorias; en empate, suma de victorias de los rivales (Buchholz) y orden inicial
+    buchholz = [sum(wins[o] for o in opponents[i]) for i in range(len(wins))]
+    return sorted(range(len(wins)), key=lambda i: (-wins[i], -buchholz[i], seed_rank[i]))
+
+
+def _swiss_pairs(order, opponents, had_bye):
+    """Empareja en orden de clasificación con el siguiente rival no repetido; descansa una si son impares."""
+    pending = list(order)
+    bye = None
+    if len(pending) % 2 == 1:
+        bye = next((i for i in reversed(pending) if i not in had_bye), pending[-1])
+        pending.remove(bye)
+    pairs = []
+    while pending:
+        a = pending.pop(0)
+        b = next((c for c in pending if c not in opponents[a]), pending[0])
+        pending.remove(b)
+        pairs.append((a, b))
+    return pairs, bye
+
+
+def run_tournament(ideas, compare, top_k=10, max_comparisons=None, max_workers=None,
+                   stable_rounds=None, cache=None):
+    """
+    Ordena ideas con un torneo suizo de comparaciones por pares.
+
+    Parámetros:
+    - ideas: lista de ideas (texto o diccionarios con idea/analysis; si traen 'score'
+      se usa como orden inicial)
+    - compare: función (idea_a, idea_b) -> True si gana A, False si gana B, None si falla
+    - top_k: número de ideas del top que se quiere fiable
+    - max_comparisons: presupuesto máximo de comparaciones pagadas (None = sin límite)
+    - max_workers: comparaciones en paralelo por ronda
+    - stable_rounds: rondas seguidas con el mismo top-k para parar antes
+    - cache: ComparisonCache (por defecto una nueva, sin contexto)
+
+    Retorna un diccionario con ranking (copias de las ideas con tournament_rank y
+    tournament_wins), top_k, comparisons (llamadas pagadas), cache_hits, rounds,
+    stopped_early, budget_exhausted y full_pairwise (comparaciones de todos contra todos).
+    """
+    n = len(ideas)
+    max_workers = max_workers or TOURNAMENT_MAX_WORKERS
+    stable_rounds = stable_rounds or TOURNAMENT_STABLE_ROUNDS
+    top_k = max(1, min(top_k, n)) if n else 0
+    referee = _Referee(ideas, compare, cache or ComparisonCache(), max_comparisons)
+
+    def _score(i):
+        try:
+            return float(ideas[i].get('score')) if isinstance(ideas[i], dict) and ideas[i].get('score') is not None else None
+        except (TypeError, ValueError):
+            return None
+
+    # Orden inicial: por score previo si lo hay, después por orden de entrada
+    seed_order = sorted(range(n), key=lambda i: (_score(i) is None, -(_score(i) or 0), i))
+    seed_rank = [0] * n
+    for rank, i in enumerate(seed_order):
+        seed_rank[i] = rank
+
+    wins = [0.0] * n
+    opponents = [set() for _ in range(n)]
+    had_bye = set()
+    rounds = 0
+    stopped_early = False
+
+    if n > 1:
+        # Rondas necesarias para separar el top-k del resto y máximo por si no se estabiliza
+        min_rounds = max(1, math.ceil(math.log2(max(2, n / top_k))) + 1)
+        max_rounds = math.ceil(math.log2(n)) + 2
+        pool_size = min(n, top_k + math.ceil(top_k / 2))
+        previous_top = None
+        stable = 0
+        while rounds < max_rounds and not referee.exhausted:
+            order = _standings(wins, opponents, seed_rank)
+            pairs, bye = _swiss_pairs(order, opponents, had_bye)
+            if bye is not None:
+                had_bye.add(bye)
+                wins[bye] += 1
+            _play(referee, pairs, wins, opponents, max_workers)
+            rounds += 1
+
+            # Estable si el top-k anterior sigue entre los candidatos de la liguilla final:
+            # el orden dentro del grupo lo decide la liguilla
+            order = _standings(wins, opponents, seed_rank)
+            top = set(order[:top_k])
+            stable = stable + 1 if previous_top is not None and previous_top <= set(order[:pool_size]) else 0
+            previous_top = top
+            if rounds >= min_rounds and stable >= max(1, stable_rounds - 1):
+                stopped_early = rounds < max_rounds
+                break
+
+    order = _standings(wins, opponents, seed_rank)
+
+    # Liguilla final entre los candidatos al top-k para ordenarlo
+    candidates = order[:min(n, top_k + math.ceil(top_k / 2))] if n else []
+    if len(candidates) > 1:
+        playoff_wins = {i: 0.0 for i in candidates}
+        pairs = [(a, b) for x, a in enumerate(candidates) for b in candidates[x + 1:]]
+        with JobThreadPoolExecutor(max_workers=max(1, min(max_workers, len(pairs)))) as executor:
+            results = list(executor.map(referee, pairs))
+        for (a, b), first_wins in zip(pairs, results):
+            if first_wins is None:
+                playoff_wins[a] += 0.5
+                playoff_wins[b] += 0.5
+            else:
+                playoff_wins[a if first_wins else b] += 1
+        position = {i: p for p, i in enumerate(candidates)}
+        candidates = sorted(candidates, key=lambda i: (-playoff_wins[i], position[i]))
+        order = candidates + [i for i in order if i not in position]
+
+    ranking = []
+    for rank, i in enumerate(order, 1):
+        idea = dict(ideas[i]) if isinstance(ideas[i], dict) else {"idea": str(ideas[i])}
+        idea["tournament_rank"] = rank
+        idea["tournament_wins"] = wins[i]
+        ranking.append(idea)
+
+    return {
+        "ranking": ranking,
+        "top_k": ranking[:top_k],
+        "comparisons": referee.comparisons,
+        "cache_hits": referee.cache_hits,
+        "failed_comparisons": referee.failures,
+        "rounds": rounds,
+        "stopped_early": stopped_early,
+        "budget_exhausted": referee.exhausted,
+        "full_pairwise": n * (n - 1) // 2,
+    }
+
+
+@llm_job("tournament")
+def generate_tournament_ranking(ideas_list, ranking_context="", top_k=10, max_comparisons=None, max_workers=None):
+    """
+    Ranking por torneo de comparaciones con el LLM (ver run_tournament).
+    Imprime y devuelve cuántas comparaciones se han pagado frente a todos contra todos.
+    """
+    ideas = [idea for idea in (ideas_list or []) if isinstance(idea, (str, dict))]
+    if not ideas:
+        print("❌ No hay ideas para el torneo")
+        return run_tournament([], llm_compare, top_k)
+
+    print(f"🏆 Iniciando torneo de {len(ideas)} ideas (top {top_k})...")
+    result = run_tournament(
+        ideas,
+        lambda a, b: llm_compare(a, b, ranking_context),
+        top_k=top_k,
+        max_comparisons=max_comparisons,
+        max_workers=max_workers,
+        cache=ComparisonCache(ranking_context),
+    )
+    share = result["comparisons"] / result["full_pairwise"] if result["full_pairwise"] else 0
+    print(f"✅ Torneo completado en {result['rounds']} rondas: {result['comparisons']} comparaciones "
+          f"({share:.1%} de las {result['full_pairwise']} de todos contra todos), "
+          f"{result['cache_hits']} desde caché"
+          + (", parada anticipada con el top estable" if result["stopped_early"] else "")
+          + (", presupuesto agotado" if result["budget_exhausted"] else ""))
+    return result
@@ -1,10 +1,15 @@
 import os
 import json
 from openai_config import get_openai_client, get_deployment_name
+from token_budget import plan_call
 
 client = get_openai_client()
 DEPLOYMENT_NAME = get_deployment_name()
 
+# Salida esperada del informe y tope de entrada (la entrada larga también alarga la latencia)
+REPORT_EXPECTED_OUTPUT_TOKENS = 2500
+REPORT_MAX_INPUT_TOKENS = 8000
+
 def build_report(prompt_blob: str, idea: str) -> dict:
     """
     prompt_blob = texto concatenado de todo lo scrap-eado.
@@ -18,13 +23,27 @@ def build_report(prompt_blob: str, idea: str) -> dict:
         "sin cita (‘[LLM]’). Devuelve un objeto JSON con las secciones "
         "Resumen, Mercado, Benchmarking, DAFO, Recomendaciones."
     )
-    user = f"IDEA:\n{idea}\n\nDATOS WEB (puedes citar literal):\n{prompt_blob[:12000]}"
+    # Presupuesto: 5 secciones en JSON (~2500 tokens) y la entrada repartida entre la
+    # idea y los datos web, que se recortan por documentos o se resumen si no caben
+    plan = plan_call(
+        DEPLOYMENT_NAME,
+        [{"role": "system", "content": system},
+         {"role": "user", "content": "IDEA:\n\n\nDATOS WEB (puedes citar literal):\n"}],
+        expected_output_tokens=REPORT_EXPECTED_OUTPUT_TOKENS,
+        variable_texts={"idea": idea, "datos": prompt_blob},
+        weights={"idea": 1, "datos": 4},
+        max_input_tokens=REPORT_MAX_INPUT_TOKENS,
+        previous_max_tokens=4096,
+    )
+    idea_text = plan.fit("idea", idea, strategy="head_tail")
+    datos_web = plan.fit("datos", prompt_blob, strategy="documents", allow_summary=True, client=client)
+    user = f"IDEA:\n{idea_text}\n\nDATOS WEB (puedes citar literal):\n{datos_web}"
     resp = client.chat.completions.create(
         model=DEPLOYMENT_NAME,
         messages=[{"role": "system", "content": system},
                   {"role": "user", "content": user}],
         temperature=0.4,
-        max_tokens=4096,
+        max_tokens=plan.max_tokens,
         response_format={"type": "json_object"}
     )
     return json.loads(resp.choices[0].message.content) 
\ No newline at end of file
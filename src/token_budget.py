@@ -0,0 +1,291 @@
+"""
+Planificador de presupuesto de tokens por llamada.
+
+Sustituye los recortes a ciegas por número de caracteres (`prompt_blob[:12000]`,
+`idea_raw[:800]`...) y los max_tokens sobredimensionados (`max_tokens=16000`).
+Para cada llamada:
+- toma la ventana de contexto y la salida máxima del deployment de una tabla;
+- fija max_tokens a partir del tamaño de salida esperado (con margen), que es lo
+  que el gateway reserva de la cuota TPM y lo que Azure usa para encolar;
+- reparte el resto de la ventana entre los textos variables y elige la estrategia
+  para ajustarlos: sin cambios, recorte (inicio, inicio+final o por documentos) o
+  resumen con el LLM cuando el texto excede mucho el presupuesto.
+
+Variables de entorno:
+    LLM_CONTEXT_LIMITS   JSON con límites por deployment que sustituyen a la tabla,
+                         p. ej. '{"mi-gpt4o": {"context": 128000, "max_output": 16384}}'
+    LLM_MAX_INPUT_TOKENS Tope de tokens de entrada por llamada aunque quepan más
+                         (por defecto 24000; prompts más largos son más lentos)
+"""
+
+import os
+import json
+import threading
+
+from llm_gateway import JobThreadPoolExecutor
+from prompt_builder import count_tokens, count_message_tokens, get_token_encoding
+
+# Ventana de contexto y salida máxima por familia de modelo (se busca por subcadena
+# del nombre del deployment, de la más específica a la más general)
+MODEL_CONTEXT_TABLE = {
+    "gpt-4o-mini": {"context": 128000, "max_output": 16384},
+    "gpt-4o": {"context": 128000, "max_output": 16384},
+    "gpt-4.1": {"context": 1047576, "max_output": 32768},
+    "gpt-4-turbo": {"context": 128000, "max_output": 4096},
+    "gpt-4-32k": {"context": 32768, "max_output": 4096},
+    "gpt-4": {"context": 8192, "max_output": 4096},
+    "gpt-35-turbo": {"context": 16385, "max_output": 4096},
+    "o3-mini": {"context": 200000, "max_output": 100000},
+    "o1": {"context": 200000, "max_output": 100000},
+}
+_DEFAULT_LIMITS = {"context": 128000, "max_output": 16384}
+
+try:
+    LLM_CONTEXT_LIMITS = json.loads(os.getenv("LLM_CONTEXT_LIMITS", "") or "{}")
+except ValueError:
+    print("⚠️ LLM_CONTEXT_LIMITS no es un JSON válido, se ignora")
+    LLM_CONTEXT_LIMITS = {}
+LLM_MAX_INPUT_TOKENS = int(os.getenv("LLM_MAX_INPUT_TOKENS", "24000"))
+
+# Margen sobre la salida esperada y tokens reservados al formato de los mensajes
+_OUTPUT_MARGIN = 1.25
+_SAFETY_TOKENS = 64
+# A partir de cuántas veces el presupuesto se resume en lugar de recortar
+_SUMMARIZE_RATIO = 3.0
+_TRUNCATION_MARK = "\n[...]\n"
+
+
+def get_model_limits(deployment):
+    """Ventana de contexto y salida máxima del deployment (env > tabla > valores por defecto)."""
+    if deployment in LLM_CONTEXT_LIMITS:
+        return {**_DEFAULT_LIMITS, **LLM_CONTEXT_LIMITS[deployment]}
+    name = (deployment or "").lower().replace("gpt-o", "o")
+    for family in sorted(MODEL_CONTEXT_TABLE, key=len, reverse=True):
+        if family in name:
+            return dict(MODEL_CONTEXT_TABLE[family])
+    return dict(_DEFAULT_LIMITS)
+
+
+class BudgetStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.truncated = 0
+        self.summarized = 0
+        self.tokens_removed = 0
+        self.max_tokens_requested = 0
+        self.max_tokens_previous = 0
+
+    def snapshot(self):
+        with self._lock:
+            return {k: v for k, v in self.__dict__.items() if not k.startswith("_")}
+
+
+_stats = BudgetStats()
+
+
+def get_budget_stats():
+    return _stats.snapshot()
+
+
+def print_budget_stats():
+    s = get_budget_stats()
+    if not s["calls"]:
+        return
+    print(
+        f"🎯 Presupuesto de tokens: {s['calls']} llamadas planificadas, {s['truncated']} textos recortados, "
+        f"{s['summarized']} resumidos, {s['tokens_removed']} tokens de entrada eliminados, "
+        f"max_tokens total {s['max_tokens_requested']} (antes {s['max_tokens_previous']})"
+    )
+
+
+# ---------------------------------------------------------------------------
+# Estrategias de ajuste de texto
+# ---------------------------------------------------------------------------
+
+def _cut_tokens(text, max_tokens, from_end=False):
+    encoding = get_token_encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        kept = tokens[-max_tokens:] if from_end else tokens[:max_tokens]
+        return encoding.decode(kept)
+    max_chars = max_tokens * 4
+    return text[-max_chars:] if from_end else text[:max_chars]
+
+
+def truncate_head(text, max_tokens):
+    """Conserva el principio del texto."""
+    return _cut_tokens(text, max_tokens)
+
+
+def truncate_head_tail(text, max_tokens, head_share=0.7):
+    """Conserva el principio y el final (las conclusiones suelen ir al final)."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    head = int(max_tokens * head_share)
+    tail = max(0, max_tokens - head - 4)
+    return _cut_tokens(text, head) + _TRUNCATION_MARK + (_cut_tokens(text, tail, from_end=True) if tail else "")
+
+
+def truncate_documents(text, max_tokens, separator="\n\n"):
+    """
+    Para textos hechos de varios documentos (p. ej. scraping concatenado): reparte el
+    presupuesto entre todos los bloques en lugar de quedarse solo con los primeros.
+    """
+    blocks = [b for b in text.split(separator) if b.strip()]
+    if len(blocks) <= 1 or count_tokens(text) <= max_tokens:
+        return truncate_head_tail(text, max_tokens)
+    sizes = [count_tokens(b) for b in blocks]
+    # Reparto max-min: los bloques pequeños entran enteros y el resto se iguala
+    remaining = max_tokens - len(blocks) * 2
+    allocation = [0] * len(blocks)
+    pending = sorted(range(len(blocks)), key=lambda i: sizes[i])
+    while pending:
+        share = max(0, remaining // len(pending))
+        i = pending.pop(0)
+        allocation[i] = min(sizes[i], share)
+        remaining -= allocation[i]
+    return separator.join(_cut_tokens(b, n) for b, n in zip(blocks, allocation) if n > 0)
+
+
+def summarize_to_budget(text, max_tokens, deployment, client=None, chunk_tokens=6000):
+    """Resume el texto por trozos (map) hasta que quepa en max_tokens."""
+    if client is None:
+        from openai_config import get_openai_client
+        client = get_openai_client()
+    encoding = get_token_encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        chunks = [encoding.decode(tokens[i:i + chunk_tokens]) for i in range(0, len(tokens), chunk_tokens)]
+    else:
+        step = chunk_tokens * 4
+        chunks = [text[i:i + step] for i in range(0, len(text), step)]
+    per_chunk = max(100, max_tokens // max(1, len(chunks)) - 10)
+
+    def summarize(chunk):
+        resp = client.chat.completions.create(
+            model=deployment,
+            messages=[
+                {"role": "system", "content": "Resumes documentos conservando cifras, nombres de empresas, fechas y fuentes. Sin introducciones."},
+                {"role": "user", "content": f"Resume en como máximo {int(per_chunk * 0.75)} palabras:\n\n{chunk}"},
+            ],
+            temperature=0.2,
+            max_tokens=per_chunk,
+        )
+        return (resp.choices[0].message.content or "").strip()
+
+    # Los trozos se resumen en paralelo; el gateway limita la concurrencia real
+    with JobThreadPoolExecutor(max_workers=min(8, len(chunks))) as executor:
+        summaries = list(executor.map(summarize, chunks))
+    return truncate_head("\n\n".join(summaries), max_tokens)
+
+
+def fit_text(text, max_tokens, strategy="auto", deployment=None, allow_summary=False, client=None):
+    """
+    Ajusta un texto a max_tokens con la estrategia indicada:
+    "head", "head_tail", "documents", "summarize" o "auto" (recorte si sobra poco,
+    resumen si excede _SUMMARIZE_RATIO veces el presupuesto y allow_summary=True).
+    """
+    text = text or ""
+    tokens = count_tokens(text)
+    if tokens <= max_tokens:
+        return text
+    if strategy == "auto":
+        if allow_summary and tokens > max_tokens * _SUMMARIZE_RATIO:
+            strategy = "summarize"
+        else:
+            strategy = "head_tail"
+
+    if strategy == "summarize":
+        try:
+            fitted = summarize_to_budget(text, max_tokens, deployment, client=client)
+            with _stats._lock:
+                _stats.summarized += 1
+                _stats.tokens_removed += tokens - count_tokens(fitted)
+            return fitted
+        except Exception as e:
+            print(f"⚠️ No se pudo resumir el texto, se recorta: {str(e)}")
+            strategy = "documents"
+
+    if strategy == "head":
+        fitted = truncate_head(text, max_tokens)
+    elif strategy == "documents":
+        fitted = truncate_documents(text, max_tokens)
+    else:
+        fitted = truncate_head_tail(text, max_tokens)
+    with _stats._lock:
+        _stats.truncated += 1
+        _stats.tokens_removed += tokens - count_tokens(fitted)
+    return fitted
+
+
+# ---------------------------------------------------------------------------
+# Plan por llamada
+# ---------------------------------------------------------------------------
+
+class BudgetPlan:
+    """Resultado de plan_call: max_tokens y tokens de entrada disponibles para cada texto variable."""
+
+    def __init__(self, deployment, max_tokens, input_budget, allocations):
+        self.deployment = deployment
+        self.max_tokens = max_tokens
+        self.input_budget = input_budget
+        self.allocations = allocations
+
+    def fit(self, name, text, strategy="auto", allow_summary=False, client=None):
+        return fit_text(text, self.allocations[name], strategy=strategy, deployment=self.deployment,
+                        allow_summary=allow_summary, client=client)
+
+    def __repr__(self):
+        return f"BudgetPlan(max_tokens={self.max_tokens}, input_budget={self.input_budget}, allocations={self.allocations})"
+
+
+def plan_call(deployment, fixed_messages, expected_output_tokens, variable_texts=None, weights=None,
+              max_input_tokens=None, previous_max_tokens=None):
+    """
+    Planifica una llamada.
+
+    Args:
+        deployment: nombre del deployment (para la tabla de contexto)
+        fixed_messages: mensajes sin los textos variables (instrucciones, esquema...)
+        expected_output_tokens: tamaño de salida esperado; max_tokens = esperado * margen
+        variable_texts: dict nombre -> texto que hay que encajar en el presupuesto
+        weights: dict nombre -> peso relativo en el reparto (por defecto iguales)
+        max_input_tokens: tope de entrada de esta llamada (por defecto LLM_MAX_INPUT_TOKENS)
+        previous_max_tokens: max_tokens que se usaba antes (solo para las estadísticas)
+    """
+    limits = get_model_limits(deployment)
+    max_tokens = min(int(expected_output_tokens * _OUTPUT_MARGIN) + 1, limits["max_output"])
+    fixed_tokens = count_message_tokens(fixed_messages)
+    cap = max_input_tokens or LLM_MAX_INPUT_TOKENS
+    input_budget = max(0, min(cap, limits["context"] - max_tokens - _SAFETY_TOKENS) - fixed_tokens)
+
+    variable_texts = variable_texts or {}
+    weights = weights or {}
+    sizes = {name: count_tokens(text or "") for name, text in variable_texts.items()}
+    allocations = {}
+    if sum(sizes.values()) <= input_budget:
+        allocations = dict(sizes)
+    else:
+        # Los textos que caben en su parte proporcional entran enteros; el sobrante se reparte
+        remaining = input_budget
+        pending = dict(sizes)
+        while pending:
+            total_weight = sum(weights.get(n, 1.0) for n in pending)
+            fits = {n: s for n, s in pending.items() if s <= remaining * weights.get(n, 1.0) / total_weight}
+            if not fits:
+                for n in pending:
+                    allocations[n] = int(remaining * weights.get(n, 1.0) / total_weight)
+                break
+            for n, s in fits.items():
+                allocations[n] = s
+                remaining -= s
+                del pending[n]
+
+    with _stats._lock:
+        _stats.calls += 1
+        _stats.max_tokens_requested += max_tokens
+        _stats.max_tokens_previous += previous_max_tokens or max_tokens
+    return BudgetPlan(deployment, max_tokens, input_budget, allocations)
@@ -0,0 +1,174 @@
+"""
+Pruebas de reanudación y bloqueo de analysis_runs (solo biblioteca estándar).
+
+    python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import json
+import tempfile
+import textwrap
+import unittest
+import subprocess
+from unittest import mock
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC_DIR)
+
+import analysis_runs  # noqa: E402
+from analysis_runs import AnalysisRun, find_resumable_run, load_latest_results  # noqa: E402
+
+IDEAS = [{"idea": "Gemelo digital de subestaciones", "index": 0},
+         {"idea": "Hidrógeno verde en puertos", "index": 1},
+         {"idea": "Mantenimiento predictivo ferroviario", "index": 2}]
+SECTIONS = ["RESUMEN EJECUTIVO: visión general", "ANÁLISIS TÉCNICO: viabilidad"]
+
+
+class RunsDirTestCase(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.runs_dir = self._tmp.name
+        self._held = []
+
+    def tearDown(self):
+        for run in self._held:
+            run.release()
+        self._tmp.cleanup()
+
+    def create(self, ideas=IDEAS, sections=None):
+        return AnalysisRun.create(ideas, "Lote", "Contexto", runs_dir=self.runs_dir, sections=sections)
+
+    def other(self, run):
+        """Otro objeto sobre el mismo directorio, como lo vería otra petición o proceso."""
+        return AnalysisRun.open(run.run_id, self.runs_dir)
+
+    def hold(self, run):
+        self.assertTrue(run.acquire())
+        self._held.append(run)
+        return run
+
+
+class ResumeTest(RunsDirTestCase):
+    def test_completed_results_survive_reopening(self):
+        run = self.create()
+        run.save_result(0, {"idea": IDEAS[0]["idea"], "analysis": "A"})
+        run.save_result(2, {"idea": IDEAS[2]["idea"], "analysis": "C"})
+        self.assertEqual(sorted(self.other(run).completed_results()), [0, 2])
+
+    def test_damaged_result_is_ignored(self):
+        run = self.create()
+        run.save_result(0, {"analysis": "A"})
+        path = os.path.join(run.ideas_dir, os.listdir(run.ideas_dir)[0])
+        with open(path, "w", encoding="utf-8") as f:
+            f.write('{"key": ')
+        self.assertEqual(run.completed_results(), {})
+
+    def test_result_of_another_idea_text_is_not_reused(self):
+        run = self.create()
+        run.save_result(1, {"analysis": "B"})
+        changed = [dict(idea) for idea in IDEAS]
+        changed[1]["idea"] = "Hidrógeno verde en aeropuertos"
+        self.assertIsNone(find_resumable_run(changed, "Lote", "Contexto", runs_dir=self.runs_dir))
+
+    def test_same_batch_is_resumed(self):
+        run = self.create()
+        found = find_resumable_run(IDEAS, "Lote", "Contexto", runs_dir=self.runs_dir)
+        self.assertEqual(found.run_id, run.run_id)
+
+    def test_section_mode_is_part_of_the_fingerprint(self):
+        self.create()
+        self.assertIsNone(find_resumable_run(IDEAS, "Lote", "Contexto", runs_dir=self.runs_dir, sections=SECTIONS))
+        sectioned = self.create(sections=SECTIONS)
+        found = find_resumable_run(IDEAS, "Lote", "Contexto", runs_dir=self.runs_dir, sections=SECTIONS)
+        self.assertEqual(found.run_id, sectioned.run_id)
+        self.assertEqual(found.manifest["sections"], SECTIONS)
+
+    def test_finished_run_is_not_resumed(self):
+        run = self.create()
+        run.update(status="done")
+        self.assertIsNone(find_resumable_run(IDEAS, "Lote", "Contexto", runs_dir=self.runs_dir))
+
+    def test_latest_results_in_index_order(self):
+        run = self.create()
+        run.save_result(2, {"analysis": "C"})
+        run.save_result(0, {"analysis": "A"})
+        run.mark_latest()
+        self.assertEqual([r["analysis"] for r in load_latest_results(self.runs_dir)], ["A", "C"])
+
+
+@unittest.skipIf(analysis_runs.fcntl is None, "sin fcntl se prueba LockFallbackTest")
+class LockTest(RunsDirTestCase):
+    def test_second_owner_is_rejected_until_release(self):
+        run = self.hold(self.create())
+        other = self.other(run)
+        self.assertTrue(other.is_active())
+        self.assertFalse(other.acquire())
+        self.assertFalse(run.is_active())
+        run.release()
+        self.assertFalse(other.is_active())
+        self.hold(other)
+
+    def test_running_batch_is_not_resumed(self):
+        self.hold(self.create())
+        self.assertIsNone(find_resumable_run(IDEAS, "Lote", "Contexto", runs_dir=self.runs_dir))
+
+    def test_lock_is_freed_when_the_owner_process_dies(self):
+        run = self.create()
+        script = textwrap.dedent(f"""
+            import sys, time
+            sys.path.insert(0, {SRC_DIR!r})
+            from analysis_runs import AnalysisRun
+            run = AnalysisRun.open({run.run_id!r}, {self.runs_dir!r})
+            print("locked" if run.acquire() else "busy", flush=True)
+            time.sleep(60)
+        """)
+        child = subprocess.Popen([sys.executable, "-c", script], stdout=subprocess.PIPE, text=True)
+        try:
+            self.assertEqual(child.stdout.readline().strip(), "locked")
+            self.assertTrue(self.other(run).is_active())
+            self.assertIsNone(find_resumable_run(IDEAS, "Lote", "Contexto", runs_dir=self.runs_dir))
+        finally:
+            child.kill()
+            child.wait()
+            child.stdout.close()
+        self.assertFalse(self.other(run).is_active())
+        self.assertEqual(find_resumable_run(IDEAS, "Lote", "Contexto", runs_dir=self.runs_dir).run_id, run.run_id)
+
+
+class LockFallbackTest(RunsDirTestCase):
+    """Sin fcntl (Windows): locked_by en el manifest y caducidad por updated_at."""
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(analysis_runs, "fcntl", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_owner_recorded_in_manifest(self):
+        run = self.hold(self.create())
+        other = self.other(run)
+        self.assertTrue(other.manifest.get("locked_by"))
+        self.assertTrue(other.is_active())
+        self.assertFalse(other.acquire())
+        run.release()
+        self.assertFalse(self.other(run).is_active())
+
+    def test_stale_owner_is_taken_over(self):
+        run = self.hold(self.create())
+        with mock.patch.object(analysis_runs, "ANALYSIS_RUN_STALE_SECONDS", 0):
+            self.assertFalse(self.other(run).is_active())
+            found = find_resumable_run(IDEAS, "Lote", "Contexto", runs_dir=self.runs_dir)
+        self.assertEqual(found.run_id, run.run_id)
+
+    def test_heartbeat_on_save(self):
+        run = self.hold(self.create())
+        with open(run.manifest_path, encoding="utf-8") as f:
+            before = json.load(f)["updated_at"]
+        with mock.patch.object(analysis_runs.time, "time", return_value=before + 5):
+            run.save_result(0, {"analysis": "A"})
+        self.assertEqual(self.other(run).manifest["updated_at"], before + 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
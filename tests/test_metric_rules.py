@@ -0,0 +1,96 @@
+"""
+Pruebas de las reglas de metric_rules (solo biblioteca estándar).
+
+    python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from metric_rules import extract_metrics_by_rules, parse_number  # noqa: E402
+
+
+def values(text):
+    return extract_metrics_by_rules(text)[0]
+
+
+class ParseNumberTest(unittest.TestCase):
+    def test_thousands_and_decimals(self):
+        self.assertEqual(parse_number("2.000"), 2000.0)
+        self.assertEqual(parse_number("1.000.000"), 1000000.0)
+        self.assertEqual(parse_number("3,5"), 3.5)
+        self.assertEqual(parse_number("1,250.5"), 1250.5)
+        self.assertEqual(parse_number("1.250,5"), 1250.5)
+
+
+class TrlTest(unittest.TestCase):
+    def test_range(self):
+        self.assertEqual(values("Hoy está en TRL 4-6."), {"trl_inicial": 4, "trl_final": 6})
+
+    def test_current_and_target(self):
+        result = values("La tecnología está en TRL 3 y el objetivo es alcanzar TRL 7.")
+        self.assertEqual((result["trl_inicial"], result["trl_final"]), (3, 7))
+
+    def test_single_mention_with_connector(self):
+        self.assertEqual(values("Un TRL de 9 en la planta piloto.")["trl_inicial"], 9)
+        self.assertEqual(values("Se encuentra en TRL 9.")["trl_inicial"], 9)
+
+    def test_several_different_mentions_are_ambiguous(self):
+        self.assertNotIn("trl_inicial", values("Un módulo en TRL 3 y otro en TRL 5."))
+
+
+class AmountTest(unittest.TestCase):
+    def test_market_size(self):
+        self.assertIn("tamano_mercado", values("El tamaño del mercado se estima en 2.000 M€."))
+        self.assertIn("tamano_mercado", values("Tamaño de mercado: 3,5 mil millones de euros."))
+
+    def test_market_amount_of_investment_is_ignored(self):
+        self.assertNotIn("tamano_mercado", values("Para entrar en el mercado se requiere una inversión de 5 M€."))
+
+    def test_revenue(self):
+        self.assertIn("ingresos_previstos", values("Ingresos previstos: 4 M€."))
+
+
+class CostRatioTest(unittest.TestCase):
+    def test_explicit_cost_to_revenue(self):
+        self.assertAlmostEqual(values("Los costes operativos suponen el 30% de los ingresos.")["ratio_costes_ingresos"], 3.77)
+
+    def test_margins_are_left_to_the_llm(self):
+        for text in ("Margen bruto del 40%.", "Un margen EBITDA del 25% en el tercer año.", "Margen neto: 12%."):
+            with self.subTest(text=text):
+                self.assertNotIn("ratio_costes_ingresos", values(text))
+
+
+class PaybackTest(unittest.TestCase):
+    def test_explicit_payback(self):
+        self.assertAlmostEqual(values("Payback: 18 meses.")["payback_roi"], 4.5)
+        self.assertAlmostEqual(values("La recuperación de la inversión se estima en 2-3 años.")["payback_roi"], 3.5)
+
+    def test_percentage_roi_is_not_a_payback(self):
+        for text in (
+            "Se estima ROI del 25% en 2 años.",
+            "El retorno de la inversión del 30% en 3 años.",
+            "Un ROI en 2 años superior a la media.",
+            "Payback con una TIR del 18 % a 5 años.",
+        ):
+            with self.subTest(text=text):
+                self.assertNotIn("payback_roi", values(text))
+
+
+class LevelTest(unittest.TestCase):
+    def test_risks_and_alignment(self):
+        result = values("Riesgo técnico: alto. El riesgo de mercado es bajo. Alineación estratégica: 4/5.")
+        self.assertEqual(result["riesgo_tecnico"], 1.5)
+        self.assertEqual(result["riesgo_mercado"], 4.5)
+        self.assertEqual(result["alineacion_estrategica"], 4.0)
+
+    def test_empty_text(self):
+        self.assertEqual(extract_metrics_by_rules(""), ({}, {}))
+        self.assertEqual(extract_metrics_by_rules(None), ({}, {}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+"""
+Pruebas de portfolio_scoring frente a ranking_module.calculate_final_score.
+
+ranking_module crea el cliente LLM al importarse: se usa el modo simulado sin
+servidor (no se hace ninguna llamada).
+
+    python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import math
+import random
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+os.environ.setdefault("LLM_MODE", "fake")
+os.environ.setdefault("LLM_FAKE_SERVER_URL", "http://127.0.0.1:9")
+os.environ.setdefault("LLM_CACHE_ENABLED", "0")
+os.environ.setdefault("LLM_TELEMETRY_ENABLED", "0")
+
+from portfolio_scoring import (  # noqa: E402
+    DEFAULT_SCORE, SCORE_COLUMNS, normalize_weights, reweight_ranking, score_portfolio, weight_shares,
+)
+from ranking_module import calculate_final_score  # noqa: E402
+
+
+def random_metrics(rng):
+    """Métricas como las del LLM: decimales en 1-5, TRL enteros o en texto y opcionales ausentes."""
+    metrics = {
+        "riesgo_tecnico": round(rng.uniform(1, 5), rng.choice([0, 1, 2])),
+        "tiempo_desarrollo": round(rng.uniform(1, 5), 1),
+        "trl_inicial": rng.randint(1, 9),
+        "trl_final": rng.randint(1, 9),
+        "ingresos_previstos": rng.choice([rng.uniform(1, 5), str(round(rng.uniform(1, 5), 1))]),
+        "riesgo_mercado": round(rng.uniform(1, 5), 2),
+        "ratio_costes_ingresos": round(rng.uniform(1, 5), 2),
+    }
+    if rng.random() < 0.5:
+        metrics["trl_final"] = str(metrics["trl_final"])
+    for key in ("payback_roi", "tamano_mercado", "alineacion_estrategica", "evaluacion_cualitativa"):
+        if rng.random() < 0.7:
+            metrics[key] = round(rng.uniform(1, 5), rng.choice([1, 2, 3]))
+    return metrics
+
+
+class MatchesCalculateFinalScoreTest(unittest.TestCase):
+    def assert_same(self, metrics_list):
+        scores = score_portfolio(metrics_list, with_ranks=False)
+        for row, metrics in enumerate(metrics_list):
+            expected = calculate_final_score(metrics)
+            for name in SCORE_COLUMNS:
+                value = scores[name].iloc[row]
+                if name in expected:
+                    self.assertEqual(value, expected[name], f"fila {row}, {name}: {metrics}")
+                else:
+                    self.assertTrue(math.isnan(value), f"fila {row}, {name}: {metrics}")
+
+    def test_random_portfolio_is_exactly_equal(self):
+        rng = random.Random(20240607)
+        self.assert_same([random_metrics(rng) for _ in range(2000)])
+
+    def test_invalid_rows_get_the_default_score(self):
+        base = random_metrics(random.Random(1))
+        broken = [
+            {k: v for k, v in base.items() if k != "riesgo_mercado"},
+            dict(base, trl_inicial="3.5"),
+            dict(base, ingresos_previstos="alto"),
+            dict(base, riesgo_tecnico=None),
+        ]
+        self.assert_same(broken)
+        self.assertTrue((score_portfolio(broken)["score"] == DEFAULT_SCORE).all())
+
+    def test_ranks_keep_input_order_on_ties(self):
+        metrics = random_metrics(random.Random(2))
+        ranks = score_portfolio([metrics, metrics, dict(metrics, evaluacion_cualitativa=5.0)])["rank"].tolist()
+        self.assertEqual(sorted(ranks), [1, 2, 3])
+        self.assertLess(ranks[0], ranks[1])
+
+
+class WeightsTest(unittest.TestCase):
+    def test_default_shares(self):
+        shares = weight_shares()
+        self.assertEqual(shares["cuantitativo"], 0.5)
+        self.assertEqual(shares["cualitativo"], 0.5)
+        self.assertAlmostEqual(shares["tecnica"], 1 / 6)
+
+    def test_invalid_weights(self):
+        for weights in ({"tecnica": -1}, {"cualitativo": 1.5}, {"otro": 1},
+                        {"tecnica": 0, "economica": 0, "mercado": 0}):
+            with self.subTest(weights=weights):
+                with self.assertRaises(ValueError):
+                    normalize_weights(weights)
+
+    def test_reweight_stamps_the_profile(self):
+        metrics = random_metrics(random.Random(3))
+        ideas = reweight_ranking([{"idea": "a", "score": 10, "metrics": metrics}, {"idea": "b", "score": 20}],
+                                 {"cualitativo": 0.2})
+        by_idea = {idea["idea"]: idea for idea in ideas}
+        self.assertEqual(by_idea["a"]["score_weights"]["cualitativo"], 0.2)
+        self.assertNotIn("score_weights", by_idea["b"])
+        self.assertEqual(by_idea["b"]["score"], 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+"""
+Pruebas de la migración de ranked_ideas.json en ranking_store (solo biblioteca estándar).
+
+    python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import json
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from ranking_store import RankingStore  # noqa: E402
+
+
+class MigrateFromJsonTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.json_path = os.path.join(self._tmp.name, "ranked_ideas.json")
+        self.store = RankingStore(os.path.join(self._tmp.name, "ranked_ideas.sqlite3"))
+
+    def tearDown(self):
+        self.store._conn.close()
+        self._tmp.cleanup()
+
+    def _write(self, content):
+        with open(self.json_path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def test_imports_once(self):
+        self._write(json.dumps([{"idea": "Idea A", "title": "A", "score": 70}, {"idea": "Idea B", "score": 55}]))
+        self.assertEqual(self.store.migrate_from_json(self.json_path), 2)
+        self.assertEqual(self.store.count(), 2)
+        self.assertEqual(self.store.migrate_from_json(self.json_path), 0)
+
+    def test_unreadable_file_is_retried(self):
+        self._write("[{\"idea\": \"Idea A\", ")
+        self.assertEqual(self.store.migrate_from_json(self.json_path), 0)
+        self._write(json.dumps([{"idea": "Idea A", "score": 70}]))
+        self.assertEqual(self.store.migrate_from_json(self.json_path), 1)
+
+    def test_non_list_is_retried(self):
+        self._write(json.dumps({"idea": "Idea A"}))
+        self.assertEqual(self.store.migrate_from_json(self.json_path), 0)
+        self._write(json.dumps([{"idea": "Idea A", "score": 70}]))
+        self.assertEqual(self.store.migrate_from_json(self.json_path), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()